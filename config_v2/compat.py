@@ -9,10 +9,9 @@ them to the new typed API one by one.
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Mapping, Optional
 
-from config_v2.manager import config_manager
-from config_v2.schema import MODULE_REGISTRY
+from config_v2.manager import _copy_tree, config_manager
 
 logger = logging.getLogger(__name__)
 
@@ -56,22 +55,19 @@ class CompatConfigManager:
 
         if module_name:
             # Return single module in old format: {"enabled": ..., "overrides": {...}}
-            resolved = await mgr.get_resolved_raw(effective_chat, module_name)
-            enabled = resolved.pop("enabled", True)
-            return {"enabled": enabled, "overrides": resolved}
+            return _old_format(await mgr.get_resolved_view(effective_chat, module_name))
 
         # Return full config in old format
-        config_modules: Dict[str, Any] = {}
-        for mod_key in MODULE_REGISTRY:
-            resolved = await mgr.get_resolved_raw(effective_chat, mod_key)
-            enabled = resolved.pop("enabled", True)
-            config_modules[mod_key] = {"enabled": enabled, "overrides": resolved}
+        views = await mgr.get_all_resolved_views(effective_chat)
+        config_modules: Dict[str, Any] = {
+            mod_key: _old_format(view) for mod_key, view in views.items()
+        }
 
         result: Dict[str, Any] = {"config_modules": config_modules}
 
         # Add chat_metadata for compatibility
         if effective_chat != "global":
-            chat_info = await mgr.db.get_chat(effective_chat)
+            chat_info = await mgr.get_chat_info(effective_chat)
             result["chat_metadata"] = {
                 "chat_id": effective_chat,
                 "chat_type": chat_type or (chat_info["chat_type"] if chat_info else "private"),
@@ -88,6 +84,21 @@ class CompatConfigManager:
 
         return result
 
+    async def get_module_view(
+        self, chat_id: Optional[str], chat_type: Optional[str], module_name: str
+    ) -> Mapping[str, Any]:
+        """
+        Read-only variant of get_config(..., module_name=...) for hot paths.
+
+        Returns the cached resolved settings of the module (the old
+        "overrides" plus "enabled") without copying them. The result is
+        shared and must not be modified.
+        """
+        mgr = config_manager()
+        if chat_id and chat_type and chat_id != "global":
+            await mgr.ensure_chat(chat_id, chat_type)
+        return await mgr.get_resolved_view(str(chat_id) if chat_id else "global", module_name)
+
     async def save_config(self, *args: Any, **kwargs: Any) -> None:
         """No-op — old save_config is not needed, writes happen via set_value."""
         pass
@@ -155,6 +166,13 @@ class CompatConfigManager:
         return await self.get_config(chat_id, chat_type, chat_name=chat_name)
 
 
+def _old_format(resolved: Mapping[str, Any]) -> Dict[str, Any]:
+    """Copy a resolved module dict into the old {"enabled", "overrides"} shape."""
+    overrides = _copy_tree(resolved)
+    enabled = overrides.pop("enabled", True)
+    return {"enabled": enabled, "overrides": overrides}
+
+
 # Singleton
 _compat_instance: Optional[CompatConfigManager] = None
 
@@ -6,7 +6,8 @@ Tables:
   - config_values: all config values (global + per-chat overrides)
   - backups: named snapshots for backup/restore
 
-No caching — always read from DB. SQLite local reads are sub-millisecond.
+No caching here — ConfigManager caches resolved configs and invalidates
+them on its own writes.
 """
 
 from __future__ import annotations
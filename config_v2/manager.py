@@ -13,12 +13,20 @@ Usage:
 
     # Set a global default
     await config_manager().set_value("global", "gpt", "command", {...})
+
+Resolved configs are cached per (chat_id, module). Each chat's raw values
+are loaded with one bulk query and the global layer is shared by all chats.
+Every write through this manager invalidates exactly the entries it can
+affect (a global write invalidates that module for every chat), so writes
+made directly to the SQLite file by another process are only picked up
+after ``invalidate_cache()``.
 """
 
 from __future__ import annotations
 
 import logging
-from typing import Any, Optional, TypeVar, Type
+import time
+from typing import Any, Mapping, Optional, TypeVar, Type
 
 from pydantic import BaseModel
 
@@ -29,6 +37,9 @@ logger = logging.getLogger(__name__)
 
 T = TypeVar("T", bound=BaseModel)
 
+# Seconds between refreshes of a known chat's updated_at (the web UI sorts by it)
+CHAT_TOUCH_INTERVAL = 3600
+
 # Singleton
 _instance: Optional[ConfigManager] = None
 
@@ -54,6 +65,14 @@ class ConfigManager:
 
     def __init__(self, db: ConfigDB) -> None:
         self.db = db
+        # chat_id -> module -> raw DB values ("global" is the shared layer)
+        self._raw: dict[str, dict[str, dict[str, Any]]] = {}
+        # (chat_id, module) -> (validated model, model_dump() of it)
+        self._resolved: dict[tuple[str, str], tuple[BaseModel, dict[str, Any]]] = {}
+        # chat_id -> {"chat_type", "chat_name"} as last written or read
+        self._chats: dict[str, dict[str, Any]] = {}
+        # Bumped by every invalidation; loads that raced with one are not cached
+        self._generation = 0
 
     @classmethod
     async def create(cls, db_path: str | None = None) -> ConfigManager:
@@ -84,24 +103,51 @@ class ConfigManager:
         2. Global DB values (chat_id='global')
         3. Per-chat DB overrides (if chat_id != 'global')
 
-        Returns a fully populated Pydantic model.
+        Returns a fully populated Pydantic model (a copy the caller may modify).
         """
         # Find which module key maps to this model class
         module_key = self._model_to_key(model_class)
+        model, _ = await self._get_resolved(str(chat_id), module_key)
+        return model.model_copy(deep=True)  # type: ignore[return-value]
+
+    async def _get_resolved(
+        self, chat_id: str, module: str
+    ) -> tuple[BaseModel, dict[str, Any]]:
+        """Return the cached (model, dict) resolution of a module, resolving it on a miss."""
+        cached = self._resolved.get((chat_id, module))
+        if cached is not None:
+            return cached
+
+        generation = self._generation
+        model_class = MODULE_REGISTRY[module]
 
         # Start with Pydantic defaults
         defaults = model_class().model_dump()
 
         # Layer global values on top
-        global_values = await self.db.get_module_config("global", module_key)
+        global_values = (await self._get_raw("global")).get(module, {})
         merged = _deep_merge(defaults, global_values)
 
         # Layer per-chat overrides on top (if not requesting global itself)
         if chat_id != "global":
-            chat_values = await self.db.get_module_config(str(chat_id), module_key)
+            chat_values = (await self._get_raw(chat_id)).get(module, {})
             merged = _deep_merge(merged, chat_values)
 
-        return model_class.model_validate(merged)
+        model = model_class.model_validate(merged)
+        resolved = (model, model.model_dump())
+        if generation == self._generation:
+            self._resolved[(chat_id, module)] = resolved
+        return resolved
+
+    async def _get_raw(self, chat_id: str) -> dict[str, dict[str, Any]]:
+        """Return all raw module values of a chat, loading them in one query."""
+        raw = self._raw.get(chat_id)
+        if raw is None:
+            generation = self._generation
+            raw = await self.db.get_all_modules_config(chat_id)
+            if generation == self._generation:
+                self._raw[chat_id] = raw
+        return raw
 
     async def get_raw_config(
         self, chat_id: str, module: str
@@ -113,11 +159,42 @@ class ConfigManager:
         self, chat_id: str, module: str
     ) -> dict[str, Any]:
         """Get merged config as a dict (global + per-chat)."""
-        model_class = MODULE_REGISTRY.get(module)
-        if not model_class:
+        resolved: dict[str, Any] = _copy_tree(await self.get_resolved_view(chat_id, module))
+        return resolved
+
+    async def get_resolved_view(
+        self, chat_id: str, module: str
+    ) -> Mapping[str, Any]:
+        """
+        Get merged config as the cached dict itself, without copying.
+
+        The result is shared by every caller and must not be modified; use
+        get_resolved_raw() for a private copy.
+        """
+        if module not in MODULE_REGISTRY:
             return {}
-        obj = await self.get_typed_config(chat_id, model_class)
-        return obj.model_dump()
+        _, resolved = await self._get_resolved(str(chat_id), module)
+        return resolved
+
+    async def get_all_resolved_views(self, chat_id: str) -> dict[str, Mapping[str, Any]]:
+        """Get the shared merged dicts of every registered module of a chat."""
+        chat_id = str(chat_id)
+        return {
+            module: (await self._get_resolved(chat_id, module))[1]
+            for module in MODULE_REGISTRY
+        }
+
+    async def get_chat_info(self, chat_id: str) -> Optional[dict[str, Any]]:
+        """Get a chat's type and name, from memory when it has been seen before."""
+        info = self._chats.get(chat_id)
+        if info is None:
+            row = await self.db.get_chat(chat_id)
+            if row is None:
+                return None
+            info = self._chats[chat_id] = {
+                "chat_type": row["chat_type"], "chat_name": row["chat_name"],
+            }
+        return info
 
     # ------------------------------------------------------------------
     # Write operations
@@ -127,32 +204,52 @@ class ConfigManager:
     ) -> None:
         """Set a single config value for a chat (or 'global')."""
         await self.db.set_value(str(chat_id), module, key, value)
+        self._invalidate(str(chat_id), module)
 
     async def set_module_config(
         self, chat_id: str, module: str, data: dict[str, Any]
     ) -> None:
         """Replace all config values for a module in a chat."""
         await self.db.set_module_config(str(chat_id), module, data)
+        self._invalidate(str(chat_id), module)
 
     async def delete_override(
         self, chat_id: str, module: str, key: str
     ) -> None:
         """Delete a per-chat override (reverts to global default)."""
         await self.db.delete_value(str(chat_id), module, key)
+        self._invalidate(str(chat_id), module)
 
     async def delete_module_overrides(self, chat_id: str, module: str) -> None:
         """Delete all overrides for a specific module (reverts to global)."""
         await self.db.delete_module_config(str(chat_id), module)
+        self._invalidate(str(chat_id), module)
 
     async def delete_chat_overrides(self, chat_id: str) -> None:
         """Delete all overrides for a chat (reverts entirely to global)."""
         await self.db.delete_chat_config(str(chat_id))
+        self._invalidate(str(chat_id))
 
     async def ensure_chat(
         self, chat_id: str | int, chat_type: str, chat_name: str = ""
     ) -> None:
-        """Ensure a chat exists in the DB."""
-        await self.db.upsert_chat(str(chat_id), chat_type, chat_name)
+        """Ensure a chat exists in the DB (skipped when nothing would change)."""
+        chat_id = str(chat_id)
+        known = self._chats.get(chat_id)
+        now = time.monotonic()
+        if (
+            known is not None
+            and known["chat_type"] == chat_type
+            and (not chat_name or known["chat_name"] == chat_name)
+            and now - known.get("touched_at", float("-inf")) < CHAT_TOUCH_INTERVAL
+        ):
+            return
+        await self.db.upsert_chat(chat_id, chat_type, chat_name)
+        self._chats[chat_id] = {
+            "chat_type": chat_type,
+            "chat_name": chat_name or (known["chat_name"] if known else ""),
+            "touched_at": now,
+        }
 
     # ------------------------------------------------------------------
     # Backup / restore / export
@@ -164,7 +261,10 @@ class ConfigManager:
         return await self.db.list_backups(chat_id)
 
     async def restore_backup(self, backup_id: int) -> bool:
-        return await self.db.restore_backup(backup_id)
+        restored = await self.db.restore_backup(backup_id)
+        if restored:
+            self.invalidate_cache()
+        return restored
 
     async def delete_backup(self, backup_id: int) -> None:
         await self.db.delete_backup(backup_id)
@@ -173,7 +273,33 @@ class ConfigManager:
         return await self.db.export_chat_json(chat_id)
 
     async def import_chat(self, chat_id: str, data: dict[str, Any]) -> None:
-        await self.db.import_chat_json(chat_id, data)
+        try:
+            await self.db.import_chat_json(chat_id, data)
+        finally:
+            self._chats.pop(str(chat_id), None)
+            self._invalidate(str(chat_id))
+
+    # ------------------------------------------------------------------
+    # Cache invalidation
+    # ------------------------------------------------------------------
+    def invalidate_cache(self) -> None:
+        """Drop every cached value (e.g. after the DB was changed externally)."""
+        self._generation += 1
+        self._raw.clear()
+        self._resolved.clear()
+        self._chats.clear()
+
+    def _invalidate(self, chat_id: str, module: Optional[str] = None) -> None:
+        """Drop the cached values a write to (chat_id, module) can affect."""
+        self._generation += 1
+        self._raw.pop(chat_id, None)
+        if chat_id == "global":
+            # The global layer is merged into every chat's resolution
+            stale = [k for k in self._resolved if module is None or k[1] == module]
+        else:
+            stale = [k for k in self._resolved if k[0] == chat_id and (module is None or k[1] == module)]
+        for key in stale:
+            del self._resolved[key]
 
     # ------------------------------------------------------------------
     # Internals
@@ -194,6 +320,7 @@ class ConfigManager:
                 flat = _flatten_dict(defaults)
                 await self.db.set_module_config("global", module_key, flat)
                 logger.info("Populated global defaults for module: %s", module_key)
+        self.invalidate_cache()
 
 
 def _deep_merge(base: dict, override: dict) -> dict:
@@ -210,6 +337,15 @@ def _deep_merge(base: dict, override: dict) -> dict:
     return result
 
 
+def _copy_tree(value: Any) -> Any:
+    """Copy nested dicts/lists of JSON values (much cheaper than copy.deepcopy)."""
+    if isinstance(value, Mapping):
+        return {k: _copy_tree(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_tree(v) for v in value]
+    return value
+
+
 def _flatten_dict(d: dict, parent_key: str = "", sep: str = ".") -> dict:
     """Flatten nested dict: {'a': {'b': 1}} → {'a': {'b': 1}} (keep top-level nested)."""
     # For config storage, we keep the top-level keys as-is but store nested dicts as JSON
@@ -22,9 +22,37 @@ CREATE TABLE IF NOT EXISTS users (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Full-text search configuration for /search (see modules/search_command.py):
+-- Ukrainian hunspell stemming if its dictionary files are installed, then
+-- unaccent if available, then the language-neutral simple dictionary.
+DO $$
+DECLARE
+    dictionaries TEXT := 'simple';
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'chat_search') THEN
+        CREATE TEXT SEARCH CONFIGURATION chat_search (COPY = simple);
+        IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'unaccent') THEN
+            CREATE EXTENSION IF NOT EXISTS unaccent;
+            dictionaries := 'unaccent, ' || dictionaries;
+        END IF;
+        BEGIN
+            CREATE TEXT SEARCH DICTIONARY ukrainian_hunspell (
+                TEMPLATE = ispell, DictFile = uk_ua, AffFile = uk_ua
+            );
+            dictionaries := 'ukrainian_hunspell, ' || dictionaries;
+        EXCEPTION WHEN OTHERS THEN
+            NULL;  -- the uk_ua hunspell files are not installed
+        END;
+        EXECUTE 'ALTER TEXT SEARCH CONFIGURATION chat_search '
+            'ALTER MAPPING FOR word, hword, hword_part WITH ' || dictionaries;
+    END IF;
+END $$;
+
 -- Create messages table
+-- Partitioned by month (see modules/message_partitions.py). Unique keys must
+-- include the partition key; Telegram never changes a message's date.
 CREATE TABLE IF NOT EXISTS messages (
-    internal_message_id BIGSERIAL PRIMARY KEY,
+    internal_message_id BIGSERIAL,
     message_id BIGINT NOT NULL,
     chat_id BIGINT NOT NULL REFERENCES chats(chat_id),
     user_id BIGINT REFERENCES users(user_id),
@@ -36,19 +64,39 @@ CREATE TABLE IF NOT EXISTS messages (
     replied_to_message_id BIGINT,
     gpt_context_message_ids JSONB,
     raw_telegram_message JSONB,
-    UNIQUE(chat_id, message_id)
-);
+    message_kind SMALLINT,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        to_tsvector('chat_search'::regconfig, COALESCE(text, ''))
+    ) STORED,
+    PRIMARY KEY (internal_message_id, timestamp),
+    UNIQUE(chat_id, message_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Catch-all for rows outside the monthly partitions, which the bot creates on startup
+CREATE TABLE IF NOT EXISTS messages_default PARTITION OF messages DEFAULT;
 
 -- Create analysis_cache table
 CREATE TABLE IF NOT EXISTS analysis_cache (
     chat_id BIGINT NOT NULL,
     time_period TEXT NOT NULL,
+    -- Watermark of the messages in the period (count and first/last internal_message_id)
     message_content_hash TEXT NOT NULL,
     result TEXT NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     PRIMARY KEY (chat_id, time_period, message_content_hash)
 );
 
+-- Per-day partial summaries of multi-day /analyze periods
+CREATE TABLE IF NOT EXISTS analysis_day_summaries (
+    chat_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    -- Watermark of the day's messages the summary was built from
+    watermark TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (chat_id, day)
+);
+
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_messages_chat_id ON messages(chat_id);
 CREATE INDEX IF NOT EXISTS idx_messages_user_id ON messages(user_id);
@@ -58,11 +106,30 @@ CREATE INDEX IF NOT EXISTS idx_messages_is_gpt_reply ON messages(is_gpt_reply);
 
 -- Text search indexes for /count command optimization
 CREATE INDEX IF NOT EXISTS idx_messages_text_gin ON messages USING GIN(text gin_trgm_ops);
-CREATE INDEX IF NOT EXISTS idx_messages_text_search ON messages USING GIN(to_tsvector('english', text));
+
+-- Full-text index for /search. Databases created before search_vector get the
+-- column and the index from scripts/migrations/20261016_add_message_search_vector.py
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'messages' AND column_name = 'search_vector'
+    ) THEN
+        CREATE INDEX IF NOT EXISTS idx_messages_search_vector ON messages USING GIN(search_vector);
+    END IF;
+END $$;
 
 -- Composite index for faster chat-specific text searches
 CREATE INDEX IF NOT EXISTS idx_messages_chat_text ON messages(chat_id) WHERE text IS NOT NULL;
 
+-- Message kind indexes for /stats, /report and /mystats counters (see MessageKind)
+CREATE INDEX IF NOT EXISTS idx_messages_chat_kind_ts ON messages(chat_id, message_kind, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_chat_ts_plain_text ON messages(chat_id, timestamp)
+    WHERE message_kind = 0 AND is_command = false AND is_gpt_reply = false;
+
+-- Keyset pagination of message windows (modules/chat_analysis.py)
+CREATE INDEX IF NOT EXISTS idx_messages_chat_ts_id ON messages(chat_id, timestamp, internal_message_id);
+
 -- Bot events tracking (url_modification, video_download)
 CREATE TABLE IF NOT EXISTS bot_events (
     id BIGSERIAL PRIMARY KEY,
@@ -72,4 +139,82 @@ CREATE TABLE IF NOT EXISTS bot_events (
     timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 CREATE INDEX IF NOT EXISTS idx_bot_events_type_chat_ts ON bot_events(event_type, chat_id, timestamp);
-CREATE INDEX IF NOT EXISTS idx_bot_events_user_chat ON bot_events(user_id, chat_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_bot_events_user_chat ON bot_events(user_id, chat_id);
+
+-- Hourly activity rollups backing /stats and /report (maintained by INSERT_MESSAGE_SQL)
+CREATE TABLE IF NOT EXISTS chat_activity_hourly (
+    chat_id BIGINT NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    user_id BIGINT NOT NULL DEFAULT 0,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    command_count INTEGER NOT NULL DEFAULT 0,
+    text_count INTEGER NOT NULL DEFAULT 0,
+    media_count INTEGER NOT NULL DEFAULT 0,
+    sticker_count INTEGER NOT NULL DEFAULT 0,
+    gif_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (chat_id, bucket, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_chat_activity_hourly_bucket ON chat_activity_hourly(bucket);
+
+CREATE TABLE IF NOT EXISTS chat_command_hourly (
+    chat_id BIGINT NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    command_name VARCHAR(255) NOT NULL,
+    command_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (chat_id, bucket, command_name)
+);
+CREATE INDEX IF NOT EXISTS idx_chat_command_hourly_bucket ON chat_command_hourly(bucket);
+
+-- Per-chat word counts backing /count
+CREATE TABLE IF NOT EXISTS chat_word_counts (
+    chat_id BIGINT NOT NULL,
+    normalized_token TEXT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    last_seen TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (chat_id, normalized_token)
+);
+
+-- Reply edges backing the /stats response-time percentiles
+CREATE TABLE IF NOT EXISTS message_reply_edges (
+    chat_id BIGINT NOT NULL,
+    reply_message_id BIGINT NOT NULL,
+    original_message_id BIGINT NOT NULL,
+    reply_timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    delta_seconds DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (chat_id, reply_message_id)
+);
+CREATE INDEX IF NOT EXISTS idx_message_reply_edges_chat_ts
+    ON message_reply_edges(chat_id, reply_timestamp) INCLUDE (delta_seconds);
+
+-- Per-user activity of each chat backing /mystats and /missing
+-- hourly_counts[h + 1] counts the messages sent in Kyiv hour h
+CREATE TABLE IF NOT EXISTS user_chat_activity (
+    chat_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    message_count BIGINT NOT NULL DEFAULT 0,
+    hourly_counts INTEGER[] NOT NULL,
+    command_counts JSONB NOT NULL DEFAULT '{}'::jsonb,
+    first_message_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_message_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_message_id BIGINT NOT NULL,
+    PRIMARY KEY (chat_id, user_id)
+);
+
+-- Every lower-cased username a user id has been stored with
+CREATE TABLE IF NOT EXISTS username_aliases (
+    username TEXT NOT NULL,
+    user_id BIGINT NOT NULL,
+    last_seen TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (username, user_id)
+);
+
+-- Rollups are trusted once backfilled; a fresh database has nothing to backfill
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name TEXT PRIMARY KEY,
+    backfilled_at TIMESTAMP WITH TIME ZONE
+);
+INSERT INTO rollup_state (name, backfilled_at)
+SELECT rollup.name, NOW()
+FROM (VALUES ('activity'), ('word_counts'), ('reply_edges'), ('user_activity')) AS rollup(name)
+WHERE NOT EXISTS (SELECT 1 FROM messages)
+ON CONFLICT (name) DO NOTHING;
\ No newline at end of file
@@ -0,0 +1,389 @@
+"""
+Hourly activity rollups backing /stats and /report.
+
+The ``chat_activity_hourly`` and ``chat_command_hourly`` tables are kept
+current by ``INSERT_MESSAGE_SQL`` in ``modules.database``: every newly
+inserted message is added to its (chat, UTC hour, user) bucket in the same
+statement. The readers here add the message aggregates of /stats and /report to
+their query plans, answered from those buckets instead of scanning
+``messages``, so period boundaries are aligned down to the hour.
+
+Databases that already hold history must be backfilled once with
+``scripts/backfill_activity_rollups.py``; until then ``rollups_ready``
+returns False and the commands keep using the raw queries.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from modules.query_plan import QueryPlan
+from modules.rollup_state import mark_backfilled, rollup_ready
+from modules.types import MEDIA_MESSAGE_KINDS_SQL, MessageKind
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "activity"
+
+# Query plan key of the summed counters row
+PERIOD_COUNTS = "period_counts"
+
+# Aggregation of raw messages into rollup rows; shared by the backfill
+# and the consistency check so both agree with INSERT_MESSAGE_SQL.
+# message_kind values are MessageKind members.
+_RAW_ACTIVITY_SQL = f"""
+    SELECT
+        chat_id,
+        date_trunc('hour', timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket,
+        COALESCE(user_id, 0) AS user_id,
+        COUNT(*) AS message_count,
+        COUNT(*) FILTER (WHERE is_command) AS command_count,
+        COUNT(*) FILTER (WHERE message_kind = {MessageKind.TEXT:d} AND NOT is_command AND NOT is_gpt_reply) AS text_count,
+        COUNT(*) FILTER (WHERE message_kind IN ({MEDIA_MESSAGE_KINDS_SQL})) AS media_count,
+        COUNT(*) FILTER (WHERE message_kind = {MessageKind.STICKER:d}) AS sticker_count,
+        COUNT(*) FILTER (WHERE message_kind = {MessageKind.ANIMATION:d}) AS gif_count
+    FROM messages
+    WHERE ($1::bigint IS NULL OR chat_id = $1)
+    GROUP BY 1, 2, 3
+"""
+
+_RAW_COMMAND_SQL = """
+    SELECT
+        chat_id,
+        date_trunc('hour', timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket,
+        command_name,
+        COUNT(*) AS command_count
+    FROM messages
+    WHERE ($1::bigint IS NULL OR chat_id = $1)
+      AND is_command AND command_name IS NOT NULL
+    GROUP BY 1, 2, 3
+"""
+
+_COUNT_COLUMNS = (
+    "message_count", "command_count", "text_count",
+    "media_count", "sticker_count", "gif_count",
+)
+
+
+def floor_hour(dt: datetime) -> datetime:
+    """Align a timestamp down to the start of its rollup bucket."""
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+async def rollups_ready(conn: Any) -> bool:
+    """Return True once the rollup tables cover the whole message history."""
+    return await rollup_ready(conn, ROLLUP_NAME)
+
+
+def _period_counts(row: Any, column: str) -> Dict[str, int]:
+    return {
+        "current_count": row[f"cur_{column}"] or 0,
+        "prev_count": row[f"prev_{column}"] or 0,
+    }
+
+
+def _counts_select(boundary: str) -> str:
+    """SUM every counter on either side of the ``boundary`` parameter (current vs previous period)."""
+    parts = []
+    for column in _COUNT_COLUMNS:
+        parts.append(f"COALESCE(SUM({column}) FILTER (WHERE bucket >= {boundary}), 0) AS cur_{column}")
+        parts.append(f"COALESCE(SUM({column}) FILTER (WHERE bucket < {boundary}), 0) AS prev_{column}")
+    return ",\n                ".join(parts)
+
+
+def unpack_period_counts(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace the ``period_counts`` row of a finished plan with the per-counter keys."""
+    results.update(_split_counts(results.pop(PERIOD_COUNTS)))
+    return results
+
+
+def _split_counts(row: Any) -> Dict[str, Any]:
+    """Map the summed counters onto the keys used by the stats formatters."""
+    return {
+        "counts": {
+            "current_total": row["cur_message_count"],
+            "current_commands": row["cur_command_count"],
+            "prev_total": row["prev_message_count"],
+            "prev_commands": row["prev_command_count"],
+        },
+        "media": _period_counts(row, "media_count"),
+        "stickers": _period_counts(row, "sticker_count"),
+        "gifs": _period_counts(row, "gif_count"),
+        "text_msgs": _period_counts(row, "text_count"),
+    }
+
+
+async def fetch_chat_earliest(conn: Any, chat_id: int) -> Optional[datetime]:
+    """Return the first rollup bucket of a chat, or None if it has no messages."""
+    earliest: Optional[datetime] = await conn.fetchval(
+        "SELECT MIN(bucket) FROM chat_activity_hourly WHERE chat_id = $1", chat_id
+    )
+    return earliest
+
+
+def add_chat_message_stats(
+    plan: QueryPlan,
+    chat_id: int,
+    start_utc: datetime,
+    end_utc: datetime,
+    prev_start_utc: Optional[datetime],
+) -> None:
+    """Add the message aggregates of /stats, read from the hourly rollups, to a query plan.
+
+    The counters arrive as one ``period_counts`` row; ``unpack_period_counts``
+    turns it into the keys the stats formatters use.
+    """
+    start = floor_hour(start_utc)
+    prev = floor_hour(prev_start_utc) if prev_start_utc is not None else start
+
+    plan.fetchrow(PERIOD_COUNTS, f"""
+        SELECT
+                {_counts_select("$2")}
+        FROM chat_activity_hourly
+        WHERE chat_id = $1 AND bucket >= $3 AND bucket < $4
+    """, chat_id, start, prev, end_utc)
+
+    plan.fetch("active_users", """
+        SELECT a.user_id, u.username, u.first_name
+        FROM (
+            SELECT DISTINCT user_id FROM chat_activity_hourly
+            WHERE chat_id = $1 AND bucket >= $2 AND bucket < $3
+        ) a
+        JOIN users u ON a.user_id = u.user_id
+        WHERE u.is_bot = false
+    """, chat_id, start, end_utc)
+
+    plan.fetchval("new_users", """
+        SELECT COUNT(*) FROM (
+            SELECT user_id FROM chat_activity_hourly
+            WHERE chat_id = $1
+            GROUP BY user_id
+            HAVING MIN(bucket) >= $2 AND MIN(bucket) < $3
+        ) sub
+    """, chat_id, start, end_utc)
+
+    if prev_start_utc is not None:
+        plan.fetchval("inactive_users", """
+            SELECT COUNT(*) FROM (
+                SELECT DISTINCT user_id FROM chat_activity_hourly
+                WHERE chat_id = $1 AND bucket >= $2 AND bucket < $3
+                EXCEPT
+                SELECT DISTINCT user_id FROM chat_activity_hourly
+                WHERE chat_id = $1 AND bucket >= $3 AND bucket < $4
+            ) sub
+        """, chat_id, prev, start, end_utc)
+
+    plan.fetch("top_commands", """
+        SELECT command_name, SUM(command_count) AS cnt
+        FROM chat_command_hourly
+        WHERE chat_id = $1 AND bucket >= $2 AND bucket < $3
+        GROUP BY command_name
+        ORDER BY cnt DESC LIMIT 5
+    """, chat_id, start, end_utc)
+
+    plan.fetch("hourly", """
+        SELECT EXTRACT(HOUR FROM bucket AT TIME ZONE 'Europe/Kyiv')::int AS hour,
+               SUM(message_count) AS cnt
+        FROM chat_activity_hourly
+        WHERE chat_id = $1 AND bucket >= $2 AND bucket < $3
+        GROUP BY hour ORDER BY hour
+    """, chat_id, start, end_utc)
+
+    plan.fetch("weekday", """
+        SELECT EXTRACT(DOW FROM bucket AT TIME ZONE 'Europe/Kyiv')::int AS dow,
+               SUM(message_count) AS cnt
+        FROM chat_activity_hourly
+        WHERE chat_id = $1 AND bucket >= $2 AND bucket < $3
+        GROUP BY dow ORDER BY dow
+    """, chat_id, start, end_utc)
+
+    plan.fetch("top_users", """
+        SELECT a.user_id, u.username, u.first_name, SUM(a.message_count) AS cnt
+        FROM chat_activity_hourly a
+        JOIN users u ON a.user_id = u.user_id
+        WHERE a.chat_id = $1 AND a.bucket >= $2 AND a.bucket < $3
+          AND u.is_bot = false
+        GROUP BY a.user_id, u.username, u.first_name
+        ORDER BY cnt DESC LIMIT 5
+    """, chat_id, start, end_utc)
+
+
+def add_global_message_stats(
+    plan: QueryPlan,
+    start_utc: datetime,
+    end_utc: datetime,
+    prev_start_utc: datetime,
+    inactive_before_utc: datetime,
+) -> None:
+    """Add the message aggregates of /report, read from the hourly rollups, to a query plan."""
+    start = floor_hour(start_utc)
+    prev = floor_hour(prev_start_utc)
+
+    plan.fetchrow(PERIOD_COUNTS, f"""
+        SELECT
+                {_counts_select("$1")}
+        FROM chat_activity_hourly
+        WHERE bucket >= $2 AND bucket < $3
+    """, start, prev, end_utc)
+
+    plan.fetch("active_chats", """
+        SELECT a.chat_id, c.title, SUM(a.message_count) AS cnt
+        FROM chat_activity_hourly a
+        LEFT JOIN chats c ON a.chat_id = c.chat_id
+        WHERE a.bucket >= $1 AND a.bucket < $2
+        GROUP BY a.chat_id, c.title
+        ORDER BY cnt DESC
+    """, start, end_utc)
+
+    plan.fetchval("prev_active", """
+        SELECT COUNT(DISTINCT chat_id) FROM chat_activity_hourly
+        WHERE bucket >= $1 AND bucket < $2
+    """, prev, start)
+
+    plan.fetchval("new_chats", """
+        SELECT COUNT(*) FROM (
+            SELECT chat_id FROM chat_activity_hourly
+            GROUP BY chat_id
+            HAVING MIN(bucket) >= $1 AND MIN(bucket) < $2
+        ) sub
+    """, start, end_utc)
+
+    plan.fetch("top_commands", """
+        SELECT command_name, SUM(command_count) AS cnt
+        FROM chat_command_hourly
+        WHERE bucket >= $1 AND bucket < $2
+        GROUP BY command_name
+        ORDER BY cnt DESC LIMIT 10
+    """, start, end_utc)
+
+    plan.fetch("top_users", """
+        SELECT u.username, u.first_name, SUM(a.message_count) AS cnt
+        FROM chat_activity_hourly a
+        JOIN users u ON a.user_id = u.user_id
+        WHERE a.bucket >= $1 AND a.bucket < $2 AND u.is_bot = false
+        GROUP BY u.user_id, u.username, u.first_name
+        ORDER BY cnt DESC LIMIT 5
+    """, start, end_utc)
+
+    plan.fetch("hourly", """
+        SELECT EXTRACT(HOUR FROM bucket AT TIME ZONE 'Europe/Kyiv')::int AS hour,
+               SUM(message_count) AS cnt
+        FROM chat_activity_hourly
+        WHERE bucket >= $1 AND bucket < $2
+        GROUP BY hour ORDER BY hour
+    """, start, end_utc)
+
+    plan.fetch("daily", """
+        SELECT
+            (bucket AT TIME ZONE 'Europe/Kyiv')::date AS day,
+            SUM(message_count) AS total,
+            SUM(command_count) AS commands
+        FROM chat_activity_hourly
+        WHERE bucket >= $1 AND bucket < $2
+        GROUP BY day ORDER BY day
+    """, start, end_utc)
+
+    plan.fetchval("inactive_count", """
+        SELECT COUNT(*) FROM (
+            SELECT chat_id FROM chat_activity_hourly
+            GROUP BY chat_id
+            HAVING MAX(bucket) < $1
+        ) sub
+    """, floor_hour(inactive_before_utc))
+
+    plan.fetchval("total_chats", "SELECT COUNT(DISTINCT chat_id) FROM chat_activity_hourly")
+
+
+async def rebuild_activity_rollups(conn: Any, chat_id: Optional[int] = None) -> int:
+    """Recompute the rollups of one chat (or every chat) from ``messages``.
+
+    Runs in a single transaction that locks the rollup tables against
+    concurrent increments, so messages inserted while the rebuild runs are
+    applied on top of the recomputed rows rather than lost or counted twice.
+    Returns the number of activity rows written.
+    """
+    async with conn.transaction():
+        await conn.execute(
+            "LOCK TABLE chat_activity_hourly, chat_command_hourly IN SHARE ROW EXCLUSIVE MODE"
+        )
+        await conn.execute(
+            "DELETE FROM chat_activity_hourly WHERE ($1::bigint IS NULL OR chat_id = $1)", chat_id
+        )
+        await conn.execute(
+            "DELETE FROM chat_command_hourly WHERE ($1::bigint IS NULL OR chat_id = $1)", chat_id
+        )
+        status = await conn.execute(f"""
+            INSERT INTO chat_activity_hourly (
+                chat_id, bucket, user_id, {", ".join(_COUNT_COLUMNS)}
+            )
+            {_RAW_ACTIVITY_SQL}
+        """, chat_id)
+        await conn.execute(f"""
+            INSERT INTO chat_command_hourly (chat_id, bucket, command_name, command_count)
+            {_RAW_COMMAND_SQL}
+        """, chat_id)
+    return int(status.split()[-1]) if status else 0
+
+
+async def backfill_activity_rollups(conn: Any) -> int:
+    """Rebuild the rollups of every chat and mark them ready; returns the number of chats."""
+    chat_ids = [r["chat_id"] for r in await conn.fetch(
+        "SELECT DISTINCT chat_id FROM messages ORDER BY chat_id"
+    )]
+    for i, chat_id in enumerate(chat_ids, 1):
+        rows = await rebuild_activity_rollups(conn, chat_id)
+        logger.info(f"[{i}/{len(chat_ids)}] chat {chat_id}: {rows} hourly rows")
+    await mark_backfilled(conn, ROLLUP_NAME)
+    return len(chat_ids)
+
+
+async def verify_activity_rollups(
+    conn: Any,
+    chat_id: Optional[int] = None,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """Compare the rollups against the raw messages and return mismatching buckets."""
+    differs = " OR ".join(
+        f"COALESCE(r.{column}, 0) <> COALESCE(a.{column}, 0)" for column in _COUNT_COLUMNS
+    )
+    rows = await conn.fetch(f"""
+        WITH raw AS ({_RAW_ACTIVITY_SQL}),
+        rollup AS (
+            SELECT * FROM chat_activity_hourly
+            WHERE ($1::bigint IS NULL OR chat_id = $1)
+        )
+        SELECT
+            COALESCE(r.chat_id, a.chat_id) AS chat_id,
+            COALESCE(r.bucket, a.bucket) AS bucket,
+            COALESCE(r.user_id, a.user_id) AS user_id,
+            r.message_count AS raw_messages,
+            a.message_count AS rollup_messages
+        FROM raw r
+        FULL OUTER JOIN rollup a
+            ON a.chat_id = r.chat_id AND a.bucket = r.bucket AND a.user_id = r.user_id
+        WHERE {differs}
+        ORDER BY 1, 2, 3
+        LIMIT $2
+    """, chat_id, limit)
+
+    command_rows = await conn.fetch(f"""
+        WITH raw AS ({_RAW_COMMAND_SQL}),
+        rollup AS (
+            SELECT * FROM chat_command_hourly
+            WHERE ($1::bigint IS NULL OR chat_id = $1)
+        )
+        SELECT
+            COALESCE(r.chat_id, a.chat_id) AS chat_id,
+            COALESCE(r.bucket, a.bucket) AS bucket,
+            COALESCE(r.command_name, a.command_name) AS command_name,
+            r.command_count AS raw_commands,
+            a.command_count AS rollup_commands
+        FROM raw r
+        FULL OUTER JOIN rollup a
+            ON a.chat_id = r.chat_id AND a.bucket = r.bucket AND a.command_name = r.command_name
+        WHERE COALESCE(r.command_count, 0) <> COALESCE(a.command_count, 0)
+        ORDER BY 1, 2, 3
+        LIMIT $2
+    """, chat_id, limit)
+
+    return [dict(row) for row in rows] + [dict(row) for row in command_rows]
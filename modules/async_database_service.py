@@ -319,7 +319,7 @@ class AsyncDatabaseService(ServiceInterface):
                         raw_telegram_message
                     )
                     VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                    ON CONFLICT (chat_id, message_id) DO NOTHING
+                    ON CONFLICT DO NOTHING
                     """,
                     (
                         message_data['message_id'],
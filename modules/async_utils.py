@@ -782,16 +782,44 @@ class AsyncRetryManager:
 
 
 class AsyncBatchProcessor:
-    """Async batch processor for efficient bulk operations."""
+    """Async batch processor for efficient bulk operations.
+
+    Items are grouped into batches of up to ``batch_size`` and handed to
+    ``processor`` when the batch is full or ``flush_interval`` has elapsed.
+    A positive ``max_queue_size`` bounds the pending queue so that
+    ``add_item`` waits (backpressure) instead of growing memory without limit.
+    """
     
-    def __init__(self, processor: Callable[[List[Any]], Any], batch_size: int = 100, flush_interval: float = 1.0):
+    def __init__(
+        self,
+        processor: Callable[[List[Any]], Any],
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 0
+    ):
         self.processor = processor
         self.batch_size = batch_size
         self.flush_interval = flush_interval
-        self._queue: asyncio.Queue[Any] = asyncio.Queue()
+        self.max_queue_size = max_queue_size
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=max_queue_size)
+        self._current_batch: List[Any] = []
+        self._flushing = False
         self._processing_task: Optional[asyncio.Task[None]] = None
         self._started = False
         self._closed = False
+        self._stats: Dict[str, float] = {
+            'batches_processed': 0,
+            'items_processed': 0,
+            'failed_batches': 0,
+            'failed_items': 0,
+            'last_flush_duration': 0.0,
+            'max_flush_duration': 0.0,
+        }
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of items waiting to be processed, including the batch being collected."""
+        return self._queue.qsize() + len(self._current_batch)
     
     async def start(self) -> None:
         """Start the batch processor."""
@@ -812,12 +840,32 @@ class AsyncBatchProcessor:
         await self._queue.put(item)
         return f"queued_{item}"  # Simple return for testing
     
+    async def _run_processor(self, batch: List[Any]) -> None:
+        """Hand a batch to the processor and record flush statistics."""
+        start_time = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(self.processor):
+                await self.processor(batch)
+            else:
+                self.processor(batch)
+            self._stats['batches_processed'] += 1
+            self._stats['items_processed'] += len(batch)
+        except Exception as e:
+            self._stats['failed_batches'] += 1
+            self._stats['failed_items'] += len(batch)
+            logger.error(f"Error processing batch: {e}")
+        finally:
+            duration = time.perf_counter() - start_time
+            self._stats['last_flush_duration'] = duration
+            self._stats['max_flush_duration'] = max(self._stats['max_flush_duration'], duration)
+    
     async def _process_batches(self) -> None:
         """Process batches continuously."""
         while not self._closed:
             try:
-                # Collect items for batch
-                batch: list[Any] = []
+                # Collect items for batch; kept on the instance so that
+                # stop() can still process them if this task is cancelled
+                batch = self._current_batch
                 deadline = time.time() + self.flush_interval
                 
                 while len(batch) < self.batch_size and time.time() < deadline:
@@ -833,13 +881,12 @@ class AsyncBatchProcessor:
                 
                 # Process batch if not empty
                 if batch and self.processor is not None:
+                    self._current_batch = []
+                    self._flushing = True
                     try:
-                        if asyncio.iscoroutinefunction(self.processor):
-                            await self.processor(batch)
-                        else:
-                            self.processor(batch)
-                    except Exception as e:
-                        logger.error(f"Error processing batch: {e}")
+                        await self._run_processor(batch)
+                    finally:
+                        self._flushing = False
                 
                 # Small delay to prevent busy waiting
                 if not batch:
@@ -851,18 +898,23 @@ class AsyncBatchProcessor:
                 logger.error(f"Error in batch processing: {e}")
     
     async def stop(self) -> None:
-        """Stop the batch processor."""
+        """Stop the batch processor, draining every pending item."""
         self._closed = True
         
         if self._processing_task:
-            self._processing_task.cancel()
-            try:
-                await self._processing_task
-            except asyncio.CancelledError:
-                pass
+            if self._flushing:
+                # Let an in-flight flush finish instead of cancelling it half-way
+                await asyncio.shield(self._processing_task)
+            else:
+                self._processing_task.cancel()
+                try:
+                    await self._processing_task
+                except asyncio.CancelledError:
+                    pass
         
         # Process remaining items
-        remaining_items = []
+        remaining_items = self._current_batch
+        self._current_batch = []
         while not self._queue.empty():
             try:
                 item = self._queue.get_nowait()
@@ -870,18 +922,20 @@ class AsyncBatchProcessor:
             except asyncio.QueueEmpty:
                 break
         
-        if remaining_items:
-            try:
-                if asyncio.iscoroutinefunction(self.processor):
-                    await self.processor(remaining_items)
-                else:
-                    self.processor(remaining_items)
-            except Exception as e:
-                logger.error(f"Error processing final batch: {e}")
+        for i in range(0, len(remaining_items), self.batch_size):
+            await self._run_processor(remaining_items[i:i + self.batch_size])
     
     async def close(self) -> None:
         """Close the batch processor."""
         await self.stop()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batch processing statistics."""
+        return {
+            **self._stats,
+            'queue_depth': self.queue_depth,
+            'max_queue_size': self.max_queue_size,
+        }
 
 
 # Async decorators
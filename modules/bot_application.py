@@ -440,6 +440,18 @@ class BotApplication(ServiceInterface):
             except Exception as e:
                 logger.error(f"Failed to schedule weekly report: {e}")
 
+            # Create next months' message partitions and apply retention daily
+            try:
+                from modules.database import message_partitions_callback
+                if self.telegram_app.job_queue:
+                    self.telegram_app.job_queue.run_daily(
+                        callback=message_partitions_callback,
+                        time=dt_time(hour=4, minute=30, tzinfo=KYIV_TZ),
+                        name="message_partitions",
+                    )
+            except Exception as e:
+                logger.error(f"Failed to schedule message partition maintenance: {e}")
+
             # Clear any stale webhook before starting polling
             await self.telegram_app.bot.delete_webhook(drop_pending_updates=False)
 
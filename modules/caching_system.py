@@ -6,15 +6,20 @@ and hybrid caching with TTL management, cache invalidation, and performance moni
 """
 
 import asyncio
+import heapq
 import json
 import logging
 import pickle
+import sys
 import time
+import uuid
+import zlib
+from collections import OrderedDict
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 from typing import (
     Dict, List, Optional, Any, Union, Callable, TypeVar, Generic,
-    Set, Tuple, AsyncGenerator, TYPE_CHECKING
+    Set, Tuple, AsyncGenerator, Awaitable, TYPE_CHECKING
 )
 from dataclasses import dataclass, field
 from enum import Enum
@@ -32,6 +37,16 @@ else:
         redis = None  # type: ignore
         REDIS_AVAILABLE = False
 
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+# msgpack is smaller and faster than JSON; JSON remains the fallback without it
+DEFAULT_SERIALIZATION = "msgpack" if MSGPACK_AVAILABLE else "json"
+
 from modules.types import Timestamp, JSONDict, CacheEntry, CacheStrategy
 from modules.shared_constants import (
     DEFAULT_CACHE_TTL, LONG_CACHE_TTL, SHORT_CACHE_TTL, MAX_CACHE_SIZE
@@ -71,6 +86,9 @@ class CacheStats:
     evictions: int = 0
     size: int = 0
     memory_usage_bytes: int = 0
+    coalesced: int = 0  # @cached callers that joined an in-flight computation
+    stale_served: int = 0  # @cached callers answered with a stale value during refresh
+    negative_hits: int = 0  # @cached callers answered with a recently cached failure
     
     @property
     def hit_rate(self) -> float:
@@ -89,9 +107,12 @@ class CacheConfig:
     redis_url: Optional[str] = None
     redis_db: int = 0
     key_prefix: str = "bot_cache"
-    serialization: str = "json"  # json, pickle
+    serialization: str = DEFAULT_SERIALIZATION  # json, pickle, msgpack (falls back to pickle if not installed)
     compression: bool = False
+    compression_threshold: int = 1024  # Only compress payloads at least this large
+    l1_ttl: int = 60  # HybridCache: upper bound for L1 copies if an invalidation is missed
     monitoring: bool = True
+    max_memory_bytes: Optional[int] = None  # MemoryCache: evict when the estimate exceeds this
 
 
 class CacheInterface(ABC, Generic[K, V]):
@@ -133,42 +154,82 @@ class CacheInterface(ABC, Generic[K, V]):
         pass
 
 
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Approximate the memory held by ``value`` in bytes.
+
+    Containers are followed three levels deep; anything below that is
+    counted with ``sys.getsizeof`` only. Computed once per ``set``.
+    """
+    size = sys.getsizeof(value)
+    if _depth >= 3 or isinstance(value, (str, bytes, bytearray)):
+        return size
+    if isinstance(value, dict):
+        size += sum(
+            estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+            for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    elif hasattr(value, '__dict__'):
+        size += estimate_size(vars(value), _depth + 1)
+    return size
+
+
+class _MemoryEntry:
+    """Value and bookkeeping of one MemoryCache key."""
+
+    __slots__ = ('value', 'expires_at', 'size', 'frequency')
+
+    def __init__(self, value: Any, expires_at: Optional[float], size: int) -> None:
+        self.value = value
+        self.expires_at = expires_at  # time.monotonic() deadline
+        self.size = size
+        self.frequency = 1
+
+
 class MemoryCache(CacheInterface[str, Any]):
-    """In-memory cache implementation with various eviction policies."""
+    """In-memory cache implementation with various eviction policies.
+
+    Every policy evicts in O(1) or O(log n):
+
+    - LRU/FIFO: ``_cache`` is an OrderedDict kept in recency (LRU) or
+      insertion (FIFO) order, so the victim is its first key;
+    - LFU: keys are grouped in per-frequency OrderedDict buckets with the
+      lowest non-empty frequency tracked, ties going to the least recent key;
+    - TTL: a heap of (deadline, key) pops the entry closest to expiry. The
+      heap is maintained for every policy so expired entries are purged
+      without scanning the whole cache.
+
+    Deadlines use ``time.monotonic()``, so wall-clock changes do not expire
+    or resurrect entries, and the memory estimate is updated on every set
+    and removal rather than recomputed in ``get_stats``.
+    """
     
     def __init__(self, config: CacheConfig):
         self.config = config
-        self._cache: Dict[str, CacheEntry] = {}
-        self._access_order: List[str] = []  # For LRU
-        self._access_count: Dict[str, int] = {}  # For LFU
+        self._cache: 'OrderedDict[str, _MemoryEntry]' = OrderedDict()
+        self._frequency_buckets: Dict[int, 'OrderedDict[str, None]'] = {}  # For LFU
+        self._min_frequency = 0
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._memory_usage = 0
         self._stats = CacheStats()
         self._lock = asyncio.Lock()
     
     async def get(self, key: str) -> Optional[Any]:
         """Get value by key."""
         async with self._lock:
-            if key not in self._cache:
+            entry = self._cache.get(key)
+            if entry is None:
                 self._stats.misses += 1
                 return None
             
-            entry = self._cache[key]
-            
             # Check TTL
-            if entry.expires_at and datetime.now() > entry.expires_at:
-                await self._remove_key(key)
+            if entry.expires_at is not None and time.monotonic() >= entry.expires_at:
+                self._remove_key(key)
                 self._stats.misses += 1
                 return None
             
-            # Update access info
-            entry.access_count += 1
-            entry.last_accessed = datetime.now()
-            self._access_count[key] = self._access_count.get(key, 0) + 1
-            
-            # Update LRU order
-            if key in self._access_order:
-                self._access_order.remove(key)
-            self._access_order.append(key)
-            
+            self._touch(key, entry)
             self._stats.hits += 1
             return entry.value
     
@@ -176,29 +237,27 @@ class MemoryCache(CacheInterface[str, Any]):
         """Set value with optional TTL."""
         async with self._lock:
             ttl = ttl or self.config.default_ttl
-            expires_at = datetime.now() + timedelta(seconds=ttl) if ttl > 0 else None
+            expires_at = time.monotonic() + ttl if ttl > 0 else None
             
-            # Check if we need to evict
-            if key not in self._cache and len(self._cache) >= self.config.max_size:
-                await self._evict()
+            if key in self._cache:
+                self._remove_key(key)
+            entry = _MemoryEntry(value, expires_at, len(key) + estimate_size(value))
             
-            # Create cache entry
-            entry = CacheEntry(
-                key=key,
-                value=value,
-                created_at=datetime.now(),
-                expires_at=expires_at,
-                access_count=1,
-                last_accessed=datetime.now()
-            )
+            # Check if we need to evict
+            if len(self._cache) >= self.config.max_size or self._over_memory_limit(entry.size):
+                self._purge_expired()
+            while self._cache and (
+                len(self._cache) >= self.config.max_size or self._over_memory_limit(entry.size)
+            ):
+                self._evict()
             
             self._cache[key] = entry
-            self._access_count[key] = 1
-            
-            # Update LRU order
-            if key in self._access_order:
-                self._access_order.remove(key)
-            self._access_order.append(key)
+            self._memory_usage += entry.size
+            self._bucket(1)[key] = None
+            self._min_frequency = 1
+            if expires_at is not None:
+                heapq.heappush(self._expiry_heap, (expires_at, key))
+                self._compact_expiry_heap()
             
             self._stats.sets += 1
             self._stats.size = len(self._cache)
@@ -207,7 +266,7 @@ class MemoryCache(CacheInterface[str, Any]):
         """Delete key and return True if existed."""
         async with self._lock:
             if key in self._cache:
-                await self._remove_key(key)
+                self._remove_key(key)
                 self._stats.deletes += 1
                 return True
             return False
@@ -215,12 +274,12 @@ class MemoryCache(CacheInterface[str, Any]):
     async def exists(self, key: str) -> bool:
         """Check if key exists."""
         async with self._lock:
-            if key not in self._cache:
+            entry = self._cache.get(key)
+            if entry is None:
                 return False
             
-            entry = self._cache[key]
-            if entry.expires_at and datetime.now() > entry.expires_at:
-                await self._remove_key(key)
+            if entry.expires_at is not None and time.monotonic() >= entry.expires_at:
+                self._remove_key(key)
                 return False
             
             return True
@@ -229,8 +288,10 @@ class MemoryCache(CacheInterface[str, Any]):
         """Clear all cache entries."""
         async with self._lock:
             self._cache.clear()
-            self._access_order.clear()
-            self._access_count.clear()
+            self._frequency_buckets.clear()
+            self._expiry_heap.clear()
+            self._min_frequency = 0
+            self._memory_usage = 0
             self._stats.size = 0
     
     async def keys(self, pattern: Optional[str] = None) -> List[str]:
@@ -245,76 +306,196 @@ class MemoryCache(CacheInterface[str, Any]):
     def get_stats(self) -> CacheStats:
         """Get cache statistics."""
         self._stats.size = len(self._cache)
-        self._stats.memory_usage_bytes = sum(
-            len(str(entry.key)) + len(str(entry.value)) 
-            for entry in self._cache.values()
-        )
+        self._stats.memory_usage_bytes = self._memory_usage
         return self._stats
     
-    async def _evict(self) -> None:
-        """Evict entries based on policy."""
+    def _over_memory_limit(self, incoming: int) -> bool:
+        limit = self.config.max_memory_bytes
+        return limit is not None and self._memory_usage + incoming > limit
+    
+    def _bucket(self, frequency: int) -> 'OrderedDict[str, None]':
+        bucket = self._frequency_buckets.get(frequency)
+        if bucket is None:
+            bucket = self._frequency_buckets[frequency] = OrderedDict()
+        return bucket
+    
+    def _touch(self, key: str, entry: _MemoryEntry) -> None:
+        """Record an access for the LRU order and the LFU buckets."""
+        if self.config.policy == CachePolicy.LRU:
+            self._cache.move_to_end(key)
+        
+        bucket = self._frequency_buckets[entry.frequency]
+        del bucket[key]
+        if not bucket:
+            del self._frequency_buckets[entry.frequency]
+            if self._min_frequency == entry.frequency:
+                self._min_frequency += 1
+        entry.frequency += 1
+        self._bucket(entry.frequency)[key] = None
+    
+    def _evict(self) -> None:
+        """Evict one entry based on policy."""
         if not self._cache:
             return
         
-        if self.config.policy == CachePolicy.LRU:
-            # Remove least recently used
-            key_to_remove = self._access_order[0]
-        elif self.config.policy == CachePolicy.LFU:
-            # Remove least frequently used
-            key_to_remove = min(self._access_count.keys(), key=self._access_count.get)  # type: ignore
-        elif self.config.policy == CachePolicy.FIFO:
-            # Remove oldest entry
-            key_to_remove = min(self._cache.keys(), key=lambda k: self._cache[k].created_at)
-        else:  # TTL
-            # Remove entry with earliest expiration
-            key_to_remove = min(
-                self._cache.keys(),
-                key=lambda k: self._cache[k].expires_at or datetime.max
-            )
+        if self.config.policy == CachePolicy.LFU:
+            # Remove least frequently used, least recently used among equals
+            if self._min_frequency not in self._frequency_buckets:
+                self._min_frequency = min(self._frequency_buckets)
+            key_to_remove = next(iter(self._frequency_buckets[self._min_frequency]))
+        elif self.config.policy == CachePolicy.TTL:
+            # Remove entry with earliest expiration, oldest entry if none expires
+            key_to_remove = self._pop_earliest_deadline() or next(iter(self._cache))
+        else:
+            # LRU: least recently used; FIFO: oldest entry
+            key_to_remove = next(iter(self._cache))
         
-        await self._remove_key(key_to_remove)
+        self._remove_key(key_to_remove)
         self._stats.evictions += 1
     
-    async def _remove_key(self, key: str) -> None:
+    def _pop_earliest_deadline(self) -> Optional[str]:
+        """Pop heap items until one matches a live entry; return its key."""
+        while self._expiry_heap:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self._cache.get(key)
+            if entry is not None and entry.expires_at == expires_at:
+                return key
+        return None
+    
+    def _purge_expired(self) -> int:
+        """Remove every expired entry reachable from the top of the heap."""
+        now = time.monotonic()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self._cache.get(key)
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove_key(key)
+                removed += 1
+        return removed
+    
+    def _compact_expiry_heap(self) -> None:
+        """Drop superseded heap items once they outnumber the live entries."""
+        if len(self._expiry_heap) > 2 * len(self._cache) + 64:
+            self._expiry_heap = [
+                (entry.expires_at, key) for key, entry in self._cache.items()
+                if entry.expires_at is not None
+            ]
+            heapq.heapify(self._expiry_heap)
+    
+    def _remove_key(self, key: str) -> None:
         """Remove key from all data structures."""
-        self._cache.pop(key, None)
-        if key in self._access_order:
-            self._access_order.remove(key)
-        self._access_count.pop(key, None)
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return
+        self._memory_usage -= entry.size
+        bucket = self._frequency_buckets.get(entry.frequency)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._frequency_buckets[entry.frequency]
+        # Heap items are discarded lazily when popped
         self._stats.size = len(self._cache)
     
     async def cleanup_expired(self) -> int:
         """Remove expired entries and return count."""
         async with self._lock:
-            now = datetime.now()
-            expired_keys = [
-                key for key, entry in self._cache.items()
-                if entry.expires_at and now > entry.expires_at
-            ]
-            
-            for key in expired_keys:
-                await self._remove_key(key)
-            
-            return len(expired_keys)
+            return self._purge_expired()
+
+
+class CacheSerializer:
+    """Encodes cache values as bytes with a one-byte header.
+
+    The header records the codec and whether the payload is zlib-compressed,
+    so values written with another configuration stay readable. msgpack is
+    used when installed; values it cannot encode (datetimes, arbitrary
+    objects) fall back to pickle individually.
+    """
+
+    _JSON, _PICKLE, _MSGPACK = 0, 1, 2
+    _COMPRESSED = 0x80
+
+    def __init__(self, serialization: str = DEFAULT_SERIALIZATION, compression: bool = False, threshold: int = 1024):
+        if serialization == "msgpack" and not MSGPACK_AVAILABLE:
+            logger.warning("msgpack is not installed, cache values will be pickled")
+            serialization = "pickle"
+        self.serialization = serialization
+        self.compression = compression
+        self.threshold = threshold
+
+    def dumps(self, value: Any) -> bytes:
+        """Serialize ``value``."""
+        payload: bytes
+        if self.serialization == "msgpack":
+            try:
+                codec, payload = self._MSGPACK, msgpack.packb(value, use_bin_type=True)
+            except (TypeError, ValueError, OverflowError):
+                codec, payload = self._PICKLE, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        elif self.serialization == "pickle":
+            codec, payload = self._PICKLE, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        else:
+            codec, payload = self._JSON, json.dumps(value, default=str).encode('utf-8')
+
+        if self.compression and len(payload) >= self.threshold:
+            compressed = zlib.compress(payload, 1)
+            if len(compressed) < len(payload):
+                return bytes((codec | self._COMPRESSED,)) + compressed
+        return bytes((codec,)) + payload
+
+    def loads(self, data: bytes) -> Any:
+        """Deserialize bytes produced by ``dumps``."""
+        header, payload = data[0], data[1:]
+        if header & self._COMPRESSED:
+            payload = zlib.decompress(payload)
+        codec = header & ~self._COMPRESSED
+        if codec == self._MSGPACK:
+            if not MSGPACK_AVAILABLE:
+                raise RuntimeError("Cached value was written with msgpack, which is not installed")
+            return msgpack.unpackb(payload, raw=False)
+        if codec == self._PICKLE:
+            return pickle.loads(payload)
+        return json.loads(payload.decode('utf-8'))
 
 
 class RedisCache(CacheInterface[str, Any]):
-    """Redis-based cache implementation."""
+    """Redis-based cache implementation.
+
+    Keys are versioned: every key embeds the cache's namespace generation
+    (``{prefix}:{generation}:{key}``), stored in Redis under
+    ``{prefix}:__generation__``. ``clear`` increments the generation instead
+    of scanning and deleting keys; the previous generation's entries are
+    unreachable at once and expire through their TTLs.
+    """
     
-    def __init__(self, config: CacheConfig):
+    # Seconds between re-reads of the generation, bounding how long another
+    # process' clear() can go unnoticed
+    GENERATION_REFRESH_INTERVAL = 1.0
+    
+    def __init__(self, config: CacheConfig, client: Optional[Any] = None):
         self.config = config
+        self._client = client  # Pre-built client, e.g. tests' in-process fake
         self._redis: Optional[redis.Redis[Any]] = None
         self._stats = CacheStats()
         self._connected = False
+        self._serializer = CacheSerializer(
+            config.serialization, config.compression, config.compression_threshold
+        )
+        self.generation = 0
+        self._generation_checked_at = float('-inf')
+    
+    @property
+    def generation_key(self) -> str:
+        """Redis key holding the current namespace generation."""
+        return f"{self.config.key_prefix}:__generation__"
     
     async def _ensure_connection(self) -> None:
         """Ensure Redis connection is established."""
-        if not REDIS_AVAILABLE:
+        if self._client is None and not REDIS_AVAILABLE:
             raise RuntimeError("Redis is not available. Install redis package.")
         
         if not self._connected:
             try:
-                self._redis = redis.from_url(
+                self._redis = self._client or redis.from_url(
                     self.config.redis_url or "redis://localhost:6379",
                     db=self.config.redis_db,
                     decode_responses=False  # We handle encoding ourselves
@@ -325,24 +506,49 @@ class RedisCache(CacheInterface[str, Any]):
             except Exception as e:
                 logger.error(f"Failed to connect to Redis: {e}")
                 raise
+        
+        # Pick up clears made by other processes
+        now = time.monotonic()
+        if self._redis is not None and now >= self._generation_checked_at + self.GENERATION_REFRESH_INTERVAL:
+            self._generation_checked_at = now
+            try:
+                self.generation = int(await self._redis.get(self.generation_key) or 0)
+            except Exception as e:
+                # Keep the last known generation; the next interval tries again
+                logger.error(f"Failed to refresh Redis cache generation: {e}")
+    
+    def adopt_generation(self, generation: int) -> None:
+        """Switch to ``generation`` if it is newer (announced by another instance)."""
+        if generation > self.generation:
+            self.generation = generation
+            self._generation_checked_at = time.monotonic()
     
     def _serialize(self, value: Any) -> bytes:
         """Serialize value for storage."""
-        if self.config.serialization == "pickle":
-            return pickle.dumps(value)
-        else:  # json
-            return json.dumps(value, default=str).encode('utf-8')
+        return self._serializer.dumps(value)
     
     def _deserialize(self, data: bytes) -> Any:
         """Deserialize value from storage."""
-        if self.config.serialization == "pickle":
-            return pickle.loads(data)
-        else:  # json
-            return json.loads(data.decode('utf-8'))
+        return self._serializer.loads(data)
     
     def _make_key(self, key: str) -> str:
-        """Create prefixed key."""
-        return f"{self.config.key_prefix}:{key}"
+        """Create prefixed, generation-versioned key."""
+        return f"{self.config.key_prefix}:{self.generation}:{key}"
+    
+    async def publish(self, channel: str, message: bytes) -> None:
+        """Publish ``message`` on a pub/sub channel."""
+        await self._ensure_connection()
+        if self._redis is not None:
+            await self._redis.publish(channel, message)
+    
+    async def subscribe(self, channel: str) -> Any:
+        """Return a pub/sub object subscribed to ``channel``."""
+        await self._ensure_connection()
+        if self._redis is None:
+            raise RuntimeError("Redis connection is not established")
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(channel)
+        return pubsub
     
     async def get(self, key: str) -> Optional[Any]:
         """Get value by key."""
@@ -424,10 +630,8 @@ class RedisCache(CacheInterface[str, Any]):
         
         try:
             if self._redis is not None:
-                pattern = f"{self.config.key_prefix}:*"
-                keys = await self._redis.keys(pattern)
-                if keys:
-                    await self._redis.delete(*keys)
+                self.generation = int(await self._redis.incr(self.generation_key))
+                self._generation_checked_at = time.monotonic()
         except Exception as e:
             logger.error(f"Redis clear error: {e}")
             raise
@@ -438,11 +642,11 @@ class RedisCache(CacheInterface[str, Any]):
         
         try:
             if self._redis is not None:
-                redis_pattern = f"{self.config.key_prefix}:{pattern or '*'}"
+                redis_pattern = self._make_key(pattern or '*')
                 redis_keys = await self._redis.keys(redis_pattern)
                 
-                # Remove prefix from keys
-                prefix_len = len(self.config.key_prefix) + 1
+                # Remove prefix and generation from keys
+                prefix_len = len(self._make_key(''))
                 return [key.decode('utf-8')[prefix_len:] for key in redis_keys]
             
             return []
@@ -463,9 +667,20 @@ class RedisCache(CacheInterface[str, Any]):
 
 
 class HybridCache(CacheInterface[str, Any]):
-    """Hybrid cache using both memory and Redis."""
+    """Hybrid cache using both memory (L1) and Redis (L2).
+
+    Every instance subscribes to ``{key_prefix}:invalidate``. ``set``,
+    ``delete`` and ``clear`` publish a message there, and the other instances
+    drop their L1 copy (or their whole L1 and the Redis generation on clear),
+    so processes sharing the Redis cache do not serve each other stale L1
+    values. L1 copies also expire after ``config.l1_ttl`` seconds in case a
+    message is lost while Redis is unreachable.
+    """
     
-    def __init__(self, config: CacheConfig):
+    # Per-key invalidation sequence numbers kept to detect races with L2 reads
+    MAX_TRACKED_INVALIDATIONS = 10000
+    
+    def __init__(self, config: CacheConfig, redis_client: Optional[Any] = None):
         self.config = config
         
         # Create memory cache for L1
@@ -473,14 +688,86 @@ class HybridCache(CacheInterface[str, Any]):
             backend=CacheBackend.MEMORY,
             policy=config.policy,
             max_size=min(config.max_size // 4, 1000),  # Smaller L1 cache
-            default_ttl=config.default_ttl
+            default_ttl=min(config.default_ttl, config.l1_ttl)
         )
         self.l1_cache = MemoryCache(memory_config)
         
         # Create Redis cache for L2
-        self.l2_cache = RedisCache(config)
+        self.l2_cache = RedisCache(config, client=redis_client)
         
         self._stats = CacheStats()
+        self.instance_id = uuid.uuid4().hex
+        self.channel = f"{config.key_prefix}:invalidate"
+        self._listener_task: Optional[asyncio.Task[None]] = None
+        self._invalidation_seq = 0
+        self._invalidated_at: OrderedDict[str, int] = OrderedDict()
+        self._forgotten_seq = 0  # Latest invalidation no longer tracked per key
+    
+    async def _ensure_listener(self) -> None:
+        """Subscribe to the invalidation channel on first use."""
+        if self._listener_task is not None and not self._listener_task.done():
+            return
+        pubsub = await self.l2_cache.subscribe(self.channel)
+        self._listener_task = asyncio.create_task(self._listen(pubsub))
+    
+    async def _listen(self, pubsub: Any) -> None:
+        """Apply invalidations published by other instances."""
+        try:
+            while True:
+                try:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message.get("type") == "message":
+                        await self._handle_invalidation(message["data"])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Cache invalidation listener error: {e}")
+                    await asyncio.sleep(1.0)
+        finally:
+            try:
+                await pubsub.close()
+            except Exception:
+                pass
+    
+    async def _handle_invalidation(self, data: Any) -> None:
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        payload = json.loads(data)
+        if payload.get("origin") == self.instance_id:
+            return
+        op = payload.get("op")
+        if op == "clear":
+            self._forget_invalidations()
+            self.l2_cache.adopt_generation(int(payload.get("generation", 0)))
+            await self.l1_cache.clear()
+        elif op in ("set", "del"):
+            key = payload["key"]
+            self._mark_invalidated(key)
+            await self.l1_cache.delete(key)
+    
+    def _mark_invalidated(self, key: str) -> None:
+        self._invalidation_seq += 1
+        self._invalidated_at[key] = self._invalidation_seq
+        self._invalidated_at.move_to_end(key)
+        if len(self._invalidated_at) > self.MAX_TRACKED_INVALIDATIONS:
+            _, self._forgotten_seq = self._invalidated_at.popitem(last=False)
+    
+    def _forget_invalidations(self) -> None:
+        """Treat every key as invalidated now (after a clear)."""
+        self._invalidation_seq += 1
+        self._invalidated_at.clear()
+        self._forgotten_seq = self._invalidation_seq
+    
+    def _invalidated_since(self, key: str, seq: int) -> bool:
+        """Return True if ``key`` may have been invalidated after sequence ``seq``."""
+        return self._invalidated_at.get(key, 0) > seq or self._forgotten_seq > seq
+    
+    async def _publish(self, op: str, key: Optional[str] = None, **extra: Any) -> None:
+        message = {"op": op, "key": key, "origin": self.instance_id, **extra}
+        try:
+            await self.l2_cache.publish(self.channel, json.dumps(message).encode('utf-8'))
+        except Exception as e:
+            logger.error(f"Cache invalidation publish error: {e}")
     
     async def get(self, key: str) -> Optional[Any]:
         """Get value from L1 first, then L2."""
@@ -490,11 +777,15 @@ class HybridCache(CacheInterface[str, Any]):
             self._stats.hits += 1
             return value
         
+        await self._ensure_listener()
+        
         # Try L2 cache
+        seq = self._invalidation_seq
         value = await self.l2_cache.get(key)
         if value is not None:
-            # Promote to L1 cache
-            await self.l1_cache.set(key, value)
+            # Promote to L1 cache unless the key changed while Redis was read
+            if not self._invalidated_since(key, seq):
+                await self.l1_cache.set(key, value)
             self._stats.hits += 1
             return value
         
@@ -502,15 +793,21 @@ class HybridCache(CacheInterface[str, Any]):
         return None
     
     async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """Set value in both L1 and L2."""
-        await self.l1_cache.set(key, value, ttl)
+        """Set value in both L1 and L2 and invalidate other instances' L1."""
+        await self._ensure_listener()
+        l1_ttl = min(ttl, self.config.l1_ttl) if ttl is not None else None
+        await self.l1_cache.set(key, value, l1_ttl)
         await self.l2_cache.set(key, value, ttl)
+        await self._publish("set", key)
         self._stats.sets += 1
     
     async def delete(self, key: str) -> bool:
-        """Delete from both L1 and L2."""
+        """Delete from both L1 and L2 and invalidate other instances' L1."""
+        await self._ensure_listener()
+        self._mark_invalidated(key)
         l1_deleted = await self.l1_cache.delete(key)
         l2_deleted = await self.l2_cache.delete(key)
+        await self._publish("del", key)
         
         if l1_deleted or l2_deleted:
             self._stats.deletes += 1
@@ -522,9 +819,12 @@ class HybridCache(CacheInterface[str, Any]):
         return await self.l1_cache.exists(key) or await self.l2_cache.exists(key)
     
     async def clear(self) -> None:
-        """Clear both caches."""
+        """Clear both caches, here and in every other instance."""
+        await self._ensure_listener()
+        self._forget_invalidations()
         await self.l1_cache.clear()
         await self.l2_cache.clear()
+        await self._publish("clear", generation=self.l2_cache.generation)
     
     async def keys(self, pattern: Optional[str] = None) -> List[str]:
         """Get keys from L2 cache."""
@@ -544,6 +844,88 @@ class HybridCache(CacheInterface[str, Any]):
             size=l1_stats.size + l2_stats.size,
             memory_usage_bytes=l1_stats.memory_usage_bytes
         )
+    
+    async def close(self) -> None:
+        """Stop listening for invalidations and close the Redis connection."""
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        await self.l2_cache.close()
+
+
+class SingleFlight:
+    """Coalesces concurrent computations of the same key into one task.
+
+    Used by ``cached``: the first caller that misses starts the computation
+    and every caller for the same key awaits that single task, so an expired
+    popular key triggers one upstream request instead of a thundering herd.
+    The task is shielded, so a cancelled caller does not cancel it for the
+    others. Failures can be remembered for a short time (negative caching);
+    they are kept in-process only, since exceptions do not survive
+    serialization to a shared backend.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, asyncio.Task[Any]] = {}
+        self._failures: Dict[str, Tuple[float, BaseException, Any]] = {}
+        self.stats = CacheStats()
+
+    def in_flight(self, key: str) -> bool:
+        """Return True if a computation for ``key`` is running."""
+        return key in self._calls
+
+    def _start(self, key: str, factory: Callable[[], Awaitable[Any]]) -> 'asyncio.Task[Any]':
+        task = asyncio.ensure_future(factory())
+        self._calls[key] = task
+
+        def _done(finished: 'asyncio.Task[Any]') -> None:
+            if self._calls.get(key) is finished:
+                del self._calls[key]
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.debug(f"Cached computation for {key} failed: {finished.exception()}")
+
+        task.add_done_callback(_done)
+        return task
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of ``factory()``, sharing a running computation for ``key``."""
+        task = self._calls.get(key)
+        if task is None:
+            task = self._start(key, factory)
+        else:
+            self.stats.coalesced += 1
+        return await asyncio.shield(task)
+
+    def refresh(self, key: str, factory: Callable[[], Awaitable[Any]]) -> bool:
+        """Start a background computation for ``key`` unless one is running."""
+        if key in self._calls:
+            return False
+        self._start(key, factory)
+        return True
+
+    def remember_failure(self, key: str, error: BaseException, ttl: float) -> None:
+        """Answer ``key`` with ``error`` for the next ``ttl`` seconds."""
+        self._failures[key] = (time.monotonic() + ttl, error, error.__traceback__)
+
+    def recent_failure(self, key: str) -> Optional[BaseException]:
+        """Return the remembered failure for ``key`` if it has not expired."""
+        failure = self._failures.get(key)
+        if failure is None:
+            return None
+        expires_at, error, traceback = failure
+        if time.monotonic() >= expires_at:
+            del self._failures[key]
+            return None
+        # Reset the traceback so repeated re-raises do not keep growing it
+        return error.with_traceback(traceback)
+
+    def clear(self) -> None:
+        """Forget remembered failures (running computations are left alone)."""
+        self._failures.clear()
 
 
 class CacheManager(metaclass=SingletonMeta):
@@ -551,6 +933,7 @@ class CacheManager(metaclass=SingletonMeta):
     
     def __init__(self) -> None:
         self._caches: Dict[str, CacheInterface[Any, Any]] = {}
+        self._flights: Dict[str, SingleFlight] = {}
         self._default_config = CacheConfig()
         self._monitoring_task: Optional[asyncio.Task[None]] = None
         self._is_monitoring = False
@@ -641,6 +1024,13 @@ class CacheManager(metaclass=SingletonMeta):
                 logger.error(f"Error in cache monitoring loop: {e}")
                 await asyncio.sleep(interval)
     
+    def get_single_flight(self, name: str) -> SingleFlight:
+        """Get the request coalescing group used by ``cached`` for a cache."""
+        flight = self._flights.get(name)
+        if flight is None:
+            flight = self._flights[name] = SingleFlight()
+        return flight
+    
     def get_all_stats(self) -> Dict[str, CacheStats]:
         """Get statistics for all caches."""
         return {name: cache.get_stats() for name, cache in self._caches.items()}
@@ -649,6 +1039,8 @@ class CacheManager(metaclass=SingletonMeta):
         """Clear all caches."""
         for cache in self._caches.values():
             await cache.clear()
+        for flight in self._flights.values():
+            flight.clear()
         logger.info("All caches cleared")
     
     async def close_all(self) -> None:
@@ -663,16 +1055,35 @@ class CacheManager(metaclass=SingletonMeta):
 # Decorators for caching
 F = TypeVar('F', bound=Callable[..., Any])
 
+# Marks values stored by ``cached`` with stale-while-revalidate enabled
+_SWR_MARKER = "__cached_swr__"
+
+
 def cached(
     cache_name: str = "default",
     ttl: Optional[int] = None,
-    key_func: Optional[Callable[..., str]] = None
+    key_func: Optional[Callable[..., str]] = None,
+    stale_ttl: int = 0,
+    negative_ttl: int = 0
 ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
-    """Decorator to cache function results."""
+    """Decorator to cache function results.
+
+    Concurrent misses for the same key share one computation (see
+    ``SingleFlight``). With ``stale_ttl`` a value stays stored for that many
+    seconds past ``ttl``; callers during that window get the stale value
+    immediately while one background call refreshes it. With
+    ``negative_ttl`` an exception raised by the function is re-raised to
+    callers of the same key for that many seconds instead of calling again.
+    ``None`` results are not stored, since a stored ``None`` reads back as a
+    miss anyway. Hit, miss, coalesced, stale and negative counters are kept in
+    ``CacheManager().get_single_flight(cache_name).stats``.
+    """
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
         async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
             cache_manager = CacheManager()
             cache = cache_manager.get_or_create_cache(cache_name)
+            flight = cache_manager.get_single_flight(cache_name)
+            stats = flight.stats
             
             # Generate cache key
             if key_func:
@@ -684,16 +1095,49 @@ def cached(
                 key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
                 cache_key = hashlib.md5(":".join(key_parts).encode()).hexdigest()
             
+            default_ttl: int = getattr(getattr(cache, 'config', None), 'default_ttl', DEFAULT_CACHE_TTL)
+            fresh_ttl = ttl or default_ttl
+            
+            async def compute() -> Any:
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    if negative_ttl > 0:
+                        flight.remember_failure(cache_key, e, negative_ttl)
+                    raise
+                if result is not None:
+                    if stale_ttl > 0:
+                        stored = {
+                            _SWR_MARKER: True,
+                            "value": result,
+                            "fresh_until": time.time() + fresh_ttl,
+                        }
+                        await cache.set(cache_key, stored, fresh_ttl + stale_ttl)
+                    else:
+                        await cache.set(cache_key, result, fresh_ttl)
+                return result
+            
             # Try to get from cache
             cached_result = await cache.get(cache_key)
             if cached_result is not None:
+                if stale_ttl > 0 and isinstance(cached_result, dict) and cached_result.get(_SWR_MARKER):
+                    if time.time() >= cached_result["fresh_until"]:
+                        stats.stale_served += 1
+                        flight.refresh(cache_key, compute)
+                        return cached_result["value"]
+                    cached_result = cached_result["value"]
+                stats.hits += 1
                 return cached_result
             
-            # Execute function and cache result
-            result = await func(*args, **kwargs)
-            await cache.set(cache_key, result, ttl)
+            failure = flight.recent_failure(cache_key) if negative_ttl > 0 else None
+            if failure is not None:
+                stats.negative_hits += 1
+                raise failure
             
-            return result
+            # Execute function (once for all concurrent callers) and cache result
+            if not flight.in_flight(cache_key):
+                stats.misses += 1
+            return await flight.run(cache_key, compute)
         
         def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
             # For sync functions, we can't use async cache operations
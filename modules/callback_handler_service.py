@@ -23,6 +23,7 @@ from telegram.ext import CallbackContext
 from modules.service_registry import ServiceInterface
 from modules.speech_recognition_service import SpeechRecognitionService
 from modules.keyboards import BUTTONS_CONFIG, LANGUAGE_OPTIONS_CONFIG
+from modules.search_command import CALLBACK_PATTERN as SEARCH_CALLBACK_PATTERN
 from modules.logger import general_logger, error_logger
 
 # Create component-specific logger with clear service identification
@@ -71,6 +72,7 @@ class CallbackHandlerService(ServiceInterface):
             r"^lang_": self._handle_language_selection_callback,
             r"^test_callback$": self._handle_test_callback,
             r"^song_select:[a-zA-Z0-9_-]+$": self._handle_song_selection_callback,
+            SEARCH_CALLBACK_PATTERN: self._handle_search_page_callback,
             r"^[a-zA-Z_]+:[0-9a-f]+$": self._handle_link_modification_callback,
         }
         
@@ -239,6 +241,15 @@ class CallbackHandlerService(ServiceInterface):
         from modules.handlers.song_command import handle_song_selection_callback
         await handle_song_selection_callback(update, context)
 
+    async def _handle_search_page_callback(
+        self,
+        update: Update,
+        context: CallbackContext[Any, Any, Any, Any],
+    ) -> None:
+        """Delegate /search "next page" buttons to search_command."""
+        from modules.search_command import handle_search_page_callback
+        await handle_search_page_callback(update, context)
+
     async def _handle_link_modification_callback(
         self,
         update: Update,
@@ -1,9 +1,207 @@
 from datetime import datetime, date, timedelta, time
-from typing import List, Tuple, Optional, Union, Dict, Any
+from typing import AsyncIterator, List, NamedTuple, Tuple, Optional, Union, Dict, Any
 import pytz
 import logging
 from modules.database import Database
 from modules.const import KYIV_TZ
+from modules.user_activity import fetch_last_message, fetch_user_profile, user_activity_ready
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip when streaming a message window
+MESSAGE_WINDOW_PAGE_SIZE = 2000
+
+# Keyset pagination on (timestamp, internal_message_id), served by
+# idx_messages_chat_ts_id: every page is an index range scan that starts
+# where the previous one ended, so memory stays bounded by the page size and
+# no page re-reads the rows before it (unlike OFFSET).
+_WINDOW_FIRST_PAGE_SQL = """
+    SELECT m.timestamp, u.username, m.text, m.internal_message_id
+    FROM messages m
+    LEFT JOIN users u ON m.user_id = u.user_id
+    WHERE m.chat_id = $1
+    AND m.timestamp >= $2
+    AND m.timestamp < $3
+    ORDER BY m.timestamp ASC, m.internal_message_id ASC
+    LIMIT $4
+"""
+
+_WINDOW_NEXT_PAGE_SQL = """
+    SELECT m.timestamp, u.username, m.text, m.internal_message_id
+    FROM messages m
+    LEFT JOIN users u ON m.user_id = u.user_id
+    WHERE m.chat_id = $1
+    AND m.timestamp >= $2
+    AND m.timestamp < $3
+    AND (m.timestamp, m.internal_message_id) > ($2, $5)
+    ORDER BY m.timestamp ASC, m.internal_message_id ASC
+    LIMIT $4
+"""
+
+# Window watermarks only read idx_messages_chat_ts_id (an index-only scan once
+# the partitions are vacuumed), never the message rows themselves.
+_WINDOW_WATERMARK_SQL = """
+    SELECT COUNT(*) AS messages,
+           MIN(internal_message_id) AS first_id,
+           MAX(internal_message_id) AS last_id
+    FROM messages
+    WHERE chat_id = $1
+    AND timestamp >= $2
+    AND timestamp < $3
+"""
+
+_LAST_N_WATERMARK_SQL = """
+    SELECT COUNT(*) AS messages,
+           MIN(internal_message_id) AS first_id,
+           MAX(internal_message_id) AS last_id
+    FROM (
+        SELECT internal_message_id
+        FROM messages
+        WHERE chat_id = $1
+        ORDER BY timestamp DESC
+        LIMIT $2
+    ) newest
+"""
+
+
+class WindowWatermark(NamedTuple):
+    """
+    Cheap fingerprint of the messages inside an /analyze window.
+
+    internal_message_id only grows, so a message landing in the window moves
+    last_id and one leaving it (deleted, or aged out of a rolling window)
+    changes the count or first_id. Used as the analysis cache key in place of
+    a hash of the message text, so a cache hit needs no message retrieval.
+    """
+    messages: int
+    first_id: Optional[int]
+    last_id: Optional[int]
+
+    def __str__(self) -> str:
+        return f"{self.messages}:{self.first_id or 0}:{self.last_id or 0}"
+
+
+def _to_local(timestamp: datetime) -> datetime:
+    """Convert a database timestamp (naive values are UTC) to Kyiv time."""
+    if timestamp.tzinfo is None:
+        timestamp = pytz.UTC.localize(timestamp)
+    return timestamp.astimezone(KYIV_TZ)
+
+
+async def iter_chat_messages(
+    chat_id: int,
+    start: datetime,
+    end: datetime,
+    page_size: int = MESSAGE_WINDOW_PAGE_SIZE,
+) -> AsyncIterator[Tuple[datetime, str, str]]:
+    """
+    Stream the messages of a chat in the half-open window [start, end).
+
+    Rows are fetched in keyset-paginated pages and converted to
+    (local timestamp, sender_name, text) one at a time as they are consumed,
+    so a long window never sits in memory as a whole. The connection is
+    held only while a page is fetched.
+
+    Args:
+        chat_id: The chat ID to fetch messages from
+        start: Window start (timezone-aware)
+        end: Window end, exclusive (timezone-aware)
+        page_size: Rows fetched per round trip
+
+    Yields:
+        Tuples of (timestamp, sender_name, text), oldest first
+    """
+    pool = await Database.get_pool()
+    last_key: Optional[Tuple[datetime, int]] = None
+    while True:
+        async with pool.acquire() as conn:
+            if last_key is None:
+                rows = await conn.fetch(_WINDOW_FIRST_PAGE_SQL, chat_id, start, end, page_size)
+            else:
+                rows = await conn.fetch(_WINDOW_NEXT_PAGE_SQL, chat_id, last_key[0], end, page_size, last_key[1])
+
+        for row in rows:
+            if row['timestamp'] is None:
+                continue
+            yield (_to_local(row['timestamp']), row['username'] or 'Unknown', row['text'] or '')
+
+        if len(rows) < page_size:
+            return
+        last_key = (rows[-1]['timestamp'], rows[-1]['internal_message_id'])
+
+
+def day_bounds(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """Return [start of start_date, start of the day after end_date) in Kyiv time."""
+    local_start = KYIV_TZ.localize(datetime.combine(start_date, time.min))
+    local_end = KYIV_TZ.localize(datetime.combine(end_date + timedelta(days=1), time.min))
+    return local_start, local_end
+
+
+def last_n_days_bounds(days: int) -> Tuple[datetime, datetime]:
+    """Return the window of the last n whole calendar days before today, plus today."""
+    today = datetime.now(KYIV_TZ).date()
+    return day_bounds(today - timedelta(days=days), today)
+
+
+def _parse_date(value: Union[str, date]) -> date:
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
+
+
+async def get_messages_for_chat_window(
+    chat_id: int, start: datetime, end: datetime
+) -> List[Tuple[datetime, str, str]]:
+    """Collect iter_chat_messages() into a list."""
+    return [message async for message in iter_chat_messages(chat_id, start, end)]
+
+
+def format_analysis_lines(messages: List[Tuple[datetime, str, str]]) -> List[str]:
+    """Render messages as the "[HH:MM] sender: text" lines sent to GPT, skipping empty ones."""
+    return [f"[{timestamp.strftime('%H:%M')}] {sender}: {text}" for timestamp, sender, text in messages if text]
+
+
+async def get_window_watermark(chat_id: int, start: datetime, end: datetime) -> WindowWatermark:
+    """Return the watermark of the messages in [start, end) without reading them."""
+    pool = await Database.get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(_WINDOW_WATERMARK_SQL, chat_id, start, end)
+    return WindowWatermark(row['messages'], row['first_id'], row['last_id'])
+
+
+async def get_last_n_messages_watermark(chat_id: int, count: int) -> WindowWatermark:
+    """Return the watermark of the window read by get_last_n_messages_in_chat()."""
+    pool = await Database.get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(_LAST_N_WATERMARK_SQL, chat_id, count)
+    return WindowWatermark(row['messages'], row['first_id'], row['last_id'])
+
+
+async def get_period_watermark(chat_id: int, period_key: str) -> WindowWatermark:
+    """
+    Return the watermark of an /analyze period key.
+
+    Keys are "today", "date_<date>", "period_<start>_<end>",
+    "last_<n>_days" and "last_<n>_messages" (dates as YYYY-MM-DD).
+    """
+    kind, _, rest = period_key.partition("_")
+    if period_key == "today":
+        today = datetime.now(KYIV_TZ).date()
+        return await get_window_watermark(chat_id, *day_bounds(today, today))
+    if kind == "date":
+        target_date = _parse_date(rest)
+        return await get_window_watermark(chat_id, *day_bounds(target_date, target_date))
+    if kind == "period":
+        start_date, end_date = rest.split("_")
+        return await get_window_watermark(chat_id, *day_bounds(_parse_date(start_date), _parse_date(end_date)))
+    if kind == "last":
+        number, _, unit = rest.partition("_")
+        if unit == "messages":
+            return await get_last_n_messages_watermark(chat_id, int(number))
+        if unit == "days":
+            return await get_window_watermark(chat_id, *last_n_days_bounds(int(number)))
+    raise ValueError(f"Unknown analysis period key: {period_key}")
+
 
 async def get_messages_for_chat_today(chat_id: int) -> List[Tuple[datetime, str, str]]:
     """
@@ -15,36 +213,8 @@ async def get_messages_for_chat_today(chat_id: int) -> List[Tuple[datetime, str,
     Returns:
         List of tuples containing (timestamp, sender_name, text)
     """
-    # Get current date in local timezone
     today = datetime.now(KYIV_TZ).date()
-    local_start = datetime.combine(today, datetime.min.time(), tzinfo=KYIV_TZ)
-    local_end = datetime.combine(today, datetime.max.time(), tzinfo=KYIV_TZ)
-    
-    # Convert to UTC for database query
-    start_time_utc = local_start.astimezone(pytz.UTC).replace(tzinfo=None)
-    end_time_utc = local_end.astimezone(pytz.UTC).replace(tzinfo=None)
-    
-    pool = await Database.get_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch("""
-            SELECT m.timestamp, u.username, m.text
-            FROM messages m
-            LEFT JOIN users u ON m.user_id = u.user_id
-            WHERE m.chat_id = $1
-            AND m.timestamp >= $2
-            AND m.timestamp <= $3
-            ORDER BY m.timestamp ASC
-        """, chat_id, start_time_utc, end_time_utc)
-        
-        # Convert timestamps back to local timezone for display
-        return [
-            (
-                row['timestamp'].replace(tzinfo=pytz.UTC).astimezone(KYIV_TZ),
-                row['username'] or 'Unknown',
-                row['text']
-            )
-            for row in rows
-        ]
+    return await get_messages_for_chat_window(chat_id, *day_bounds(today, today))
 
 async def get_last_n_messages_in_chat(chat_id: int, count: int) -> List[Tuple[datetime, str, str]]:
     """
@@ -82,72 +252,9 @@ async def get_messages_for_chat_last_n_days(chat_id: int, days: int) -> List[Tup
     Returns:
         List of tuples containing (timestamp, sender_name, text)
     """
-    logger = logging.getLogger(__name__)
-    
-    # Get current time in local timezone
-    end_time = datetime.now(KYIV_TZ)
-    start_time = end_time - timedelta(days=days)
-    
-    # Convert to UTC for database query
-    start_time_utc = start_time.astimezone(pytz.UTC)
-    end_time_utc = end_time.astimezone(pytz.UTC)
-    
-    # For PostgreSQL TIMESTAMP WITH TIME ZONE, we can pass timezone-aware datetimes
-    # PostgreSQL will handle the conversion correctly
-    logger.info(f"Querying messages for chat {chat_id} from last {days} days")
-    logger.info(f"Time range (Kyiv): {start_time} to {end_time}")
-    logger.info(f"Time range (UTC): {start_time_utc} to {end_time_utc}")
-    
-    pool = await Database.get_pool()
-    async with pool.acquire() as conn:
-        # First check total messages in DB for debugging
-        total_count = await conn.fetchval("""
-            SELECT COUNT(*) FROM messages WHERE chat_id = $1
-        """, chat_id)
-        logger.info(f"Total messages in DB for chat {chat_id}: {total_count}")
-        
-        # Check date range of messages in the database
-        date_range = await conn.fetchrow("""
-            SELECT 
-                MIN(timestamp) as min_date, 
-                MAX(timestamp) as max_date,
-                COUNT(*) as total_count
-            FROM messages 
-            WHERE chat_id = $1
-        """, chat_id)
-        if date_range:
-            logger.info(f"Date range of messages in DB: {date_range['min_date']} to {date_range['max_date']} ({date_range['total_count']} total messages)")
-        
-        # Query with timezone-aware datetimes - PostgreSQL will handle conversion
-        rows = await conn.fetch("""
-            SELECT m.timestamp, u.username, m.text
-            FROM messages m
-            LEFT JOIN users u ON m.user_id = u.user_id
-            WHERE m.chat_id = $1
-            AND m.timestamp >= $2
-            AND m.timestamp <= $3
-            ORDER BY m.timestamp ASC
-        """, chat_id, start_time_utc, end_time_utc)
-        
-        logger.info(f"Query returned {len(rows)} messages")
-        
-        # Convert timestamps back to local timezone for display
-        result = []
-        for row in rows:
-            timestamp = row['timestamp']
-            # Handle timezone-aware or naive timestamps from database
-            if timestamp.tzinfo is None:
-                # If naive, assume UTC
-                timestamp = pytz.UTC.localize(timestamp)
-            # Convert to local timezone
-            local_timestamp = timestamp.astimezone(KYIV_TZ)
-            result.append((
-                local_timestamp,
-                row['username'] or 'Unknown',
-                row['text'] or ''
-            ))
-        
-        return result
+    start_time, end_time = last_n_days_bounds(days)
+    logger.info(f"Querying messages for chat {chat_id} from {start_time} to {end_time}")
+    return await get_messages_for_chat_window(chat_id, start_time, end_time)
 
 async def get_messages_for_chat_date_period(
     chat_id: int,
@@ -165,41 +272,8 @@ async def get_messages_for_chat_date_period(
     Returns:
         List of tuples containing (timestamp, sender_name, text)
     """
-    # Convert string dates to date objects if needed
-    if isinstance(start_date, str):
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-    if isinstance(end_date, str):
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    # Create datetime objects in local timezone
-    local_start = datetime.combine(start_date, datetime.min.time(), tzinfo=KYIV_TZ)
-    local_end = datetime.combine(end_date, datetime.max.time(), tzinfo=KYIV_TZ)
-    
-    # Convert to UTC for database query
-    start_time_utc = local_start.astimezone(pytz.UTC).replace(tzinfo=None)
-    end_time_utc = local_end.astimezone(pytz.UTC).replace(tzinfo=None)
-    
-    pool = await Database.get_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch("""
-            SELECT m.timestamp, u.username, m.text
-            FROM messages m
-            LEFT JOIN users u ON m.user_id = u.user_id
-            WHERE m.chat_id = $1
-            AND m.timestamp >= $2
-            AND m.timestamp <= $3
-            ORDER BY m.timestamp ASC
-        """, chat_id, start_time_utc, end_time_utc)
-        
-        # Convert timestamps back to local timezone for display
-        return [
-            (
-                row['timestamp'].replace(tzinfo=pytz.UTC).astimezone(KYIV_TZ),
-                row['username'] or 'Unknown',
-                row['text']
-            )
-            for row in rows
-        ]
+    bounds = day_bounds(_parse_date(start_date), _parse_date(end_date))
+    return await get_messages_for_chat_window(chat_id, *bounds)
 
 async def get_messages_for_chat_single_date(chat_id: int, target_date: Union[date, str]) -> List[Tuple[datetime, str, str]]:
     """
@@ -212,220 +286,11 @@ async def get_messages_for_chat_single_date(chat_id: int, target_date: Union[dat
     Returns:
         List of tuples containing (timestamp, sender_name, text)
     """
-    logger = logging.getLogger(__name__)
-    
     try:
-        # Convert string date to date object if needed
-        if isinstance(target_date, str):
-            target_date = datetime.strptime(target_date, '%Y-%m-%d').date()
-        
-        # Create date range in local timezone (Kyiv)
-        local_tz = pytz.timezone('Europe/Kyiv')
-        
-        # Log the input parameters
-        logger.info(f"Getting messages for chat_id: {chat_id}, date: {target_date}")
-        
-        # Create start of day and start of next day in local timezone
-        local_start = local_tz.localize(datetime.combine(target_date, time.min))
-        local_end = local_tz.localize(datetime.combine(target_date + timedelta(days=1), time.min))
-        
-        # Convert to UTC for database query
-        start_utc = local_start.astimezone(pytz.UTC)
-        end_utc = local_end.astimezone(pytz.UTC)
-        
-        # For database query, we need naive datetime
-        start_naive = start_utc.replace(tzinfo=None)
-        end_naive = end_utc.replace(tzinfo=None)
-        
-        logger.info(f"Converted date range:")
-        logger.info(f"  Local: {local_start} to {local_end}")
-        logger.info(f"  UTC:   {start_utc} to {end_utc}")
-        logger.info(f"  Types: {type(start_utc)}, {type(end_utc)}")
-        logger.info(f"  Using chat_id: {chat_id}")
-        
-        logger.info(f"Querying messages for date: {target_date}")
-        logger.info(f"Local time range: {local_start} to {local_end}")
-        logger.info(f"UTC time range: {start_utc} to {end_utc}")
-        
-        pool = await Database.get_pool()
-        async with pool.acquire() as conn:
-            # First check if we have any messages in this date range
-            # Using half-open interval [start, end) to avoid missing messages at the end of the day
-            count_query = """
-                SELECT COUNT(*)
-                FROM messages
-                WHERE chat_id = $1
-                AND timestamp >= $2
-                AND timestamp < $3
-            """
-            logger.info(f"Executing count query:\n{count_query}\nWith params: chat_id={chat_id}, start_utc={start_utc}, end_utc={end_utc}")
-
-            # Execute with timezone-aware datetime objects
-            count = await conn.fetchval(count_query, chat_id, start_utc, end_utc)
-            
-            logger.info(f"Found {count} messages in the date range")
-            
-            # Debug: Check if there are any messages in the database at all for this chat
-            total_count = await conn.fetchval("""
-                SELECT COUNT(*) FROM messages WHERE chat_id = $1
-            """, chat_id)
-            logger.info(f"Total messages in DB for chat {chat_id}: {total_count}")
-            
-            # Debug: Check the date range of messages in the database
-            date_range = await conn.fetchrow("""
-                SELECT 
-                    MIN(timestamp) as min_date, 
-                    MAX(timestamp) as max_date,
-                    COUNT(*) as total_count
-                FROM messages 
-                WHERE chat_id = $1
-            """, chat_id)
-            if date_range:
-                logger.info(f"Date range of messages in DB: {date_range['min_date']} to {date_range['max_date']} ({date_range['total_count']} total messages)")
-            
-            if count == 0:
-                # If no messages found, check the date range of available messages
-                date_range = await conn.fetchrow("""
-                    SELECT 
-                        MIN(timestamp) as min_date, 
-                        MAX(timestamp) as max_date,
-                        COUNT(*) as total_messages
-                    FROM messages 
-                    WHERE chat_id = $1
-                """, chat_id)
-                
-                if date_range and date_range['min_date']:
-                    # Convert database timestamps to local timezone for display
-                    min_local = date_range['min_date'].replace(tzinfo=pytz.UTC).astimezone(local_tz)
-                    max_local = date_range['max_date'].replace(tzinfo=pytz.UTC).astimezone(local_tz)
-                    
-                    logger.warning(f"No messages found for {target_date}.")
-                    logger.warning(f"Database date range: {min_local} to {max_local}")
-                    logger.warning(f"Total messages in database: {date_range['total_messages']}")
-                    
-                    # Get some sample messages to see what dates we have
-                    sample_messages = await conn.fetch("""
-                        SELECT timestamp, text 
-                        FROM messages 
-                        WHERE chat_id = $1 
-                        ORDER BY timestamp DESC 
-                        LIMIT 5
-                    """, chat_id)
-                    
-                    if sample_messages:
-                        logger.warning("Sample messages from database:")
-                        for msg in sample_messages:
-                            msg_time = msg['timestamp']
-                            if msg_time.tzinfo is None:
-                                msg_time = pytz.UTC.localize(msg_time)
-                            local_time = msg_time.astimezone(local_tz)
-                            logger.warning(f"- {local_time} (UTC: {msg_time}): {msg['text'][:100]}...")
-                else:
-                    logger.warning("No messages found in the database for this chat")
-                
-                return []
-            
-            # Log the exact query being executed
-            query = """
-                SELECT m.timestamp, u.username, m.text
-                FROM messages m
-                LEFT JOIN users u ON m.user_id = u.user_id
-                WHERE m.chat_id = $1
-                AND m.timestamp >= $2
-                AND m.timestamp < $3
-                ORDER BY m.timestamp ASC
-            """
-            logger.info(f"Executing query with params: chat_id={chat_id}, start_utc={start_utc}, end_utc={end_utc}")
-            logger.info(f"Query: {query}")
-
-            # Log the EXPLAIN ANALYZE output for debugging
-            try:
-                explain = await conn.fetch("""
-                    EXPLAIN ANALYZE
-                    SELECT m.timestamp, u.username, m.text
-                    FROM messages m
-                    LEFT JOIN users u ON m.user_id = u.user_id
-                    WHERE m.chat_id = $1
-                    AND m.timestamp >= $2
-                    AND m.timestamp < $3
-                    ORDER BY m.timestamp ASC
-                """, chat_id, start_utc, end_utc)
-                logger.info("Query plan:")
-                for row in explain:
-                    logger.info(f"  {row['QUERY PLAN']}")
-            except Exception as e:
-                logger.warning(f"Failed to get query plan: {e}")
-
-            # Execute the query with timezone-aware datetime objects
-            rows = await conn.fetch(query, chat_id, start_utc, end_utc)
-            
-            # Log the raw results
-            logger.info(f"Raw query returned {len(rows)} rows")
-            
-            # If no rows found, try to find any messages in the database
-            if not rows:
-                logger.warning("No rows returned. Checking for any messages in the database...")
-                any_messages = await conn.fetch("""
-                    SELECT timestamp, text 
-                    FROM messages 
-                    WHERE chat_id = $1 
-                    ORDER BY timestamp DESC 
-                    LIMIT 5
-                """, chat_id)
-                
-                if any_messages:
-                    logger.warning(f"Found {len(any_messages)} recent messages in the database:")
-                    for i, msg in enumerate(any_messages):
-                        logger.warning(f"  {i+1}. {msg['timestamp']} - {msg['text'][:100]}")
-                else:
-                    logger.warning("No messages found in the database for this chat")
-            
-            # Convert timestamps back to local timezone for display
-            messages = []
-            processed_count = 0
-            error_count = 0
-            
-            for row in rows:
-                try:
-                    timestamp = row['timestamp']
-                    
-                    # Log raw timestamp info for debugging
-                    logger.debug(f"Processing message - raw timestamp: {timestamp}, type: {type(timestamp)}")
-                    
-                    # Handle timezone
-                    if timestamp is None:
-                        logger.warning(f"Skipping message with null timestamp: {row}")
-                        error_count += 1
-                        continue
-                        
-                    if timestamp.tzinfo is None:
-                        logger.debug("Localizing naive timestamp to UTC")
-                        timestamp = pytz.UTC.localize(timestamp)
-                    
-                    # Convert to local timezone
-                    local_time = timestamp.astimezone(local_tz)
-                    
-                    messages.append((
-                        local_time,
-                        row['username'] or 'Unknown',
-                        row['text'] or ''  # Ensure text is never None
-                    ))
-                    processed_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error processing message row: {e}", exc_info=True)
-                    error_count += 1
-            
-            # Log summary
-            logger.info(f"Processed {processed_count} messages successfully")
-            if error_count > 0:
-                logger.warning(f"Encountered {error_count} errors while processing messages")
-            
-            if not messages and rows:
-                logger.error("No messages were processed successfully despite having rows. Check logs for errors.")
-            
-            return messages
-            
+        target_date = _parse_date(target_date)
+        messages = await get_messages_for_chat_window(chat_id, *day_bounds(target_date, target_date))
+        logger.info(f"Found {len(messages)} messages in chat {chat_id} for {target_date}")
+        return messages
     except Exception as e:
         logger.error(f"Error in get_messages_for_chat_single_date: {str(e)}", exc_info=True)
         raise
@@ -510,6 +375,10 @@ async def get_user_chat_stats_with_fallback(chat_id: int, user_id: int, username
     
     pool = await Database.get_pool()
     async with pool.acquire() as conn:
+        if await user_activity_ready(conn):
+            week_ago = datetime.now(KYIV_TZ) - timedelta(days=7)
+            return await fetch_user_profile(conn, chat_id, user_id, username, week_ago)
+
         # Get all user_ids for this username
         user_ids = [user_id]
         rows = await conn.fetch("""
@@ -581,8 +450,13 @@ async def get_last_message_for_user_in_chat(chat_id: int, user_id: Optional[int]
     If username is provided, will aggregate all user_ids with that username (for username changes).
     Returns None if not found.
     """
+    if user_id is None and not username:
+        return None
     pool = await Database.get_pool()
     async with pool.acquire() as conn:
+        if await user_activity_ready(conn):
+            return await fetch_last_message(conn, chat_id, user_id, username)
+
         user_ids = set()
         if username:
             rows = await conn.fetch("""
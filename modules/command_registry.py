@@ -332,6 +332,7 @@ class CommandRegistry(ServiceInterface):
             missing_command,
             error_report_command,
             report_command,
+            search_command,
         )
         from modules.handlers.admin_commands import mute_command, unmute_command
         from modules.handlers.song_command import song_command, short_command
@@ -386,6 +387,18 @@ class CommandRegistry(ServiceInterface):
             )
         )
 
+        # Search command
+        self.register_command(
+            CommandInfo(
+                name="search",
+                description="Full-text search of the chat's messages",
+                category=CommandCategory.UTILITY,
+                handler_func=search_command,
+                usage="/search <query>",
+                examples=["/search борщ", '/search "нова пошта" -київ'],
+            )
+        )
+
         # Weather command (class-based handler)
         weather_handler = WeatherCommandHandler()
         self.register_command(
@@ -2,6 +2,8 @@ from telegram import Update
 from telegram.ext import ContextTypes
 import re
 
+from modules.word_counts import fetch_word_count, is_countable_word, normalize_token, word_counts_ready
+
 async def count_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Count the number of encounters of a word in the entire chat history.
@@ -21,8 +23,8 @@ async def count_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         )
         return
     
-    word = args[0].strip().lower()
-    if not word.isalpha():
+    word = normalize_token(args[0])
+    if not is_countable_word(word):
         if update.message:
             await update.message.reply_text(
             "❌ Слово повинно містити лише літери."
@@ -35,22 +37,26 @@ async def count_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
         pool = await Database.get_pool()
         async with pool.acquire() as conn:
-            # Use PostgreSQL regex to count ALL occurrences (not just messages containing word)
-            query = """
-            SELECT COALESCE(SUM(
-                (LENGTH(text) - LENGTH(REGEXP_REPLACE(text, $1, '', 'gi'))) 
-                / LENGTH($2)
-            ), 0)::INTEGER as total_count
-            FROM messages 
-            WHERE chat_id = $3 
-              AND text IS NOT NULL 
-              AND text ~* $1
-            """
-            
-            # Use a simpler pattern that matches the word as a whole word
-            word_pattern = rf'\m{re.escape(word)}\M'
-            
-            count = await conn.fetchval(query, word_pattern, word, chat_id)
+            if await word_counts_ready(conn):
+                count = await fetch_word_count(conn, chat_id, word)
+            else:
+                # History not tokenized yet (scripts/rebuild_word_counts.py):
+                # count ALL regex occurrences (not just messages containing word)
+                query = """
+                SELECT COALESCE(SUM(
+                    (LENGTH(text) - LENGTH(REGEXP_REPLACE(text, $1, '', 'gi'))) 
+                    / LENGTH($2)
+                ), 0)::INTEGER as total_count
+                FROM messages 
+                WHERE chat_id = $3 
+                  AND text IS NOT NULL 
+                  AND text ~* $1
+                """
+                
+                # Use a simpler pattern that matches the word as a whole word
+                word_pattern = rf'\m{re.escape(word)}\M'
+                
+                count = await conn.fetchval(query, word_pattern, word, chat_id)
             
             general_logger.info(f"Word count for '{word}' in chat {chat_id}: {count}")
         
@@ -79,7 +85,6 @@ async def missing_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     Shows how long the user was missing, when was their last message, and what it was.
     """
     from modules.chat_analysis import get_last_message_for_user_in_chat
-    from modules.database import Database
     from datetime import datetime
     import pytz
 
@@ -97,64 +102,10 @@ async def missing_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
     username = args[0].lstrip('@')
     
-    # Enhanced user lookup with better error messages
-    pool = await Database.get_pool()
-    async with pool.acquire() as conn:
-        # Check if user exists
-        user_rows = await conn.fetch("""
-            SELECT user_id, username, first_name, last_name
-            FROM users 
-            WHERE username = $1
-        """, username)
-        
-        if not user_rows:
-            # Check for similar usernames
-            similar_users = await conn.fetch("""
-                SELECT username
-                FROM users 
-                WHERE username ILIKE $1
-                ORDER BY username
-                LIMIT 5
-            """, f"%{username}%")
-            
-            if similar_users:
-                similar_list = ", ".join([f"@{u['username']}" for u in similar_users])
-                if update.message:
-                    await update.message.reply_text(
-                        f"❌ Користувача @{username} не знайдено.\n\n"
-                        f"Можливо, ви мали на увазі одного з цих користувачів:\n{similar_list}"
-                    )
-            else:
-                if update.message:
-                    await update.message.reply_text(
-                        f"❌ Користувача @{username} не знайдено в базі даних.\n"
-                        f"Можливо, цей користувач ще не писав повідомлення в чатах з ботом."
-                    )
-            return
-    
-    # Try to get last message for this username
+    # The common case: one lookup of the user's last message in this chat
     last_message = await get_last_message_for_user_in_chat(chat_id, username=username)
     if not last_message:
-        # Check if user has messages in other chats
-        user_ids = [row['user_id'] for row in user_rows]
-        total_messages = await conn.fetchval("""
-            SELECT COUNT(*) 
-            FROM messages 
-            WHERE user_id = ANY($1::bigint[])
-        """, user_ids)
-        
-        if total_messages > 0:
-            if update.message:
-                await update.message.reply_text(
-                    f"❌ Не знайдено повідомлень від @{username} у цьому чаті.\n"
-                    f"Але користувач має {total_messages} повідомлень в інших чатах."
-                )
-        else:
-            if update.message:
-                await update.message.reply_text(
-                    f"❌ Не знайдено повідомлень від @{username} у цьому чаті.\n"
-                    f"Користувач ще не писав повідомлень в жодному чаті."
-                )
+        await _explain_missing_user(update, username)
         return
     last_time = last_message['timestamp']
     last_username = last_message['username']
@@ -196,3 +147,63 @@ async def missing_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         msg += f"\nОстання команда: {command_used}"
     if update.message:
         await update.message.reply_text(msg)
+
+
+async def _explain_missing_user(update: Update, username: str) -> None:
+    """Tell why /missing found nothing: unknown user, or no messages in this chat."""
+    from modules.database import Database
+
+    pool = await Database.get_pool()
+    async with pool.acquire() as conn:
+        # Check if user exists
+        user_rows = await conn.fetch("""
+            SELECT user_id, username, first_name, last_name
+            FROM users 
+            WHERE username = $1
+        """, username)
+        
+        if not user_rows:
+            # Check for similar usernames
+            similar_users = await conn.fetch("""
+                SELECT username
+                FROM users 
+                WHERE username ILIKE $1
+                ORDER BY username
+                LIMIT 5
+            """, f"%{username}%")
+            
+            if similar_users:
+                similar_list = ", ".join([f"@{u['username']}" for u in similar_users])
+                if update.message:
+                    await update.message.reply_text(
+                        f"❌ Користувача @{username} не знайдено.\n\n"
+                        f"Можливо, ви мали на увазі одного з цих користувачів:\n{similar_list}"
+                    )
+            else:
+                if update.message:
+                    await update.message.reply_text(
+                        f"❌ Користувача @{username} не знайдено в базі даних.\n"
+                        f"Можливо, цей користувач ще не писав повідомлення в чатах з ботом."
+                    )
+            return
+
+        # Check if user has messages in other chats
+        user_ids = [row['user_id'] for row in user_rows]
+        total_messages = await conn.fetchval("""
+            SELECT COUNT(*) 
+            FROM messages 
+            WHERE user_id = ANY($1::bigint[])
+        """, user_ids)
+        
+    if total_messages > 0:
+        if update.message:
+            await update.message.reply_text(
+                f"❌ Не знайдено повідомлень від @{username} у цьому чаті.\n"
+                f"Але користувач має {total_messages} повідомлень в інших чатах."
+            )
+    else:
+        if update.message:
+            await update.message.reply_text(
+                f"❌ Не знайдено повідомлень від @{username} у цьому чаті.\n"
+                f"Користувач ще не писав повідомлень в жодному чаті."
+            )
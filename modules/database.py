@@ -1,8 +1,10 @@
 import os
 import json
+import time
 import asyncio
 import logging
 from typing import Optional, List, Dict, Any, Union, Tuple, Callable, Awaitable
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
 
@@ -13,7 +15,7 @@ import pytz
 
 from modules.types import (
     UserId, ChatId, MessageId, Timestamp, JSONDict, QueryResult,
-    DatabaseOperation, CacheEntry
+    DatabaseOperation, CacheEntry, MessageKind, MEDIA_MESSAGE_KINDS_SQL
 )
 from modules.shared_constants import (
     DEFAULT_DATABASE_URL, DATABASE_POOL_SIZE, DATABASE_TIMEOUT, 
@@ -23,6 +25,10 @@ from modules.shared_utilities import (
     CacheManager, PerformanceMonitor, RetryManager, AsyncContextManager
 )
 from modules.error_decorators import handle_database_errors, database_operation
+from modules.async_utils import AsyncBatchProcessor
+from modules.performance_monitor import performance_monitor
+from modules.message_partitions import apply_message_retention, ensure_message_partitions
+from modules.word_counts import word_count_params
 
 load_dotenv()
 
@@ -58,8 +64,23 @@ POOL_MAX_SIZE: int = int(os.getenv('DB_POOL_MAX_SIZE', '20'))
 CONNECTION_TIMEOUT: int = int(os.getenv('DB_CONNECTION_TIMEOUT', '30'))
 QUERY_TIMEOUT: int = int(os.getenv('DB_QUERY_TIMEOUT', '30'))
 
+# Write-behind message ingestion (opt-in)
+INGESTION_ENABLED: bool = os.getenv('DB_INGESTION_ENABLED', 'false').lower() in ('true', '1', 'yes', 'on')
+INGESTION_BATCH_SIZE: int = int(os.getenv('DB_INGESTION_BATCH_SIZE', '200'))
+INGESTION_FLUSH_INTERVAL: float = float(os.getenv('DB_INGESTION_FLUSH_INTERVAL', '1.0'))
+INGESTION_MAX_QUEUE_SIZE: int = int(os.getenv('DB_INGESTION_MAX_QUEUE_SIZE', '5000'))
+
+# Monthly message partitions and retention (see modules/message_partitions.py)
+PARTITION_MONTHS_AHEAD: int = int(os.getenv('DB_MESSAGES_PARTITION_MONTHS_AHEAD', '3'))
+RETENTION_MONTHS: int = int(os.getenv('DB_MESSAGES_RETENTION_MONTHS', '0'))
+RETENTION_MODE: str = os.getenv('DB_MESSAGES_RETENTION_MODE', 'strip_raw')
+
+# Concurrent aggregate queries of /stats and /report (see modules/query_plan.py)
+QUERY_PLAN_CONCURRENCY: int = int(os.getenv('DB_QUERY_PLAN_CONCURRENCY', '4'))
+QUERY_PLAN_RESERVED_CONNECTIONS: int = int(os.getenv('DB_QUERY_PLAN_RESERVED_CONNECTIONS', '4'))
+
 # SQL for creating tables
-CREATE_TABLES_SQL = """
+CREATE_TABLES_SQL = f"""
 -- Create extensions (required for text search)
 CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
@@ -81,9 +102,37 @@ CREATE TABLE IF NOT EXISTS users (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Full-text search configuration for /search (see modules/message_search.py):
+-- Ukrainian hunspell stemming if its dictionary files are installed, then
+-- unaccent if available, then the language-neutral simple dictionary.
+DO $$
+DECLARE
+    dictionaries TEXT := 'simple';
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'chat_search') THEN
+        CREATE TEXT SEARCH CONFIGURATION chat_search (COPY = simple);
+        IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'unaccent') THEN
+            CREATE EXTENSION IF NOT EXISTS unaccent;
+            dictionaries := 'unaccent, ' || dictionaries;
+        END IF;
+        BEGIN
+            CREATE TEXT SEARCH DICTIONARY ukrainian_hunspell (
+                TEMPLATE = ispell, DictFile = uk_ua, AffFile = uk_ua
+            );
+            dictionaries := 'ukrainian_hunspell, ' || dictionaries;
+        EXCEPTION WHEN OTHERS THEN
+            NULL;  -- the uk_ua hunspell files are not installed
+        END;
+        EXECUTE 'ALTER TEXT SEARCH CONFIGURATION chat_search '
+            'ALTER MAPPING FOR word, hword, hword_part WITH ' || dictionaries;
+    END IF;
+END $$;
+
 -- Create messages table
+-- Partitioned by month (see modules/message_partitions.py). Unique keys must
+-- include the partition key; Telegram never changes a message's date.
 CREATE TABLE IF NOT EXISTS messages (
-    internal_message_id BIGSERIAL PRIMARY KEY,
+    internal_message_id BIGSERIAL,
     message_id BIGINT NOT NULL,
     chat_id BIGINT NOT NULL REFERENCES chats(chat_id),
     user_id BIGINT REFERENCES users(user_id),
@@ -95,19 +144,39 @@ CREATE TABLE IF NOT EXISTS messages (
     replied_to_message_id BIGINT,
     gpt_context_message_ids JSONB,
     raw_telegram_message JSONB,
-    UNIQUE(chat_id, message_id)
-);
+    message_kind SMALLINT,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        to_tsvector('chat_search'::regconfig, COALESCE(text, ''))
+    ) STORED,
+    PRIMARY KEY (internal_message_id, timestamp),
+    UNIQUE(chat_id, message_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Added after the initial schema; see scripts/migrations/20261016_add_message_kind.py
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS message_kind SMALLINT;
 
 -- Create analysis_cache table
 CREATE TABLE IF NOT EXISTS analysis_cache (
     chat_id BIGINT NOT NULL,
     time_period TEXT NOT NULL,
+    -- Watermark of the messages in the period (count and first/last internal_message_id)
     message_content_hash TEXT NOT NULL,
     result TEXT NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     PRIMARY KEY (chat_id, time_period, message_content_hash)
 );
 
+-- Per-day partial summaries of multi-day /analyze periods (see modules/period_summary.py)
+CREATE TABLE IF NOT EXISTS analysis_day_summaries (
+    chat_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    -- Watermark of the day's messages the summary was built from
+    watermark TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (chat_id, day)
+);
+
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_messages_chat_id ON messages(chat_id);
 CREATE INDEX IF NOT EXISTS idx_messages_user_id ON messages(user_id);
@@ -117,11 +186,37 @@ CREATE INDEX IF NOT EXISTS idx_messages_is_gpt_reply ON messages(is_gpt_reply);
 
 -- Text search indexes for /count command optimization
 CREATE INDEX IF NOT EXISTS idx_messages_text_gin ON messages USING GIN(text gin_trgm_ops);
-CREATE INDEX IF NOT EXISTS idx_messages_text_search ON messages USING GIN(to_tsvector('english', text));
+
+-- Full-text index for /search. Databases created before search_vector get the
+-- column and the index from scripts/migrations/20261016_add_message_search_vector.py
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'messages' AND column_name = 'search_vector'
+    ) THEN
+        CREATE INDEX IF NOT EXISTS idx_messages_search_vector ON messages USING GIN(search_vector);
+    END IF;
+END $$;
 
 -- Composite index for faster chat-specific text searches
 CREATE INDEX IF NOT EXISTS idx_messages_chat_text ON messages(chat_id) WHERE text IS NOT NULL;
 
+-- Message kind indexes for /stats, /report and /mystats counters (see MessageKind).
+-- Built here only while messages is empty; existing databases get them without
+-- blocking writes from scripts/migrations/20261016_add_message_kind.py
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM messages) THEN
+        CREATE INDEX IF NOT EXISTS idx_messages_chat_kind_ts ON messages(chat_id, message_kind, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_messages_chat_ts_plain_text ON messages(chat_id, timestamp)
+            WHERE message_kind = {MessageKind.TEXT:d} AND is_command = false AND is_gpt_reply = false;
+    END IF;
+END $$;
+
+-- Keyset pagination of message windows (modules/chat_analysis.py)
+CREATE INDEX IF NOT EXISTS idx_messages_chat_ts_id ON messages(chat_id, timestamp, internal_message_id);
+
 -- Bot events tracking (url_modification, video_download)
 CREATE TABLE IF NOT EXISTS bot_events (
     id BIGSERIAL PRIMARY KEY,
@@ -132,11 +227,431 @@ CREATE TABLE IF NOT EXISTS bot_events (
 );
 CREATE INDEX IF NOT EXISTS idx_bot_events_type_chat_ts ON bot_events(event_type, chat_id, timestamp);
 CREATE INDEX IF NOT EXISTS idx_bot_events_user_chat ON bot_events(user_id, chat_id);
+
+-- Hourly activity rollups backing /stats and /report (maintained by INSERT_MESSAGE_SQL)
+CREATE TABLE IF NOT EXISTS chat_activity_hourly (
+    chat_id BIGINT NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    user_id BIGINT NOT NULL DEFAULT 0,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    command_count INTEGER NOT NULL DEFAULT 0,
+    text_count INTEGER NOT NULL DEFAULT 0,
+    media_count INTEGER NOT NULL DEFAULT 0,
+    sticker_count INTEGER NOT NULL DEFAULT 0,
+    gif_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (chat_id, bucket, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_chat_activity_hourly_bucket ON chat_activity_hourly(bucket);
+
+CREATE TABLE IF NOT EXISTS chat_command_hourly (
+    chat_id BIGINT NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    command_name VARCHAR(255) NOT NULL,
+    command_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (chat_id, bucket, command_name)
+);
+CREATE INDEX IF NOT EXISTS idx_chat_command_hourly_bucket ON chat_command_hourly(bucket);
+
+-- Per-chat word counts backing /count (maintained by INSERT_MESSAGE_SQL)
+CREATE TABLE IF NOT EXISTS chat_word_counts (
+    chat_id BIGINT NOT NULL,
+    normalized_token TEXT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    last_seen TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (chat_id, normalized_token)
+);
+
+-- Reply edges backing the /stats response-time percentiles (maintained by INSERT_MESSAGE_SQL)
+CREATE TABLE IF NOT EXISTS message_reply_edges (
+    chat_id BIGINT NOT NULL,
+    reply_message_id BIGINT NOT NULL,
+    original_message_id BIGINT NOT NULL,
+    reply_timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    delta_seconds DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (chat_id, reply_message_id)
+);
+CREATE INDEX IF NOT EXISTS idx_message_reply_edges_chat_ts
+    ON message_reply_edges(chat_id, reply_timestamp) INCLUDE (delta_seconds);
+
+-- Per-user activity of each chat backing /mystats and /missing (maintained by INSERT_MESSAGE_SQL)
+-- hourly_counts[h + 1] counts the messages sent in Kyiv hour h
+CREATE TABLE IF NOT EXISTS user_chat_activity (
+    chat_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    message_count BIGINT NOT NULL DEFAULT 0,
+    hourly_counts INTEGER[] NOT NULL,
+    command_counts JSONB NOT NULL DEFAULT '{{}}'::jsonb,
+    first_message_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_message_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_message_id BIGINT NOT NULL,
+    PRIMARY KEY (chat_id, user_id)
+);
+
+-- Every lower-cased username a user id has been stored with (maintained by UPSERT_USER_SQL)
+CREATE TABLE IF NOT EXISTS username_aliases (
+    username TEXT NOT NULL,
+    user_id BIGINT NOT NULL,
+    last_seen TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (username, user_id)
+);
+
+-- Rollups are trusted once backfilled; a fresh database has nothing to backfill
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name TEXT PRIMARY KEY,
+    backfilled_at TIMESTAMP WITH TIME ZONE
+);
+INSERT INTO rollup_state (name, backfilled_at)
+SELECT rollup.name, NOW()
+FROM (VALUES ('activity'), ('word_counts'), ('reply_edges'), ('user_activity')) AS rollup(name)
+WHERE NOT EXISTS (SELECT 1 FROM messages)
+ON CONFLICT (name) DO NOTHING;
+
+-- /search reads the stored search_vector once the column exists (modules/message_search.py)
+INSERT INTO rollup_state (name, backfilled_at)
+SELECT 'search_vector', NOW()
+WHERE EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'messages' AND column_name = 'search_vector'
+)
+ON CONFLICT (name) DO NOTHING;
+"""
+
+UPSERT_CHAT_SQL = """
+    INSERT INTO chats (chat_id, chat_type, title)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (chat_id) DO UPDATE
+    SET chat_type = EXCLUDED.chat_type, title = EXCLUDED.title
 """
 
+# Upserts a user and records its current username as an alias
+UPSERT_USER_SQL = """
+    WITH upserted AS (
+        INSERT INTO users (user_id, first_name, last_name, username, is_bot)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (user_id) DO UPDATE
+        SET first_name = EXCLUDED.first_name, last_name = EXCLUDED.last_name,
+            username = EXCLUDED.username, is_bot = EXCLUDED.is_bot
+        RETURNING user_id, username
+    )
+    INSERT INTO username_aliases (username, user_id)
+    SELECT lower(username), user_id FROM upserted WHERE username IS NOT NULL
+    ON CONFLICT (username, user_id) DO UPDATE SET last_seen = NOW()
+"""
+
+# Inserts a message and, only if it was new, folds it into the hourly rollups,
+# the chat's word counts ($13/$14 from word_count_params), the sender's
+# activity profile and, for a human reply, the reply edges in the same
+# statement so none can drift from the raw table.
+INSERT_MESSAGE_SQL = f"""
+    WITH inserted AS (
+        INSERT INTO messages (
+            message_id, chat_id, user_id, timestamp, text,
+            is_command, command_name, is_gpt_reply,
+            replied_to_message_id, gpt_context_message_ids,
+            raw_telegram_message, message_kind
+        )
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+        -- No conflict target: the unique key is (chat_id, message_id, timestamp)
+        -- on partitioned tables and (chat_id, message_id) on older ones
+        ON CONFLICT DO NOTHING
+        RETURNING message_id, chat_id, user_id, timestamp, is_command, command_name,
+                  is_gpt_reply, replied_to_message_id, message_kind
+    ), reply_edges AS (
+        INSERT INTO message_reply_edges (
+            chat_id, reply_message_id, original_message_id, reply_timestamp, delta_seconds
+        )
+        SELECT i.chat_id, i.message_id, i.replied_to_message_id, i.timestamp,
+               EXTRACT(EPOCH FROM (i.timestamp - o.timestamp))
+        FROM inserted i
+        CROSS JOIN LATERAL (
+            SELECT timestamp FROM messages
+            WHERE chat_id = i.chat_id AND message_id = i.replied_to_message_id
+            LIMIT 1
+        ) o
+        WHERE i.replied_to_message_id IS NOT NULL AND NOT i.is_gpt_reply
+        ON CONFLICT DO NOTHING
+    ), user_activity AS (
+        INSERT INTO user_chat_activity AS p (
+            chat_id, user_id, message_count, hourly_counts, command_counts,
+            first_message_at, last_message_at, last_message_id
+        )
+        SELECT
+            chat_id, user_id, 1,
+            (SELECT array_agg((h = EXTRACT(HOUR FROM timestamp AT TIME ZONE 'Europe/Kyiv'))::int ORDER BY h)
+             FROM generate_series(0, 23) AS h),
+            CASE WHEN is_command AND command_name IS NOT NULL
+                 THEN jsonb_build_object(split_part(command_name, '@', 1), 1)
+                 ELSE '{{}}'::jsonb END,
+            timestamp, timestamp, message_id
+        FROM inserted
+        WHERE user_id IS NOT NULL
+        ON CONFLICT (chat_id, user_id) DO UPDATE SET
+            message_count = p.message_count + 1,
+            hourly_counts[EXTRACT(HOUR FROM EXCLUDED.last_message_at AT TIME ZONE 'Europe/Kyiv')::int + 1] =
+                p.hourly_counts[EXTRACT(HOUR FROM EXCLUDED.last_message_at AT TIME ZONE 'Europe/Kyiv')::int + 1] + 1,
+            command_counts = p.command_counts || (
+                SELECT COALESCE(jsonb_object_agg(c.key, c.value::bigint + COALESCE((p.command_counts ->> c.key)::bigint, 0)), '{{}}'::jsonb)
+                FROM jsonb_each_text(EXCLUDED.command_counts) AS c
+            ),
+            first_message_at = LEAST(p.first_message_at, EXCLUDED.first_message_at),
+            last_message_id = CASE WHEN EXCLUDED.last_message_at >= p.last_message_at
+                                   THEN EXCLUDED.last_message_id ELSE p.last_message_id END,
+            last_message_at = GREATEST(p.last_message_at, EXCLUDED.last_message_at)
+    ), words AS (
+        INSERT INTO chat_word_counts AS w (chat_id, normalized_token, count, last_seen)
+        SELECT inserted.chat_id, t.token, t.n, inserted.timestamp
+        FROM inserted, unnest($13::text[], $14::int[]) AS t(token, n)
+        ON CONFLICT (chat_id, normalized_token) DO UPDATE SET
+            count = w.count + EXCLUDED.count,
+            last_seen = GREATEST(w.last_seen, EXCLUDED.last_seen)
+    ), classified AS (
+        SELECT
+            chat_id,
+            date_trunc('hour', timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket,
+            COALESCE(user_id, 0) AS user_id,
+            is_command,
+            command_name,
+            is_gpt_reply,
+            message_kind
+        FROM inserted
+    ), activity AS (
+        INSERT INTO chat_activity_hourly AS a (
+            chat_id, bucket, user_id, message_count, command_count,
+            text_count, media_count, sticker_count, gif_count
+        )
+        SELECT
+            chat_id, bucket, user_id, 1,
+            is_command::int,
+            (message_kind = {MessageKind.TEXT:d} AND NOT is_command AND NOT is_gpt_reply)::int,
+            (message_kind IN ({MEDIA_MESSAGE_KINDS_SQL}))::int,
+            (message_kind = {MessageKind.STICKER:d})::int,
+            (message_kind = {MessageKind.ANIMATION:d})::int
+        FROM classified
+        ON CONFLICT (chat_id, bucket, user_id) DO UPDATE SET
+            message_count = a.message_count + EXCLUDED.message_count,
+            command_count = a.command_count + EXCLUDED.command_count,
+            text_count = a.text_count + EXCLUDED.text_count,
+            media_count = a.media_count + EXCLUDED.media_count,
+            sticker_count = a.sticker_count + EXCLUDED.sticker_count,
+            gif_count = a.gif_count + EXCLUDED.gif_count
+    )
+    INSERT INTO chat_command_hourly AS c (chat_id, bucket, command_name, command_count)
+    SELECT chat_id, bucket, command_name, 1
+    FROM classified
+    WHERE is_command AND command_name IS NOT NULL
+    ON CONFLICT (chat_id, bucket, command_name) DO UPDATE SET
+        command_count = c.command_count + 1
+"""
+
+# Deletes one stored message and takes it back out of everything INSERT_MESSAGE_SQL
+# folded it into; $4/$5 are word_count_params of the deleted text. Rewriting a
+# message is a retract followed by INSERT_MESSAGE_SQL in one transaction.
+RETRACT_MESSAGE_SQL = f"""
+    WITH deleted AS (
+        DELETE FROM messages
+        WHERE chat_id = $1 AND message_id = $2 AND timestamp = $3
+        RETURNING message_id, chat_id, user_id, timestamp, is_command, command_name,
+                  is_gpt_reply, message_kind
+    ), reply_edges AS (
+        DELETE FROM message_reply_edges e
+        USING deleted d
+        WHERE e.chat_id = d.chat_id AND e.reply_message_id = d.message_id
+    ), user_activity AS (
+        UPDATE user_chat_activity p SET
+            message_count = p.message_count - 1,
+            hourly_counts[EXTRACT(HOUR FROM d.timestamp AT TIME ZONE 'Europe/Kyiv')::int + 1] =
+                p.hourly_counts[EXTRACT(HOUR FROM d.timestamp AT TIME ZONE 'Europe/Kyiv')::int + 1] - 1,
+            command_counts = CASE WHEN d.is_command AND d.command_name IS NOT NULL
+                THEN jsonb_set(
+                    p.command_counts, ARRAY[split_part(d.command_name, '@', 1)],
+                    to_jsonb(COALESCE((p.command_counts ->> split_part(d.command_name, '@', 1))::bigint, 0) - 1)
+                )
+                ELSE p.command_counts END
+        FROM deleted d
+        WHERE p.chat_id = d.chat_id AND p.user_id = d.user_id
+    ), words AS (
+        UPDATE chat_word_counts w SET count = w.count - t.n
+        FROM deleted d, unnest($4::text[], $5::int[]) AS t(token, n)
+        WHERE w.chat_id = d.chat_id AND w.normalized_token = t.token
+    ), classified AS (
+        SELECT
+            chat_id,
+            date_trunc('hour', timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket,
+            COALESCE(user_id, 0) AS user_id,
+            COALESCE(is_command, false) AS is_command,
+            command_name,
+            COALESCE(message_kind = {MessageKind.TEXT:d} AND NOT is_command AND NOT is_gpt_reply, false) AS is_text,
+            COALESCE(message_kind IN ({MEDIA_MESSAGE_KINDS_SQL}), false) AS is_media,
+            COALESCE(message_kind = {MessageKind.STICKER:d}, false) AS is_sticker,
+            COALESCE(message_kind = {MessageKind.ANIMATION:d}, false) AS is_gif
+        FROM deleted
+    ), activity AS (
+        UPDATE chat_activity_hourly a SET
+            message_count = a.message_count - 1,
+            command_count = a.command_count - d.is_command::int,
+            text_count = a.text_count - d.is_text::int,
+            media_count = a.media_count - d.is_media::int,
+            sticker_count = a.sticker_count - d.is_sticker::int,
+            gif_count = a.gif_count - d.is_gif::int
+        FROM classified d
+        WHERE a.chat_id = d.chat_id AND a.bucket = d.bucket AND a.user_id = d.user_id
+    )
+    UPDATE chat_command_hourly c SET command_count = c.command_count - 1
+    FROM classified d
+    WHERE d.is_command AND d.command_name IS NOT NULL
+      AND c.chat_id = d.chat_id AND c.bucket = d.bucket AND c.command_name = d.command_name
+"""
+
+
+async def retract_message(conn: Any, chat_id: ChatId, message_id: MessageId) -> bool:
+    """Delete a stored message together with its rollup contributions; run inside a transaction.
+
+    Returns False if the message is not stored.
+    """
+    row = await conn.fetchrow(
+        "SELECT timestamp, text FROM messages WHERE chat_id = $1 AND message_id = $2 LIMIT 1 FOR UPDATE",
+        chat_id, message_id
+    )
+    if row is None:
+        return False
+    await conn.execute(
+        RETRACT_MESSAGE_SQL, chat_id, message_id, row['timestamp'], *word_count_params(row['text'])
+    )
+    return True
+
+
 # Note: Using the imported database_operation decorator from modules.error_decorators
 # The duplicate definition has been removed
 
+
+# Checked in order; the first key present in the raw message decides its kind
+MESSAGE_KIND_KEYS: Tuple[Tuple[str, MessageKind], ...] = (
+    ('sticker', MessageKind.STICKER),
+    ('animation', MessageKind.ANIMATION),
+    ('photo', MessageKind.PHOTO),
+    ('video', MessageKind.VIDEO),
+    ('video_note', MessageKind.VIDEO_NOTE),
+    ('voice', MessageKind.VOICE),
+)
+
+
+def classify_message_kind(raw_message: Optional[JSONDict], text: Optional[str] = None) -> MessageKind:
+    """Classify a message for the message_kind column from its raw Telegram dict."""
+    if raw_message:
+        for key, kind in MESSAGE_KIND_KEYS:
+            if key in raw_message:
+                return kind
+        text = text or raw_message.get('text')
+    return MessageKind.TEXT if text else MessageKind.OTHER
+
+
+@dataclass
+class PendingMessage:
+    """Column values of a message row, extracted once from a Telegram message."""
+    message_id: MessageId
+    chat_id: ChatId
+    user_id: Optional[UserId]
+    timestamp: datetime
+    text: Optional[str]
+    is_command: bool
+    command_name: Optional[str]
+    is_gpt_reply: bool
+    replied_to_message_id: Optional[MessageId]
+    gpt_context_message_ids: Optional[List[int]]
+    raw_message: JSONDict
+    message_kind: MessageKind
+    chat: Chat
+    user: Optional[User] = None
+
+    @classmethod
+    def from_message(
+        cls,
+        message: Message,
+        is_gpt_reply: bool = False,
+        gpt_context_message_ids: Optional[List[int]] = None
+    ) -> 'PendingMessage':
+        """Extract the row values for ``message``."""
+        # Extract command information
+        is_command: bool = bool(message.text and message.text.startswith('/'))
+        command_name: Optional[str] = message.text.split()[0][1:] if (message.text and message.text.startswith('/')) else None
+
+        # Get reply information
+        replied_to_message_id: Optional[MessageId] = (
+            message.reply_to_message.message_id if (message.reply_to_message is not None) else None
+        )
+
+        # Convert the entire message object to JSON (serialized lazily in to_params)
+        raw_message: JSONDict = message.to_dict()
+
+        return cls(
+            message_id=message.message_id,
+            chat_id=message.chat.id,
+            user_id=message.from_user.id if message.from_user else None,
+            timestamp=message.date,
+            text=message.text,
+            is_command=is_command,
+            command_name=command_name,
+            is_gpt_reply=is_gpt_reply,
+            replied_to_message_id=replied_to_message_id,
+            gpt_context_message_ids=gpt_context_message_ids,
+            raw_message=raw_message,
+            message_kind=classify_message_kind(raw_message, message.text),
+            chat=message.chat,
+            user=message.from_user,
+        )
+
+    def to_params(self) -> Tuple[Any, ...]:
+        """Return the positional parameters for INSERT_MESSAGE_SQL."""
+        return (
+            self.message_id,
+            self.chat_id,
+            self.user_id,
+            self.timestamp,
+            self.text,
+            self.is_command,
+            self.command_name,
+            self.is_gpt_reply,
+            self.replied_to_message_id,
+            json.dumps(self.gpt_context_message_ids) if self.gpt_context_message_ids else None,
+            json.dumps(self.raw_message),
+            int(self.message_kind),
+            *word_count_params(self.text)
+        )
+
+
+def _is_chat_cached(cache: CacheManager[Any], chat: Chat) -> bool:
+    """Check whether the stored chat row is known to be up to date."""
+    cached_chat = cache.get(f"chat:{chat.id}")
+    return bool(cached_chat and cached_chat.get('title') == chat.title)
+
+
+def _cache_chat(cache: CacheManager[Any], chat: Chat) -> None:
+    """Remember that the chat row has been written."""
+    cache.set(f"chat:{chat.id}", {
+        'id': chat.id,
+        'type': chat.type,
+        'title': chat.title
+    }, ttl=3600)  # Cache for 1 hour
+
+
+def _is_user_cached(cache: CacheManager[Any], user: User) -> bool:
+    """Check whether the stored user row is known to be up to date."""
+    cached_user = cache.get(f"user:{user.id}")
+    return bool(cached_user and
+                cached_user.get('username') == user.username and
+                cached_user.get('first_name') == user.first_name)
+
+
+def _cache_user(cache: CacheManager[Any], user: User) -> None:
+    """Remember that the user row has been written."""
+    cache.set(f"user:{user.id}", {
+        'id': user.id,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'username': user.username,
+        'is_bot': user.is_bot
+    }, ttl=3600)  # Cache for 1 hour
+
 class DatabaseConnectionManager:
     """Enhanced database connection manager with optimized pooling."""
     
@@ -382,10 +897,123 @@ class DatabaseConnectionManager:
                 self._last_health_check = None
 
 
+class MessageIngestionPipeline:
+    """Write-behind ingestion queue for incoming messages.
+
+    Messages are buffered in an AsyncBatchProcessor and flushed when the batch
+    is full or the flush interval elapses. Each flush de-duplicates the chats
+    and users of the batch and writes all three tables with ``executemany``
+    inside one transaction, so a busy chat costs one connection acquire per
+    batch instead of up to three round-trips per message. The queue is bounded:
+    once ``max_queue_size`` messages are pending, ``enqueue`` waits for the
+    next flush.
+    """
+
+    def __init__(
+        self,
+        manager: DatabaseConnectionManager,
+        batch_size: int = INGESTION_BATCH_SIZE,
+        flush_interval: float = INGESTION_FLUSH_INTERVAL,
+        max_queue_size: int = INGESTION_MAX_QUEUE_SIZE
+    ) -> None:
+        self._manager = manager
+        self._processor = AsyncBatchProcessor(
+            self._flush,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            max_queue_size=max_queue_size
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of messages waiting to be written."""
+        return self._processor.queue_depth
+
+    async def start(self) -> None:
+        """Start the background flush task."""
+        await self._processor.start()
+
+    async def enqueue(self, record: PendingMessage) -> None:
+        """Queue a message for writing, waiting if the queue is full."""
+        await self._processor.add_item(record)
+
+    async def drain(self) -> None:
+        """Stop accepting messages and write everything still pending."""
+        await self._processor.stop()
+        logger.info(f"Message ingestion drained: {self.get_stats()}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get ingestion queue statistics."""
+        return self._processor.get_stats()
+
+    async def _flush(self, batch: List[PendingMessage]) -> None:
+        """Write a batch of messages together with their chats and users."""
+        cache = self._manager._cache_manager
+        chats: Dict[ChatId, Chat] = {}
+        users: Dict[UserId, User] = {}
+        for record in batch:
+            if not _is_chat_cached(cache, record.chat):
+                chats[record.chat.id] = record.chat
+            if record.user and not _is_user_cached(cache, record.user):
+                users[record.user.id] = record.user
+
+        start_time = time.perf_counter()
+        try:
+            await self._write_batch(batch, list(chats.values()), list(users.values()))
+        except Exception as e:
+            logger.warning(f"Batched message write failed ({len(batch)} messages), retrying one by one: {e}")
+            await self._write_individually(batch)
+            return
+        finally:
+            duration = time.perf_counter() - start_time
+            performance_monitor.record_metric(
+                "message_ingestion_flush_latency", duration, "seconds",
+                {"batch_size": str(len(batch))}
+            )
+            performance_monitor.record_metric(
+                "message_ingestion_queue_depth", self.queue_depth, "messages"
+            )
+
+        for chat in chats.values():
+            _cache_chat(cache, chat)
+        for user in users.values():
+            _cache_user(cache, user)
+        logger.debug(f"Flushed {len(batch)} messages ({len(chats)} chats, {len(users)} users) in {duration:.3f}s")
+
+    async def _write_batch(self, batch: List[PendingMessage], chats: List[Chat], users: List[User]) -> None:
+        """Write a batch in a single transaction."""
+        async with self._manager.get_connection() as conn:
+            async with conn.transaction():
+                if chats:
+                    await conn.executemany(
+                        UPSERT_CHAT_SQL, [(chat.id, chat.type, chat.title) for chat in chats]
+                    )
+                if users:
+                    await conn.executemany(
+                        UPSERT_USER_SQL,
+                        [(user.id, user.first_name, user.last_name, user.username, user.is_bot) for user in users]
+                    )
+                await conn.executemany(INSERT_MESSAGE_SQL, [record.to_params() for record in batch])
+        self._manager._connection_stats['queries_executed'] += 1 + bool(chats) + bool(users)
+
+    async def _write_individually(self, batch: List[PendingMessage]) -> None:
+        """Fallback path so that one bad row does not lose the whole batch."""
+        for record in batch:
+            try:
+                await self._write_batch(
+                    [record], [record.chat], [record.user] if record.user else []
+                )
+            except Exception as e:
+                logger.error(
+                    f"Failed to save message: chat_id={record.chat_id}, message_id={record.message_id}, error={e}"
+                )
+
+
 class Database:
     """Enhanced database class with optimizations and caching."""
     
     _connection_manager: Optional[DatabaseConnectionManager] = None
+    _ingestion_pipeline: Optional[MessageIngestionPipeline] = None
     
     @classmethod
     def get_connection_manager(cls) -> DatabaseConnectionManager:
@@ -425,34 +1053,82 @@ class Database:
             await conn.execute(CREATE_TABLES_SQL)
             logger.info("Database tables initialized successfully")
 
+        # Retention can rewrite whole partitions; it runs from the daily job instead
+        await cls.maintain_message_partitions(retention_months=0)
+
+        if INGESTION_ENABLED:
+            await cls.enable_message_ingestion()
+
+    @classmethod
+    @database_operation("maintain_message_partitions")
+    async def maintain_message_partitions(
+        cls,
+        months_ahead: int = PARTITION_MONTHS_AHEAD,
+        retention_months: int = RETENTION_MONTHS,
+        retention_mode: str = RETENTION_MODE
+    ) -> List[str]:
+        """Create upcoming monthly message partitions and apply the retention policy.
+
+        Returns the partitions changed by retention. Does nothing on databases
+        whose messages table has not been partitioned yet.
+        """
+        manager = cls.get_connection_manager()
+        async with manager.get_connection() as conn:
+            created = await ensure_message_partitions(conn, months_ahead)
+            if created:
+                logger.info(f"Message partitions ensured through {created[-1]}")
+            changed = await apply_message_retention(conn, retention_months, retention_mode)
+            manager._connection_stats['queries_executed'] += 1
+        return changed
+
+    @classmethod
+    async def enable_message_ingestion(
+        cls,
+        batch_size: int = INGESTION_BATCH_SIZE,
+        flush_interval: float = INGESTION_FLUSH_INTERVAL,
+        max_queue_size: int = INGESTION_MAX_QUEUE_SIZE
+    ) -> MessageIngestionPipeline:
+        """Route save_message through the write-behind ingestion pipeline."""
+        if cls._ingestion_pipeline is None:
+            pipeline = MessageIngestionPipeline(
+                cls.get_connection_manager(),
+                batch_size=batch_size,
+                flush_interval=flush_interval,
+                max_queue_size=max_queue_size
+            )
+            await pipeline.start()
+            cls._ingestion_pipeline = pipeline
+            logger.info(
+                f"Message ingestion pipeline enabled (batch_size={batch_size}, "
+                f"flush_interval={flush_interval}s, max_queue_size={max_queue_size})"
+            )
+        return cls._ingestion_pipeline
+
+    @classmethod
+    async def disable_message_ingestion(cls) -> None:
+        """Drain the ingestion pipeline and go back to direct writes."""
+        pipeline = cls._ingestion_pipeline
+        if pipeline is not None:
+            cls._ingestion_pipeline = None
+            await pipeline.drain()
+
     @classmethod
     @database_operation("save_chat_info", raise_exception=True)
     async def save_chat_info(cls, chat: Chat) -> None:
         """Save or update chat information with caching."""
         manager = cls.get_connection_manager()
-        cache_key = f"chat:{chat.id}"
         
         # Check cache first
-        cached_chat = manager._cache_manager.get(cache_key)
-        if cached_chat and cached_chat.get('title') == chat.title:
+        if _is_chat_cached(manager._cache_manager, chat):
             manager._connection_stats['cache_hits'] += 1
             return
         
         manager._connection_stats['cache_misses'] += 1
         async with manager.get_connection() as conn:
-            await conn.execute("""
-                INSERT INTO chats (chat_id, chat_type, title)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (chat_id) DO UPDATE
-                SET chat_type = $2, title = $3
-            """, chat.id, chat.type, chat.title)
+            await conn.execute(UPSERT_CHAT_SQL, chat.id, chat.type, chat.title)
             
             # Cache the chat info
-            manager._cache_manager.set(cache_key, {
-                'id': chat.id,
-                'type': chat.type,
-                'title': chat.title
-            }, ttl=3600)  # Cache for 1 hour
+            _cache_chat(manager._cache_manager, chat)
             
             manager._connection_stats['queries_executed'] += 1
 
@@ -461,33 +1137,21 @@ class Database:
     async def save_user_info(cls, user: User) -> None:
         """Save or update user information with caching."""
         manager = cls.get_connection_manager()
-        cache_key = f"user:{user.id}"
         
         # Check cache first
-        cached_user = manager._cache_manager.get(cache_key)
-        if (cached_user and 
-            cached_user.get('username') == user.username and
-            cached_user.get('first_name') == user.first_name):
+        if _is_user_cached(manager._cache_manager, user):
             manager._connection_stats['cache_hits'] += 1
             return
         
         manager._connection_stats['cache_misses'] += 1
         async with manager.get_connection() as conn:
-            await conn.execute("""
-                INSERT INTO users (user_id, first_name, last_name, username, is_bot)
-                VALUES ($1, $2, $3, $4, $5)
-                ON CONFLICT (user_id) DO UPDATE
-                SET first_name = $2, last_name = $3, username = $4, is_bot = $5
-            """, user.id, user.first_name, user.last_name, user.username, user.is_bot)
+            await conn.execute(
+                UPSERT_USER_SQL,
+                user.id, user.first_name, user.last_name, user.username, user.is_bot
+            )
             
             # Cache the user info
-            manager._cache_manager.set(cache_key, {
-                'id': user.id,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'username': user.username,
-                'is_bot': user.is_bot
-            }, ttl=3600)  # Cache for 1 hour
+            _cache_user(manager._cache_manager, user)
             
             manager._connection_stats['queries_executed'] += 1
 
@@ -499,50 +1163,28 @@ class Database:
         is_gpt_reply: bool = False,
         gpt_context_message_ids: Optional[List[int]] = None
     ) -> None:
-        """Save a message and its associated chat and user information with optimizations."""
+        """Save a message and its associated chat and user information with optimizations.
+        
+        When the ingestion pipeline is enabled the message is only queued here
+        and written by the next batch flush.
+        """
         manager = cls.get_connection_manager()
         
         try:
+            record = PendingMessage.from_message(message, is_gpt_reply, gpt_context_message_ids)
+            
+            pipeline = cls._ingestion_pipeline
+            if pipeline is not None:
+                await pipeline.enqueue(record)
+                return
+            
             # First save chat and user info (these methods now have caching)
             await cls.save_chat_info(message.chat)
             if message.from_user:
                 await cls.save_user_info(message.from_user)
 
-            # Extract command information
-            is_command: bool = bool(message.text and message.text.startswith('/'))
-            command_name: Optional[str] = message.text.split()[0][1:] if (message.text and message.text.startswith('/')) else None
-
-            # Get reply information
-            replied_to_message_id: Optional[MessageId] = (
-                message.reply_to_message.message_id if (message.reply_to_message is not None) else None
-            )
-
-            # Convert the entire message object to JSON
-            raw_message: JSONDict = message.to_dict()
-
             async with manager.get_connection() as conn:
-                await conn.execute("""
-                    INSERT INTO messages (
-                        message_id, chat_id, user_id, timestamp, text,
-                        is_command, command_name, is_gpt_reply,
-                        replied_to_message_id, gpt_context_message_ids,
-                        raw_telegram_message
-                    )
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                    ON CONFLICT (chat_id, message_id) DO NOTHING
-                """,
-                    message.message_id,
-                    message.chat.id,
-                    message.from_user.id if message.from_user else None,
-                    message.date,
-                    message.text,
-                    is_command,
-                    command_name,
-                    is_gpt_reply,
-                    replied_to_message_id,
-                    json.dumps(gpt_context_message_ids) if gpt_context_message_ids else None,
-                    json.dumps(raw_message)
-                )
+                await conn.execute(INSERT_MESSAGE_SQL, *record.to_params())
                 manager._connection_stats['queries_executed'] += 1
                 logger.debug(f"Message saved successfully: chat_id={message.chat.id}, message_id={message.message_id}")
                 
@@ -557,61 +1199,67 @@ class Database:
         original_message: Message,
         description: str,
     ) -> None:
-        """Saves an image description as a new message entry in the database."""
+        """Saves an image description as a new message entry in the database.
+
+        The description is stored as a bot reply to the photo rather than over
+        the user's message, and goes through INSERT_MESSAGE_SQL like any other
+        message so the rollups count it once.
+        """
         manager = cls.get_connection_manager()
 
         # Get the bot's own User object via get_me() and save it to the users table.
         ext_bot = original_message.get_bot()
         bot_user = await ext_bot.get_me()
+        await cls.save_chat_info(original_message.chat)
         await cls.save_user_info(bot_user)
-        
-        bot_user_id: UserId = bot_user.id
-        chat_id: ChatId = original_message.chat.id
-        
+
+        record = PendingMessage(
+            # Telegram message ids are positive, so the negated id of the photo
+            # cannot collide with a real message of the chat
+            message_id=-original_message.message_id,
+            chat_id=original_message.chat.id,
+            user_id=bot_user.id,
+            # The photo's date keeps a repeated analysis from adding a second row
+            timestamp=original_message.date,
+            text=f"[IMAGE ANALYSIS]: {description}",
+            is_command=False,
+            command_name=None,
+            is_gpt_reply=True,
+            replied_to_message_id=original_message.message_id,
+            gpt_context_message_ids=None,
+            raw_message={},
+            message_kind=MessageKind.TEXT,
+            chat=original_message.chat,
+            user=bot_user,
+        )
         async with manager.get_connection() as conn:
-            # We use ON CONFLICT...DO UPDATE because the original message from the user
-            # already exists. We are overwriting it with the bot's analysis.
-            # This is a simplification. A better approach might be a separate table
-            # for metadata or using a new message_id.
-            await conn.execute("""
-                INSERT INTO messages (
-                    message_id, chat_id, user_id, timestamp, text,
-                    is_command, command_name, is_gpt_reply,
-                    replied_to_message_id
-                )
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                ON CONFLICT (chat_id, message_id) DO UPDATE SET
-                text = EXCLUDED.text,
-                user_id = EXCLUDED.user_id,
-                is_gpt_reply = TRUE,
-                timestamp = EXCLUDED.timestamp
-            """,
-                original_message.message_id,
-                chat_id,
-                bot_user_id,
-                datetime.now(pytz.utc), # Use timezone-aware datetime
-                f"[IMAGE ANALYSIS]: {description}",
-                False, # is_command
-                None,  # command_name
-                True,  # is_gpt_reply
-                original_message.message_id
-            )
+            await conn.execute(INSERT_MESSAGE_SQL, *record.to_params())
             manager._connection_stats['queries_executed'] += 1
 
+    @staticmethod
+    def _analysis_cache_key(chat_id: ChatId, time_period: str, watermark: str) -> str:
+        return f"analysis:{chat_id}:{time_period}:{watermark}"
+
     @classmethod
     @database_operation("get_analysis_cache")
     async def get_analysis_cache(
         cls, 
         chat_id: ChatId, 
         time_period: str, 
-        message_content_hash: str, 
+        watermark: str, 
         ttl_seconds: int
     ) -> Optional[str]:
-        """Fetch cached analysis result if not expired with enhanced caching."""
+        """
+        Fetch a cached analysis if not expired.
+
+        Entries are keyed by the period and the watermark of the messages in
+        it (see chat_analysis.WindowWatermark), so a lookup needs no message
+        retrieval and a new message in the period simply misses.
+        """
         manager = cls.get_connection_manager()
         
         # Check in-memory cache first
-        cache_key = f"analysis:{chat_id}:{time_period}:{message_content_hash}"
+        cache_key = cls._analysis_cache_key(chat_id, time_period, watermark)
         cached_result = manager._cache_manager.get(cache_key)
         if cached_result is not None:
             manager._connection_stats['cache_hits'] += 1
@@ -624,7 +1272,7 @@ class Database:
                 SELECT result, created_at FROM analysis_cache
                 WHERE chat_id = $1 AND time_period = $2 AND message_content_hash = $3
                 """,
-                chat_id, time_period, message_content_hash
+                chat_id, time_period, watermark
             )
             if row:
                 now = datetime.now(pytz.utc)
@@ -641,10 +1289,10 @@ class Database:
         cls, 
         chat_id: ChatId, 
         time_period: str, 
-        message_content_hash: str, 
+        watermark: str, 
         result: str
     ) -> None:
-        """Store analysis result in cache with dual-layer caching."""
+        """Store an analysis result under its period watermark in both cache layers."""
         manager = cls.get_connection_manager()
         
         async with manager.get_connection() as conn:
@@ -655,11 +1303,11 @@ class Database:
                 ON CONFLICT (chat_id, time_period, message_content_hash)
                 DO UPDATE SET result = EXCLUDED.result, created_at = EXCLUDED.created_at
                 """,
-                chat_id, time_period, message_content_hash, result
+                chat_id, time_period, watermark, result
             )
             
             # Also cache in memory
-            cache_key = f"analysis:{chat_id}:{time_period}:{message_content_hash}"
+            cache_key = cls._analysis_cache_key(chat_id, time_period, watermark)
             manager._cache_manager.set(cache_key, result, ttl=DEFAULT_CACHE_TTL)
             manager._connection_stats['queries_executed'] += 1
 
@@ -864,6 +1512,7 @@ class Database:
             return {
                 'connection_diagnostics': detailed_stats,
                 'database_stats': database_stats,
+                'message_ingestion': cls._ingestion_pipeline.get_stats() if cls._ingestion_pipeline else None,
                 'health_status': await cls.health_check()
             }
             
@@ -955,7 +1604,26 @@ class Database:
     
     @classmethod
     async def close(cls) -> None:
-        """Close the database connection pool."""
+        """Drain pending message writes and close the database connection pool."""
+        try:
+            await cls.disable_message_ingestion()
+        except Exception as e:
+            logger.error(f"Error draining message ingestion pipeline: {e}")
         if cls._connection_manager:
             await cls._connection_manager.close()
-            cls._connection_manager = None
\ No newline at end of file
+            cls._connection_manager = None
+    
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Service registry shutdown hook."""
+        await cls.close()
+
+
+async def message_partitions_callback(context: Any) -> None:
+    """Scheduled callback: keep message partitions ahead of time and apply retention."""
+    try:
+        changed = await Database.maintain_message_partitions()
+        if changed:
+            logger.info(f"Message retention ({RETENTION_MODE}) applied to: {', '.join(changed)}")
+    except Exception as e:
+        logger.error(f"Message partition maintenance failed: {e}")
@@ -0,0 +1,119 @@
+"""
+Shared in-flight downloads.
+
+When one link is posted in several chats at once, ``DownloadCoordinator``
+runs a single download for it and gives the same file to every requester.
+Downloads are keyed by the caller (canonical URL plus format). The file is
+reference-counted: every requester that received it calls ``release`` once
+it is done sending, and the file is deleted after the last release. Until
+then, new requests for the same key get the same file without downloading.
+
+Each requester waits on its own. One that times out or is cancelled stops
+waiting and gives up its reference without affecting the others. The
+download itself is cancelled only when nobody is waiting for it any more.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from modules.performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+DownloadResult = Tuple[Optional[str], Optional[str]]
+
+
+class _Download:
+    """One download and the requesters holding it."""
+
+    def __init__(self, key: str, task: "asyncio.Task[DownloadResult]") -> None:
+        self.key = key
+        self.task = task
+        self.holders = 0
+
+
+class DownloadCoordinator:
+    """Deduplicates concurrent downloads of one key and reference-counts their files."""
+
+    def __init__(self) -> None:
+        self._downloads: Dict[str, _Download] = {}
+        self._files: Dict[str, _Download] = {}
+
+    async def fetch(self, key: str, download: Callable[[], Awaitable[DownloadResult]]) -> DownloadResult:
+        """
+        Return (filename, title) of the download for key, starting download() if none is running.
+
+        A returned filename must be passed to release() exactly once.
+        """
+        entry = self._downloads.get(key)
+        if entry is None:
+            entry = _Download(key, asyncio.ensure_future(download()))
+            entry.task.add_done_callback(functools.partial(self._on_done, entry))
+            self._downloads[key] = entry
+        else:
+            logger.info(f"Joining in-flight download of {key}")
+            performance_monitor.record_metric("download_shared", 1, "count")
+        entry.holders += 1
+
+        try:
+            # Shielded: a requester's timeout or cancellation must not cancel the others' download
+            filename, title = await asyncio.shield(entry.task)
+        except BaseException:
+            self._drop(entry)
+            raise
+        if not filename:
+            self._drop(entry)
+            return filename, title
+        self._files[filename] = entry
+        return filename, title
+
+    def release(self, filename: Optional[str]) -> None:
+        """Give up a file returned by fetch(); delete it once nobody holds it."""
+        if not filename:
+            return
+        entry = self._files.get(filename)
+        if entry is None:
+            # Not from a coordinated download: the caller owns it alone
+            _remove(filename)
+            return
+        self._drop(entry)
+
+    def _drop(self, entry: _Download) -> None:
+        entry.holders -= 1
+        if entry.holders > 0:
+            return
+        if self._downloads.get(entry.key) is entry:
+            del self._downloads[entry.key]
+        if not entry.task.done():
+            logger.info(f"Cancelling download of {entry.key}: no requester is waiting")
+            entry.task.cancel()
+            return
+        if entry.task.cancelled() or entry.task.exception() is not None:
+            return
+        filename = entry.task.result()[0]
+        if filename and self._files.get(filename) is entry:
+            del self._files[filename]
+            _remove(filename)
+
+    def _on_done(self, entry: _Download, task: "asyncio.Task[DownloadResult]") -> None:
+        if task.cancelled():
+            return
+        filename = None if task.exception() is not None else task.result()[0]
+        if not filename:
+            # Failures are not shared with later requests; they start a new attempt
+            if self._downloads.get(entry.key) is entry:
+                del self._downloads[entry.key]
+        elif entry.holders == 0:
+            # Finished after every requester gave up; nobody will send the file
+            _remove(filename)
+
+
+def _remove(filename: str) -> None:
+    if os.path.exists(filename):
+        try:
+            os.remove(filename)
+        except OSError as e:
+            logger.warning(f"Could not remove downloaded file {filename}: {e}")
@@ -0,0 +1,243 @@
+"""
+Fair scheduling of media downloads.
+
+``DownloadScheduler`` limits how many downloads run at once and decides
+which waiting download starts when a slot frees up:
+
+- short-form links (TikTok, YouTube Shorts, Instagram Reels) go first;
+- otherwise chats take turns, the chat served least recently first, and
+  within a chat its users take turns the same way;
+- one user's downloads run in the order they were requested.
+
+So one user posting ten links holds up other chats by at most one download.
+Each waiting request is told its queue position whenever it changes, and
+position 0 when it starts; ``QueuePositionMessage`` shows it in a Telegram
+message without exceeding the chat's edit rate limit. Queue depth, wait
+time and run time (tagged by platform) are recorded as
+``download_queue_depth``, ``download_queue_wait`` and ``download_run_time``.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, List, Optional
+from urllib.parse import urlparse
+
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+from modules.gpt_streaming import retry_after_seconds
+from modules.performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 3
+
+SHORT_FORM_PLATFORMS = {"tiktok", "youtube_shorts", "instagram_reels"}
+
+PositionCallback = Callable[[int], None]
+
+
+def download_platform(url: str) -> str:
+    """Return the platform label of a link, used for priority and metric tags."""
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    path = parsed.path.lower()
+    if host == "tiktok.com" or host.endswith(".tiktok.com"):
+        return "tiktok"
+    if host == "music.youtube.com":
+        return "youtube_music"
+    if host == "youtu.be" or host == "youtube.com" or host.endswith(".youtube.com"):
+        return "youtube_shorts" if path.startswith("/shorts/") else "youtube"
+    if host.endswith("instagram.com"):
+        return "instagram_reels" if "/reel/" in path or "/reels/" in path else "instagram"
+    if host in ("x.com", "twitter.com") or host.endswith((".x.com", ".twitter.com")):
+        return "twitter"
+    return "other"
+
+
+@dataclass(eq=False)
+class _Job:
+    platform: str
+    chat: Optional[str]
+    user: Optional[str]
+    sequence: int
+    on_position: Optional[PositionCallback] = None
+    future: "asyncio.Future[None]" = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+    position: int = 0
+
+
+class DownloadScheduler:
+    """Runs at most max_concurrency downloads, starting waiting ones fairly."""
+
+    def __init__(self, max_concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        self.max_concurrency = max_concurrency
+        self._running = 0
+        self._waiting: List[_Job] = []
+        # Turn at which a chat or (chat, user) was last served; lower goes first
+        self._served: Dict[Hashable, int] = {}
+        self._turns = itertools.count(1)
+        self._sequence = itertools.count()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        platform: str,
+        chat_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        on_position: Optional[PositionCallback] = None,
+    ) -> AsyncIterator[None]:
+        """Hold a download slot; on_position(n) is called while the request waits."""
+        job = _Job(platform, chat_id, user_id, next(self._sequence), on_position)
+        enqueued = time.monotonic()
+        await self._acquire(job)
+        started = time.monotonic()
+        tags = {"platform": platform}
+        performance_monitor.record_metric("download_queue_wait", started - enqueued, "seconds", tags)
+        try:
+            yield
+        finally:
+            performance_monitor.record_metric("download_run_time", time.monotonic() - started, "seconds", tags)
+            self._running -= 1
+            self._dispatch()
+
+    async def _acquire(self, job: _Job) -> None:
+        if self._running < self.max_concurrency and not self._waiting:
+            self._start(job)
+            return
+        self._waiting.append(job)
+        self._publish()
+        try:
+            await job.future
+        except asyncio.CancelledError:
+            if job.future.done() and not job.future.cancelled():
+                # Started just as it was cancelled: hand the slot on
+                self._running -= 1
+                self._dispatch()
+            elif job in self._waiting:
+                self._waiting.remove(job)
+                self._publish()
+            raise
+
+    def _start(self, job: _Job) -> None:
+        turn = next(self._turns)
+        self._served[("chat", job.chat)] = turn
+        self._served[("user", job.chat, job.user)] = turn
+        self._running += 1
+        if not job.future.done():
+            job.future.set_result(None)
+        if job.position:
+            job.position = 0
+            self._notify(job)
+
+    @staticmethod
+    def _next(waiting: List[_Job], served: Dict[Hashable, int]) -> _Job:
+        candidates = [job for job in waiting if job.platform in SHORT_FORM_PLATFORMS] or waiting
+        return min(candidates, key=lambda job: (
+            served.get(("chat", job.chat), 0),
+            served.get(("user", job.chat, job.user), 0),
+            job.sequence,
+        ))
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrency and self._waiting:
+            job = self._next(self._waiting, self._served)
+            self._waiting.remove(job)
+            self._start(job)
+        if not self._waiting:
+            # Turns only matter between waiting requests
+            self._served.clear()
+        self._publish()
+
+    def _publish(self) -> None:
+        """Record the queue depth and tell waiting requests whose position changed."""
+        performance_monitor.record_metric("download_queue_depth", len(self._waiting), "count")
+        waiting = list(self._waiting)
+        served = dict(self._served)
+        turn = max(served.values(), default=0)
+        for position in range(1, len(waiting) + 1):
+            job = self._next(waiting, served)
+            waiting.remove(job)
+            turn += 1
+            served[("chat", job.chat)] = turn
+            served[("user", job.chat, job.user)] = turn
+            if job.position != position:
+                job.position = position
+                self._notify(job)
+
+    @staticmethod
+    def _notify(job: _Job) -> None:
+        if job.on_position is None:
+            return
+        try:
+            job.on_position(job.position)
+        except Exception as e:
+            logger.warning(f"Queue position callback failed: {e}")
+
+
+def queue_position_text(position: int) -> str:
+    """Return the processing message text for a queue position (0 once it runs)."""
+    text = "⏳ Processing your request..."
+    if position:
+        text += f"\nPosition in queue: {position}"
+    return text
+
+
+class QueuePositionMessage:
+    """
+    Shows a request's queue position in its processing message.
+
+    ``update`` is a PositionCallback. At most one edit task runs per message:
+    positions reported while it waits replace each other, and only the latest
+    is shown, at most once per interval and no sooner than a RetryAfter asks.
+    The message must already show position 0.
+    """
+
+    def __init__(self, message: Any, interval: float) -> None:
+        self._message = message
+        self._interval = interval
+        self._latest = 0
+        self._shown = 0
+        self._next_edit = 0.0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def update(self, position: int) -> None:
+        self._latest = position
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        """Cancel a pending edit; call before the message is deleted."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        while self._latest != self._shown:
+            delay = self._next_edit - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            position = self._latest
+            try:
+                await self._message.edit_text(queue_position_text(position))
+            except RetryAfter as e:
+                self._next_edit = time.monotonic() + max(retry_after_seconds(e), self._interval)
+                continue
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    logger.debug(f"Could not update queue position: {e}")
+            except TelegramError as e:
+                logger.debug(f"Could not update queue position: {e}")
+            # A failed edit is not retried; the next position change tries again
+            self._shown = position
+            self._next_edit = time.monotonic() + self._interval
@@ -155,14 +155,17 @@ class EnhancedAnalyzeCommand:
             cache_enabled = cache_cfg["enabled"]
             
             cached_result = None
-            if cache_enabled:
+            watermark = None
+            if cache_enabled and time_period_key:
                 log_command_milestone("analyze", "checking_cache", 
                                     user_id=user_id, chat_id=chat_id)
                 
                 async with track_database_query("cache_lookup", "analysis_cache"):
+                    from modules.chat_analysis import get_period_watermark
                     from modules.database import Database
+                    watermark = str(await get_period_watermark(chat_id, time_period_key))
                     cached_result = await Database.get_analysis_cache(
-                        chat_id, time_period_key, cache_cfg["ttl"]
+                        chat_id, time_period_key, watermark, cache_cfg["ttl"]
                     )
                 
                 if cached_result:
@@ -246,13 +249,13 @@ class EnhancedAnalyzeCommand:
                                 user_id=user_id, chat_id=chat_id)
             
             # Cache the result if caching is enabled
-            if cache_enabled and time_period_key:
+            if watermark is not None:
                 log_command_milestone("analyze", "caching_result", 
                                     user_id=user_id, chat_id=chat_id)
                 
                 async with track_database_query("cache_store", "analysis_cache"):
                     from modules.database import Database
-                    await Database.set_analysis_cache(chat_id, time_period_key, analysis_result)
+                    await Database.set_analysis_cache(chat_id, time_period_key, watermark, analysis_result)
             
             # Send the analysis result
             response_text = f"📊 Аналіз повідомлень за {date_str}:\n\n{analysis_result}"
@@ -2,12 +2,11 @@
 
 # Standard library imports
 import asyncio
-import os
-from datetime import datetime
-from typing import Optional, List, Dict, Any, Union
+import functools
+from datetime import date, datetime, timedelta
+from typing import AsyncGenerator, AsyncIterator, Optional, List, Dict, Any, Tuple, Union
 import base64
 from io import BytesIO
-import hashlib
 
 # Third-party imports
 from PIL import Image
@@ -22,24 +21,29 @@ from openai import AsyncOpenAI
 # Local module imports
 from .database import Database
 from .chat_streamer import chat_streamer
+from .gpt_scheduler import GPTOverloaded, GPTScheduler, Priority
+from .gpt_streaming import iter_sse_deltas, stream_reply
 from .shared_constants import GPTConstants
 from modules.const import (
     Config
 )
 from modules.diagnostics import run_api_diagnostics
-from modules.logger import general_logger, error_logger, get_daily_log_path, chat_logger
+from modules.logger import general_logger, error_logger, chat_logger
 from modules.error_handler import ErrorHandler, ErrorCategory, ErrorSeverity
 from config_v2.compat import get_shared_config_manager
 
 from modules.chat_analysis import (
+    format_analysis_lines,
     get_messages_for_chat_today,
     get_last_n_messages_in_chat,
     get_messages_for_chat_last_n_days,
     get_messages_for_chat_date_period,
     get_messages_for_chat_single_date,
+    get_period_watermark,
     get_user_chat_stats,
     get_user_chat_stats_with_fallback
 )
+from modules.period_summary import DAY_SUMMARY_MAX_TOKENS, plan_period, summarize_period
 
 
 # Constants - now imported from shared_constants
@@ -50,6 +54,7 @@ GPT_MODEL_VISION = GPTConstants.GPT_MODEL_VISION
 GPT_MODEL_IMAGE = GPTConstants.GPT_MODEL_IMAGE
 KYIV_TZ = pytz.timezone(GPTConstants.KYIV_TZ)
 DEFAULT_MAX_TOKENS = GPTConstants.DEFAULT_MAX_TOKENS
+STREAM_RESPONSES = GPTConstants.STREAM_RESPONSES
 SUMMARY_MAX_TOKENS = GPTConstants.SUMMARY_MAX_TOKENS
 CONTEXT_MESSAGES_COUNT = GPTConstants.CONTEXT_MESSAGES_COUNT
 MAX_TELEGRAM_MESSAGE_LENGTH = GPTConstants.MAX_TELEGRAM_MESSAGE_LENGTH
@@ -79,6 +84,20 @@ DEFAULT_PROMPTS = {
     "headache_risk": "Ти асистент з охорони здоров'я. Оцінюй ризик головного болю та мігрені на основі метеорологічних даних. Відповідай виключно українською мовою. Будь конкретним та практичним, 2-3 речення."
 }
 
+# Replies the user is waiting for are streamed; background ones are sent whole
+STREAMED_RESPONSE_TYPES = {"command", "mention", "private"}
+
+# Scheduler priority of each response type; anything else is background work
+RESPONSE_PRIORITIES = {
+    "command": Priority.DIRECT,
+    "private": Priority.DIRECT,
+    "mention": Priority.MENTION,
+    "weather": Priority.MENTION,
+    "headache_risk": Priority.MENTION,
+    "analyze": Priority.ANALYZE,
+    "summary": Priority.ANALYZE,
+}
+
 # Configure timeouts and retries for API clients
 TIMEOUT_CONFIG = httpx.Timeout(connect=15.0, read=60.0, write=30.0, pool=10.0)
 
@@ -86,6 +105,9 @@ TIMEOUT_CONFIG = httpx.Timeout(connect=15.0, read=60.0, write=30.0, pool=10.0)
 MAX_RETRIES = 3
 RETRY_BACKOFF_BASE = 2.0  # seconds
 
+# Failures to reach the API, retried by the client before anything is sent
+CONNECT_ERRORS = (httpx.ConnectTimeout, httpx.ConnectError, httpx.PoolTimeout)
+
 # OpenRouter specific settings (from first implementation)
 USE_OPENROUTER = bool(Config.OPENROUTER_BASE_URL)  # Only use if defined
 
@@ -93,8 +115,17 @@ USE_OPENROUTER = bool(Config.OPENROUTER_BASE_URL)  # Only use if defined
 last_diagnostic_result: Optional[Any] = None
 last_diagnostic_time = datetime.min
 
+async def _wait_to_reconnect(error: Exception, attempt: int) -> None:
+    """Back off after a failed connection attempt; re-raise error once MAX_RETRIES are used up."""
+    if attempt >= MAX_RETRIES - 1:
+        error_logger.error(f"API connection failed after {MAX_RETRIES} attempts: {type(error).__name__}", exc_info=True)
+        raise error
+    wait_time = RETRY_BACKOFF_BASE * (2 ** attempt)
+    general_logger.warning(f"API connection failed (attempt {attempt + 1}/{MAX_RETRIES}): {type(error).__name__}. Retrying in {wait_time}s...")
+    await asyncio.sleep(wait_time)
+
 class OpenAIAsyncClient:
-    def __init__(self, api_key: str, base_url: str) -> None:
+    def __init__(self, api_key: str, base_url: str, scheduler: Optional[GPTScheduler] = None) -> None:
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
         self.headers = {
@@ -104,6 +135,7 @@ class OpenAIAsyncClient:
             "X-Title": "PsychochauffeurBot"
         }
         self._client = httpx.AsyncClient(timeout=TIMEOUT_CONFIG)
+        self.scheduler = scheduler
 
     class Chat:
         def __init__(self, outer: 'OpenAIAsyncClient') -> None:
@@ -113,7 +145,11 @@ class OpenAIAsyncClient:
             def __init__(self, outer: 'OpenAIAsyncClient.Chat') -> None:
                 self.outer = outer
 
-            async def create(self, model: str, messages: List[Dict[str, Any]], max_tokens: int, temperature: float, **kwargs: Any) -> Dict[str, Any]:
+            async def create(
+                self, model: str, messages: List[Dict[str, Any]], max_tokens: int, temperature: float,
+                priority: Priority = Priority.DIRECT, chat_id: Optional[int] = None, **kwargs: Any
+            ) -> Dict[str, Any]:
+                """Request a completion; priority and chat_id are passed to the client's scheduler."""
                 payload = {
                     "model": model,
                     "messages": messages,
@@ -121,6 +157,12 @@ class OpenAIAsyncClient:
                     "temperature": temperature
                 }
                 payload.update(kwargs)
+                scheduler = self.outer.outer.scheduler
+                if scheduler is None:
+                    return await self._post(payload)
+                return await scheduler.run(priority, chat_id, lambda: self._post(payload))
+
+            async def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
                 url = f"{self.outer.outer.base_url}/chat/completions"
 
                 last_exception = None
@@ -130,17 +172,43 @@ class OpenAIAsyncClient:
                         response.raise_for_status()
                         result = response.json()
                         return dict(result) if isinstance(result, dict) else {}
-                    except (httpx.ConnectTimeout, httpx.ConnectError, httpx.PoolTimeout) as e:
+                    except CONNECT_ERRORS as e:
                         last_exception = e
-                        if attempt < MAX_RETRIES - 1:
-                            wait_time = RETRY_BACKOFF_BASE * (2 ** attempt)
-                            general_logger.warning(f"API connection failed (attempt {attempt + 1}/{MAX_RETRIES}): {type(e).__name__}. Retrying in {wait_time}s...")
-                            await asyncio.sleep(wait_time)
-                        else:
-                            error_logger.error(f"API connection failed after {MAX_RETRIES} attempts: {type(e).__name__}", exc_info=True)
-                            raise
+                        await _wait_to_reconnect(e, attempt)
                 raise last_exception  # type: ignore
 
+            def stream(
+                self, model: str, messages: List[Dict[str, Any]], max_tokens: int, temperature: float,
+                priority: Priority = Priority.DIRECT, chat_id: Optional[int] = None, **kwargs: Any
+            ) -> AsyncIterator[str]:
+                """Like create(), but yield the content as it is generated (server-sent events)."""
+                payload = {
+                    "model": model,
+                    "messages": messages,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "stream": True
+                }
+                payload.update(kwargs)
+                scheduler = self.outer.outer.scheduler
+                if scheduler is None:
+                    return self._stream(payload)
+                return scheduler.stream(priority, chat_id, lambda: self._stream(payload))
+
+            async def _stream(self, payload: Dict[str, Any]) -> AsyncGenerator[str, None]:
+                url = f"{self.outer.outer.base_url}/chat/completions"
+
+                # Only connecting is retried: once content has been yielded a retry would repeat it
+                for attempt in range(MAX_RETRIES):
+                    try:
+                        async with self.outer.outer._client.stream("POST", url, headers=self.outer.outer.headers, json=payload) as response:
+                            response.raise_for_status()
+                            async for delta in iter_sse_deltas(response.aiter_lines()):
+                                yield delta
+                        return
+                    except CONNECT_ERRORS as e:
+                        await _wait_to_reconnect(e, attempt)
+
         @property
         def completions(self) -> 'OpenAIAsyncClient.Chat.Completions':
             return OpenAIAsyncClient.Chat.Completions(self)
@@ -149,10 +217,13 @@ class OpenAIAsyncClient:
     def chat(self) -> 'OpenAIAsyncClient.Chat':
         return OpenAIAsyncClient.Chat(self)
 
-# Instantiate the client for use in this module and diagnostics
+# Instantiate the client for use in this module and diagnostics; all of its
+# requests share one scheduler
+gpt_scheduler = GPTScheduler()
 client = OpenAIAsyncClient(
     api_key=Config.OPENROUTER_API_KEY,
-    base_url=Config.OPENROUTER_BASE_URL or "https://api.openai.com/v1"
+    base_url=Config.OPENROUTER_BASE_URL or "https://api.openai.com/v1",
+    scheduler=gpt_scheduler
 )
 
 async def get_system_prompt(response_type: str, chat_config: Dict[str, Any]) -> str:
@@ -336,7 +407,9 @@ async def analyze_image(
                 }
             ],
             max_tokens=150,
-            temperature=0.2
+            temperature=0.2,
+            priority=Priority.BACKGROUND,
+            chat_id=update.effective_chat.id if update and update.effective_chat else None
         )
         
         description = response["choices"][0]["message"]["content"].strip()
@@ -364,7 +437,10 @@ async def analyze_image(
             general_logger.info(f"Logged image description for user {username} in chat {chat_id}")
         
         return str(description) if description else "No description available"
-        
+
+    except GPTOverloaded as e:
+        general_logger.info(f"Skipped image analysis: {e}")
+        return "Error analyzing image."
     except Exception as e:
         await handle_error(e, update, return_text=False)
         return "Error analyzing image."
@@ -419,7 +495,14 @@ async def get_context_messages(update: Update, context: CallbackContext[Any, Any
         
         # Get previous messages from the global chat history manager
         from modules.utils import chat_history_manager
-        chat_history = chat_history_manager.get_history(update.effective_chat.id) if update.effective_chat else []
+        chat_history: List[Dict[str, Any]] = []
+        if update.effective_chat:
+            try:
+                # Loads the chat's stored history on first use after a restart
+                await chat_history_manager.warm_up(update.effective_chat.id)
+            except Exception as e:
+                error_logger.warning(f"Chat history warm-up failed: {e}")
+            chat_history = chat_history_manager.get_history(update.effective_chat.id, limit=context_messages_count)
         
         # Add up to context_messages_count previous messages (excluding current message)
         for msg in chat_history[-context_messages_count:]:
@@ -439,7 +522,7 @@ async def get_context_messages(update: Update, context: CallbackContext[Any, Any
 async def get_chat_context(update: Optional[Update]) -> str:
     """
     Get recent chat messages as context for GPT requests.
-    Retrieves the last CONTEXT_MESSAGES_COUNT messages from the chat log.
+    Retrieves the last CONTEXT_MESSAGES_COUNT messages from the chat history store.
     
     Args:
         update: Telegram update object
@@ -447,16 +530,16 @@ async def get_chat_context(update: Optional[Update]) -> str:
     Returns:
         str: Recent chat messages concatenated
     """
-    chat_id = "unknown"
     last_messages: List[str] = []
     
     if update and hasattr(update, 'effective_chat') and update.effective_chat:
-        chat_id = str(update.effective_chat.id)
-        log_path = get_daily_log_path(chat_id)
-        if os.path.exists(log_path):
-            with open(log_path, 'r', encoding='utf-8') as f:
-                # Get the last N messages from the log file
-                last_messages = f.readlines()[-CONTEXT_MESSAGES_COUNT:]
+        from modules.utils import chat_history_manager
+        chat_id = update.effective_chat.id
+        await chat_history_manager.warm_up(chat_id)
+        last_messages = [
+            msg['text'] for msg in chat_history_manager.get_history(chat_id, limit=CONTEXT_MESSAGES_COUNT)
+            if msg.get('text')
+        ]
 
     return ' '.join(last_messages)
 
@@ -596,19 +679,43 @@ async def gpt_response(
             *context_messages
         ]
         
-        # Call GPT API
-        response = await client.chat.completions.create(
-            model=model,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature
+        priority = RESPONSE_PRIORITIES.get(response_type, Priority.BACKGROUND)
+        scheduled_chat_id = update.effective_chat.id if update.effective_chat else None
+        streamed = (
+            STREAM_RESPONSES and not return_text and response_type in STREAMED_RESPONSE_TYPES
+            and update.message is not None
         )
-        
-        # Get response text
-        response_text = response["choices"][0]["message"]["content"].strip()
+        if streamed:
+            # Reply at once and edit the reply as tokens arrive
+            response_text = await stream_reply(
+                update.message,
+                client.chat.completions.stream(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    priority=priority,
+                    chat_id=scheduled_chat_id
+                ),
+                private=chat_type == "private",
+                max_length=MAX_TELEGRAM_MESSAGE_LENGTH
+            )
+        else:
+            # Call GPT API
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                priority=priority,
+                chat_id=scheduled_chat_id
+            )
+            
+            # Get response text
+            response_text = response["choices"][0]["message"]["content"].strip()
         
         # Check if response is too long for Telegram
-        if len(response_text) > MAX_TELEGRAM_MESSAGE_LENGTH:
+        if not streamed and len(response_text) > MAX_TELEGRAM_MESSAGE_LENGTH:
             # Truncate the response and add a note
             truncated_text = response_text[:MAX_TELEGRAM_MESSAGE_LENGTH - 100]  # Leave room for the note
             response_text = f"{truncated_text}\n\n[Message truncated due to length limit]"
@@ -639,10 +746,14 @@ async def gpt_response(
                     'timestamp': update.message.date if update.message else None
                 })
             
-            if update.message:
+            if update.message and not streamed:
                 await update.message.reply_text(response_text, parse_mode="Markdown")
             return None
-        
+
+    except GPTOverloaded as e:
+        # Shed by the scheduler to keep direct replies fast; not worth an error message
+        general_logger.info(f"Skipped GPT response: {e}")
+        return None
     except Exception as e:
         await handle_error(e, update, return_text=return_text)
         return None
@@ -768,6 +879,22 @@ async def handle_error(
     )
 
 
+async def _summary_settings() -> Tuple[str, str]:
+    """Return the (model, system prompt) configured for summaries, or the defaults."""
+    system_prompt = DEFAULT_PROMPTS["gpt_summary"]  # Default fallback
+    model = GPT_MODEL_TEXT  # Default fallback
+    try:
+        chat_config = await get_shared_config_manager().get_config()
+        system_prompt = await get_system_prompt("gpt_summary", chat_config)
+        # Get model from config
+        gpt_module = chat_config.get("config_modules", {}).get("gpt", {})
+        response_settings = gpt_module.get("overrides", {}).get("summary", {})
+        model = response_settings.get("model", GPT_MODEL_TEXT)
+    except Exception as e:
+        error_logger.error(f"Failed to load config for summary: {e}")
+    return model, system_prompt
+
+
 async def gpt_summary_function(messages: List[str]) -> str:
     """
     Generate a summary of messages using GPT.
@@ -785,18 +912,7 @@ async def gpt_summary_function(messages: List[str]) -> str:
         # Create the prompt for GPT
         prompt = f"Підсумуйте наступні повідомлення:\n\n{messages_text}\n\nПідсумок:"
 
-        # Get system prompt and model from config or use default
-        system_prompt = DEFAULT_PROMPTS["gpt_summary"]  # Default fallback
-        model = GPT_MODEL_TEXT  # Default fallback
-        try:
-            chat_config = await get_shared_config_manager().get_config()
-            system_prompt = await get_system_prompt("gpt_summary", chat_config)
-            # Get model from config
-            gpt_module = chat_config.get("config_modules", {}).get("gpt", {})
-            response_settings = gpt_module.get("overrides", {}).get("summary", {})
-            model = response_settings.get("model", GPT_MODEL_TEXT)
-        except Exception as e:
-            error_logger.error(f"Failed to load config for summary: {e}")
+        model, system_prompt = await _summary_settings()
 
         # Call the API to get the summary
         response = await client.chat.completions.create(
@@ -806,7 +922,8 @@ async def gpt_summary_function(messages: List[str]) -> str:
                 {"role": "user", "content": prompt}
             ],
             max_tokens=SUMMARY_MAX_TOKENS,
-            temperature=0.4
+            temperature=0.4,
+            priority=Priority.ANALYZE
         )
 
         # Extract the summary from the response
@@ -835,6 +952,31 @@ async def summarize_messages(messages: List[str]) -> str:
         return "Could not generate summary."
 
 
+async def _summarize_analysis_day(day: date, text: str) -> str:
+    """
+    Summarize one day (or a chunk of one) of a multi-day /analyze period.
+
+    Unlike gpt_summary_function, errors are raised: the result is stored and
+    reused, so a failure must not be mistaken for a summary.
+    """
+    model, system_prompt = await _summary_settings()
+    prompt = (
+        f"Стисло підсумуйте розмову в чаті за {day.strftime('%d.%m.%Y')}: "
+        f"основні теми, події та хто що обговорював.\n\n{text}"
+    )
+    response = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=DAY_SUMMARY_MAX_TOKENS,
+        temperature=0.4,
+        priority=Priority.ANALYZE
+    )
+    return str(response["choices"][0]["message"]["content"]).strip()
+
+
 async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Analyze chat messages based on various criteria and provide a summary.
@@ -843,9 +985,12 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     Supported syntaxes:
     - /analyze: Analyze today's messages
     - /analyze last <number> messages: Analyze last N messages
-    - /analyze last <number> days: Analyze messages from last N days
+    - /analyze last <number> days: Analyze today and the N calendar days before it
     - /analyze period <date1> <date2>: Analyze messages in date range (supports DD-MM-YYYY, YYYY-MM-DD, DD/MM/YYYY, DD.MM.YYYY)
     - /analyze date <date>: Analyze messages for specific date (supports DD-MM-YYYY, YYYY-MM-DD, DD/MM/YYYY, DD.MM.YYYY)
+
+    Periods spanning several days are summarized day by day and merged (see
+    modules/period_summary.py), reusing the day summaries of earlier requests.
     
     Args:
         update: Telegram update object
@@ -913,16 +1058,17 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         cache_enabled = cache_cfg["enabled"]
         cache_ttl = cache_cfg["ttl"]
 
-        # Initialize variables
-        messages = []
+        # Initialize variables; messages are only loaded on a cache miss
+        load_messages = None
         date_str = "сьогодні"
         time_period_key = None
+        period_days: Optional[Tuple[date, date]] = None
 
         # Parse command arguments with enhanced validation
         if not context.args:
             # Default: analyze today's messages
             general_logger.info(f"Analyzing today's messages for chat {chat_id}")
-            messages = await get_messages_for_chat_today(chat_id)
+            load_messages = functools.partial(get_messages_for_chat_today, chat_id)
             time_period_key = "today"
         else:
             args = context.args
@@ -962,14 +1108,16 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 unit = args[2].lower()
                 if unit == "messages":
                     general_logger.info(f"Analyzing last {number} messages for chat {chat_id}")
-                    messages = await get_last_n_messages_in_chat(chat_id, number)
+                    load_messages = functools.partial(get_last_n_messages_in_chat, chat_id, number)
                     date_str = f"останні {number} повідомлень"
                     time_period_key = f"last_{number}_messages"
                 elif unit == "days":
                     general_logger.info(f"Analyzing last {number} days for chat {chat_id}")
-                    messages = await get_messages_for_chat_last_n_days(chat_id, number)
+                    load_messages = functools.partial(get_messages_for_chat_last_n_days, chat_id, number)
                     date_str = f"останні {number} днів"
                     time_period_key = f"last_{number}_days"
+                    today = datetime.now(KYIV_TZ).date()
+                    period_days = (today - timedelta(days=number), today)
                 else:
                     error_message = (
                         "❌ Неправильний формат команди. Використовуйте:\n"
@@ -1013,13 +1161,10 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                         raise ValueError("Date range too large (max 365 days)")
                     
                     general_logger.info(f"Analyzing period {start_date} to {end_date} for chat {chat_id}")
-                    messages = await get_messages_for_chat_date_period(
-                        int(chat_id) if isinstance(chat_id, (int, str)) and str(chat_id).isdigit() else 0, 
-                        start_date, 
-                        end_date
-                    )
+                    load_messages = functools.partial(get_messages_for_chat_date_period, chat_id, start_date, end_date)
                     date_str = f"період {DateParser.format_date_for_display(start_date)} - {DateParser.format_date_for_display(end_date)}"
                     time_period_key = f"period_{start_date}_{end_date}"
+                    period_days = (start_date, end_date)
                     
                 except ValueError as e:
                     error_message = (
@@ -1064,7 +1209,8 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                         chat_id_to_use = int(chat_id)
                         
                     general_logger.info(f"Analyzing date {target_date} for chat {chat_id_to_use}")
-                    messages = await get_messages_for_chat_single_date(
+                    load_messages = functools.partial(
+                        get_messages_for_chat_single_date,
                         chat_id_to_use,
                         target_date
                     )
@@ -1100,44 +1246,75 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 if update.message:
                     await update.message.reply_text(error_message)
                 return
-        if not messages:
-            no_messages_text = f"📊 Немає повідомлень для аналізу за {date_str}."
-            general_logger.info(f"No messages found for analysis in chat {chat_id} for period: {date_str}")
-            if update.message:
-                await update.message.reply_text(no_messages_text)
-            return
-
-        # Format messages for GPT analysis
-        messages_text = []
-        for timestamp, sender, text in messages:
-            if text:
-                time_str = timestamp.strftime('%H:%M')
-                messages_text.append(f"[{time_str}] {sender}: {text}")
-        
-        analysis_text = "\n".join(messages_text)
-        message_content_hash = hashlib.sha256(analysis_text.encode("utf-8")).hexdigest()
-        
-        general_logger.info(f"Formatted {len(messages_text)} messages for analysis in chat {chat_id}")
 
-        # Check cache
+        # Check cache: the key is the period plus its watermark, read from an
+        # index, so a hit never retrieves the messages themselves
+        watermark = None
         if cache_enabled and time_period_key:
             try:
-                cached = await Database.get_analysis_cache(chat_id, time_period_key, message_content_hash, cache_ttl)
+                watermark = await get_period_watermark(chat_id, time_period_key)
+                cached = None
+                if watermark.messages:
+                    cached = await Database.get_analysis_cache(chat_id, time_period_key, str(watermark), cache_ttl)
                 if cached:
                     general_logger.info(f"Returning cached analysis for chat {chat_id}, key: {time_period_key}")
                     if update.message:
                         await update.message.reply_text(f"⚡️ (З кешу)\n{cached}", parse_mode="Markdown")
                     return
             except Exception as cache_error:
+                watermark = None
                 error_logger.warning(f"Cache retrieval failed for chat {chat_id}: {cache_error}")
                 # Continue without cache
 
+        if watermark is not None and not watermark.messages:
+            message_count = 0
+        elif period_days and period_days[0] < period_days[1]:
+            # Several days: summarize the days not summarized before, then merge them
+            plan = await plan_period(chat_id, *period_days)
+            message_count = plan.messages
+            run_analysis = functools.partial(
+                summarize_period,
+                plan,
+                _summarize_analysis_day,
+                lambda day_summaries: gpt_response(
+                    update,
+                    context,
+                    response_type="analyze",
+                    message_text_override=day_summaries,
+                    return_text=True
+                )
+            )
+            general_logger.info(
+                f"Map-reduce analysis for chat {chat_id}: {len(plan.watermarks)} days, "
+                f"{len(plan.missing_days)} to summarize"
+            )
+        else:
+            # Format messages for GPT analysis
+            messages_text = format_analysis_lines(await load_messages())
+            message_count = len(messages_text)
+            run_analysis = functools.partial(
+                gpt_response,
+                update, 
+                context, 
+                response_type="analyze", 
+                message_text_override="\n".join(messages_text), 
+                return_text=True
+            )
+            general_logger.info(f"Formatted {message_count} messages for analysis in chat {chat_id}")
+
+        if not message_count:
+            no_messages_text = f"📊 Немає повідомлень для аналізу за {date_str}."
+            general_logger.info(f"No messages found for analysis in chat {chat_id} for period: {date_str}")
+            if update.message:
+                await update.message.reply_text(no_messages_text)
+            return
+
         # Send initial status message
         status_message = None
         try:
             if update.message:
                 status_message = await update.message.reply_text(
-                    f"🔄 Аналізую {len(messages_text)} повідомлень за {date_str}..."
+                    f"🔄 Аналізую {message_count} повідомлень за {date_str}..."
                 )
         except Exception as status_error:
             error_logger.warning(f"Failed to send status message: {status_error}")
@@ -1145,14 +1322,8 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         # Get GPT analysis with error handling
         gpt_result = None
         try:
-            general_logger.info(f"Requesting GPT analysis for {len(messages_text)} messages in chat {chat_id}")
-            gpt_result = await gpt_response(
-                update, 
-                context, 
-                response_type="analyze", 
-                message_text_override=analysis_text, 
-                return_text=True
-            )
+            general_logger.info(f"Requesting GPT analysis for {message_count} messages in chat {chat_id}")
+            gpt_result = await run_analysis()
             
             if not gpt_result or gpt_result.strip() == "":
                 gpt_result = "❌ Не вдалося отримати аналіз від GPT. Спробуйте пізніше."
@@ -1168,9 +1339,9 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             error_logger.error(f"GPT analysis failed for chat {chat_id}: {gpt_error}", exc_info=True)
 
         # Store successful result in cache
-        if cache_enabled and time_period_key and gpt_result and not gpt_result.startswith("❌"):
+        if watermark is not None and gpt_result and not gpt_result.startswith("❌"):
             try:
-                await Database.set_analysis_cache(chat_id, time_period_key, message_content_hash, gpt_result)
+                await Database.set_analysis_cache(chat_id, time_period_key, str(watermark), gpt_result)
                 general_logger.info(f"Analysis cached for chat {chat_id}, key: {time_period_key}")
             except Exception as cache_error:
                 error_logger.warning(f"Failed to cache analysis for chat {chat_id}: {cache_error}")
@@ -1179,7 +1350,7 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         try:
             if status_message:
                 await status_message.edit_text(
-                    f"📊 Аналіз повідомлень за {date_str} ({len(messages_text)} повідомлень) завершено."
+                    f"📊 Аналіз повідомлень за {date_str} ({message_count} повідомлень) завершено."
                 )
         except Exception as edit_error:
             error_logger.warning(f"Failed to edit status message: {edit_error}")
@@ -1197,7 +1368,7 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 execution_time = (datetime.now() - start_time).total_seconds()
                 general_logger.info(
                     f"Analyze command completed successfully - Chat: {chat_id}, User: {username}, "
-                    f"Messages: {len(messages_text)}, Period: {date_str}, "
+                    f"Messages: {message_count}, Period: {date_str}, "
                     f"Execution time: {execution_time:.2f}s"
                 )
         except Exception as send_error:
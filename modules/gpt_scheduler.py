@@ -0,0 +1,244 @@
+"""
+Priority scheduling for GPT API requests.
+
+Every request made through ``modules.gpt.client`` passes one ``GPTScheduler``:
+
+- at most ``MAX_CONCURRENT_REQUESTS`` requests run at once; waiting requests
+  start in ``Priority`` order, oldest first within a class, so a burst of
+  random replies cannot hold up /ask or mention replies;
+- each chat has a token bucket of ``CHAT_BURST`` requests refilled at
+  ``CHAT_REQUESTS_PER_MINUTE``; an empty bucket delays the request, except
+  background work, which is dropped;
+- a 429 from the API pauses all dispatching until its ``Retry-After`` has
+  passed (exponential backoff without one) and the request is retried;
+- when many requests are waiting, new analyze and background requests are
+  refused with ``GPTOverloaded`` instead of growing the queue.
+
+The time each request waited for its slot is recorded as the
+``gpt_queue_wait`` metric, tagged with its priority; shed requests are
+recorded as ``gpt_requests_shed``.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import httpx
+
+from modules.performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Request classes, most urgent first."""
+    DIRECT = 0      # commands and private chats
+    MENTION = 1     # mentions and replies the user asked for indirectly
+    ANALYZE = 2     # /analyze, /tldr and other bulk summarization
+    BACKGROUND = 3  # random replies, image descriptions
+
+
+MAX_CONCURRENT_REQUESTS = 8
+
+# Per-chat token bucket: sustained rate and burst size
+CHAT_REQUESTS_PER_MINUTE = 12
+CHAT_BURST = 5
+MAX_TRACKED_CHATS = 1000
+
+# Number of waiting requests at which new requests of a class are refused
+SHED_QUEUE_DEPTH: Dict[Priority, int] = {
+    Priority.ANALYZE: 16,
+    Priority.BACKGROUND: 4,
+}
+
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BACKOFF_BASE = 2.0
+MAX_RETRY_AFTER = 60.0
+
+
+class GPTOverloaded(RuntimeError):
+    """A request was shed because the scheduler is too busy for its priority."""
+
+
+class TokenBucket:
+    """Allows capacity requests at once and rate requests per second after that."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token and return 0.0, or return the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429
+
+
+def retry_after_seconds(error: httpx.HTTPStatusError, attempt: int) -> float:
+    """Seconds to wait after a 429: its Retry-After (seconds or HTTP date), else exponential backoff."""
+    header = error.response.headers.get("Retry-After")
+    if header:
+        seconds: Optional[float]
+        try:
+            seconds = float(header)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(header) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+    backoff: float = RATE_LIMIT_BACKOFF_BASE * (2 ** attempt)
+    return min(backoff, MAX_RETRY_AFTER)
+
+
+class GPTScheduler:
+    """Admits, orders and retries GPT requests; see the module docstring."""
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        chat_requests_per_minute: float = CHAT_REQUESTS_PER_MINUTE,
+        chat_burst: int = CHAT_BURST,
+        shed_queue_depth: Optional[Dict[Priority, int]] = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.chat_rate = chat_requests_per_minute / 60
+        self.chat_burst = chat_burst
+        self.shed_queue_depth = SHED_QUEUE_DEPTH if shed_queue_depth is None else shed_queue_depth
+        self._active = 0
+        self._waiting: List[Tuple[int, int, "asyncio.Future[None]"]] = []
+        self._sequence = itertools.count()
+        self._buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._paused_until = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a slot."""
+        return sum(1 for _, _, future in self._waiting if not future.done())
+
+    async def run(self, priority: Priority, chat_id: Optional[int], call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run call() when the scheduler allows, retrying it after 429 responses.
+
+        chat_id charges the chat's token bucket; pass None for requests that
+        are part of a larger one already charged (e.g. the chunks of a summary).
+        """
+        await self._admit(priority, chat_id)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            async with self._slot(priority):
+                try:
+                    return await call()
+                except httpx.HTTPStatusError as e:
+                    if not is_rate_limited(e) or attempt == RATE_LIMIT_RETRIES:
+                        raise
+                    self._pause(retry_after_seconds(e, attempt))
+        raise AssertionError("unreachable")
+
+    async def stream(
+        self, priority: Priority, chat_id: Optional[int], open_stream: Callable[[], AsyncGenerator[str, None]]
+    ) -> AsyncIterator[str]:
+        """
+        Like run(), for a streamed response; the slot is held until the stream ends.
+
+        A 429 is retried only before the first delta, as a retry would repeat text.
+        """
+        await self._admit(priority, chat_id)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            async with self._slot(priority):
+                started = False
+                deltas = open_stream()
+                try:
+                    async for delta in deltas:
+                        started = True
+                        yield delta
+                    return
+                except httpx.HTTPStatusError as e:
+                    if started or not is_rate_limited(e) or attempt == RATE_LIMIT_RETRIES:
+                        raise
+                    self._pause(retry_after_seconds(e, attempt))
+                finally:
+                    await deltas.aclose()
+
+    def _shed(self, priority: Priority, reason: str) -> None:
+        performance_monitor.record_metric(
+            "gpt_requests_shed", 1, "count", {"priority": priority.name.lower(), "reason": reason}
+        )
+        raise GPTOverloaded(f"{priority.name.lower()} GPT request dropped: {reason}")
+
+    async def _admit(self, priority: Priority, chat_id: Optional[int]) -> None:
+        limit = self.shed_queue_depth.get(priority)
+        if limit is not None and self.queue_depth >= limit:
+            self._shed(priority, "queue full")
+        if chat_id is None:
+            return
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            while len(self._buckets) > MAX_TRACKED_CHATS:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(chat_id)
+        while (delay := bucket.take()) > 0:
+            if priority == Priority.BACKGROUND:
+                self._shed(priority, "chat rate limit")
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def _slot(self, priority: Priority) -> AsyncIterator[None]:
+        start = time.monotonic()
+        await self._acquire(priority)
+        try:
+            while (delay := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+            performance_monitor.record_metric(
+                "gpt_queue_wait", time.monotonic() - start, "seconds", {"priority": priority.name.lower()}
+            )
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: Priority) -> None:
+        # Free slots are handed straight to waiters, so waiters imply no free slot
+        if self._active < self.max_concurrency:
+            self._active += 1
+            return
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # the slot was handed over just as we were cancelled
+            raise
+
+    def _release(self) -> None:
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def _pause(self, seconds: float) -> None:
+        logger.warning(f"GPT API rate limited; pausing requests for {seconds:.1f}s")
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
@@ -0,0 +1,136 @@
+"""
+Streaming GPT replies into a Telegram message.
+
+``iter_sse_deltas`` turns the server-sent events of a streamed chat
+completion (``"stream": true``) into content deltas. ``stream_reply`` sends a
+placeholder reply and edits it with the accumulated text as deltas arrive,
+at most once per edit interval and never earlier than a ``RetryAfter`` from
+Telegram asks. Half-written Markdown cannot be parsed, so intermediate edits
+are plain text with a cursor; the final edit uses Markdown and falls back to
+plain text when Telegram rejects the entities.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Optional
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+from modules.shared_constants import GPTConstants
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_TEXT = "✍️ …"
+CURSOR = " ▌"
+TRUNCATION_NOTE = "\n\n[Message truncated due to length limit]"
+
+
+class StreamError(RuntimeError):
+    """The API reported an error inside the event stream."""
+
+
+async def iter_sse_deltas(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Yield the content deltas of a streamed chat completion from its SSE lines."""
+    async for line in lines:
+        # Blank lines separate events; ":" lines are keep-alive comments
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        chunk = json.loads(data)
+        if chunk.get("error"):
+            raise StreamError(str(chunk["error"].get("message", chunk["error"])))
+        for choice in chunk.get("choices") or []:
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """Return how long Telegram asked to wait, whichever type retry_after has."""
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+def _fit(text: str, max_length: int) -> str:
+    if len(text) <= max_length:
+        return text
+    return text[:max_length - len(TRUNCATION_NOTE)] + TRUNCATION_NOTE
+
+
+async def _edit(message: Message, text: str, parse_mode: Optional[str] = None) -> None:
+    try:
+        await message.edit_text(text, parse_mode=parse_mode)
+    except BadRequest as e:
+        if "not modified" in str(e).lower():
+            return
+        if parse_mode is None:
+            raise
+        logger.warning(f"Streamed reply is not valid {parse_mode}, sending plain text: {e}")
+        await message.edit_text(text)
+
+
+async def stream_reply(
+    message: Message,
+    deltas: AsyncIterator[str],
+    private: bool = False,
+    max_length: int = GPTConstants.MAX_TELEGRAM_MESSAGE_LENGTH,
+) -> str:
+    """
+    Reply to message with the streamed text, editing it in place; return the final text.
+
+    If the stream fails, the placeholder is removed and the error re-raised.
+    """
+    interval = GPTConstants.STREAM_EDIT_INTERVAL_PRIVATE if private else GPTConstants.STREAM_EDIT_INTERVAL_GROUP
+    reply = await message.reply_text(PLACEHOLDER_TEXT)
+    text = ""
+    shown = ""
+    next_edit = time.monotonic() + interval
+    try:
+        async for delta in deltas:
+            text += delta
+            if len(text) > max_length:
+                # Nothing more fits; stop reading and finish with what we have
+                break
+            now = time.monotonic()
+            if now < next_edit or text.strip() == shown:
+                continue
+            try:
+                await _edit(reply, text.strip()[:max_length - len(CURSOR)] + CURSOR)
+                shown = text.strip()
+            except RetryAfter as e:
+                seconds = retry_after_seconds(e)
+                logger.info(f"Telegram asked to slow down streamed edits by {seconds}s")
+                next_edit = now + max(seconds, interval)
+                continue
+            except TelegramError as e:
+                # A lost intermediate edit only delays the text; the final edit matters
+                logger.warning(f"Streamed edit failed: {e}")
+            next_edit = now + interval
+    except Exception:
+        try:
+            await reply.delete()
+        except Exception as delete_error:
+            logger.warning(f"Failed to delete streaming placeholder: {delete_error}")
+        raise
+    finally:
+        # Leaving early (length limit, error) must still close the HTTP stream
+        aclose = getattr(deltas, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    final = _fit(text.strip(), max_length)
+    if not final:
+        await reply.delete()
+        return ""
+    try:
+        await _edit(reply, final, parse_mode="Markdown")
+    except RetryAfter as e:
+        # The final text must land, so wait as long as Telegram asks once
+        await asyncio.sleep(retry_after_seconds(e))
+        await _edit(reply, final, parse_mode="Markdown")
+    return final
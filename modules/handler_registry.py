@@ -37,6 +37,7 @@ class HandlerRegistry(ServiceInterface):
         self.command_processor = command_processor
         self.service_registry = service_registry
         self._registered = False
+        self._video_downloader: Optional[Any] = None
 
     async def initialize(self) -> None:
         """Initialize the handler registry."""
@@ -44,7 +45,13 @@ class HandlerRegistry(ServiceInterface):
         logger.info("Handler Registry initialized")
 
     async def shutdown(self) -> None:
-        """Shutdown the handler registry."""
+        """Shutdown the handler registry and the video downloader's worker processes."""
+        if self._video_downloader is not None:
+            try:
+                await self._video_downloader.close()
+            except Exception as e:
+                logger.error(f"Error closing video downloader: {e}")
+            self._video_downloader = None
         logger.info("Handler Registry shutdown")
 
     async def register_all_handlers(
@@ -105,6 +112,7 @@ class HandlerRegistry(ServiceInterface):
             report_command,
             stats_command,
             nasa_command,
+            search_command,
         )
         from modules.handlers.admin_commands import mute_command, unmute_command
         from modules.handlers.speech_commands import speech_command
@@ -176,6 +184,11 @@ class HandlerRegistry(ServiceInterface):
             "stats", stats_command, "Show chat statistics"
         )
 
+        # Search command
+        self.command_processor.register_text_command(
+            "search", search_command, "Search messages in chat"
+        )
+
         # NASA APOD command
         self.command_processor.register_text_command(
             "nasa", nasa_command, "NASA Astronomy Picture of the Day", chat_action=ChatAction.UPLOAD_PHOTO
@@ -376,3 +389,4 @@ class HandlerRegistry(ServiceInterface):
         setup_video_handlers(
             application, extract_urls_func=extract_urls, config_manager=config_manager
         )
+        self._video_downloader = application.bot_data.get("video_downloader")
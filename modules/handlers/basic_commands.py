@@ -28,7 +28,8 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         "📊 **Статистика:**\n"
         "• `/stats` — статистика чату\n"
         "• `/mystats` — особиста статистика\n"
-        "• `/count` — кількість повідомлень\n\n"
+        "• `/count` — кількість повідомлень\n"
+        "• `/search <запит>` — пошук у повідомленнях чату\n\n"
 
         "🌤 **Погода та космос:**\n"
         "• `/weather <місто>` — погода\n"
@@ -74,6 +75,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "• `/stats` — статистика чату\n"
         "• `/mystats` — особиста статистика використання\n"
         "• `/count` — кількість повідомлень\n"
+        "• `/search <запит>` — пошук у повідомленнях чату\n"
 
         "🌤 **Погода та космос:**\n"
         "• `/weather <місто>` — поточна погода\n"
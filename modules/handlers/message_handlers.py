@@ -97,12 +97,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             chat_cfg = await config_manager.get_config(
                 chat_id=str(update.effective_chat.id),
                 chat_type=update.effective_chat.type,
+                module_name="chat_behavior",
             )
-            cb_overrides = (
-                chat_cfg.get("config_modules", {})
-                .get("chat_behavior", {})
-                .get("overrides", {})
-            )
+            cb_overrides = chat_cfg.get("overrides", {})
             ban_words = cb_overrides.get("ban_words", [])
             ban_symbols = cb_overrides.get("ban_symbols", [])
         except Exception as cfg_err:
@@ -78,8 +78,9 @@ async def _handle_shorts_download(context, chat_id, message_id, shorts_url, user
             reply_to_message_id=message_id,
         )
         async with _chat_action_for(context.bot, chat_id, ChatAction.UPLOAD_VIDEO):
-            filename, title = await asyncio.wait_for(
-                video_downloader.download_video(watch_url), timeout=60
+            # download_video times out on its own once it leaves the download queue
+            filename, title = await video_downloader.download_video(
+                watch_url, str(chat_id), user_id=str(user.id) if user else None
             )
 
             if not filename or not os.path.exists(filename):
@@ -138,8 +139,5 @@ async def _handle_shorts_download(context, chat_id, message_id, shorts_url, user
 
     finally:
         in_progress.discard(key)
-        if filename and os.path.exists(filename):
-            try:
-                os.remove(filename)
-            except Exception:
-                pass  # cleanup
+        if filename:
+            video_downloader.release_download(filename)
@@ -694,10 +694,6 @@ async def short_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         file_size = os.path.getsize(filename)
         if file_size > 50 * 1024 * 1024:
             await processing_msg.edit_text("Video file is too large to send (>50MB).")
-            try:
-                os.remove(filename)
-            except Exception:
-                pass
             return
 
         try:
@@ -738,8 +734,5 @@ async def short_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             pass
 
     finally:
-        if filename and os.path.exists(filename):
-            try:
-                os.remove(filename)
-            except Exception as e:
-                logger.warning(f"Could not remove temporary file {filename}: {e}")
+        if filename:
+            video_downloader.release_download(filename)
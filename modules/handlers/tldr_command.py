@@ -1,8 +1,21 @@
-"""TLDR command handler — fetches URL content or summarizes replied message text."""
-
+"""
+TLDR command handler — fetches URL content or summarizes replied message text.
+
+Long texts are split on paragraph and sentence boundaries into chunks of
+about ``CHUNK_MAX_TOKENS`` estimated tokens, the chunks are summarized
+concurrently (at most ``CHUNK_CONCURRENCY`` calls at once) and the partial
+summaries merged. Final summaries are kept in memory per language, keyed both
+by the canonical URL and by a hash of the summarized text, so a re-posted
+article is answered without fetching or calling GPT again.
+"""
+
+import asyncio
+import hashlib
 import html as html_lib
 import re
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 from urllib.parse import urlparse, urlunparse
 
 import httpx
@@ -10,11 +23,24 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 from modules.gpt import GPT_MODEL_TEXT, client
+from modules.gpt_scheduler import Priority
 from modules.logger import error_logger
+from modules.performance_monitor import performance_monitor
+from modules.text_chunks import split_text
+from modules.url_processor import strip_tracking_params
 from config_v2.compat import get_shared_config_manager
 
-CHUNK_SIZE = 4000
+# Estimated prompt tokens per chunk, and chunk summaries requested at once
+CHUNK_MAX_TOKENS = 3000
+CHUNK_CONCURRENCY = 4
 MAX_CONTENT_LENGTH = 40_000
+
+# Final summaries remembered, and for how long (pages do change)
+SUMMARY_CACHE_SIZE = 500
+SUMMARY_CACHE_TTL = 6 * 3600
+
+SUMMARY_FAILED = "Не вдалося згенерувати підсумок."
+
 URL_PATTERN = re.compile(r'https?://\S+')
 REDDIT_DOMAIN_PATTERN = re.compile(r'https?://(?:www\.)?reddit\.com/', re.IGNORECASE)
 REDDIT_POST_PATTERN = re.compile(r'https?://(?:www\.)?reddit\.com/r/\w+/comments/\w+', re.IGNORECASE)
@@ -41,6 +67,9 @@ _CHUNK_PROMPTS = {
     "original": "Summarize this part of the text concisely, preserving the original language:",
 }
 
+# key -> (expires at, summary), least recently used first
+_summaries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
 _MERGE_PROMPTS = {
     "ukrainian": "Об'єднай ці часткові підсумки в один зв'язний підсумок українською мовою:",
     "english": "Combine these partial summaries into one coherent summary in English:",
@@ -127,9 +156,19 @@ async def _fetch_url_text(url: str) -> Optional[str]:
             html_content,
             flags=re.DOTALL | re.IGNORECASE,
         )
+        # Source line breaks mean nothing in HTML; block boundaries become
+        # paragraph breaks so long pages are chunked on them
+        html_content = re.sub(r'\s+', ' ', html_content)
+        html_content = re.sub(
+            r'<(?:br|/p|/div|/h[1-6]|/li|/tr|/blockquote|/article|/section)\b[^>]*>',
+            '\n\n',
+            html_content,
+            flags=re.IGNORECASE,
+        )
         text = re.sub(r'<[^>]+>', ' ', html_content)
         text = html_lib.unescape(text)
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = re.sub(r'[^\S\n]+', ' ', text)
+        text = re.sub(r'\s*\n\s*', '\n\n', text).strip()
 
         if len(text) > MAX_CONTENT_LENGTH:
             text = text[:MAX_CONTENT_LENGTH]
@@ -143,6 +182,35 @@ async def _fetch_url_text(url: str) -> Optional[str]:
         return None
 
 
+def _url_key(url: str, lang: str) -> str:
+    return f"url:{lang}:{strip_tracking_params(url)}"
+
+
+def _content_key(text: str, lang: str) -> str:
+    return f"text:{lang}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+def _cached_summary(key: str) -> Optional[str]:
+    entry = _summaries.get(key)
+    if entry is None:
+        return None
+    expires_at, summary = entry
+    if expires_at < time.monotonic():
+        del _summaries[key]
+        return None
+    _summaries.move_to_end(key)
+    return summary
+
+
+def _remember_summary(summary: str, *keys: str) -> None:
+    expires_at = time.monotonic() + SUMMARY_CACHE_TTL
+    for key in keys:
+        _summaries[key] = (expires_at, summary)
+        _summaries.move_to_end(key)
+    while len(_summaries) > SUMMARY_CACHE_SIZE:
+        _summaries.popitem(last=False)
+
+
 async def _gpt_call(system_prompt: str, user_content: str) -> Optional[str]:
     """Make a single GPT call and return the response text."""
     try:
@@ -154,6 +222,7 @@ async def _gpt_call(system_prompt: str, user_content: str) -> Optional[str]:
             ],
             max_tokens=500,
             temperature=0.4,
+            priority=Priority.ANALYZE,
         )
         return response["choices"][0]["message"]["content"].strip() or None
     except Exception as e:
@@ -161,32 +230,44 @@ async def _gpt_call(system_prompt: str, user_content: str) -> Optional[str]:
         return None
 
 
-async def _summarize_chunked(text: str, lang: str) -> str:
-    """Chunk text, summarize each chunk, then merge into a final summary."""
-    chunks = [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
+async def _timed_gpt_call(metric: str, system_prompt: str, user_content: str) -> Optional[str]:
+    start = time.perf_counter()
+    try:
+        return await _gpt_call(system_prompt, user_content)
+    finally:
+        performance_monitor.record_metric(metric, time.perf_counter() - start, "seconds")
+
+
+async def _summarize_chunked(text: str, lang: str) -> Optional[str]:
+    """Chunk text, summarize the chunks concurrently, then merge; None if nothing came back."""
+    chunks = split_text(text, CHUNK_MAX_TOKENS)
     system_prompt = _SYSTEM_PROMPTS[lang]
     chunk_prompt = _CHUNK_PROMPTS[lang]
 
     if len(chunks) == 1:
-        result = await _gpt_call(system_prompt, f"{chunk_prompt}\n\n{chunks[0]}")
-        return result or "Не вдалося згенерувати підсумок."
-
-    chunk_summaries = []
-    for i, chunk in enumerate(chunks):
-        summary = await _gpt_call(
-            system_prompt,
-            f"{chunk_prompt} ({i + 1}/{len(chunks)})\n\n{chunk}",
-        )
-        if summary:
-            chunk_summaries.append(summary)
+        return await _timed_gpt_call("tldr_chunk_duration", system_prompt, f"{chunk_prompt}\n\n{chunks[0]}")
+
+    semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+    async def summarize(i: int, chunk: str) -> Optional[str]:
+        async with semaphore:
+            return await _timed_gpt_call(
+                "tldr_chunk_duration",
+                system_prompt,
+                f"{chunk_prompt} ({i + 1}/{len(chunks)})\n\n{chunk}",
+            )
+
+    results = await asyncio.gather(*(summarize(i, chunk) for i, chunk in enumerate(chunks)))
+    chunk_summaries: List[str] = [summary for summary in results if summary]
 
     if not chunk_summaries:
-        return "Не вдалося згенерувати підсумок."
+        return None
     if len(chunk_summaries) == 1:
         return chunk_summaries[0]
 
     merge_prompt = _MERGE_PROMPTS[lang]
-    merged = await _gpt_call(
+    merged = await _timed_gpt_call(
+        "tldr_merge_duration",
         system_prompt,
         f"{merge_prompt}\n\n" + "\n\n---\n\n".join(chunk_summaries),
     )
@@ -228,15 +309,27 @@ async def tldr_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     replied = update.message.reply_to_message
     replied_text = replied.text or replied.caption or ""
     url_match = URL_PATTERN.search(replied_text)
+    url = url_match.group(0).rstrip(".,;)") if url_match else None
+
+    if url:
+        cached = _cached_summary(_url_key(url, lang))
+        if cached:
+            performance_monitor.record_cache_hit("tldr")
+            await update.message.reply_text(cached)
+            return
 
     status_msg = await update.message.reply_text("🔄 Читаю та аналізую...")
 
     content: Optional[str] = None
     url_error: Optional[str] = None
 
-    if url_match:
-        url = url_match.group(0).rstrip(".,;)")
+    if url:
+        start = time.perf_counter()
         content = await _fetch_url_text(url)
+        performance_monitor.record_metric(
+            "tldr_fetch_duration", time.perf_counter() - start, "seconds",
+            {"status": "ok" if content is not None else "failed"},
+        )
         if content is None:
             url_error = f"Не вдалося завантажити сторінку ({url[:60]})."
 
@@ -255,7 +348,19 @@ async def tldr_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             await status_msg.edit_text(f"❌ {url_error}")
             return
 
-    summary = await _summarize_chunked(text_to_summarize, lang)
+    # The same text under another URL (or re-posted as text) is summarized once
+    keys = [_content_key(text_to_summarize, lang)]
+    if url and content:
+        keys.append(_url_key(url, lang))
+    summary = _cached_summary(keys[0])
+    if summary:
+        performance_monitor.record_cache_hit("tldr")
+    else:
+        summary = await _summarize_chunked(text_to_summarize, lang)
+    if summary:
+        _remember_summary(summary, *keys)
+    else:
+        summary = SUMMARY_FAILED
 
     try:
         await status_msg.edit_text(summary)
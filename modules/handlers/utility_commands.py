@@ -15,6 +15,7 @@ from modules.error_analytics import error_report_command as _error_report
 from modules.report_command import report_command as _report
 from modules.stats_command import stats_command as _stats
 from modules.nasa_command import nasa_command as _nasa
+from modules.search_command import search_command as _search
 
 logger = logging.getLogger(__name__)
 
@@ -56,4 +57,9 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 async def nasa_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /nasa command for NASA Astronomy Picture of the Day."""
-    await _nasa(update, context)
\ No newline at end of file
+    await _nasa(update, context)
+
+
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /search command for full-text message search."""
+    await _search(update, context)
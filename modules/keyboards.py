@@ -206,13 +206,15 @@ async def button_callback(update: Update, context: CallbackContext[Any, Any, Any
                 filename, title = await video_downloader.download_video(original_link)
 
                 if filename and os.path.exists(filename):
-                    with open(filename, 'rb') as video_file:
-                        await context.bot.send_video(
-                            chat_id=chat_id,
-                            video=video_file,
-                            caption=f"📹 {title or 'Downloaded Video'}"
-                        )
-                    os.remove(filename)
+                    try:
+                        with open(filename, 'rb') as video_file:
+                            await context.bot.send_video(
+                                chat_id=chat_id,
+                                video=video_file,
+                                caption=f"📹 {title or 'Downloaded Video'}"
+                            )
+                    finally:
+                        video_downloader.release_download(filename)
                     if hasattr(query.message, 'edit_text'):
                         await query.message.edit_text("✅ Download complete!")
                 else:
@@ -241,20 +243,22 @@ async def button_callback(update: Update, context: CallbackContext[Any, Any, Any
                     await query.message.edit_text("🔄 Downloading...")
                 filename, title = await video_downloader.download_video(original_link)
                 if filename and os.path.exists(filename):
-                    with open(filename, 'rb') as media_file:
-                        if video_downloader._file_is_image(filename):
-                            await context.bot.send_photo(
-                                chat_id=chat_id,
-                                photo=media_file,
-                                caption=f"📷 {title or 'Instagram Photo'}"
-                            )
-                        else:
-                            await context.bot.send_video(
-                                chat_id=chat_id,
-                                video=media_file,
-                                caption=f"📹 {title or 'Instagram Video'}"
-                            )
-                    os.remove(filename)
+                    try:
+                        with open(filename, 'rb') as media_file:
+                            if video_downloader._file_is_image(filename):
+                                await context.bot.send_photo(
+                                    chat_id=chat_id,
+                                    photo=media_file,
+                                    caption=f"📷 {title or 'Instagram Photo'}"
+                                )
+                            else:
+                                await context.bot.send_video(
+                                    chat_id=chat_id,
+                                    video=media_file,
+                                    caption=f"📹 {title or 'Instagram Video'}"
+                                )
+                    finally:
+                        video_downloader.release_download(filename)
                     if hasattr(query.message, 'edit_text'):
                         await query.message.edit_text("✅ Download complete!")
                 else:
@@ -0,0 +1,127 @@
+"""
+Telegram file_id cache of downloaded videos and photos.
+
+Once a video or photo has been uploaded, Telegram can send it again by its
+file_id without another download or upload. ``MediaCache`` keeps those
+file_ids in a JSON file under the key ``media_cache_key`` derives from the
+link, so different shares of one post (short links, mobile hosts, tracking
+parameters) resend the same file. The file holds at most ``_CAP`` entries;
+the oldest are dropped first, and entries Telegram rejects are evicted.
+"""
+
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from modules.url_processor import strip_tracking_params
+
+logger = logging.getLogger(__name__)
+
+_CAP = 5000
+
+# Platform media IDs, matched against host + path with "www." and "m." dropped
+_MEDIA_ID_PATTERNS = [
+    ("youtube", re.compile(r'^(?:youtube\.com/(?:shorts|embed|live|clip)/|youtu\.be/)([\w-]+)')),
+    ("tiktok", re.compile(r'^tiktok\.com/(?:@[^/]+/(?:video|photo)|v|embed(?:/v2)?)/(\d+)')),
+    ("instagram", re.compile(r'^(?:dd|to)?instagram\.com/(?:[^/]+/)?(?:p|reels?|tv)/([\w-]+)')),
+    ("twitter", re.compile(r'^(?:twitter|x|fxtwitter|vxtwitter|fixupx)\.com/[^/]+/status/(\d+)')),
+    ("reddit", re.compile(r'^reddit\.com/r/[^/]+/comments/(\w+)')),
+]
+
+
+def media_cache_key(url: str) -> str:
+    """
+    Return the cache key of a media link: the platform and media ID where it
+    can be read from the URL, else the URL without tracking parameters.
+
+    Different shares of one video (youtu.be vs youtube.com/shorts, tracking
+    parameters, mobile hosts) get the same key. Short links such as
+    vm.tiktok.com carry no ID and are only matched exactly.
+    """
+    url = strip_tracking_params(url.strip())
+    parsed = urlparse(url)
+    host = re.sub(r'^(?:www\.|m\.)', '', (parsed.hostname or '').lower())
+    if host == 'youtube.com' and parsed.path == '/watch':
+        video_id = parse_qs(parsed.query).get('v', [''])[0]
+        if video_id:
+            return f"youtube:{video_id}"
+    location = host + parsed.path
+    for platform, pattern in _MEDIA_ID_PATTERNS:
+        match = pattern.match(location)
+        if match:
+            return f"{platform}:{match.group(1)}"
+    return url.rstrip('/')
+
+
+class MediaCache:
+    """Persistent mapping of media link key → Telegram video/photo file_id."""
+
+    def __init__(self, path: str) -> None:
+        self._path = Path(path)
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self._path.exists():
+            logger.info(f"MediaCache: no existing cache at {self._path}")
+            return
+        try:
+            with open(self._path, encoding='utf-8') as f:
+                self._data = json.load(f)
+            logger.info(f"MediaCache: loaded {len(self._data)} entries")
+        except Exception as e:
+            logger.warning(f"MediaCache: load failed ({e}), starting empty")
+            self._data = {}
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key: str, kind: str, file_id: str, title: Optional[str],
+            width: Optional[int] = None, height: Optional[int] = None,
+            duration: Optional[int] = None) -> None:
+        self._data[key] = {
+            'kind': kind,
+            'file_id': file_id,
+            'title': title,
+            'width': width,
+            'height': height,
+            'duration': duration,
+            'stored_at': datetime.now(timezone.utc).isoformat(),
+        }
+        if len(self._data) > _CAP:
+            oldest = sorted(self._data.items(), key=lambda x: x[1].get('stored_at', ''))
+            for old_key, _ in oldest[:len(self._data) - _CAP]:
+                del self._data[old_key]
+        self._save()
+
+    def evict(self, key: str) -> None:
+        if key in self._data:
+            del self._data[key]
+            self._save()
+            logger.info(f"MediaCache: evicted stale entry {key}")
+
+    def _save(self) -> None:
+        tmp = str(self._path) + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False)
+            os.replace(tmp, self._path)
+        except Exception as e:
+            logger.error(f"MediaCache: save failed: {e}")
@@ -0,0 +1,165 @@
+"""
+Size-aware format selection before a video is downloaded.
+
+Telegram bots can upload at most ``TELEGRAM_UPLOAD_LIMIT`` bytes, and the
+size of a download used to be checked only after the whole file had been
+fetched. ``probe_media`` reads a link's format list with yt-dlp (``-J``,
+no download) and ``choose_format`` picks the best format, or video+audio
+pair, whose size fits the limit:
+
+- a format's size is its ``filesize``, else yt-dlp's ``filesize_approx``,
+  else bitrate × duration; estimated sizes must fit with
+  ``ESTIMATE_MARGIN`` to spare;
+- H.264/MP4 formats, which Telegram plays inline, are preferred, then
+  higher resolution, then higher bitrate.
+
+When nothing fits, the smallest format is chosen and ``fits`` is False;
+the caller transcodes the result (see ``modules.video_transcode``). Probe
+results are kept in a ``ProbeCache`` per canonical URL, so a link posted
+again is not probed again.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from modules.ytdlp_pool import YtDlpPool
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_UPLOAD_LIMIT = 50 * 1024 * 1024
+
+# Share of the limit an estimated (not reported) size may use
+ESTIMATE_MARGIN = 0.9
+
+PROBE_CACHE_TTL = 6 * 60 * 60
+PROBE_CACHE_SIZE = 1000
+
+_H264_CODECS = ("avc1", "h264")
+
+
+@dataclass
+class ProbeResult:
+    """The format chosen for a link and what is known about it."""
+    format_id: Optional[str]
+    size: Optional[int]
+    fits: bool
+    duration: Optional[float] = None
+    title: Optional[str] = None
+    tags: List[str] = field(default_factory=list)
+
+
+def estimate_size(fmt: Dict[str, Any], duration: Optional[float]) -> Tuple[Optional[int], bool]:
+    """Return (size in bytes, whether it is exact) of a format, or (None, False) if unknown."""
+    if fmt.get("filesize"):
+        return int(fmt["filesize"]), True
+    if fmt.get("filesize_approx"):
+        return int(fmt["filesize_approx"]), False
+    if fmt.get("tbr") and duration:
+        # tbr is in kbit/s
+        return int(fmt["tbr"] * 1000 / 8 * duration), False
+    return None, False
+
+
+def _has_video(fmt: Dict[str, Any]) -> bool:
+    return fmt.get("vcodec") != "none"
+
+
+def _has_audio(fmt: Dict[str, Any]) -> bool:
+    return fmt.get("acodec") != "none"
+
+
+def _candidates(formats: Sequence[Dict[str, Any]], duration: Optional[float]) -> Iterator[Tuple[str, int, bool, Dict[str, Any]]]:
+    """Yield (format selector, size, exact, video format) for every sized format and video+audio pair."""
+    audio_only = [f for f in formats if _has_audio(f) and not _has_video(f)]
+    for fmt in formats:
+        if not _has_video(fmt) or not fmt.get("format_id"):
+            continue
+        size, exact = estimate_size(fmt, duration)
+        if size is None:
+            continue
+        if _has_audio(fmt):
+            yield fmt["format_id"], size, exact, fmt
+            continue
+        for audio in audio_only:
+            audio_size, audio_exact = estimate_size(audio, duration)
+            if audio_size is not None and audio.get("format_id"):
+                yield f"{fmt['format_id']}+{audio['format_id']}", size + audio_size, exact and audio_exact, fmt
+
+
+def _rank(fmt: Dict[str, Any]) -> Tuple[bool, int, float]:
+    vcodec = str(fmt.get("vcodec") or "avc1")
+    return vcodec.startswith(_H264_CODECS), fmt.get("height") or 0, fmt.get("tbr") or 0.0
+
+
+def choose_format(info: Dict[str, Any], limit: int = TELEGRAM_UPLOAD_LIMIT) -> Optional[ProbeResult]:
+    """Pick the best format of yt-dlp info that fits limit; None if no format has a known size."""
+    duration = info.get("duration")
+    candidates = list(_candidates(info.get("formats") or [], duration))
+    if not candidates:
+        return None
+    fitting = [
+        c for c in candidates
+        if c[1] <= (limit if c[2] else limit * ESTIMATE_MARGIN)
+    ]
+    if fitting:
+        # Among equally ranked formats, the smaller one
+        format_id, size, _, _ = max(fitting, key=lambda c: (_rank(c[3]), -c[1]))
+        fits = True
+    else:
+        format_id, size, _, _ = min(candidates, key=lambda c: c[1])
+        fits = False
+    return ProbeResult(
+        format_id=format_id,
+        size=size,
+        fits=fits,
+        duration=duration,
+        title=info.get("title"),
+        tags=list(info.get("tags") or []),
+    )
+
+
+async def probe_media(
+    pool: YtDlpPool, url: str, extra_args: Sequence[str] = (), limit: int = TELEGRAM_UPLOAD_LIMIT
+) -> Optional[ProbeResult]:
+    """Read the formats of url with yt-dlp and choose one; None if they cannot be read."""
+    result = await pool.run(
+        [url, "-J", "--no-playlist", "--no-warnings", *extra_args], kind="metadata"
+    )
+    if result.returncode != 0:
+        logger.info(f"Format probe failed for {url}: {result.stderr.decode()[-200:].strip()}")
+        return None
+    try:
+        info = json.loads(result.stdout)
+    except ValueError as e:
+        logger.warning(f"Format probe returned invalid JSON for {url}: {e}")
+        return None
+    return choose_format(info, limit)
+
+
+class ProbeCache:
+    """Probe results by canonical URL, dropped after ttl seconds or when over capacity."""
+
+    def __init__(self, ttl: float = PROBE_CACHE_TTL, capacity: int = PROBE_CACHE_SIZE) -> None:
+        self.ttl = ttl
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Tuple[float, ProbeResult]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[ProbeResult]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        return result
+
+    def set(self, key: str, result: ProbeResult) -> None:
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
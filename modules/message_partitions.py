@@ -0,0 +1,209 @@
+"""
+Monthly range partitioning and retention for the messages table.
+
+``messages`` is partitioned by ``timestamp`` into one partition per UTC
+month (``messages_YYYY_MM``) plus a ``messages_default`` catch-all for rows
+outside every range, e.g. imported history. ``ensure_message_partitions`` is
+called at bootstrap to create the partitions for the coming months, and
+``apply_message_retention`` ages out old partitions:
+
+- ``strip_raw``: clear ``raw_telegram_message`` (everything the bot queries
+  is denormalized into columns and rollups) and keep the rows;
+- ``archive``: detach the partition, move its rows into the compressed
+  ``messages_archive`` table and drop it.
+
+Databases created before partitioning are converted with
+``scripts/partition_messages.py``; until then every function here is a no-op.
+"""
+
+import logging
+import re
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+RETENTION_MODES = ("strip_raw", "archive")
+
+DEFAULT_PARTITION = "messages_default"
+
+_PARTITION_NAME_RE = re.compile(r"^messages_(\d{4})_(\d{2})$")
+
+# Table comment marking partitions whose raw JSON has already been cleared
+_RAW_STRIPPED_MARK = "raw_telegram_message stripped by retention"
+
+# Columns copied into messages_archive
+MESSAGE_COLUMNS = (
+    "internal_message_id", "message_id", "chat_id", "user_id", "timestamp", "text",
+    "is_command", "command_name", "is_gpt_reply", "replied_to_message_id",
+    "gpt_context_message_ids", "raw_telegram_message", "message_kind",
+)
+
+CREATE_ARCHIVE_SQL = """
+CREATE TABLE IF NOT EXISTS messages_archive (
+    internal_message_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    chat_id BIGINT NOT NULL,
+    user_id BIGINT,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    text TEXT,
+    is_command BOOLEAN,
+    command_name VARCHAR(255),
+    is_gpt_reply BOOLEAN,
+    replied_to_message_id BIGINT,
+    gpt_context_message_ids JSONB,
+    raw_telegram_message JSONB,
+    message_kind SMALLINT,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_messages_archive_chat_ts ON messages_archive(chat_id, timestamp);
+"""
+
+
+def month_start(dt: datetime, offset: int = 0) -> datetime:
+    """Return the first instant (UTC) of the month of ``dt`` shifted by ``offset`` months."""
+    dt = dt.astimezone(pytz.UTC)
+    index = dt.year * 12 + (dt.month - 1) + offset
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=pytz.UTC)
+
+
+def partition_name(month: datetime) -> str:
+    """Name of the partition holding ``month``, e.g. ``messages_2024_05``."""
+    return f"messages_{month.year:04d}_{month.month:02d}"
+
+
+async def is_partitioned(conn: Any, table: str = "messages") -> bool:
+    """Return True if ``table`` is a range-partitioned table."""
+    return bool(await conn.fetchval(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = $1 AND pg_table_is_visible(c.oid)
+        )
+        """,
+        table,
+    ))
+
+
+async def list_month_partitions(conn: Any, parent: str = "messages") -> List[Tuple[str, datetime]]:
+    """Return (partition name, month start) for every monthly partition, oldest first."""
+    rows = await conn.fetch(
+        """
+        SELECT child.relname AS name
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE parent.relname = $1 AND pg_table_is_visible(parent.oid)
+        """,
+        parent,
+    )
+    partitions = []
+    for row in rows:
+        match = _PARTITION_NAME_RE.match(row["name"])
+        if match:
+            partitions.append(
+                (row["name"], datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=pytz.UTC))
+            )
+    return sorted(partitions, key=lambda p: p[1])
+
+
+async def create_month_partition(conn: Any, month: datetime, parent: str = "messages") -> str:
+    """Create the partition of ``parent`` covering ``month`` if it does not exist yet."""
+    start = month_start(month)
+    end = month_start(month, 1)
+    name = partition_name(start)
+    await conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    return name
+
+
+async def ensure_message_partitions(
+    conn: Any,
+    months_ahead: int,
+    since: Optional[datetime] = None,
+    parent: str = "messages",
+) -> List[str]:
+    """Create the default partition and monthly partitions up to ``months_ahead`` months from now.
+
+    ``since`` extends the range backwards and ``parent`` names the staging
+    table while an existing table is being converted; partitions always get
+    their final ``messages_*`` names. Returns the monthly partitions ensured.
+    """
+    if not await is_partitioned(conn, parent):
+        return []
+
+    await conn.execute(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {parent} DEFAULT")
+
+    now = datetime.now(pytz.UTC)
+    month = month_start(since or now)
+    last = month_start(now, months_ahead)
+    names = []
+    while month <= last:
+        try:
+            names.append(await create_month_partition(conn, month, parent))
+        except Exception as e:
+            # Usually rows for this month already sit in the default partition
+            logger.error(f"Could not create partition {partition_name(month)}: {e}")
+        month = month_start(month, 1)
+    return names
+
+
+async def _strip_raw(conn: Any, name: str) -> bool:
+    marked = await conn.fetchval("SELECT obj_description($1::regclass, 'pg_class')", name)
+    if marked == _RAW_STRIPPED_MARK:
+        return False
+    status = await conn.execute(
+        f"UPDATE {name} SET raw_telegram_message = NULL WHERE raw_telegram_message IS NOT NULL"
+    )
+    await conn.execute(f"COMMENT ON TABLE {name} IS '{_RAW_STRIPPED_MARK}'")
+    logger.info(f"Retention: stripped raw messages from {name} ({status})")
+    return True
+
+
+async def _archive(conn: Any, name: str) -> bool:
+    columns = ", ".join(MESSAGE_COLUMNS)
+    await conn.execute(CREATE_ARCHIVE_SQL)
+    try:
+        await conn.execute(
+            "ALTER TABLE messages_archive ALTER COLUMN raw_telegram_message SET COMPRESSION lz4"
+        )
+    except Exception as e:
+        logger.debug(f"lz4 compression unavailable for messages_archive, using default: {e}")
+    async with conn.transaction():
+        await conn.execute(f"ALTER TABLE messages DETACH PARTITION {name}")
+        status = await conn.execute(
+            f"INSERT INTO messages_archive ({columns}) SELECT {columns} FROM {name}"
+        )
+        await conn.execute(f"DROP TABLE {name}")
+    logger.info(f"Retention: archived {name} into messages_archive ({status})")
+    return True
+
+
+async def apply_message_retention(conn: Any, retention_months: int, mode: str) -> List[str]:
+    """Apply the retention policy to partitions older than ``retention_months`` full months.
+
+    Returns the partitions that were changed. A non-positive retention keeps
+    everything.
+    """
+    if retention_months <= 0:
+        return []
+    if mode not in RETENTION_MODES:
+        raise ValueError(f"Unknown retention mode {mode!r}, expected one of {RETENTION_MODES}")
+    if not await is_partitioned(conn):
+        logger.info("Retention skipped: messages is not partitioned")
+        return []
+
+    cutoff = month_start(datetime.now(pytz.UTC), -retention_months)
+    changed = []
+    for name, month in await list_month_partitions(conn):
+        if month_start(month, 1) > cutoff:
+            break
+        done = await (_archive(conn, name) if mode == "archive" else _strip_raw(conn, name))
+        if done:
+            changed.append(name)
+    return changed
@@ -0,0 +1,90 @@
+"""
+Ranked full-text search over a chat's messages, used by /search and
+``MessageRepository.search_messages``.
+
+``messages.search_vector`` is a stored tsvector generated with the
+``chat_search`` configuration (Ukrainian hunspell stemming where the server
+has the dictionary, unaccent, then ``simple``, see ``CREATE_TABLES_SQL``) and
+indexed with GIN, so a query only touches the chat's matching rows. The
+newest ``SEARCH_MAX_CANDIDATES`` matches are ranked with ``ts_rank`` and
+paged with a (rank, internal_message_id) keyset; snippets are only built for
+the rows of the page.
+
+Databases created before ``search_vector`` existed are migrated with
+``scripts/migrations/20261016_add_message_search_vector.py``; until then the
+vectors are computed on the fly with the same configuration.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from modules.rollup_state import rollup_ready
+
+SEARCH_CONFIG = "chat_search"
+
+# rollup_state name recorded once messages has the stored search_vector column
+SEARCH_VECTOR_STATE = "search_vector"
+
+# Hits per page and how many of the newest matches are ranked at all
+SEARCH_PAGE_SIZE = 5
+SEARCH_MAX_CANDIDATES = 2000
+
+# Unlikely characters marking the matched words inside snippets
+SNIPPET_START = "⟦"
+SNIPPET_STOP = "⟧"
+
+# The tsquery is repeated rather than joined from a CTE so the planner can use the GIN index
+_TSQUERY = f"websearch_to_tsquery('{SEARCH_CONFIG}', $2)"
+
+_SEARCH_SQL = f"""
+    WITH hits AS (
+        SELECT m.internal_message_id, m.message_id, m.user_id, m.timestamp, m.text,
+               ts_rank({{vector}}, {_TSQUERY}) AS rank
+        FROM messages m
+        WHERE m.chat_id = $1 AND {{vector}} @@ {_TSQUERY}
+        ORDER BY m.timestamp DESC
+        LIMIT {SEARCH_MAX_CANDIDATES}
+    ), page AS (
+        SELECT * FROM hits
+        WHERE $3::real IS NULL OR (rank, internal_message_id) < ($3::real, $4::bigint)
+        ORDER BY rank DESC, internal_message_id DESC
+        LIMIT $5
+    )
+    SELECT p.internal_message_id, p.message_id, p.timestamp, p.rank,
+           u.username, u.first_name,
+           ts_headline('{SEARCH_CONFIG}', p.text, {_TSQUERY},
+                       'MaxWords=20, MinWords=8, MaxFragments=1, '
+                       'StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}') AS snippet
+    FROM page p
+    LEFT JOIN users u ON u.user_id = p.user_id
+    ORDER BY p.rank DESC, p.internal_message_id DESC
+"""
+
+_VECTOR_SQL = _SEARCH_SQL.format(vector="m.search_vector")
+_INLINE_VECTOR_SQL = _SEARCH_SQL.format(
+    vector=f"to_tsvector('{SEARCH_CONFIG}'::regconfig, COALESCE(m.text, ''))"
+)
+
+Cursor = Tuple[float, int]
+
+
+async def search_vector_ready(conn: Any) -> bool:
+    """Return True once messages has the stored ``search_vector`` column."""
+    return await rollup_ready(conn, SEARCH_VECTOR_STATE)
+
+
+async def search_messages(
+    conn: Any,
+    chat_id: int,
+    query: str,
+    after: Optional[Cursor] = None,
+    limit: int = SEARCH_PAGE_SIZE,
+) -> Tuple[List[Dict[str, Any]], Optional[Cursor]]:
+    """Return one page of hits, best first, and the cursor of the next page (None on the last)."""
+    sql = _VECTOR_SQL if await search_vector_ready(conn) else _INLINE_VECTOR_SQL
+    rank, last_id = after if after else (None, None)
+    rows = await conn.fetch(sql, chat_id, query, rank, last_id, limit + 1)
+    hits = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit and hits:
+        next_cursor = (hits[-1]["rank"], hits[-1]["internal_message_id"])
+    return hits, next_cursor
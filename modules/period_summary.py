@@ -0,0 +1,152 @@
+"""
+Map-reduce summaries for /analyze periods spanning several days.
+
+A multi-day period is summarized one Kyiv calendar day at a time (map), and
+the day summaries are merged into the final analysis (reduce). Day summaries
+are stored in ``analysis_day_summaries`` with the watermark of the day they
+were built from (see ``chat_analysis.WindowWatermark``); the watermarks of all
+days of a period come from one index-only query, so a day is summarized again
+only when its messages changed. Past days never change, so repeating a long
+analysis costs a single merge call and a period that grew by a day costs one
+day summary more.
+
+Days are summarized concurrently, at most ``DAY_SUMMARY_CONCURRENCY`` at once;
+a day too long for one prompt is split into token-bounded chunks whose
+summaries are joined. The GPT calls themselves are supplied by the caller
+(``modules.gpt``).
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from modules.chat_analysis import (
+    WindowWatermark,
+    day_bounds,
+    format_analysis_lines,
+    get_messages_for_chat_window,
+)
+from modules.const import KYIV_TZ
+from modules.database import Database
+from modules.text_chunks import pack_lines
+
+logger = logging.getLogger(__name__)
+
+# Day summaries requested from the API at once
+DAY_SUMMARY_CONCURRENCY = 4
+
+# Estimated prompt tokens per chunk of a day, and the length of a day summary
+DAY_CHUNK_MAX_TOKENS = 12000
+DAY_SUMMARY_MAX_TOKENS = 400
+
+_DAY_WATERMARKS_SQL = f"""
+    SELECT (timestamp AT TIME ZONE '{KYIV_TZ.zone}')::date AS day,
+           COUNT(*) AS messages,
+           MIN(internal_message_id) AS first_id,
+           MAX(internal_message_id) AS last_id
+    FROM messages
+    WHERE chat_id = $1
+    AND timestamp >= $2
+    AND timestamp < $3
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+_STORED_DAYS_SQL = """
+    SELECT day, watermark, summary
+    FROM analysis_day_summaries
+    WHERE chat_id = $1 AND day >= $2 AND day <= $3
+"""
+
+_STORE_DAY_SQL = """
+    INSERT INTO analysis_day_summaries (chat_id, day, watermark, summary, created_at)
+    VALUES ($1, $2, $3, $4, NOW())
+    ON CONFLICT (chat_id, day)
+    DO UPDATE SET watermark = EXCLUDED.watermark, summary = EXCLUDED.summary, created_at = EXCLUDED.created_at
+"""
+
+SummarizeChunk = Callable[[date, str], Awaitable[str]]
+MergeSummaries = Callable[[str], Awaitable[Optional[str]]]
+
+
+@dataclass
+class PeriodPlan:
+    """The days of a period with messages, and which of them are already summarized."""
+    chat_id: int
+    watermarks: Dict[date, WindowWatermark]
+    summaries: Dict[date, str] = field(default_factory=dict)
+
+    @property
+    def messages(self) -> int:
+        return sum(watermark.messages for watermark in self.watermarks.values())
+
+    @property
+    def missing_days(self) -> List[date]:
+        return [day for day in sorted(self.watermarks) if day not in self.summaries]
+
+
+async def plan_period(chat_id: int, first_day: date, last_day: date) -> PeriodPlan:
+    """Read the day watermarks of [first_day, last_day] and the stored summaries still valid."""
+    start, end = day_bounds(first_day, last_day)
+    pool = await Database.get_pool()
+    async with pool.acquire() as conn:
+        day_rows = await conn.fetch(_DAY_WATERMARKS_SQL, chat_id, start, end)
+        stored_rows = await conn.fetch(_STORED_DAYS_SQL, chat_id, first_day, last_day)
+
+    plan = PeriodPlan(chat_id, {
+        row['day']: WindowWatermark(row['messages'], row['first_id'], row['last_id'])
+        for row in day_rows
+    })
+    for row in stored_rows:
+        watermark = plan.watermarks.get(row['day'])
+        if watermark is not None and str(watermark) == row['watermark']:
+            plan.summaries[row['day']] = row['summary']
+    return plan
+
+
+async def _summarize_day(
+    plan: PeriodPlan, day: date, summarize_chunk: SummarizeChunk, semaphore: asyncio.Semaphore
+) -> None:
+    async with semaphore:
+        # The watermark was read first: messages arriving meanwhile only make
+        # the stored summary look stale next time, never the other way round
+        watermark = plan.watermarks[day]
+        messages = await get_messages_for_chat_window(plan.chat_id, *day_bounds(day, day))
+        chunks = pack_lines(format_analysis_lines(messages), DAY_CHUNK_MAX_TOKENS)
+        parts = [await summarize_chunk(day, "\n".join(chunk)) for chunk in chunks]
+        summary = "\n".join(part.strip() for part in parts if part and part.strip())
+
+    pool = await Database.get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(_STORE_DAY_SQL, plan.chat_id, day, str(watermark), summary)
+    plan.summaries[day] = summary
+
+
+async def summarize_period(
+    plan: PeriodPlan,
+    summarize_chunk: SummarizeChunk,
+    merge: MergeSummaries,
+    concurrency: int = DAY_SUMMARY_CONCURRENCY,
+) -> Optional[str]:
+    """
+    Summarize the days of plan that have no valid summary yet, then merge all days.
+
+    Each finished day is stored at once, so if one day fails the others are
+    not paid for again on the next attempt.
+    """
+    missing = plan.missing_days
+    if missing:
+        logger.info(f"Summarizing {len(missing)} of {len(plan.watermarks)} days for chat {plan.chat_id}")
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(_summarize_day(plan, day, summarize_chunk, semaphore) for day in missing))
+
+    merge_input = "\n\n".join(
+        f"{day.strftime('%d.%m.%Y')}:\n{plan.summaries[day]}"
+        for day in sorted(plan.watermarks)
+        if plan.summaries.get(day)
+    )
+    if not merge_input:
+        return None
+    return await merge(merge_input)
@@ -0,0 +1,145 @@
+"""
+Concurrent execution of independent read queries.
+
+/stats and /report answer each request with a dozen or more aggregate
+queries that do not depend on each other. A ``QueryPlan`` collects them as
+named steps and ``run`` spreads the steps over several pooled connections,
+so the command waits for the slowest query instead of the sum of all of
+them::
+
+    plan = QueryPlan("stats")
+    plan.fetchval("new_users", "SELECT ...", chat_id)
+    plan.fetch("top_commands", "SELECT ...", chat_id)
+    results = await plan.run(pool)        # {"new_users": 3, "top_commands": [...]}
+
+A plan never takes more than ``max_concurrency`` connections and leaves
+``QUERY_PLAN_RESERVED_CONNECTIONS`` of the pool to message ingestion and
+the other handlers. When the pool cannot spare more than one connection the
+steps run one after another on a single connection, exactly as before.
+
+Every step is timed; steps slower than ``SLOW_QUERY_THRESHOLD`` are logged
+and the duration of the whole plan is reported to the performance monitor
+as ``query_plan_duration``.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from modules.database import QUERY_PLAN_CONCURRENCY, QUERY_PLAN_RESERVED_CONNECTIONS
+from modules.performance_monitor import performance_monitor
+from modules.shared_constants import PerformanceConstants
+
+logger = logging.getLogger(__name__)
+
+Step = Callable[[Any], Awaitable[Any]]
+
+
+def spare_connections(pool: Any) -> int:
+    """Return how many more connections ``pool`` can hand out without waiting."""
+    try:
+        idle = int(pool.get_idle_size())
+        unopened = int(pool.get_max_size()) - int(pool.get_size())
+    except (AttributeError, TypeError, ValueError):
+        return 0
+    return max(idle + unopened, 0)
+
+
+class QueryPlan:
+    """A named set of independent queries, run concurrently when the pool allows."""
+
+    def __init__(self, name: str, max_concurrency: Optional[int] = None) -> None:
+        self.name = name
+        self.max_concurrency = QUERY_PLAN_CONCURRENCY if max_concurrency is None else max_concurrency
+        self.timings: Dict[str, float] = {}
+        self.workers = 0
+        self._steps: Dict[str, Step] = {}
+
+    def __len__(self) -> int:
+        return len(self._steps)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._steps
+
+    def add(self, key: str, step: Step) -> None:
+        """Add a step: ``step(conn)`` is awaited and its result stored under ``key``."""
+        if key in self._steps:
+            raise ValueError(f"Query plan {self.name!r} already has a step {key!r}")
+        self._steps[key] = step
+
+    def fetch(self, key: str, query: str, *args: Any) -> None:
+        self.add(key, lambda conn: conn.fetch(query, *args))
+
+    def fetchrow(self, key: str, query: str, *args: Any) -> None:
+        self.add(key, lambda conn: conn.fetchrow(query, *args))
+
+    def fetchval(self, key: str, query: str, *args: Any) -> None:
+        self.add(key, lambda conn: conn.fetchval(query, *args))
+
+    def concurrency(self, pool: Any) -> int:
+        """Number of connections the next ``run`` on ``pool`` would use."""
+        spare = spare_connections(pool) - QUERY_PLAN_RESERVED_CONNECTIONS
+        return max(1, min(self.max_concurrency, spare, len(self._steps)))
+
+    async def run(self, pool: Any) -> Dict[str, Any]:
+        """Run every step and return their results by key.
+
+        If a step fails the remaining steps are cancelled and the error is
+        raised.
+        """
+        self.timings = {}
+        self.workers = self.concurrency(pool)
+        results: Dict[str, Any] = {}
+        pending: Deque[str] = deque(self._steps)
+        start = time.perf_counter()
+
+        if self.workers == 1:
+            async with pool.acquire() as conn:
+                await self._drain(conn, pending, results)
+        else:
+            tasks = [
+                asyncio.create_task(self._worker(pool, pending, results))
+                for _ in range(self.workers)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+        self._report(time.perf_counter() - start)
+        # Keep the declaration order regardless of completion order
+        return {key: results[key] for key in self._steps}
+
+    async def _worker(self, pool: Any, pending: Deque[str], results: Dict[str, Any]) -> None:
+        if not pending:
+            return
+        async with pool.acquire() as conn:
+            await self._drain(conn, pending, results)
+
+    async def _drain(self, conn: Any, pending: Deque[str], results: Dict[str, Any]) -> None:
+        while pending:
+            key = pending.popleft()
+            step_start = time.perf_counter()
+            try:
+                results[key] = await self._steps[key](conn)
+            finally:
+                self.timings[key] = time.perf_counter() - step_start
+
+    def _report(self, elapsed: float) -> None:
+        mode = "concurrent" if self.workers > 1 else "sequential"
+        performance_monitor.record_metric(
+            "query_plan_duration", elapsed, "seconds",
+            {"plan": self.name, "mode": mode},
+        )
+        for key, duration in self.timings.items():
+            if duration > PerformanceConstants.SLOW_QUERY_THRESHOLD:
+                logger.warning(f"Slow query {self.name}.{key}: {duration:.3f}s")
+        logger.debug(
+            f"Query plan {self.name}: {len(self._steps)} steps on {self.workers} "
+            f"connection(s) in {elapsed:.3f}s (sum of steps {sum(self.timings.values()):.3f}s)"
+        )
@@ -0,0 +1,111 @@
+"""
+Reply edges backing the response-time percentiles of /stats.
+
+``message_reply_edges`` holds one row per human reply: the chat, the reply
+and the message it answers, when the reply was sent and how many seconds
+after the original. ``INSERT_MESSAGE_SQL`` in ``modules.database`` records
+the edge in the same statement that inserts a new reply, so /stats computes
+its p50/p90/p99 with ``percentile_cont`` over a narrow index range instead
+of self-joining ``messages`` and sorting every delta in Python.
+
+Databases that already hold history must be backfilled once with
+``scripts/backfill_reply_edges.py``; until then ``reply_edges_ready``
+returns False and the percentiles are computed from the self-join, still
+inside PostgreSQL.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from modules.rollup_state import mark_backfilled, rollup_ready
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "reply_edges"
+
+# Replies slower than a day answer something else; ignore them
+MAX_RESPONSE_SECONDS = 86400
+
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+_PERCENTILES_SQL = ", ".join(str(q) for q in PERCENTILES.values())
+
+_EDGE_PERCENTILES_SQL = f"""
+    SELECT percentile_cont(ARRAY[{_PERCENTILES_SQL}]) WITHIN GROUP (ORDER BY delta_seconds) AS pct
+    FROM message_reply_edges
+    WHERE chat_id = $1 AND reply_timestamp >= $2 AND reply_timestamp < $3
+      AND delta_seconds > 0 AND delta_seconds < {MAX_RESPONSE_SECONDS}
+"""
+
+_RAW_PERCENTILES_SQL = f"""
+    SELECT percentile_cont(ARRAY[{_PERCENTILES_SQL}]) WITHIN GROUP (ORDER BY d.delta) AS pct
+    FROM (
+        SELECT EXTRACT(EPOCH FROM (reply.timestamp - original.timestamp)) AS delta
+        FROM messages reply
+        JOIN messages original
+            ON original.chat_id = reply.chat_id
+            AND original.message_id = reply.replied_to_message_id
+        WHERE reply.chat_id = $1
+            AND reply.timestamp >= $2 AND reply.timestamp < $3
+            AND reply.replied_to_message_id IS NOT NULL
+            AND reply.is_gpt_reply = false
+    ) d
+    WHERE d.delta > 0 AND d.delta < {MAX_RESPONSE_SECONDS}
+"""
+
+# Same edges INSERT_MESSAGE_SQL records, for the history before it did
+_BACKFILL_SQL = """
+    INSERT INTO message_reply_edges (
+        chat_id, reply_message_id, original_message_id, reply_timestamp, delta_seconds
+    )
+    SELECT DISTINCT ON (reply.message_id)
+           reply.chat_id, reply.message_id, reply.replied_to_message_id, reply.timestamp,
+           EXTRACT(EPOCH FROM (reply.timestamp - original.timestamp))
+    FROM messages reply
+    JOIN messages original
+        ON original.chat_id = reply.chat_id
+        AND original.message_id = reply.replied_to_message_id
+    WHERE reply.chat_id = $1
+      AND reply.replied_to_message_id IS NOT NULL
+      AND reply.is_gpt_reply = false
+    ORDER BY reply.message_id
+    ON CONFLICT DO NOTHING
+"""
+
+
+async def reply_edges_ready(conn: Any) -> bool:
+    """Return True once the reply edges cover the whole message history."""
+    return await rollup_ready(conn, ROLLUP_NAME)
+
+
+async def fetch_response_percentiles(
+    conn: Any,
+    chat_id: int,
+    start_utc: datetime,
+    end_utc: datetime,
+    use_edges: bool = True,
+) -> Optional[Dict[str, float]]:
+    """Return the p50/p90/p99 reply latency (seconds) of a chat in a period.
+
+    Only human replies sent within ``MAX_RESPONSE_SECONDS`` of the original
+    count. Returns None if the period has no such replies.
+    """
+    query = _EDGE_PERCENTILES_SQL if use_edges else _RAW_PERCENTILES_SQL
+    values = await conn.fetchval(query, chat_id, start_utc, end_utc)
+    if not values:
+        return None
+    return {name: float(value) for name, value in zip(PERCENTILES, values)}
+
+
+async def backfill_reply_edges(conn: Any) -> int:
+    """Record the reply edges of every chat and mark them ready; returns the number of edges added."""
+    chat_ids = [r["chat_id"] for r in await conn.fetch("SELECT chat_id FROM chats ORDER BY chat_id")]
+    added = 0
+    for i, chat_id in enumerate(chat_ids, 1):
+        status = await conn.execute(_BACKFILL_SQL, chat_id)
+        count = int(status.split()[-1])
+        added += count
+        logger.info(f"[{i}/{len(chat_ids)}] chat {chat_id}: {count} reply edges")
+    await mark_backfilled(conn, ROLLUP_NAME)
+    return added
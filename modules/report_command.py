@@ -16,6 +16,9 @@ from telegram.ext import ContextTypes
 
 from modules.const import KYIV_TZ
 from modules.database import Database
+from modules.activity_rollups import add_global_message_stats, rollups_ready, unpack_period_counts
+from modules.query_plan import QueryPlan
+from modules.types import MEDIA_MESSAGE_KINDS_SQL, MessageKind
 from modules.logger import error_logger
 from modules.utils import clock_emoji
 
@@ -37,7 +40,12 @@ def _pct_change(current: int, previous: int) -> str:
 
 
 async def fetch_report_data(days: int) -> Dict[str, Any]:
-    """Fetch all analytics data for the given period and its comparison period."""
+    """Fetch all analytics data for the given period and its comparison period.
+
+    Message aggregates come from the hourly activity rollups once they have
+    been backfilled, and from the raw ``messages`` table before that. The
+    aggregates are independent and run as one concurrent query plan.
+    """
     now = datetime.now(KYIV_TZ)
     period_start = now - timedelta(days=days)
     prev_start = period_start - timedelta(days=days)
@@ -45,181 +53,72 @@ async def fetch_report_data(days: int) -> Dict[str, Any]:
     now_utc = now.astimezone(pytz.UTC)
     period_start_utc = period_start.astimezone(pytz.UTC)
     prev_start_utc = prev_start.astimezone(pytz.UTC)
+    inactive_before_utc = (now - timedelta(days=14)).astimezone(pytz.UTC)
 
     pool = await Database.get_pool()
     async with pool.acquire() as conn:
-        # 1. Message/command counts for both periods
-        counts = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_total,
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2 AND is_command = true) AS current_commands,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_total,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1 AND is_command = true) AS prev_commands
-            FROM messages
-            WHERE timestamp >= $3 AND timestamp < $2
-        """, period_start_utc, now_utc, prev_start_utc)
-
-        # 2. Active chats with titles and message counts (current period)
-        active_chats = await conn.fetch("""
-            SELECT m.chat_id, c.title, COUNT(*) AS cnt
-            FROM messages m
-            LEFT JOIN chats c ON m.chat_id = c.chat_id
-            WHERE m.timestamp >= $1 AND m.timestamp < $2
-            GROUP BY m.chat_id, c.title
-            ORDER BY cnt DESC
-        """, period_start_utc, now_utc)
-
-        # 3. Previous period active chat count
-        prev_active = await conn.fetchval("""
-            SELECT COUNT(DISTINCT chat_id) FROM messages
-            WHERE timestamp >= $1 AND timestamp < $2
-        """, prev_start_utc, period_start_utc)
-
-        # 4. New chats (first-ever message falls in current period)
-        new_chats = await conn.fetchval("""
-            SELECT COUNT(*) FROM (
-                SELECT chat_id FROM messages
-                GROUP BY chat_id
-                HAVING MIN(timestamp) >= $1 AND MIN(timestamp) < $2
-            ) sub
-        """, period_start_utc, now_utc)
-
-        # 5. Top commands
-        top_commands = await conn.fetch("""
-            SELECT command_name, COUNT(*) AS cnt
-            FROM messages
-            WHERE timestamp >= $1 AND timestamp < $2
-              AND is_command = true AND command_name IS NOT NULL
-            GROUP BY command_name
-            ORDER BY cnt DESC LIMIT 10
-        """, period_start_utc, now_utc)
-
-        # 6. Top users (excluding bots)
-        top_users = await conn.fetch("""
-            SELECT u.username, u.first_name, COUNT(*) AS cnt
-            FROM messages m
-            JOIN users u ON m.user_id = u.user_id
-            WHERE m.timestamp >= $1 AND m.timestamp < $2 AND u.is_bot = false
-            GROUP BY u.user_id, u.username, u.first_name
-            ORDER BY cnt DESC LIMIT 5
-        """, period_start_utc, now_utc)
-
-        # 7. Hourly distribution (Kyiv time)
-        hourly = await conn.fetch("""
-            SELECT EXTRACT(HOUR FROM timestamp AT TIME ZONE 'Europe/Kyiv')::int AS hour,
-                   COUNT(*) AS cnt
-            FROM messages
-            WHERE timestamp >= $1 AND timestamp < $2
-            GROUP BY hour ORDER BY hour
-        """, period_start_utc, now_utc)
-
-        # 8. Daily breakdown
-        daily = await conn.fetch("""
-            SELECT
-                (timestamp AT TIME ZONE 'Europe/Kyiv')::date AS day,
-                COUNT(*) AS total,
-                COUNT(*) FILTER (WHERE is_command = true) AS commands
-            FROM messages
-            WHERE timestamp >= $1 AND timestamp < $2
-            GROUP BY day ORDER BY day
-        """, period_start_utc, now_utc)
-
-        # 9. Inactive chats (no activity in >14 days)
-        inactive_count = await conn.fetchval("""
-            SELECT COUNT(*) FROM (
-                SELECT chat_id FROM messages
-                GROUP BY chat_id
-                HAVING MAX(timestamp) < $1
-            ) sub
-        """, (now - timedelta(days=14)).astimezone(pytz.UTC))
-
-        # 10. Total chats ever
-        total_chats = await conn.fetchval("SELECT COUNT(DISTINCT chat_id) FROM messages")
-
-        # 11. URL modification and video download counts
-        url_mods = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM bot_events
-            WHERE event_type = 'url_modification'
-              AND timestamp >= $3 AND timestamp < $2
-        """, period_start_utc, now_utc, prev_start_utc)
-
-        vid_downloads = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM bot_events
-            WHERE event_type = 'video_download'
-              AND timestamp >= $3 AND timestamp < $2
-        """, period_start_utc, now_utc, prev_start_utc)
-
-        # 12. Media sent (photos + videos)
-        media = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM messages
-            WHERE timestamp >= $3 AND timestamp < $2
-              AND (raw_telegram_message ? 'photo' OR raw_telegram_message ? 'video'
-                   OR raw_telegram_message ? 'video_note')
-        """, period_start_utc, now_utc, prev_start_utc)
-
-        # 13. User reactions added
-        reactions = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM bot_events
-            WHERE event_type = 'reaction'
-              AND timestamp >= $3 AND timestamp < $2
-        """, period_start_utc, now_utc, prev_start_utc)
-
-        # 14. Stickers sent
-        stickers = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM messages
-            WHERE timestamp >= $3 AND timestamp < $2
-              AND raw_telegram_message ? 'sticker'
-        """, period_start_utc, now_utc, prev_start_utc)
-
-        # 15. GIFs sent
-        gifs = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM messages
-            WHERE timestamp >= $3 AND timestamp < $2
-              AND raw_telegram_message ? 'animation'
-        """, period_start_utc, now_utc, prev_start_utc)
-
-        # 16. Songs sent
-        songs = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM bot_events
-            WHERE event_type = 'song_sent'
-              AND timestamp >= $3 AND timestamp < $2
-        """, period_start_utc, now_utc, prev_start_utc)
-
-        # 17. Text messages (no media, no commands, no GPT replies)
-        text_msgs = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM messages
-            WHERE timestamp >= $3 AND timestamp < $2
-              AND is_command = false
-              AND is_gpt_reply = false
-              AND NOT (raw_telegram_message ? 'photo' OR raw_telegram_message ? 'video'
-                       OR raw_telegram_message ? 'video_note' OR raw_telegram_message ? 'sticker'
-                       OR raw_telegram_message ? 'animation')
-        """, period_start_utc, now_utc, prev_start_utc)
-
+        use_rollups = await rollups_ready(conn)
+
+    plan = QueryPlan("report")
+
+    # 1-10, 12, 14, 15, 17. Message aggregates
+    if use_rollups:
+        add_global_message_stats(plan, period_start_utc, now_utc, prev_start_utc, inactive_before_utc)
+    else:
+        _add_message_stats_raw(plan, period_start_utc, now_utc, prev_start_utc, inactive_before_utc)
+
+    # 11. URL modification and video download counts
+    plan.fetchrow("url_mods", """
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM bot_events
+        WHERE event_type = 'url_modification'
+          AND timestamp >= $3 AND timestamp < $2
+    """, period_start_utc, now_utc, prev_start_utc)
+
+    plan.fetchrow("vid_downloads", """
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM bot_events
+        WHERE event_type = 'video_download'
+          AND timestamp >= $3 AND timestamp < $2
+    """, period_start_utc, now_utc, prev_start_utc)
+
+    # 13. User reactions added
+    plan.fetchrow("reactions", """
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM bot_events
+        WHERE event_type = 'reaction'
+          AND timestamp >= $3 AND timestamp < $2
+    """, period_start_utc, now_utc, prev_start_utc)
+
+    # 16. Songs sent
+    plan.fetchrow("songs", """
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM bot_events
+        WHERE event_type = 'song_sent'
+          AND timestamp >= $3 AND timestamp < $2
+    """, period_start_utc, now_utc, prev_start_utc)
+
+    msg_stats = await plan.run(pool)
+    if use_rollups:
+        unpack_period_counts(msg_stats)
+    url_mods = msg_stats["url_mods"]
+    vid_downloads = msg_stats["vid_downloads"]
+    reactions = msg_stats["reactions"]
+    songs = msg_stats["songs"]
+
+    counts = msg_stats["counts"]
+    media = msg_stats["media"]
+    stickers = msg_stats["stickers"]
+    gifs = msg_stats["gifs"]
+    text_msgs = msg_stats["text_msgs"]
     return {
         "now": now,
         "period_start": period_start,
@@ -227,15 +126,15 @@ async def fetch_report_data(days: int) -> Dict[str, Any]:
         "current_commands": counts["current_commands"],
         "prev_total": counts["prev_total"],
         "prev_commands": counts["prev_commands"],
-        "active_chats": active_chats,
-        "prev_active_count": prev_active or 0,
-        "new_chats": new_chats or 0,
-        "top_commands": top_commands,
-        "top_users": top_users,
-        "hourly": hourly,
-        "daily": daily,
-        "inactive_count": inactive_count or 0,
-        "total_chats": total_chats or 0,
+        "active_chats": msg_stats["active_chats"],
+        "prev_active_count": msg_stats["prev_active"] or 0,
+        "new_chats": msg_stats["new_chats"] or 0,
+        "top_commands": msg_stats["top_commands"],
+        "top_users": msg_stats["top_users"],
+        "hourly": msg_stats["hourly"],
+        "daily": msg_stats["daily"],
+        "inactive_count": msg_stats["inactive_count"] or 0,
+        "total_chats": msg_stats["total_chats"] or 0,
         "url_mods_current": url_mods["current_count"] or 0,
         "url_mods_prev": url_mods["prev_count"] or 0,
         "vid_downloads_current": vid_downloads["current_count"] or 0,
@@ -255,6 +154,145 @@ async def fetch_report_data(days: int) -> Dict[str, Any]:
     }
 
 
+def _add_message_stats_raw(
+    plan: QueryPlan,
+    period_start_utc: datetime,
+    now_utc: datetime,
+    prev_start_utc: datetime,
+    inactive_before_utc: datetime,
+) -> None:
+    """Add the message aggregates of /report, computed from the messages table, to a query plan."""
+    # 1. Message/command counts for both periods
+    plan.fetchrow("counts", """
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_total,
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2 AND is_command = true) AS current_commands,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_total,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1 AND is_command = true) AS prev_commands
+        FROM messages
+        WHERE timestamp >= $3 AND timestamp < $2
+    """, period_start_utc, now_utc, prev_start_utc)
+
+    # 2. Active chats with titles and message counts (current period)
+    plan.fetch("active_chats", """
+        SELECT m.chat_id, c.title, COUNT(*) AS cnt
+        FROM messages m
+        LEFT JOIN chats c ON m.chat_id = c.chat_id
+        WHERE m.timestamp >= $1 AND m.timestamp < $2
+        GROUP BY m.chat_id, c.title
+        ORDER BY cnt DESC
+    """, period_start_utc, now_utc)
+
+    # 3. Previous period active chat count
+    plan.fetchval("prev_active", """
+        SELECT COUNT(DISTINCT chat_id) FROM messages
+        WHERE timestamp >= $1 AND timestamp < $2
+    """, prev_start_utc, period_start_utc)
+
+    # 4. New chats (first-ever message falls in current period)
+    plan.fetchval("new_chats", """
+        SELECT COUNT(*) FROM (
+            SELECT chat_id FROM messages
+            GROUP BY chat_id
+            HAVING MIN(timestamp) >= $1 AND MIN(timestamp) < $2
+        ) sub
+    """, period_start_utc, now_utc)
+
+    # 5. Top commands
+    plan.fetch("top_commands", """
+        SELECT command_name, COUNT(*) AS cnt
+        FROM messages
+        WHERE timestamp >= $1 AND timestamp < $2
+          AND is_command = true AND command_name IS NOT NULL
+        GROUP BY command_name
+        ORDER BY cnt DESC LIMIT 10
+    """, period_start_utc, now_utc)
+
+    # 6. Top users (excluding bots)
+    plan.fetch("top_users", """
+        SELECT u.username, u.first_name, COUNT(*) AS cnt
+        FROM messages m
+        JOIN users u ON m.user_id = u.user_id
+        WHERE m.timestamp >= $1 AND m.timestamp < $2 AND u.is_bot = false
+        GROUP BY u.user_id, u.username, u.first_name
+        ORDER BY cnt DESC LIMIT 5
+    """, period_start_utc, now_utc)
+
+    # 7. Hourly distribution (Kyiv time)
+    plan.fetch("hourly", """
+        SELECT EXTRACT(HOUR FROM timestamp AT TIME ZONE 'Europe/Kyiv')::int AS hour,
+               COUNT(*) AS cnt
+        FROM messages
+        WHERE timestamp >= $1 AND timestamp < $2
+        GROUP BY hour ORDER BY hour
+    """, period_start_utc, now_utc)
+
+    # 8. Daily breakdown
+    plan.fetch("daily", """
+        SELECT
+            (timestamp AT TIME ZONE 'Europe/Kyiv')::date AS day,
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE is_command = true) AS commands
+        FROM messages
+        WHERE timestamp >= $1 AND timestamp < $2
+        GROUP BY day ORDER BY day
+    """, period_start_utc, now_utc)
+
+    # 9. Inactive chats (no activity in >14 days)
+    plan.fetchval("inactive_count", """
+        SELECT COUNT(*) FROM (
+            SELECT chat_id FROM messages
+            GROUP BY chat_id
+            HAVING MAX(timestamp) < $1
+        ) sub
+    """, inactive_before_utc)
+
+    # 10. Total chats ever
+    plan.fetchval("total_chats", "SELECT COUNT(DISTINCT chat_id) FROM messages")
+
+    # 12. Media sent (photos + videos)
+    plan.fetchrow("media", f"""
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM messages
+        WHERE timestamp >= $3 AND timestamp < $2
+          AND message_kind IN ({MEDIA_MESSAGE_KINDS_SQL})
+    """, period_start_utc, now_utc, prev_start_utc)
+
+    # 14. Stickers sent
+    plan.fetchrow("stickers", f"""
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM messages
+        WHERE timestamp >= $3 AND timestamp < $2
+          AND message_kind = {MessageKind.STICKER:d}
+    """, period_start_utc, now_utc, prev_start_utc)
+
+    # 15. GIFs sent
+    plan.fetchrow("gifs", f"""
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM messages
+        WHERE timestamp >= $3 AND timestamp < $2
+          AND message_kind = {MessageKind.ANIMATION:d}
+    """, period_start_utc, now_utc, prev_start_utc)
+
+    # 17. Text messages (no media, no commands, no GPT replies)
+    plan.fetchrow("text_msgs", f"""
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM messages
+        WHERE timestamp >= $3 AND timestamp < $2
+          AND is_command = false
+          AND is_gpt_reply = false
+          AND message_kind = {MessageKind.TEXT:d}
+    """, period_start_utc, now_utc, prev_start_utc)
+
+
 def _html(text: str) -> str:
     """Escape HTML special characters in dynamic text."""
     return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
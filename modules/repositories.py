@@ -13,7 +13,9 @@ from typing import Any, Dict, List, Optional, TypeVar, Generic, Union, Tuple
 import json
 
 from telegram import Chat, User, Message
-from modules.database import Database
+from modules.database import Database, INSERT_MESSAGE_SQL, classify_message_kind, retract_message
+from modules.word_counts import word_count_params
+from modules.message_search import search_messages as search_chat_messages
 
 logger = logging.getLogger(__name__)
 
@@ -355,25 +357,7 @@ class MessageRepository(Repository[MessageEntity]):
         """Save message entity."""
         pool = await Database.get_pool()
         async with pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO messages (
-                    message_id, chat_id, user_id, timestamp, text,
-                    is_command, command_name, is_gpt_reply,
-                    replied_to_message_id, gpt_context_message_ids,
-                    raw_telegram_message
-                )
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                ON CONFLICT (chat_id, message_id) DO UPDATE SET
-                text = EXCLUDED.text,
-                user_id = EXCLUDED.user_id,
-                timestamp = EXCLUDED.timestamp,
-                is_command = EXCLUDED.is_command,
-                command_name = EXCLUDED.command_name,
-                is_gpt_reply = EXCLUDED.is_gpt_reply,
-                replied_to_message_id = EXCLUDED.replied_to_message_id,
-                gpt_context_message_ids = EXCLUDED.gpt_context_message_ids,
-                raw_telegram_message = EXCLUDED.raw_telegram_message
-            """,
+            params = (
                 entity.message_id,
                 entity.chat_id,
                 entity.user_id,
@@ -384,8 +368,15 @@ class MessageRepository(Repository[MessageEntity]):
                 entity.is_gpt_reply,
                 entity.replied_to_message_id,
                 json.dumps(entity.gpt_context_message_ids) if entity.gpt_context_message_ids else None,
-                json.dumps(entity.raw_telegram_message) if entity.raw_telegram_message else None
+                json.dumps(entity.raw_telegram_message) if entity.raw_telegram_message else None,
+                int(classify_message_kind(entity.raw_telegram_message, entity.text)),
+                *word_count_params(entity.text)
             )
+            # A stored version is taken out of the rollups before the new one
+            # goes in, under its row lock so concurrent saves cannot interleave
+            async with conn.transaction():
+                await retract_message(conn, entity.chat_id, entity.message_id)
+                await conn.execute(INSERT_MESSAGE_SQL, *params)
         
         return await self.get_by_id((entity.chat_id, entity.message_id)) or entity
     
@@ -466,11 +457,21 @@ class MessageRepository(Repository[MessageEntity]):
         return await self.find_by_criteria({'user_id': user_id})
     
     async def search_messages(self, chat_id: int, search_text: str, limit: int = 50) -> List[MessageEntity]:
-        """Search messages by text content."""
-        return await self.find_by_criteria({
-            'chat_id': chat_id,
-            'text_contains': search_text
-        })
+        """Full-text search of a chat's messages, best match first (see modules.message_search)."""
+        pool = await Database.get_pool()
+        async with pool.acquire() as conn:
+            hits, _ = await search_chat_messages(conn, chat_id, search_text, limit=limit)
+            if not hits:
+                return []
+            rows = await conn.fetch(
+                "SELECT * FROM messages WHERE internal_message_id = ANY($1::bigint[])",
+                [hit['internal_message_id'] for hit in hits]
+            )
+        by_id = {row['internal_message_id']: row for row in rows}
+        return [
+            self._row_to_entity(by_id[hit['internal_message_id']])
+            for hit in hits if hit['internal_message_id'] in by_id
+        ]
     
     def _row_to_entity(self, row: Any) -> MessageEntity:
         """Convert database row to MessageEntity."""
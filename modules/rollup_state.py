@@ -0,0 +1,42 @@
+"""
+Backfill markers of the tables maintained alongside ``messages``.
+
+Rollups, reply edges, word counts and user activity profiles are kept
+current on every insert, but only cover the whole history once a backfill
+script has run and recorded its name in ``rollup_state``. Until then the
+readers fall back to querying ``messages``. A fresh database is marked
+backfilled by ``CREATE_TABLES_SQL`` in ``modules.database``.
+"""
+
+import logging
+from typing import Any, Set
+
+logger = logging.getLogger(__name__)
+
+# Names whose backfill marker has been seen; a marker never goes away again
+_backfilled: Set[str] = set()
+
+
+async def rollup_ready(conn: Any, name: str) -> bool:
+    """Return True once ``rollup_state`` marks ``name`` as backfilled; False if it cannot be read."""
+    if name in _backfilled:
+        return True
+    try:
+        backfilled_at = await conn.fetchval(
+            "SELECT backfilled_at FROM rollup_state WHERE name = $1", name
+        )
+    except Exception as e:
+        logger.warning(f"Could not read the {name} backfill state, using the fallback query: {e}")
+        return False
+    if backfilled_at is None:
+        return False
+    _backfilled.add(name)
+    return True
+
+
+async def mark_backfilled(conn: Any, name: str) -> None:
+    """Record in ``rollup_state`` that ``name`` now covers the whole history."""
+    await conn.execute("""
+        INSERT INTO rollup_state (name, backfilled_at) VALUES ($1, NOW())
+        ON CONFLICT (name) DO UPDATE SET backfilled_at = EXCLUDED.backfilled_at
+    """, name)
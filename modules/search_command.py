@@ -0,0 +1,159 @@
+"""
+/search: ranked full-text search over a chat's messages.
+
+The search itself lives in ``modules.message_search``; this module renders
+the hits and pages through them. The "next page" button carries the keyset
+of the last hit. Telegram limits callback data to 64 bytes, so the query
+text itself stays in a small in-memory map keyed by a hash; after a restart
+old buttons ask for a new /search.
+"""
+
+import hashlib
+import html
+import logging
+import struct
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message, Update
+from telegram.ext import ContextTypes
+
+from modules.const import KYIV_TZ
+from modules.database import Database
+from modules.message_search import SNIPPET_START, SNIPPET_STOP, Cursor, search_messages
+
+logger = logging.getLogger(__name__)
+
+# Queries remembered for "next page" buttons
+MAX_REMEMBERED_QUERIES = 1000
+
+CALLBACK_PREFIX = "search"
+CALLBACK_PATTERN = rf"^{CALLBACK_PREFIX}:[0-9a-f]+:\d+:[0-9a-f]{{8}}:\d+$"
+
+_queries: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+
+
+def _remember_query(chat_id: int, query: str) -> str:
+    token = hashlib.sha1(f"{chat_id}:{query}".encode()).hexdigest()[:10]
+    _queries[token] = (chat_id, query)
+    _queries.move_to_end(token)
+    while len(_queries) > MAX_REMEMBERED_QUERIES:
+        _queries.popitem(last=False)
+    return token
+
+
+def encode_cursor(token: str, page: int, cursor: Cursor) -> str:
+    """Callback data of the "next page" button; the rank is packed as the float4 it came from."""
+    rank, last_id = cursor
+    return f"{CALLBACK_PREFIX}:{token}:{page}:{struct.pack('>f', rank).hex()}:{last_id}"
+
+
+def decode_cursor(data: str) -> Tuple[str, int, Cursor]:
+    """Inverse of ``encode_cursor``: (query token, page number, cursor)."""
+    _, token, page, rank, last_id = data.split(":")
+    return token, int(page), (struct.unpack(">f", bytes.fromhex(rank))[0], int(last_id))
+
+
+def _message_link(chat_id: int, message_id: int) -> Optional[str]:
+    # Only supergroups and channels have linkable messages; rows the bot
+    # stored itself (image analyses) have no Telegram message id
+    chat = str(chat_id)
+    if not chat.startswith("-100") or message_id <= 0:
+        return None
+    return f"https://t.me/c/{chat[4:]}/{message_id}"
+
+
+def _snippet(text: Optional[str]) -> str:
+    escaped = html.escape(" ".join((text or "").split()))
+    return escaped.replace(SNIPPET_START, "<b>").replace(SNIPPET_STOP, "</b>")
+
+
+def format_results(chat_id: int, query: str, hits: List[Dict[str, Any]], page: int) -> str:
+    """Render a page of hits as Telegram HTML."""
+    if not hits:
+        if page == 1:
+            return f"🔎 Нічого не знайдено за запитом «{html.escape(query)}»."
+        return f"🔎 Більше результатів за запитом «{html.escape(query)}» немає."
+    lines = [f"🔎 <b>{html.escape(query)}</b> — сторінка {page}\n"]
+    for hit in hits:
+        author = hit["username"] and f"@{hit['username']}" or hit["first_name"] or "Unknown"
+        when = hit["timestamp"].astimezone(KYIV_TZ).strftime("%d.%m.%Y %H:%M")
+        link = _message_link(chat_id, hit["message_id"])
+        header = f'<a href="{link}">{when}</a>' if link else when
+        lines.append(f"{header} · {html.escape(author)}\n{_snippet(hit['snippet'])}\n")
+    return "\n".join(lines)
+
+
+def _keyboard(token: str, page: int, next_cursor: Optional[Cursor]) -> Optional[InlineKeyboardMarkup]:
+    if next_cursor is None:
+        return None
+    button = InlineKeyboardButton("Далі ▶️", callback_data=encode_cursor(token, page + 1, next_cursor))
+    return InlineKeyboardMarkup([[button]])
+
+
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /search <query>: ranked full-text search in the current chat."""
+    if not update.message or not update.effective_chat:
+        return
+    query = " ".join(context.args or []).strip()
+    if not query:
+        await update.message.reply_text(
+            "❌ Вкажіть, що шукати: /search <запит>\n"
+            "Підтримуються \"точні фрази\", OR та -виключення."
+        )
+        return
+
+    chat_id = update.effective_chat.id
+    try:
+        pool = await Database.get_pool()
+        async with pool.acquire() as conn:
+            hits, next_cursor = await search_messages(conn, chat_id, query)
+    except Exception as e:
+        logger.error(f"Error in /search command: {e}", exc_info=True)
+        await update.message.reply_text("❌ Помилка пошуку. Спробуйте пізніше.")
+        return
+
+    token = _remember_query(chat_id, query)
+    await update.message.reply_text(
+        format_results(chat_id, query, hits, 1),
+        parse_mode="HTML",
+        disable_web_page_preview=True,
+        reply_markup=_keyboard(token, 1, next_cursor),
+    )
+
+
+async def handle_search_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show the next page of a /search when its button is pressed."""
+    callback = update.callback_query
+    if not callback or not callback.data:
+        return
+    message = callback.message
+    if not isinstance(message, Message):
+        # Too old for the bot to access (InaccessibleMessage). The query has
+        # already been answered by CallbackHandlerService, so write to the chat
+        if message is not None:
+            await context.bot.send_message(message.chat.id, "⌛ Цей пошук застарів, повторіть /search.")
+        return
+    token, page, cursor = decode_cursor(callback.data)
+    remembered = _queries.get(token)
+    chat_id = message.chat.id
+    if remembered is None or remembered[0] != chat_id:
+        await callback.edit_message_reply_markup(reply_markup=None)
+        await message.reply_text("⌛ Цей пошук застарів, повторіть /search.")
+        return
+
+    query = remembered[1]
+    try:
+        pool = await Database.get_pool()
+        async with pool.acquire() as conn:
+            hits, next_cursor = await search_messages(conn, chat_id, query, after=cursor)
+    except Exception as e:
+        logger.error(f"Error in /search page callback: {e}", exc_info=True)
+        await message.reply_text("❌ Помилка пошуку. Спробуйте пізніше.")
+        return
+    await callback.edit_message_text(
+        format_results(chat_id, query, hits, page),
+        parse_mode="HTML",
+        disable_web_page_preview=True,
+        reply_markup=_keyboard(token, page, next_cursor),
+    )
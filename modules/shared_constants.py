@@ -473,6 +473,12 @@ class GPTConstants:
     CONTEXT_MESSAGES_COUNT = 3
     MAX_TELEGRAM_MESSAGE_LENGTH = 4096
 
+    # Streamed replies are edited in place as tokens arrive; Telegram allows
+    # about one edit a second in private chats and twenty a minute in groups
+    STREAM_RESPONSES = os.getenv("GPT_STREAM_RESPONSES", "true").lower() in ("1", "true", "yes")
+    STREAM_EDIT_INTERVAL_PRIVATE = 1.0
+    STREAM_EDIT_INTERVAL_GROUP = 3.0
+
     # Image processing
     MAX_IMAGE_SIZE = (1024, 1024)
     IMAGE_COMPRESSION_QUALITY = 80
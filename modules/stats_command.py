@@ -15,6 +15,12 @@ from telegram.ext import ContextTypes
 
 from modules.const import KYIV_TZ
 from modules.database import Database
+from modules.activity_rollups import (
+    add_chat_message_stats, fetch_chat_earliest, rollups_ready, unpack_period_counts
+)
+from modules.query_plan import QueryPlan
+from modules.types import MEDIA_MESSAGE_KINDS_SQL, MessageKind
+from modules.reply_edges import fetch_response_percentiles, reply_edges_ready
 from modules.report_command import _pct_change, _peak_time_range, _peak_start_hour
 from modules.utils import clock_emoji
 from modules.logger import general_logger, error_logger
@@ -50,6 +56,7 @@ def _empty_stats_data(now: datetime, period_start: datetime, is_all_time: bool)
         "weekday": [],
         "avg_response_seconds": None,
         "prev_avg_response_seconds": None,
+        "response_percentiles": None,
         "url_mods_current": 0,
         "url_mods_prev": 0,
         "vid_downloads_current": 0,
@@ -71,226 +78,118 @@ def _empty_stats_data(now: datetime, period_start: datetime, is_all_time: bool)
 
 
 async def fetch_stats_data(chat_id: int, days: Optional[int] = None) -> Dict[str, Any]:
-    """Fetch all chat-specific analytics data for the given period."""
+    """Fetch all chat-specific analytics data for the given period.
+
+    Message aggregates come from the hourly activity rollups once they have
+    been backfilled, and from the raw ``messages`` table before that. The
+    aggregates are independent and run as one concurrent query plan.
+    """
     now = datetime.now(KYIV_TZ)
     now_utc = now.astimezone(pytz.UTC)
     is_all_time = days is None
 
     pool = await Database.get_pool()
     async with pool.acquire() as conn:
+        use_rollups = await rollups_ready(conn)
+        use_edges = await reply_edges_ready(conn)
+        earliest = None
         if is_all_time:
-            earliest = await conn.fetchval(
-                "SELECT MIN(timestamp) FROM messages WHERE chat_id = $1", chat_id
-            )
-            if earliest is None:
-                return _empty_stats_data(now, now, is_all_time=True)
-            period_start_utc = earliest
-            period_start = earliest.astimezone(KYIV_TZ)
-            prev_start_utc = None
-            actual_days = (now_utc - period_start_utc).days or 1
-        else:
-            period_start = now - timedelta(days=days)
-            period_start_utc = period_start.astimezone(pytz.UTC)
-            prev_start_utc = (period_start - timedelta(days=days)).astimezone(pytz.UTC)
-            actual_days = days
-
-        # 1. Message/command counts
-        if prev_start_utc is not None:
-            counts = await conn.fetchrow("""
-                SELECT
-                    COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_total,
-                    COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2 AND is_command = true) AS current_commands,
-                    COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_total,
-                    COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1 AND is_command = true) AS prev_commands
-                FROM messages
-                WHERE chat_id = $4 AND timestamp >= $3 AND timestamp < $2
-            """, period_start_utc, now_utc, prev_start_utc, chat_id)
-        else:
-            row = await conn.fetchrow("""
-                SELECT COUNT(*) AS current_total,
-                       COUNT(*) FILTER (WHERE is_command = true) AS current_commands
-                FROM messages
-                WHERE chat_id = $1 AND timestamp >= $2 AND timestamp < $3
-            """, chat_id, period_start_utc, now_utc)
-            counts = {
-                "current_total": row["current_total"],
-                "current_commands": row["current_commands"],
-                "prev_total": 0,
-                "prev_commands": 0,
-            }
-
-        # 2. Active users (non-bot)
-        active_users = await conn.fetch("""
-            SELECT DISTINCT m.user_id, u.username, u.first_name
-            FROM messages m
-            JOIN users u ON m.user_id = u.user_id
-            WHERE m.chat_id = $1 AND m.timestamp >= $2 AND m.timestamp < $3
-              AND u.is_bot = false
-        """, chat_id, period_start_utc, now_utc)
-
-        # 3. New users (first message in this chat falls in current period)
-        new_users = await conn.fetchval("""
-            SELECT COUNT(*) FROM (
-                SELECT user_id FROM messages
-                WHERE chat_id = $1
-                GROUP BY user_id
-                HAVING MIN(timestamp) >= $2 AND MIN(timestamp) < $3
-            ) sub
-        """, chat_id, period_start_utc, now_utc)
-
-        # 4. Inactive users (active in previous period, absent in current)
-        inactive_users = 0
-        if prev_start_utc is not None:
-            inactive_users = await conn.fetchval("""
-                SELECT COUNT(*) FROM (
-                    SELECT DISTINCT user_id FROM messages
-                    WHERE chat_id = $1 AND timestamp >= $2 AND timestamp < $3
-                    EXCEPT
-                    SELECT DISTINCT user_id FROM messages
-                    WHERE chat_id = $1 AND timestamp >= $3 AND timestamp < $4
-                ) sub
-            """, chat_id, prev_start_utc, period_start_utc, now_utc)
-
-        # 5. Top commands
-        top_commands = await conn.fetch("""
-            SELECT command_name, COUNT(*) AS cnt
-            FROM messages
-            WHERE chat_id = $1 AND timestamp >= $2 AND timestamp < $3
-              AND is_command = true AND command_name IS NOT NULL
-            GROUP BY command_name
-            ORDER BY cnt DESC LIMIT 5
-        """, chat_id, period_start_utc, now_utc)
+            if use_rollups:
+                earliest = await fetch_chat_earliest(conn, chat_id)
+            else:
+                earliest = await conn.fetchval(
+                    "SELECT MIN(timestamp) FROM messages WHERE chat_id = $1", chat_id
+                )
 
-        # 6. Hourly distribution (Kyiv time)
-        hourly = await conn.fetch("""
-            SELECT EXTRACT(HOUR FROM timestamp AT TIME ZONE 'Europe/Kyiv')::int AS hour,
-                   COUNT(*) AS cnt
-            FROM messages
-            WHERE chat_id = $1 AND timestamp >= $2 AND timestamp < $3
-            GROUP BY hour ORDER BY hour
-        """, chat_id, period_start_utc, now_utc)
+    if days is None:
+        if earliest is None:
+            return _empty_stats_data(now, now, is_all_time=True)
+        period_start_utc = earliest
+        period_start = earliest.astimezone(KYIV_TZ)
+        prev_start_utc = None
+        actual_days = (now_utc - period_start_utc).days or 1
+    else:
+        period_start = now - timedelta(days=days)
+        period_start_utc = period_start.astimezone(pytz.UTC)
+        prev_start_utc = (period_start - timedelta(days=days)).astimezone(pytz.UTC)
+        actual_days = days
 
-        # 7. Weekday distribution (Kyiv time, DOW: 0=Sun..6=Sat)
-        weekday = await conn.fetch("""
-            SELECT EXTRACT(DOW FROM timestamp AT TIME ZONE 'Europe/Kyiv')::int AS dow,
-                   COUNT(*) AS cnt
-            FROM messages
-            WHERE chat_id = $1 AND timestamp >= $2 AND timestamp < $3
-            GROUP BY dow ORDER BY dow
-        """, chat_id, period_start_utc, now_utc)
+    plan = QueryPlan("stats")
 
-        # 8. Response time (median of reply deltas, human replies only)
-        avg_response_seconds = await _calc_response_time(
-            conn, chat_id, period_start_utc, now_utc
+    # 1-7, 11, 13, 14, 16, 17. Message aggregates
+    if use_rollups:
+        add_chat_message_stats(plan, chat_id, period_start_utc, now_utc, prev_start_utc)
+    else:
+        _add_message_stats_raw(plan, chat_id, period_start_utc, now_utc, prev_start_utc)
+
+    # 8. Response time percentiles (human replies only)
+    plan.add(
+        "response_percentiles",
+        lambda conn: fetch_response_percentiles(conn, chat_id, period_start_utc, now_utc, use_edges),
+    )
+
+    # 9. Previous period response time
+    if prev_start_utc is not None:
+        plan.add(
+            "prev_response_percentiles",
+            lambda conn: fetch_response_percentiles(conn, chat_id, prev_start_utc, period_start_utc, use_edges),
         )
 
-        # 9. Previous period response time
-        prev_avg_response_seconds = None
-        if prev_start_utc is not None:
-            prev_avg_response_seconds = await _calc_response_time(
-                conn, chat_id, prev_start_utc, period_start_utc
-            )
-
-        # 10. URL modification and video download counts
-        _prev_bound = prev_start_utc if prev_start_utc is not None else period_start_utc
-        url_mods = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM bot_events
-            WHERE event_type = 'url_modification' AND chat_id = $4
-              AND timestamp >= $3 AND timestamp < $2
-        """, period_start_utc, now_utc, _prev_bound, chat_id)
-
-        vid_downloads = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM bot_events
-            WHERE event_type = 'video_download' AND chat_id = $4
-              AND timestamp >= $3 AND timestamp < $2
-        """, period_start_utc, now_utc, _prev_bound, chat_id)
-
-        # 11. Media sent (photos + videos in messages)
-        media = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM messages
-            WHERE chat_id = $4
-              AND timestamp >= $3 AND timestamp < $2
-              AND (raw_telegram_message ? 'photo' OR raw_telegram_message ? 'video'
-                   OR raw_telegram_message ? 'video_note')
-        """, period_start_utc, now_utc, _prev_bound, chat_id)
-
-        # 12. User reactions added
-        reactions = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM bot_events
-            WHERE event_type = 'reaction' AND chat_id = $4
-              AND timestamp >= $3 AND timestamp < $2
-        """, period_start_utc, now_utc, _prev_bound, chat_id)
-
-        # 13. Stickers sent
-        stickers = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM messages
-            WHERE chat_id = $4
-              AND timestamp >= $3 AND timestamp < $2
-              AND raw_telegram_message ? 'sticker'
-        """, period_start_utc, now_utc, _prev_bound, chat_id)
-
-        # 14. GIFs sent
-        gifs = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM messages
-            WHERE chat_id = $4
-              AND timestamp >= $3 AND timestamp < $2
-              AND raw_telegram_message ? 'animation'
-        """, period_start_utc, now_utc, _prev_bound, chat_id)
-
-        # 15. Songs sent
-        songs = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM bot_events
-            WHERE event_type = 'song_sent' AND chat_id = $4
-              AND timestamp >= $3 AND timestamp < $2
-        """, period_start_utc, now_utc, _prev_bound, chat_id)
-
-        # 16. Text messages (no media, no commands, no GPT replies)
-        text_msgs = await conn.fetchrow("""
-            SELECT
-                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
-                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
-            FROM messages
-            WHERE chat_id = $4
-              AND timestamp >= $3 AND timestamp < $2
-              AND is_command = false
-              AND is_gpt_reply = false
-              AND NOT (raw_telegram_message ? 'photo' OR raw_telegram_message ? 'video'
-                       OR raw_telegram_message ? 'video_note' OR raw_telegram_message ? 'sticker'
-                       OR raw_telegram_message ? 'animation')
-        """, period_start_utc, now_utc, _prev_bound, chat_id)
-
-        # 17. Top users leaderboard
-        top_users = await conn.fetch("""
-            SELECT m.user_id, u.username, u.first_name, COUNT(*) AS cnt
-            FROM messages m
-            JOIN users u ON m.user_id = u.user_id
-            WHERE m.chat_id = $1 AND m.timestamp >= $2 AND m.timestamp < $3
-              AND u.is_bot = false
-            GROUP BY m.user_id, u.username, u.first_name
-            ORDER BY cnt DESC LIMIT 5
-        """, chat_id, period_start_utc, now_utc)
-
+    # 10. URL modification and video download counts
+    _prev_bound = prev_start_utc if prev_start_utc is not None else period_start_utc
+    plan.fetchrow("url_mods", """
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM bot_events
+        WHERE event_type = 'url_modification' AND chat_id = $4
+          AND timestamp >= $3 AND timestamp < $2
+    """, period_start_utc, now_utc, _prev_bound, chat_id)
+
+    plan.fetchrow("vid_downloads", """
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM bot_events
+        WHERE event_type = 'video_download' AND chat_id = $4
+          AND timestamp >= $3 AND timestamp < $2
+    """, period_start_utc, now_utc, _prev_bound, chat_id)
+
+    # 12. User reactions added
+    plan.fetchrow("reactions", """
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM bot_events
+        WHERE event_type = 'reaction' AND chat_id = $4
+          AND timestamp >= $3 AND timestamp < $2
+    """, period_start_utc, now_utc, _prev_bound, chat_id)
+
+    # 15. Songs sent
+    plan.fetchrow("songs", """
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM bot_events
+        WHERE event_type = 'song_sent' AND chat_id = $4
+          AND timestamp >= $3 AND timestamp < $2
+    """, period_start_utc, now_utc, _prev_bound, chat_id)
+
+    msg_stats = await plan.run(pool)
+    if use_rollups:
+        unpack_period_counts(msg_stats)
+    url_mods = msg_stats["url_mods"]
+    vid_downloads = msg_stats["vid_downloads"]
+    reactions = msg_stats["reactions"]
+    songs = msg_stats["songs"]
+    response = msg_stats["response_percentiles"]
+    prev_response = msg_stats.get("prev_response_percentiles")
+
+    counts = msg_stats["counts"]
+    media = msg_stats["media"]
+    stickers = msg_stats["stickers"]
+    gifs = msg_stats["gifs"]
+    text_msgs = msg_stats["text_msgs"]
     return {
         "now": now,
         "period_start": period_start,
@@ -300,14 +199,15 @@ async def fetch_stats_data(chat_id: int, days: Optional[int] = None) -> Dict[str
         "current_commands": counts["current_commands"],
         "prev_total": counts["prev_total"],
         "prev_commands": counts["prev_commands"],
-        "active_users": active_users,
-        "new_users_count": new_users or 0,
-        "inactive_users_count": inactive_users or 0,
-        "top_commands": top_commands,
-        "hourly": hourly,
-        "weekday": weekday,
-        "avg_response_seconds": avg_response_seconds,
-        "prev_avg_response_seconds": prev_avg_response_seconds,
+        "active_users": msg_stats["active_users"],
+        "new_users_count": msg_stats["new_users"] or 0,
+        "inactive_users_count": msg_stats.get("inactive_users") or 0,
+        "top_commands": msg_stats["top_commands"],
+        "hourly": msg_stats["hourly"],
+        "weekday": msg_stats["weekday"],
+        "avg_response_seconds": response["p50"] if response else None,
+        "prev_avg_response_seconds": prev_response["p50"] if prev_response else None,
+        "response_percentiles": response,
         "url_mods_current": url_mods["current_count"] or 0,
         "url_mods_prev": url_mods["prev_count"] or 0 if prev_start_utc is not None else 0,
         "vid_downloads_current": vid_downloads["current_count"] or 0,
@@ -324,29 +224,156 @@ async def fetch_stats_data(chat_id: int, days: Optional[int] = None) -> Dict[str
         "songs_prev": songs["prev_count"] or 0 if prev_start_utc is not None else 0,
         "text_msgs_current": text_msgs["current_count"] or 0,
         "text_msgs_prev": text_msgs["prev_count"] or 0 if prev_start_utc is not None else 0,
-        "top_users": top_users,
+        "top_users": msg_stats["top_users"],
     }
 
 
-async def _calc_response_time(conn, chat_id: int, start_utc, end_utc) -> Optional[float]:
-    """Calculate median response time (seconds) for human replies in a period."""
-    rows = await conn.fetch("""
-        SELECT EXTRACT(EPOCH FROM (reply.timestamp - original.timestamp)) AS delta
-        FROM messages reply
-        JOIN messages original
-            ON original.chat_id = reply.chat_id
-            AND original.message_id = reply.replied_to_message_id
-        WHERE reply.chat_id = $1
-            AND reply.timestamp >= $2 AND reply.timestamp < $3
-            AND reply.replied_to_message_id IS NOT NULL
-            AND reply.is_gpt_reply = false
-            AND EXTRACT(EPOCH FROM (reply.timestamp - original.timestamp)) > 0
-            AND EXTRACT(EPOCH FROM (reply.timestamp - original.timestamp)) < 86400
-    """, chat_id, start_utc, end_utc)
-    if not rows:
-        return None
-    deltas = sorted(r["delta"] for r in rows)
-    return deltas[len(deltas) // 2]
+def _add_message_stats_raw(
+    plan: QueryPlan,
+    chat_id: int,
+    period_start_utc: datetime,
+    now_utc: datetime,
+    prev_start_utc: Optional[datetime],
+) -> None:
+    """Add the message aggregates of /stats, computed from the messages table, to a query plan."""
+    # 1. Message/command counts
+    if prev_start_utc is not None:
+        plan.fetchrow("counts", """
+            SELECT
+                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_total,
+                COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2 AND is_command = true) AS current_commands,
+                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_total,
+                COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1 AND is_command = true) AS prev_commands
+            FROM messages
+            WHERE chat_id = $4 AND timestamp >= $3 AND timestamp < $2
+        """, period_start_utc, now_utc, prev_start_utc, chat_id)
+    else:
+        plan.fetchrow("counts", """
+            SELECT COUNT(*) AS current_total,
+                   COUNT(*) FILTER (WHERE is_command = true) AS current_commands,
+                   0 AS prev_total,
+                   0 AS prev_commands
+            FROM messages
+            WHERE chat_id = $1 AND timestamp >= $2 AND timestamp < $3
+        """, chat_id, period_start_utc, now_utc)
+
+    # 2. Active users (non-bot)
+    plan.fetch("active_users", """
+        SELECT DISTINCT m.user_id, u.username, u.first_name
+        FROM messages m
+        JOIN users u ON m.user_id = u.user_id
+        WHERE m.chat_id = $1 AND m.timestamp >= $2 AND m.timestamp < $3
+          AND u.is_bot = false
+    """, chat_id, period_start_utc, now_utc)
+
+    # 3. New users (first message in this chat falls in current period)
+    plan.fetchval("new_users", """
+        SELECT COUNT(*) FROM (
+            SELECT user_id FROM messages
+            WHERE chat_id = $1
+            GROUP BY user_id
+            HAVING MIN(timestamp) >= $2 AND MIN(timestamp) < $3
+        ) sub
+    """, chat_id, period_start_utc, now_utc)
+
+    # 4. Inactive users (active in previous period, absent in current)
+    if prev_start_utc is not None:
+        plan.fetchval("inactive_users", """
+            SELECT COUNT(*) FROM (
+                SELECT DISTINCT user_id FROM messages
+                WHERE chat_id = $1 AND timestamp >= $2 AND timestamp < $3
+                EXCEPT
+                SELECT DISTINCT user_id FROM messages
+                WHERE chat_id = $1 AND timestamp >= $3 AND timestamp < $4
+            ) sub
+        """, chat_id, prev_start_utc, period_start_utc, now_utc)
+
+    # 5. Top commands
+    plan.fetch("top_commands", """
+        SELECT command_name, COUNT(*) AS cnt
+        FROM messages
+        WHERE chat_id = $1 AND timestamp >= $2 AND timestamp < $3
+          AND is_command = true AND command_name IS NOT NULL
+        GROUP BY command_name
+        ORDER BY cnt DESC LIMIT 5
+    """, chat_id, period_start_utc, now_utc)
+
+    # 6. Hourly distribution (Kyiv time)
+    plan.fetch("hourly", """
+        SELECT EXTRACT(HOUR FROM timestamp AT TIME ZONE 'Europe/Kyiv')::int AS hour,
+               COUNT(*) AS cnt
+        FROM messages
+        WHERE chat_id = $1 AND timestamp >= $2 AND timestamp < $3
+        GROUP BY hour ORDER BY hour
+    """, chat_id, period_start_utc, now_utc)
+
+    # 7. Weekday distribution (Kyiv time, DOW: 0=Sun..6=Sat)
+    plan.fetch("weekday", """
+        SELECT EXTRACT(DOW FROM timestamp AT TIME ZONE 'Europe/Kyiv')::int AS dow,
+               COUNT(*) AS cnt
+        FROM messages
+        WHERE chat_id = $1 AND timestamp >= $2 AND timestamp < $3
+        GROUP BY dow ORDER BY dow
+    """, chat_id, period_start_utc, now_utc)
+
+    _prev_bound = prev_start_utc if prev_start_utc is not None else period_start_utc
+
+    # 11. Media sent (photos + videos in messages)
+    plan.fetchrow("media", f"""
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM messages
+        WHERE chat_id = $4
+          AND timestamp >= $3 AND timestamp < $2
+          AND message_kind IN ({MEDIA_MESSAGE_KINDS_SQL})
+    """, period_start_utc, now_utc, _prev_bound, chat_id)
+
+    # 13. Stickers sent
+    plan.fetchrow("stickers", f"""
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM messages
+        WHERE chat_id = $4
+          AND timestamp >= $3 AND timestamp < $2
+          AND message_kind = {MessageKind.STICKER:d}
+    """, period_start_utc, now_utc, _prev_bound, chat_id)
+
+    # 14. GIFs sent
+    plan.fetchrow("gifs", f"""
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM messages
+        WHERE chat_id = $4
+          AND timestamp >= $3 AND timestamp < $2
+          AND message_kind = {MessageKind.ANIMATION:d}
+    """, period_start_utc, now_utc, _prev_bound, chat_id)
+
+    # 16. Text messages (no media, no commands, no GPT replies)
+    plan.fetchrow("text_msgs", f"""
+        SELECT
+            COUNT(*) FILTER (WHERE timestamp >= $1 AND timestamp < $2) AS current_count,
+            COUNT(*) FILTER (WHERE timestamp >= $3 AND timestamp < $1) AS prev_count
+        FROM messages
+        WHERE chat_id = $4
+          AND timestamp >= $3 AND timestamp < $2
+          AND is_command = false
+          AND is_gpt_reply = false
+          AND message_kind = {MessageKind.TEXT:d}
+    """, period_start_utc, now_utc, _prev_bound, chat_id)
+
+    # 17. Top users leaderboard
+    plan.fetch("top_users", """
+        SELECT m.user_id, u.username, u.first_name, COUNT(*) AS cnt
+        FROM messages m
+        JOIN users u ON m.user_id = u.user_id
+        WHERE m.chat_id = $1 AND m.timestamp >= $2 AND m.timestamp < $3
+          AND u.is_bot = false
+        GROUP BY m.user_id, u.username, u.first_name
+        ORDER BY cnt DESC LIMIT 5
+    """, chat_id, period_start_utc, now_utc)
 
 
 def _build_weekday_chart(weekday_data: List) -> str:
@@ -617,7 +644,13 @@ def format_stats(data: Dict[str, Any]) -> str:
             rt_str += " (↑slower)"
         else:
             rt_str += " (stable)"
-    lines.append(f"🕒 <b>Avg response time:</b> {rt_str}")
+    lines.append(f"🕒 <b>Median response time:</b> {rt_str}")
+    percentiles = data.get("response_percentiles")
+    if percentiles:
+        lines.append(
+            f"⏳ <b>Slow replies:</b> p90 {_format_response_time(percentiles['p90'])}"
+            f" · p99 {_format_response_time(percentiles['p99'])}"
+        )
 
     # Engagement trend
     lines.append(f"💡 <b>Engagement:</b> {_build_engagement_trend(data)}")
@@ -730,39 +763,29 @@ async def mystats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                         "SELECT COUNT(*) FROM bot_events WHERE event_type = 'video_download' AND chat_id = $1 AND user_id = $2",
                         _chat_id_int, _user_id_int
                     )
-                    media_count = await conn.fetchval("""
-                        SELECT COUNT(*) FROM messages
+                    kind_counts = await conn.fetchrow(f"""
+                        SELECT
+                            COUNT(*) FILTER (WHERE message_kind IN ({MEDIA_MESSAGE_KINDS_SQL})) AS media_count,
+                            COUNT(*) FILTER (WHERE message_kind = {MessageKind.STICKER:d}) AS sticker_count,
+                            COUNT(*) FILTER (WHERE message_kind = {MessageKind.ANIMATION:d}) AS gif_count,
+                            COUNT(*) FILTER (
+                                WHERE message_kind = {MessageKind.TEXT:d} AND is_command = false AND is_gpt_reply = false
+                            ) AS text_msg_count
+                        FROM messages
                         WHERE chat_id = $1 AND user_id = $2
-                          AND (raw_telegram_message ? 'photo' OR raw_telegram_message ? 'video'
-                               OR raw_telegram_message ? 'video_note')
                     """, _chat_id_int, _user_id_int)
+                    media_count = kind_counts["media_count"]
+                    sticker_count = kind_counts["sticker_count"]
+                    gif_count = kind_counts["gif_count"]
+                    text_msg_count = kind_counts["text_msg_count"]
                     reaction_count = await conn.fetchval(
                         "SELECT COUNT(*) FROM bot_events WHERE event_type = 'reaction' AND chat_id = $1 AND user_id = $2",
                         _chat_id_int, _user_id_int
                     )
-                    sticker_count = await conn.fetchval("""
-                        SELECT COUNT(*) FROM messages
-                        WHERE chat_id = $1 AND user_id = $2
-                          AND raw_telegram_message ? 'sticker'
-                    """, _chat_id_int, _user_id_int)
-                    gif_count = await conn.fetchval("""
-                        SELECT COUNT(*) FROM messages
-                        WHERE chat_id = $1 AND user_id = $2
-                          AND raw_telegram_message ? 'animation'
-                    """, _chat_id_int, _user_id_int)
                     song_count = await conn.fetchval(
                         "SELECT COUNT(*) FROM bot_events WHERE event_type = 'song_sent' AND chat_id = $1 AND user_id = $2",
                         _chat_id_int, _user_id_int
                     )
-                    text_msg_count = await conn.fetchval("""
-                        SELECT COUNT(*) FROM messages
-                        WHERE chat_id = $1 AND user_id = $2
-                          AND is_command = false
-                          AND is_gpt_reply = false
-                          AND NOT (raw_telegram_message ? 'photo' OR raw_telegram_message ? 'video'
-                                   OR raw_telegram_message ? 'video_note' OR raw_telegram_message ? 'sticker'
-                                   OR raw_telegram_message ? 'animation')
-                    """, _chat_id_int, _user_id_int)
                 if text_msg_count:
                     message_parts.append(f"📝 Текстових повідомлень: {text_msg_count}")
                 if url_mods_count:
@@ -0,0 +1,104 @@
+"""
+Token estimates and token-bounded chunking for text sent to GPT.
+
+``pack_lines`` packs chat lines as they are; ``split_text`` cuts prose on
+paragraph boundaries, then sentence boundaries, and only cuts inside a
+sentence that alone exceeds the budget.
+
+No tokenizer is bundled, so sizes are estimated from the UTF-8 length: about
+four bytes per token for Latin text, which overestimates Cyrillic (two bytes
+per letter) and so keeps chunks safely inside their budget.
+"""
+
+import math
+import re
+from typing import Iterable, List, Tuple
+
+BYTES_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Return a conservative estimate of the number of tokens in text."""
+    return math.ceil(len(text.encode("utf-8")) / BYTES_PER_TOKEN)
+
+
+def pack_lines(lines: Iterable[str], max_tokens: int) -> List[List[str]]:
+    """
+    Greedily pack lines into chunks of at most max_tokens estimated tokens.
+
+    Lines are never split or reordered; a single line over the budget becomes
+    a chunk of its own.
+    """
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in lines:
+        tokens = estimate_tokens(line) + 1  # the joining newline
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _cut_sentence(sentence: str, max_tokens: int) -> List[str]:
+    """Cut an oversized sentence between words, or between characters for very long words."""
+    pieces: List[Tuple[str, str]] = []
+    for word in sentence.split():
+        if estimate_tokens(word) <= max_tokens:
+            pieces.append((word, " "))
+            continue
+        # A character takes at most four UTF-8 bytes, i.e. one estimated token
+        for i in range(0, len(word), max_tokens):
+            pieces.append((word[i:i + max_tokens], " " if i == 0 else ""))
+    return _pack(pieces, max_tokens)
+
+
+def _pack(pieces: Iterable[Tuple[str, str]], max_tokens: int) -> List[str]:
+    """Greedily join (piece, separator) pairs into chunks of at most max_tokens."""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece, separator in pieces:
+        tokens = estimate_tokens(piece)
+        if current:
+            joined = current_tokens + estimate_tokens(separator) + tokens
+            if joined <= max_tokens:
+                current += [separator, piece]
+                current_tokens = joined
+                continue
+            chunks.append("".join(current))
+        current, current_tokens = [piece], tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens estimated tokens.
+
+    Whole paragraphs are kept together where they fit, then whole sentences;
+    paragraphs are rejoined with a blank line and sentences with a space.
+    """
+    pieces: List[Tuple[str, str]] = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append((paragraph, "\n\n"))
+            continue
+        separator = "\n\n"
+        for sentence in _SENTENCE_END.split(paragraph):
+            parts = [sentence] if estimate_tokens(sentence) <= max_tokens else _cut_sentence(sentence, max_tokens)
+            for part in parts:
+                pieces.append((part, separator))
+                separator = " "
+    return _pack(pieces, max_tokens)
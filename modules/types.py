@@ -11,7 +11,7 @@ from typing import (
 )
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from enum import Enum
+from enum import Enum, IntEnum
 from datetime import datetime
 
 from telegram import Update, Message, User, Chat, CallbackQuery
@@ -81,6 +81,23 @@ class MessageType(Enum):
     LOCATION = "location"
     CONTACT = "contact"
 
+class MessageKind(IntEnum):
+    """Compact message classification stored in messages.message_kind (SMALLINT)."""
+    TEXT = 0
+    PHOTO = 1
+    VIDEO = 2
+    VIDEO_NOTE = 3
+    STICKER = 4
+    ANIMATION = 5
+    VOICE = 6
+    OTHER = 7
+
+# Kinds counted as "media" by /stats, /report and /mystats
+MEDIA_MESSAGE_KINDS = (MessageKind.PHOTO, MessageKind.VIDEO, MessageKind.VIDEO_NOTE)
+
+# MEDIA_MESSAGE_KINDS as the list of a SQL ``message_kind IN (...)``
+MEDIA_MESSAGE_KINDS_SQL = ", ".join(f"{kind:d}" for kind in MEDIA_MESSAGE_KINDS)
+
 # Error handling types
 class ErrorSeverity(Enum):
     """Error severity levels."""
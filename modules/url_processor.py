@@ -4,7 +4,7 @@ URL processing module for handling URL-related operations.
 
 import re
 from typing import List, Optional
-from urllib.parse import urlparse, urlunparse
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 import pyshorteners
 from collections import deque
 import os
@@ -19,6 +19,11 @@ _url_shortener_cache: dict[str, str] = {}
 _shortener_calls: deque[float] = deque()
 _SHORTENER_MAX_CALLS_PER_MINUTE: int = int(os.getenv('SHORTENER_MAX_CALLS_PER_MINUTE', '30'))
 
+# Query parameters that only track where a link was shared from
+TRACKING_PARAMS = re.compile(
+    r'^(utm_\w+|fbclid|gclid|yclid|mc_cid|mc_eid|igshid|igsh|si|ref|ref_src|feature|_r|_t)$', re.IGNORECASE
+)
+
 # Meta platform domains
 META_PLATFORMS = [
     'instagram.com',
@@ -95,6 +100,22 @@ def sanitize_url(url: str) -> str:
         error_logger.error(f"URL sanitization failed: {str(e)}", exc_info=True)
         return ""
 
+def strip_tracking_params(url: str) -> str:
+    """
+    Drop the fragment and tracking parameters so shares of one page match.
+
+    Args:
+        url: URL to clean
+
+    Returns:
+        str: URL with a lowercase host and without tracking parameters
+    """
+    parsed = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k)]
+    return urlunparse(parsed._replace(
+        netloc=parsed.netloc.lower(), query=urlencode(query), fragment='',
+    ))
+
 @handle_errors(feedback_message="An error occurred while shortening the URL.")
 async def shorten_url(url: str) -> str:
     """
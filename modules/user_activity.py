@@ -0,0 +1,203 @@
+"""
+Per-user activity profiles backing /mystats and /missing.
+
+``user_chat_activity`` holds one row per (chat, user): the message count, a
+24-bucket histogram of the Kyiv hour messages were sent in, the command
+histogram, the first and last message timestamps and the id of the last
+message. ``INSERT_MESSAGE_SQL`` in ``modules.database`` folds every newly
+inserted message into its row in the same statement.
+
+``username_aliases`` remembers every (lower-cased) username a user id has
+been stored with, written by ``UPSERT_USER_SQL``, so accounts that changed
+username are merged with an indexed lookup instead of scanning ``users``.
+
+Both commands read a profile in a single query. Databases that already hold
+history must be backfilled once with ``scripts/backfill_user_activity.py``;
+until then ``user_activity_ready`` returns False and the commands keep
+scanning ``messages``.
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from modules.rollup_state import mark_backfilled, rollup_ready
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "user_activity"
+
+# The user ids of an account: $2 itself plus every id seen with username $3
+_ACCOUNT_IDS_SQL = """
+    SELECT $2::bigint AS user_id
+    UNION
+    SELECT user_id FROM username_aliases WHERE username = lower($3::text)
+"""
+
+_PROFILE_SQL = f"""
+    WITH ids AS ({_ACCOUNT_IDS_SQL})
+    SELECT a.user_id, a.message_count, a.hourly_counts, a.command_counts,
+           a.first_message_at, a.last_message_at,
+           (SELECT COUNT(*) FROM messages m
+            WHERE m.chat_id = $1 AND m.user_id IN (SELECT user_id FROM ids)
+              AND m.timestamp >= $4) AS messages_last_week
+    FROM user_chat_activity a
+    WHERE a.chat_id = $1 AND a.user_id IN (SELECT user_id FROM ids)
+"""
+
+_LAST_MESSAGE_SQL = f"""
+    WITH ids AS ({_ACCOUNT_IDS_SQL})
+    SELECT m.timestamp, u.username, m.text
+    FROM user_chat_activity a
+    JOIN messages m
+        ON m.chat_id = a.chat_id
+        AND m.message_id = a.last_message_id
+        AND m.timestamp = a.last_message_at
+    LEFT JOIN users u ON m.user_id = u.user_id
+    WHERE a.chat_id = $1 AND a.user_id IN (SELECT user_id FROM ids)
+    ORDER BY a.last_message_at DESC
+    LIMIT 1
+"""
+
+# Same rows INSERT_MESSAGE_SQL maintains, recomputed from the messages of chat $1
+_REBUILD_SQL = """
+    WITH chat_messages AS (
+        SELECT user_id, message_id, timestamp, internal_message_id, is_command, command_name,
+               EXTRACT(HOUR FROM timestamp AT TIME ZONE 'Europe/Kyiv')::int AS hour
+        FROM messages
+        WHERE chat_id = $1 AND user_id IS NOT NULL
+    ), totals AS (
+        SELECT user_id, COUNT(*) AS message_count,
+               MIN(timestamp) AS first_message_at, MAX(timestamp) AS last_message_at
+        FROM chat_messages
+        GROUP BY user_id
+    ), hours AS (
+        SELECT t.user_id, array_agg(COALESCE(c.n, 0)::int ORDER BY h) AS hourly_counts
+        FROM totals t
+        CROSS JOIN generate_series(0, 23) AS h
+        LEFT JOIN (
+            SELECT user_id, hour, COUNT(*) AS n FROM chat_messages GROUP BY user_id, hour
+        ) c ON c.user_id = t.user_id AND c.hour = h
+        GROUP BY t.user_id
+    ), commands AS (
+        SELECT user_id, jsonb_object_agg(command, n) AS command_counts
+        FROM (
+            SELECT user_id, split_part(command_name, '@', 1) AS command, COUNT(*) AS n
+            FROM chat_messages
+            WHERE is_command AND command_name IS NOT NULL
+            GROUP BY 1, 2
+        ) c
+        GROUP BY user_id
+    ), last AS (
+        SELECT DISTINCT ON (user_id) user_id, message_id
+        FROM chat_messages
+        ORDER BY user_id, timestamp DESC, internal_message_id DESC
+    )
+    INSERT INTO user_chat_activity (
+        chat_id, user_id, message_count, hourly_counts, command_counts,
+        first_message_at, last_message_at, last_message_id
+    )
+    SELECT $1, t.user_id, t.message_count, h.hourly_counts,
+           COALESCE(c.command_counts, '{}'::jsonb),
+           t.first_message_at, t.last_message_at, l.message_id
+    FROM totals t
+    JOIN hours h USING (user_id)
+    JOIN last l USING (user_id)
+    LEFT JOIN commands c USING (user_id)
+"""
+
+
+async def user_activity_ready(conn: Any) -> bool:
+    """Return True once the activity profiles cover the whole message history."""
+    return await rollup_ready(conn, ROLLUP_NAME)
+
+
+def _command_counts(value: Any) -> Dict[str, int]:
+    # asyncpg returns jsonb as text unless a codec is registered
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value or {}
+
+
+def merge_profiles(rows: List[Any]) -> Dict[str, Any]:
+    """Combine the profile rows of an account's user ids into the /mystats stats dict."""
+    hourly = [0] * 24
+    commands: Dict[str, int] = {}
+    for row in rows:
+        hourly = [a + b for a, b in zip(hourly, row["hourly_counts"])]
+        for command, count in _command_counts(row["command_counts"]).items():
+            commands[command] = commands.get(command, 0) + int(count)
+    busiest = max(range(24), key=hourly.__getitem__)
+    return {
+        'total_messages': sum(row["message_count"] for row in rows),
+        'messages_last_week': rows[0]["messages_last_week"] if rows else 0,
+        'command_stats': sorted(commands.items(), key=lambda item: item[1], reverse=True),
+        'most_active_hour': busiest if hourly[busiest] else None,
+        'first_message': min((row["first_message_at"] for row in rows), default=None),
+        'last_message': max((row["last_message_at"] for row in rows), default=None),
+    }
+
+
+async def fetch_user_profile(
+    conn: Any,
+    chat_id: int,
+    user_id: Optional[int],
+    username: Optional[str],
+    since: datetime,
+) -> Dict[str, Any]:
+    """Return the /mystats stats of an account in a chat; ``messages_last_week`` counts from ``since``."""
+    rows = await conn.fetch(_PROFILE_SQL, chat_id, user_id, username, since)
+    return merge_profiles(rows)
+
+
+async def fetch_last_message(
+    conn: Any,
+    chat_id: int,
+    user_id: Optional[int],
+    username: Optional[str],
+) -> Optional[Dict[str, Any]]:
+    """Return the last message (timestamp, username, text) of an account in a chat, or None."""
+    row = await conn.fetchrow(_LAST_MESSAGE_SQL, chat_id, user_id, username)
+    if row is None:
+        return None
+    return {
+        'timestamp': row['timestamp'],
+        'username': row['username'] or 'Unknown',
+        'text': row['text'],
+    }
+
+
+async def rebuild_user_activity(conn: Any, chat_id: int) -> int:
+    """Recompute the activity profiles of one chat; returns the number of users.
+
+    Runs in one transaction that locks the profiles against concurrent
+    increments, so messages inserted meanwhile are neither lost nor counted
+    twice.
+    """
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE user_chat_activity IN SHARE ROW EXCLUSIVE MODE")
+        await conn.execute("DELETE FROM user_chat_activity WHERE chat_id = $1", chat_id)
+        status = await conn.execute(_REBUILD_SQL, chat_id)
+    return int(status.split()[-1]) if status else 0
+
+
+async def backfill_user_activity(conn: Any) -> int:
+    """Rebuild every chat's profiles and the username aliases, then mark them ready.
+
+    Returns the number of chats. Only current usernames are known for the
+    history; earlier ones are recorded from now on.
+    """
+    await conn.execute("""
+        INSERT INTO username_aliases (username, user_id)
+        SELECT lower(username), user_id FROM users WHERE username IS NOT NULL
+        ON CONFLICT (username, user_id) DO NOTHING
+    """)
+    chat_ids = [r["chat_id"] for r in await conn.fetch(
+        "SELECT DISTINCT chat_id FROM messages ORDER BY chat_id"
+    )]
+    for i, chat_id in enumerate(chat_ids, 1):
+        users = await rebuild_user_activity(conn, chat_id)
+        logger.info(f"[{i}/{len(chat_ids)}] chat {chat_id}: {users} users")
+    await mark_backfilled(conn, ROLLUP_NAME)
+    return len(chat_ids)
@@ -8,7 +8,9 @@ import csv
 import subprocess
 import uuid
 from datetime import datetime, time as dt_time, timedelta, date
-from typing import Optional, Any, List, Dict, Tuple
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Optional, Any, Awaitable, Callable, Deque, List, Dict, Set, Tuple
 import logging
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -253,30 +255,133 @@ class MessageCounter:
 
 
 class ChatHistoryManager:
-    """Manages chat history for context in GPT responses."""
-    chat_histories: Dict[int, List[Dict[str, Any]]]
-    def __init__(self) -> None:
-        self.chat_histories = {}  # chat_id -> list of messages
+    """
+    Bounded per-chat message history used as context for GPT responses.
+
+    Each chat keeps a ring buffer of its last ``capacity`` messages, and all
+    chats together hold at most ``max_total_messages``: when the budget is
+    exceeded, the least recently used chats are dropped. A chat that is seen
+    for the first time since startup (or since it was dropped) is warmed up
+    in the background from the ``messages`` table, so context survives
+    restarts.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 50,
+        max_total_messages: int = 20000,
+        loader: Optional[Callable[[int, int], Awaitable[List[Dict[str, Any]]]]] = None,
+    ) -> None:
+        self.capacity = capacity
+        self.max_total_messages = max_total_messages
+        self._loader = loader or _load_chat_history
+        self.chat_histories: "OrderedDict[int, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._total_messages = 0
+        self._warmups: Dict[int, "asyncio.Future[None]"] = {}
+        self._warm: Set[int] = set()
+
+    def _buffer(self, chat_id: int) -> Deque[Dict[str, Any]]:
+        """Return the chat's buffer, marking it most recently used."""
+        history = self.chat_histories.get(chat_id)
+        if history is None:
+            history = self.chat_histories[chat_id] = deque(maxlen=self.capacity)
+            self._start_warmup(chat_id)
+        else:
+            self.chat_histories.move_to_end(chat_id)
+        return history
+
+    def _evict_idle_chats(self) -> None:
+        while self._total_messages > self.max_total_messages and len(self.chat_histories) > 1:
+            chat_id, history = self.chat_histories.popitem(last=False)
+            self._total_messages -= len(history)
+            self._warm.discard(chat_id)
 
     def add_message(self, chat_id: int, message: Dict[str, Any]) -> None:
         """Add a message to chat history."""
-        if chat_id not in self.chat_histories:
-            self.chat_histories[chat_id] = []
-        
-        self.chat_histories[chat_id].append(message)
-        
-        # Keep only the last 50 messages to prevent memory issues
-        if len(self.chat_histories[chat_id]) > 50:
-            self.chat_histories[chat_id] = self.chat_histories[chat_id][-50:]
-
-    def get_history(self, chat_id: int) -> List[Dict[str, Any]]:
-        """Get chat history for a specific chat."""
-        return self.chat_histories.get(chat_id, [])
+        history = self._buffer(chat_id)
+        if len(history) < self.capacity:
+            self._total_messages += 1
+        history.append(message)
+        self._evict_idle_chats()
+
+    def get_history(self, chat_id: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the last ``limit`` messages (all kept messages by default), oldest first."""
+        history = self._buffer(chat_id)
+        if limit is None or limit >= len(history):
+            return list(history)
+        if limit <= 0:
+            return []
+        recent = list(islice(reversed(history), limit))
+        recent.reverse()
+        return recent
+
+    def get_recent_messages(self, chat_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the last ``limit`` messages, oldest first."""
+        return self.get_history(chat_id, limit)
+
+    async def warm_up(self, chat_id: int) -> None:
+        """Wait until the chat's history has been loaded from the database."""
+        self._buffer(chat_id)
+        warmup = self._warmups.get(chat_id)
+        if warmup is not None:
+            await asyncio.shield(warmup)
 
     def clear_history(self, chat_id: int) -> None:
         """Clear chat history for a specific chat."""
-        if chat_id in self.chat_histories:
-            del self.chat_histories[chat_id]
+        history = self.chat_histories.pop(chat_id, None)
+        if history is not None:
+            self._total_messages -= len(history)
+        # Cleared on purpose: do not reload it from the database
+        self._warm.add(chat_id)
+
+    def _start_warmup(self, chat_id: int) -> None:
+        if chat_id in self._warm or chat_id in self._warmups:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No event loop (e.g. sync tests); stay in-memory only
+        self._warmups[chat_id] = loop.create_task(self._warm_up(chat_id))
+
+    async def _warm_up(self, chat_id: int) -> None:
+        try:
+            rows = await self._loader(chat_id, self.capacity)
+        except Exception as e:
+            error_logger.warning(f"Could not load chat history for {chat_id}: {e}")
+            rows = []
+        finally:
+            self._warmups.pop(chat_id, None)
+        history = self.chat_histories.get(chat_id)
+        if history is None:
+            return  # Evicted while loading
+        self._warm.add(chat_id)
+        # Keep only stored messages older than anything added meanwhile
+        oldest = next((m.get('timestamp') for m in history if m.get('timestamp')), None)
+        older = [m for m in rows if oldest is None or (m.get('timestamp') and m['timestamp'] < oldest)]
+        room = self.capacity - len(history)
+        if room <= 0 or not older:
+            return
+        for message in reversed(older[-room:]):
+            history.appendleft(message)
+        self._total_messages += min(room, len(older))
+        self._evict_idle_chats()
+
+
+async def _load_chat_history(chat_id: int, limit: int) -> List[Dict[str, Any]]:
+    """Load a chat's last ``limit`` text messages from the database, oldest first."""
+    from modules.database import Database
+
+    rows = await Database.get_recent_messages(chat_id, limit=limit, include_commands=False) or []
+    return [
+        {
+            'text': row['text'],
+            'is_user': not row['is_gpt_reply'],
+            'user_id': row['user_id'],
+            'timestamp': row['timestamp'],
+        }
+        for row in reversed(rows)
+        if row.get('text')
+    ]
 
 
 # Global instances
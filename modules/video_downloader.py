@@ -10,9 +10,9 @@ import html as html_lib
 import uuid
 import shutil
 import subprocess
+import time
 from urllib.parse import urljoin, urlparse, parse_qs, unquote
 from typing import Optional, Tuple, List, Dict, Any, Callable, TypedDict, cast
-from asyncio import Semaphore
 from dataclasses import dataclass
 from enum import Enum
 from telegram import (
@@ -23,7 +23,7 @@ from telegram import (
     InlineKeyboardButton,
 )
 from telegram.constants import ChatAction
-from telegram.error import BadRequest
+from telegram.error import BadRequest, TelegramError
 from telegram.ext import ContextTypes, MessageHandler, filters, InlineQueryHandler
 from modules.chat_action import chat_action as _chat_action
 from modules.const import (
@@ -31,8 +31,23 @@ from modules.const import (
     InstagramConfig,
     MUSIC_DIR,
     SONG_CACHE_PATH,
+    MEDIA_CACHE_PATH,
 )
 from modules.song_cache import SongCache
+from modules.download_coordinator import DownloadCoordinator
+from modules.shared_constants import GPTConstants
+from modules.download_scheduler import (
+    DownloadScheduler,
+    PositionCallback,
+    QueuePositionMessage,
+    download_platform,
+    queue_position_text,
+)
+from modules.media_cache import MediaCache, media_cache_key
+from modules.media_probe import TELEGRAM_UPLOAD_LIMIT, ProbeCache, ProbeResult, probe_media
+from modules.video_transcode import VideoTranscoder, can_transcode_to
+from modules.ytdlp_pool import YtDlpPool
+from modules.performance_monitor import performance_monitor
 from modules.utils import extract_urls
 from modules.logger import (
     TelegramErrorHandler,
@@ -50,6 +65,13 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 YTDL_SERVICE_API_KEY = os.getenv("YTDL_SERVICE_API_KEY")
 
+# Longest a single download may run once it has left the queue
+DOWNLOAD_TIMEOUT = 60
+# Longest the format probe before a download may take
+PROBE_TIMEOUT = 15
+
+VIDEO_EXTENSIONS = (".mp4", ".webm", ".mkv", ".mov")
+
 
 class DownloadStrategy(TypedDict):
     name: str
@@ -208,8 +230,6 @@ class VideoDownloader:
             error_logger.error("extract_urls_func is not provided or not callable.")
             raise ValueError("extract_urls_func must be a callable function.")
 
-        self._video_work_semaphore = asyncio.Semaphore(3)
-
         self.yt_dlp_path = self._get_yt_dlp_path()
 
         # Service configuration - use environment variables with fallback
@@ -224,11 +244,28 @@ class VideoDownloader:
 
         self._init_download_path()
         self._verify_yt_dlp()
-        self._download_semaphore = Semaphore(3)  # Allow up to 3 concurrent downloads
+        # Downloads running at once; waiting ones are started fairly across chats
+        self._download_scheduler = DownloadScheduler(
+            int(os.getenv("VIDEO_DOWNLOAD_CONCURRENCY", "3"))
+        )
+        # One download per link at a time, shared by every chat that posts it
+        self._downloads = DownloadCoordinator()
+        # yt-dlp runs on reusable worker processes instead of a new process per call
+        self.ytdlp_pool = YtDlpPool(
+            size=int(os.getenv("YTDLP_WORKERS", "3")),
+            env=self._yt_dlp_env(),
+            fallback_executable=self.yt_dlp_path,
+        )
+        # Formats chosen to fit Telegram's upload limit, by canonical URL
+        self.probe_cache = ProbeCache()
+        # Shrinks videos no format of which fits the limit
+        self.transcoder = VideoTranscoder(int(os.getenv("VIDEO_TRANSCODE_WORKERS", "1")))
         self.last_download: Dict[str, Any] = {}
 
         # Song file_id cache (persists across restarts)
         self.song_cache = SongCache(SONG_CACHE_PATH)
+        # Video/photo file_id cache, keyed by media_cache_key(url)
+        self.media_cache = MediaCache(MEDIA_CACHE_PATH)
 
         # Platform-specific download configurations
         self.platform_configs = {
@@ -676,88 +713,215 @@ class VideoDownloader:
         return None, None
 
     async def download_video(
-        self, url: str, chat_id: Optional[str] = None, chat_type: Optional[str] = None
+        self,
+        url: str,
+        chat_id: Optional[str] = None,
+        chat_type: Optional[str] = None,
+        user_id: Optional[str] = None,
+        on_queue_position: Optional[PositionCallback] = None,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Download a video or image; return (filename, title), or (None, None) on failure.
+
+        Concurrent requests for one link share a single download and file. A
+        returned file must be passed to release_download() once it is sent.
+        The download waits for a slot of the download scheduler, reporting
+        its queue position to on_queue_position; DOWNLOAD_TIMEOUT applies
+        from when it starts.
+        """
+        url = url.strip().strip("\\")
+        return await self._downloads.fetch(
+            f"video:{media_cache_key(url)}",
+            lambda: self._scheduled_download(
+                url, chat_id, chat_type, user_id, on_queue_position
+            ),
+        )
+
+    async def close(self) -> None:
+        """Stop the yt-dlp workers and the transcoding processes."""
+        await self.ytdlp_pool.close()
+        self.transcoder.shutdown()
+
+    def release_download(self, filename: Optional[str]) -> None:
+        """Give up a file returned by download_video(); it is deleted after its last user."""
+        self._downloads.release(filename)
+
+    async def _scheduled_download(
+        self,
+        url: str,
+        chat_id: Optional[str],
+        chat_type: Optional[str],
+        user_id: Optional[str],
+        on_queue_position: Optional[PositionCallback],
     ) -> Tuple[Optional[str], Optional[str]]:
-        async with self._download_semaphore:
+        async with self._download_scheduler.slot(
+            download_platform(url), chat_id, user_id, on_queue_position
+        ):
             try:
-                url = url.strip().strip("\\")
-                if self._is_story_url(url):
-                    error_logger.info(f"Story URL detected and skipped: {url}")
-                    return None, None
+                filename, title = await asyncio.wait_for(
+                    self._download_video(url, chat_id, chat_type),
+                    timeout=DOWNLOAD_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                error_logger.error(f"Download timed out after {DOWNLOAD_TIMEOUT}s: {url}")
+                return None, None
+        # Transcoding has its own process pool and does not hold a download slot
+        return await self._fit_upload_limit(url, filename), title
 
-                # Get video config to determine download path
-                video_config = await self._get_video_config(chat_id, chat_type)
-                current_download_path = video_config.get(
-                    "video_path", self.download_path
+    async def _fit_upload_limit(self, url: str, filename: Optional[str]) -> Optional[str]:
+        """Return filename, or a transcoded copy of it if it is a video over the upload limit."""
+        if (
+            not filename
+            or not filename.lower().endswith(VIDEO_EXTENSIONS)
+            or not os.path.exists(filename)
+            or os.path.getsize(filename) <= TELEGRAM_UPLOAD_LIMIT
+        ):
+            return filename
+        probe = self.probe_cache.get(media_cache_key(url))
+        error_logger.info(
+            f"Downloaded video is {os.path.getsize(filename)} bytes, transcoding to fit: {url}"
+        )
+        fitted = await self.transcoder.fit(
+            filename, TELEGRAM_UPLOAD_LIMIT, probe.duration if probe else None
+        )
+        if fitted is None:
+            return filename
+        os.remove(filename)
+        return fitted
+
+    async def _probe_formats(self, url: str, platform: Platform) -> Optional[ProbeResult]:
+        """Choose a format that fits the upload limit, once per canonical URL."""
+        key = media_cache_key(url)
+        cached = self.probe_cache.get(key)
+        if cached is not None:
+            performance_monitor.record_cache_hit("probe")
+            return cached
+        performance_monitor.record_metric("cache_miss_probe", 1)
+        config = self.platform_configs.get(platform) if platform == Platform.TIKTOK else None
+        started = time.monotonic()
+        try:
+            probe = await asyncio.wait_for(
+                probe_media(self.ytdlp_pool, url, (config.extra_args or []) if config else []),
+                timeout=PROBE_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            error_logger.warning(f"Format probe timed out for {url}")
+            return None
+        finally:
+            performance_monitor.record_metric(
+                "video_probe_time", time.monotonic() - started, "seconds"
+            )
+        if probe is not None:
+            self.probe_cache.set(key, probe)
+        return probe
+
+    def _sized_format(self, url: str, fallback: str) -> str:
+        """The probed format of url ahead of fallback, for yt-dlp's -f."""
+        probe = self.probe_cache.get(media_cache_key(url))
+        if probe is None or not probe.format_id:
+            return fallback
+        return f"{probe.format_id}/{fallback}" if fallback else probe.format_id
+
+    def _too_large_to_send(self, url: str) -> bool:
+        """Whether the probe found url too large to send even after transcoding."""
+        probe = self.probe_cache.get(media_cache_key(url))
+        return (
+            probe is not None
+            and not probe.fits
+            and not can_transcode_to(TELEGRAM_UPLOAD_LIMIT, probe.duration)
+        )
+
+    async def _download_video(
+        self, url: str, chat_id: Optional[str] = None, chat_type: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        try:
+            if self._is_story_url(url):
+                error_logger.info(f"Story URL detected and skipped: {url}")
+                return None, None
+
+            # Get video config to determine download path
+            video_config = await self._get_video_config(chat_id, chat_type)
+            current_download_path = video_config.get(
+                "video_path", self.download_path
+            )
+            current_download_path = os.path.abspath(current_download_path)
+
+            # Ensure the download directory exists
+            os.makedirs(current_download_path, exist_ok=True)
+
+            platform = self._get_platform(url)
+            is_youtube_shorts = "youtube.com/shorts" in url.lower()
+            is_youtube_clips = "youtube.com/clip" in url.lower()
+            is_youtube = "youtube.com" in url.lower() or "youtu.be" in url.lower()
+            parsed_url = urlparse(url)
+            host = parsed_url.hostname or ""
+            is_instagram = (
+                host == "instagram.com"
+                or host.endswith(".instagram.com")
+                or host == "toinstagram.com"
+                or host.endswith(".toinstagram.com")
+            )
+
+            # Prioritize service for YouTube, Instagram, and other problematic platforms
+            if is_youtube or is_instagram:
+                error_logger.info(
+                    f"🎬 Processing {'YouTube' if is_youtube else 'Instagram'} URL: {url}"
                 )
-                current_download_path = os.path.abspath(current_download_path)
-
-                # Ensure the download directory exists
-                os.makedirs(current_download_path, exist_ok=True)
-
-                platform = self._get_platform(url)
-                is_youtube_shorts = "youtube.com/shorts" in url.lower()
-                is_youtube_clips = "youtube.com/clip" in url.lower()
-                is_youtube = "youtube.com" in url.lower() or "youtu.be" in url.lower()
-                parsed_url = urlparse(url)
-                host = parsed_url.hostname or ""
-                is_instagram = (
-                    host == "instagram.com"
-                    or host.endswith(".instagram.com")
-                    or host == "toinstagram.com"
-                    or host.endswith(".toinstagram.com")
+                error_logger.info(
+                    f"   URL type: {'Shorts' if is_youtube_shorts else 'Clips' if is_youtube_clips else 'Regular'}"
                 )
 
-                # Prioritize service for YouTube, Instagram, and other problematic platforms
-                if is_youtube or is_instagram:
-                    error_logger.info(
-                        f"🎬 Processing {'YouTube' if is_youtube else 'Instagram'} URL: {url}"
-                    )
-                    error_logger.info(
-                        f"   URL type: {'Shorts' if is_youtube_shorts else 'Clips' if is_youtube_clips else 'Regular'}"
-                    )
-
-                    # Try service first
-                    error_logger.info(f"🔧 Checking service availability...")
-                    if await self._check_service_health():
-                        result = await self._download_from_service(url)
-                        if result and result[0]:
-                            error_logger.info(
-                                f"✅ Service download successful for: {url}"
-                            )
-                            return result
-                        else:
-                            error_logger.warning(
-                                f"⚠️ Service download failed for: {url}, falling back to direct strategies"
-                            )
+                # Try service first
+                error_logger.info(f"🔧 Checking service availability...")
+                if await self._check_service_health():
+                    result = await self._download_from_service(url)
+                    if result and result[0]:
+                        error_logger.info(
+                            f"✅ Service download successful for: {url}"
+                        )
+                        return result
                     else:
                         error_logger.warning(
-                            f"⚠️ Service unavailable for: {url}, using direct strategies"
+                            f"⚠️ Service download failed for: {url}, falling back to direct strategies"
                         )
-
-                # For TikTok, use direct download
-                if platform == Platform.TIKTOK:
-                    return await self._download_tiktok_ytdlp(url)
-
-                # For YouTube, try multiple strategies
-                if is_youtube:
-                    return await self._download_youtube_with_strategies(
-                        url, is_youtube_shorts, is_youtube_clips
+                else:
+                    error_logger.warning(
+                        f"⚠️ Service unavailable for: {url}, using direct strategies"
                     )
 
-                # For Instagram, try multiple strategies
-                if is_instagram:
-                    return await self._download_instagram_with_strategies(url)
+            # Choose a format that fits the upload limit before downloading anything
+            probe = await self._probe_formats(url, platform)
+            if probe is not None and self._too_large_to_send(url):
+                error_logger.warning(
+                    f"Skipping download of {url}: smallest format is {probe.size} bytes "
+                    f"and {probe.duration}s is too long to transcode"
+                )
+                performance_monitor.record_metric("download_oversized_skipped", 1, "count")
+                return None, None
+
+            # For TikTok, use direct download
+            if platform == Platform.TIKTOK:
+                return await self._download_tiktok_ytdlp(url)
 
-                # For other platforms, use direct download
-                config = self.platform_configs.get(platform)
-                return await self._download_generic(
-                    url, platform, config, current_download_path
+            # For YouTube, try multiple strategies
+            if is_youtube:
+                return await self._download_youtube_with_strategies(
+                    url, is_youtube_shorts, is_youtube_clips
                 )
 
-            except Exception as e:
-                error_logger.error(f"Download error for {url}: {e}")
-                return None, None
+            # For Instagram, try multiple strategies
+            if is_instagram:
+                return await self._download_instagram_with_strategies(url)
+
+            # For other platforms, use direct download
+            config = self.platform_configs.get(platform)
+            return await self._download_generic(
+                url, platform, config, current_download_path
+            )
+
+        except Exception as e:
+            error_logger.error(f"Download error for {url}: {e}")
+            return None, None
 
     async def _download_youtube_with_strategies(
         self, url: str, is_shorts: bool = False, is_clips: bool = False
@@ -1004,7 +1168,6 @@ class VideoDownloader:
 
         # Build command
         cmd = [
-            self.yt_dlp_path,
             url,
             "-o",
             output_path,
@@ -1021,20 +1184,16 @@ class VideoDownloader:
             "--fragment-retries",
             "2",
             "-f",
-            strategy["format"],
+            self._sized_format(url, strategy["format"]),
         ] + strategy["args"]
 
         error_logger.info(f"   Executing Instagram strategy: {strategy['name']}")
 
-        process = None
+        result = None
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-            )
+            result = await asyncio.wait_for(self.ytdlp_pool.run(cmd), timeout=60.0)
 
-            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=60.0)
-
-            if process.returncode == 0 and os.path.exists(output_path):
+            if result.returncode == 0 and os.path.exists(output_path):
                 file_size = os.path.getsize(output_path)
                 error_logger.info(f"   ✅ Downloaded {file_size} bytes")
 
@@ -1042,9 +1201,9 @@ class VideoDownloader:
                 title = await self._get_video_title(url)
                 return output_path, title
             else:
-                stderr_text = stderr.decode()
+                stderr_text = result.stderr.decode()
                 error_logger.warning(
-                    f"   ❌ Process failed (code {process.returncode})"
+                    f"   ❌ Process failed (code {result.returncode})"
                 )
                 error_logger.warning(f"   Error: {stderr_text[:200]}...")
                 if "there is no video in this post" in stderr_text.lower():
@@ -1063,9 +1222,8 @@ class VideoDownloader:
                 try:
                     # Only remove if download failed
                     success = (
-                        process is not None
-                        and hasattr(process, "returncode")
-                        and process.returncode == 0
+                        result is not None
+                        and result.returncode == 0
                         and os.path.getsize(output_path) > 0
                     )
                     if not success:
@@ -1202,11 +1360,6 @@ class VideoDownloader:
 
         output_template = os.path.join(MUSIC_DIR, "%(title)s.%(ext)s")
 
-        # Environment with deno in PATH for JS challenge solving
-        env = os.environ.copy()
-        deno_path = os.path.expanduser("~/.deno/bin")
-        if os.path.exists(deno_path):
-            env["PATH"] = f"{deno_path}:{env.get('PATH', '')}"
 
         # Check for YouTube cookies file
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -1224,7 +1377,7 @@ class VideoDownloader:
         # Strategies ordered by reliability:
         # iOS/Android clients don't require PO tokens.
         # HLS is a fallback when HTTPS formats get 403.
-        strategies = [
+        strategies: List[Dict[str, Any]] = [
             {
                 "name": "iOS client (bestaudio)",
                 "format": "bestaudio/best",
@@ -1257,7 +1410,6 @@ class VideoDownloader:
 
             # Build yt-dlp command for audio extraction with metadata
             cmd = [
-                self.yt_dlp_path,
                 url,
                 "-f",
                 strategy["format"],
@@ -1293,16 +1445,10 @@ class VideoDownloader:
                 cmd.extend(strategy["args"])
 
             try:
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                    env=env,
-                )
-
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(), timeout=180.0
+                result = await asyncio.wait_for(
+                    self.ytdlp_pool.run(cmd), timeout=180.0
                 )
+                stdout, stderr = result.stdout, result.stderr
 
                 lines = (
                     [l for l in stdout.decode().strip().split("\n") if l.strip()]
@@ -1319,7 +1465,7 @@ class VideoDownloader:
                         pass
 
                 if (
-                    process.returncode == 0
+                    result.returncode == 0
                     and output_path
                     and os.path.exists(output_path)
                 ):
@@ -1337,7 +1483,7 @@ class VideoDownloader:
                 else:
                     stderr_text = stderr.decode()
                     error_logger.warning(
-                        f"   ❌ Strategy '{strategy['name']}' failed (code {process.returncode})"
+                        f"   ❌ Strategy '{strategy['name']}' failed (code {result.returncode})"
                     )
                     if stderr_text:
                         error_logger.warning(f"   Error: {stderr_text[:200]}...")
@@ -2256,10 +2402,6 @@ class VideoDownloader:
         os.makedirs(MUSIC_DIR, exist_ok=True)
         output_template = os.path.join(MUSIC_DIR, "%(title)s.%(ext)s")
 
-        env = os.environ.copy()
-        deno_path = os.path.expanduser("~/.deno/bin")
-        if os.path.exists(deno_path):
-            env["PATH"] = f"{deno_path}:{env.get('PATH', '')}"
 
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         yt_cookies_path = os.path.join(project_root, "youtube_cookies.txt")
@@ -2268,7 +2410,6 @@ class VideoDownloader:
         )
 
         cmd = [
-            self.yt_dlp_path,
             url_or_query,
             "-f",
             "bestaudio/best",
@@ -2298,15 +2439,10 @@ class VideoDownloader:
             cmd.extend(cookies_args)
 
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env,
-            )
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(), timeout=180.0
+            result = await asyncio.wait_for(
+                self.ytdlp_pool.run(cmd), timeout=180.0
             )
+            stdout, stderr = result.stdout, result.stderr
 
             lines = (
                 [l for l in stdout.decode().strip().split("\n") if l.strip()]
@@ -2322,14 +2458,14 @@ class VideoDownloader:
                 except Exception:
                     pass
 
-            if process.returncode == 0 and output_path and os.path.exists(output_path):
+            if result.returncode == 0 and output_path and os.path.exists(output_path):
                 display_title, performer, webpage_url = self._compose_display_title(meta)
                 video_id = meta.get("id") or ""
                 general_logger.info(f"Track downloaded: {display_title}")
                 return output_path, display_title, performer, webpage_url, video_id
             else:
                 general_logger.warning(
-                    f"Track download failed (code {process.returncode}): {stderr.decode()[:200]}"
+                    f"Track download failed (code {result.returncode}): {stderr.decode()[:200]}"
                 )
         except asyncio.TimeoutError:
             general_logger.warning(f"Track download timed out for: {url_or_query}")
@@ -2411,7 +2547,6 @@ class VideoDownloader:
             )
 
             cmd = [
-                self.yt_dlp_path,
                 url,
                 "-f",
                 "bestaudio/best",
@@ -2435,21 +2570,15 @@ class VideoDownloader:
                 "after_move:filepath",
             ]
             try:
-                env = os.environ.copy()
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                    env=env,
-                )
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(), timeout=180.0
+                result = await asyncio.wait_for(
+                    self.ytdlp_pool.run(cmd), timeout=180.0
                 )
+                stdout, stderr = result.stdout, result.stderr
                 output_path = (
                     stdout.decode().strip().split("\n")[-1] if stdout else None
                 )
                 if (
-                    process.returncode == 0
+                    result.returncode == 0
                     and output_path
                     and os.path.exists(output_path)
                 ):
@@ -2783,13 +2912,8 @@ class VideoDownloader:
         Returns list of metadata dicts with id, title, artist, track, uploader, duration, webpage_url.
         """
         search_query = f"ytsearch{limit}:{query}"
-        env = os.environ.copy()
-        deno_path = os.path.expanduser("~/.deno/bin")
-        if os.path.exists(deno_path):
-            env["PATH"] = f"{deno_path}:{env.get('PATH', '')}"
 
         cmd = [
-            self.yt_dlp_path,
             search_query,
             "--skip-download",
             "--no-playlist",
@@ -2806,15 +2930,11 @@ class VideoDownloader:
             cmd.extend(["--cookies", yt_cookies_path])
 
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env,
+            result = await asyncio.wait_for(
+                self.ytdlp_pool.run(cmd, kind="search"), timeout=timeout
             )
-            stdout, _ = await asyncio.wait_for(process.communicate(), timeout=timeout)
             results = []
-            for line in stdout.decode().strip().split("\n"):
+            for line in result.stdout.decode().strip().split("\n"):
                 line = line.strip()
                 if not line:
                     continue
@@ -3029,15 +3149,9 @@ class VideoDownloader:
         unique_filename = f"yt_{uuid.uuid4().hex[:8]}.mp4"
         output_path = os.path.join(self.download_path, unique_filename)
 
-        # Environment with deno in PATH for JS challenge solving
-        env = os.environ.copy()
-        deno_path = os.path.expanduser("~/.deno/bin")
-        if os.path.exists(deno_path):
-            env["PATH"] = f"{deno_path}:{env.get('PATH', '')}"
 
         # Build command
         cmd = [
-            self.yt_dlp_path,
             url,
             "-o",
             output_path,
@@ -3054,22 +3168,16 @@ class VideoDownloader:
             "--fragment-retries",
             "2",
             "-f",
-            strategy["format"],
+            self._sized_format(url, strategy["format"]),
         ] + strategy["args"]
 
         error_logger.info(f"   Command: {' '.join(cmd[:8])}... (truncated)")
 
+        result = None
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env,
-            )
-
-            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=90.0)
+            result = await asyncio.wait_for(self.ytdlp_pool.run(cmd), timeout=90.0)
 
-            if process.returncode == 0 and os.path.exists(output_path):
+            if result.returncode == 0 and os.path.exists(output_path):
                 file_size = os.path.getsize(output_path)
                 error_logger.info(f"   ✅ Downloaded {file_size} bytes")
 
@@ -3077,9 +3185,9 @@ class VideoDownloader:
                 title = await self._get_video_title(url)
                 return output_path, title
             else:
-                stderr_text = stderr.decode()
+                stderr_text = result.stderr.decode()
                 error_logger.warning(
-                    f"   ❌ Process failed (code {process.returncode})"
+                    f"   ❌ Process failed (code {result.returncode})"
                 )
                 error_logger.warning(f"   Error: {stderr_text[:200]}...")
                 return None, None
@@ -3096,13 +3204,22 @@ class VideoDownloader:
                 try:
                     # Only remove if download failed
                     if not (
-                        process.returncode == 0 and os.path.getsize(output_path) > 0
+                        result is not None
+                        and result.returncode == 0
+                        and os.path.getsize(output_path) > 0
                     ):
                         os.remove(output_path)
                 except Exception:
                     pass  # cleanup
 
     async def _get_video_title(self, url: str) -> str:
+        # The format probe has usually read the title already
+        probe = self.probe_cache.get(media_cache_key(url))
+        if probe is not None and probe.title:
+            if "youtube.com/shorts" in url.lower() and probe.tags:
+                hashtags = " ".join(f"#{tag.strip()}" for tag in probe.tags)
+                return f"{probe.title} {hashtags}"
+            return probe.title
         try:
             # For YouTube Shorts, get both title and hashtags with better error handling
             if "youtube.com/shorts" in url.lower():
@@ -3117,45 +3234,32 @@ class VideoDownloader:
 
                 try:
                     # First try to get just the title (more likely to succeed)
-                    title_process = await asyncio.create_subprocess_exec(
-                        self.yt_dlp_path,
-                        "--get-title",
-                        "--no-warnings",
-                        url,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE,
-                    )
-
-                    # Get title with timeout
-                    title_stdout, title_stderr = await asyncio.wait_for(
-                        title_process.communicate(), timeout=15.0
+                    title_result = await asyncio.wait_for(
+                        self.ytdlp_pool.run(
+                            ["--get-title", "--no-warnings", url], kind="metadata"
+                        ),
+                        timeout=15.0,
                     )
-                    title = title_stdout.decode().strip()
+                    title = title_result.stdout.decode().strip()
 
                     if not title:
                         error_logger.warning(f"Empty title for YouTube Shorts: {url}")
                         error_logger.warning(
-                            f"Title stderr: {title_stderr.decode().strip()}"
+                            f"Title stderr: {title_result.stderr.decode().strip()}"
                         )
                         title = f"YouTube Short {video_id}"
 
                     # Try to get tags if we have a title
                     hashtags = ""
                     try:
-                        tags_process = await asyncio.create_subprocess_exec(
-                            self.yt_dlp_path,
-                            "--get-tags",
-                            "--no-warnings",
-                            url,
-                            stdout=asyncio.subprocess.PIPE,
-                            stderr=asyncio.subprocess.PIPE,
-                        )
-
                         # Get tags with a shorter timeout
-                        tags_stdout, _ = await asyncio.wait_for(
-                            tags_process.communicate(), timeout=10.0
+                        tags_result = await asyncio.wait_for(
+                            self.ytdlp_pool.run(
+                                ["--get-tags", "--no-warnings", url], kind="metadata"
+                            ),
+                            timeout=10.0,
                         )
-                        tags = tags_stdout.decode().strip()
+                        tags = tags_result.stdout.decode().strip()
 
                         # Add hashtags if available
                         if tags:
@@ -3178,24 +3282,17 @@ class VideoDownloader:
             else:
                 # For other platforms, just get the title
                 error_logger.info(f"Getting title for URL: {url}")
-                process = await asyncio.create_subprocess_exec(
-                    self.yt_dlp_path,
-                    "--get-title",
-                    "--no-warnings",
-                    url,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-
-                # Add timeout
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(), timeout=15.0
+                result = await asyncio.wait_for(
+                    self.ytdlp_pool.run(
+                        ["--get-title", "--no-warnings", url], kind="metadata"
+                    ),
+                    timeout=15.0,
                 )
-                title = stdout.decode().strip()
+                title = result.stdout.decode().strip()
 
                 if not title:
                     error_logger.warning(f"Empty title for URL: {url}")
-                    error_logger.warning(f"Stderr: {stderr.decode().strip()}")
+                    error_logger.warning(f"Stderr: {result.stderr.decode().strip()}")
                     # Try to extract some identifier from the URL
                     parts = url.split("/")
                     if len(parts) > 3:
@@ -3252,6 +3349,7 @@ class VideoDownloader:
     ) -> None:
         """Handle video link with improved error handling and resource cleanup."""
         processing_msg = None
+        queue_position: Optional[QueuePositionMessage] = None
         filename = None
 
         try:
@@ -3299,58 +3397,90 @@ class VideoDownloader:
                 "DEBUG: Finished calling _send_before_video_if_configured"
             )
 
+            # Links sent before are resent by file_id, without downloading
+            pending = []
+            for url in urls:
+                if "music.youtube.com" in url.lower() or not await self._send_cached_media(
+                    update, context, url
+                ):
+                    pending.append(url)
+            urls = pending
+            if not urls:
+                return
+
             # Now send processing message
             if update.message:
                 processing_msg = await update.message.reply_text(
-                    "⏳ Processing your request..."
+                    queue_position_text(0)
+                )
+                queue_position = QueuePositionMessage(
+                    processing_msg,
+                    GPTConstants.STREAM_EDIT_INTERVAL_PRIVATE
+                    if chat_type == "private"
+                    else GPTConstants.STREAM_EDIT_INTERVAL_GROUP,
                 )
+            show_position = queue_position.update if queue_position else None
 
-            async with self._video_work_semaphore:
-                for url in urls:
-                    is_youtube_music = "music.youtube.com" in url.lower()
-                    async with _chat_action(update, context, ChatAction.UPLOAD_VIDEO):
-                        if is_youtube_music:
-                            # Handle YouTube Music - download as MP3
+            user_id = str(update.effective_user.id) if update.effective_user else None
+
+            for url in urls:
+                is_youtube_music = "music.youtube.com" in url.lower()
+                async with _chat_action(update, context, ChatAction.UPLOAD_VIDEO):
+                    if is_youtube_music:
+                        # Handle YouTube Music - download as MP3
+                        async with self._download_scheduler.slot(
+                            "youtube_music", chat_id, user_id, show_position
+                        ):
                             filename, title, performer, youtube_url, video_id = (
                                 await asyncio.wait_for(
                                     self.download_youtube_music(url), timeout=60
                                 )
                             )
-                        else:
-                            # Handle regular video platforms
-                            filename, title = await asyncio.wait_for(
-                                self.download_video(url, chat_id, chat_type),
-                                timeout=60,
-                            )
-                    # chat_action exited — keepalive cancelled, indicator stops refreshing
-                    if is_youtube_music:
-                        if filename and os.path.exists(filename):
-                            await self._send_audio(
-                                update,
-                                context,
-                                filename,
-                                title,
-                                performer=performer,
-                                youtube_url=youtube_url or url,
+                    else:
+                        # Handle regular video platforms
+                        filename, title = await self.download_video(
+                            url,
+                            chat_id,
+                            chat_type,
+                            user_id=user_id,
+                            on_queue_position=show_position,
+                        )
+                # chat_action exited — keepalive cancelled, indicator stops refreshing
+                if is_youtube_music:
+                    if filename and os.path.exists(filename):
+                        await self._send_audio(
+                            update,
+                            context,
+                            filename,
+                            title,
+                            performer=performer,
+                            youtube_url=youtube_url or url,
+                        )
+                    else:
+                        await self._handle_download_error(update, url)
+                else:
+                    if filename and os.path.exists(filename):
+                        if self._file_is_image(filename):
+                            await self._send_photo(
+                                update, context, filename, title, source_url=url
                             )
                         else:
-                            await self._handle_download_error(update, url)
+                            await self._send_video(
+                                update, context, filename, title, source_url=url
+                            )
+                    elif self._too_large_to_send(url) and update.message:
+                        await update.message.reply_text("❌ Video file too large to send.")
                     else:
-                        if filename and os.path.exists(filename):
-                            if self._file_is_image(filename):
-                                await self._send_photo(
-                                    update, context, filename, title, source_url=url
-                                )
-                            else:
-                                await self._send_video(
-                                    update, context, filename, title, source_url=url
-                                )
-                        else:
-                            await self._handle_download_error(update, url)
+                        await self._handle_download_error(update, url)
+                # Files are shared with other chats; release each once it is sent
+                self.release_download(filename)
+                filename = None
 
         except Exception as e:
             await self._handle_processing_error(update, e, message_text)
         finally:
+            if queue_position:
+                await queue_position.close()
             await self._cleanup(processing_msg, filename, update)
 
     async def _send_before_video(
@@ -3409,66 +3539,14 @@ class VideoDownloader:
             # Videos are always sent now
 
             file_size = os.path.getsize(filename)
-            max_size = 50 * 1024 * 1024  # 50MB limit for Telegram
 
-            if file_size > max_size:
+            if file_size > TELEGRAM_UPLOAD_LIMIT:
                 error_logger.warning(f"File too large: {file_size} bytes")
                 if update.message:
                     await update.message.reply_text("❌ Video file too large to send.")
                 return
 
-            # Build caption with manual entities to support expandable_blockquote
-            # (HTML/MarkdownV2 parsers in older python-telegram-bot don't support it)
-            from telegram import MessageEntity
-
-            def utf16_len(s: str) -> int:
-                return len(s.encode("utf-16-le")) // 2
-
-            username = "Unknown"
-            if update.effective_user:
-                username = (
-                    update.effective_user.username
-                    or update.effective_user.first_name
-                    or "Unknown"
-                )
-
-            caption = f"👤 Від: @{username}"
-            caption_entities = []
-            offset = utf16_len(caption)
-
-            if source_url:
-                link_prefix = "\n\n🔗 "
-                link_label = "Посилання"
-                offset += utf16_len(link_prefix)
-                caption_entities.append(
-                    MessageEntity(
-                        type=MessageEntity.TEXT_LINK,
-                        offset=offset,
-                        length=utf16_len(link_label),
-                        url=source_url,
-                    )
-                )
-                caption += link_prefix + link_label
-                offset += utf16_len(link_label)
-
-            if title:
-                title_prefix = "\n\n"
-                # Truncate only if needed to stay within Telegram's 1024-char caption limit
-                max_title_len = 1024 - len(caption) - len(title_prefix)
-                truncated_title = (
-                    title
-                    if len(title) <= max_title_len
-                    else title[: max_title_len - 3] + "..."
-                )
-                offset += utf16_len(title_prefix)
-                caption_entities.append(
-                    MessageEntity(
-                        type="expandable_blockquote",
-                        offset=offset,
-                        length=utf16_len(truncated_title),
-                    )
-                )
-                caption += title_prefix + truncated_title
+            caption, caption_entities = self._media_caption(update, source_url, title)
 
             _upload_timeouts = dict(
                 write_timeout=120,
@@ -3478,38 +3556,19 @@ class VideoDownloader:
             )
 
             with open(filename, "rb") as video_file:
-                send_kwargs = dict(caption=caption, caption_entities=caption_entities)
-                # Check if the original message was a reply to another message
-                if update.message and update.message.reply_to_message:
-                    await update.message.reply_to_message.reply_video(
-                        video=video_file, **send_kwargs, **_upload_timeouts
-                    )
-                else:
-                    if update.effective_chat:
-                        await context.bot.send_video(
-                            chat_id=update.effective_chat.id,
-                            video=video_file,
-                            **send_kwargs,
-                            **_upload_timeouts,
-                        )
-
-            # Track successful video download
-            if update.effective_chat:
-                from modules.event_tracker import record_bot_event
-
-                _user_id = update.effective_user.id if update.effective_user else None
-                asyncio.ensure_future(
-                    record_bot_event(
-                        "video_download", update.effective_chat.id, _user_id
-                    )
+                sent = await self._deliver_media(
+                    update,
+                    context,
+                    "video",
+                    video_file,
+                    caption=caption,
+                    caption_entities=caption_entities,
+                    **_upload_timeouts,
                 )
 
-            # Delete the original message after successful video send
-            try:
-                if update.message:
-                    await asyncio.wait_for(update.message.delete(), timeout=10)
-            except (asyncio.TimeoutError, Exception) as e:
-                error_logger.error(f"Failed to delete original message: {str(e)}")
+            if source_url:
+                self._remember_media(source_url, "video", sent, title)
+            await self._finish_media_send(update)
 
         except Exception as e:
             error_logger.error(f"Video sending error: {str(e)}")
@@ -3524,36 +3583,7 @@ class VideoDownloader:
         source_url: Optional[str] = None,
     ) -> None:
         try:
-            from telegram import MessageEntity
-
-            def utf16_len(s: str) -> int:
-                return len(s.encode("utf-16-le")) // 2
-
-            username = "Unknown"
-            if update.effective_user:
-                username = (
-                    update.effective_user.username
-                    or update.effective_user.first_name
-                    or "Unknown"
-                )
-
-            caption = f"👤 Від: @{username}"
-            caption_entities = []
-            offset = utf16_len(caption)
-
-            if source_url:
-                link_prefix = "\n\n🔗 "
-                link_label = "Посилання"
-                offset += utf16_len(link_prefix)
-                caption_entities.append(
-                    MessageEntity(
-                        type=MessageEntity.TEXT_LINK,
-                        offset=offset,
-                        length=utf16_len(link_label),
-                        url=source_url,
-                    )
-                )
-                caption += link_prefix + link_label
+            caption, caption_entities = self._media_caption(update, source_url)
 
             _upload_timeouts = dict(
                 write_timeout=60,
@@ -3563,40 +3593,189 @@ class VideoDownloader:
             )
 
             with open(filename, "rb") as photo_file:
-                send_kwargs = dict(caption=caption, caption_entities=caption_entities)
-                if update.message and update.message.reply_to_message:
-                    await update.message.reply_to_message.reply_photo(
-                        photo=photo_file, **send_kwargs, **_upload_timeouts
-                    )
-                else:
-                    if update.effective_chat:
-                        await context.bot.send_photo(
-                            chat_id=update.effective_chat.id,
-                            photo=photo_file,
-                            **send_kwargs,
-                            **_upload_timeouts,
-                        )
-
-            if update.effective_chat:
-                from modules.event_tracker import record_bot_event
-
-                _user_id = update.effective_user.id if update.effective_user else None
-                asyncio.ensure_future(
-                    record_bot_event(
-                        "video_download", update.effective_chat.id, _user_id
-                    )
+                sent = await self._deliver_media(
+                    update,
+                    context,
+                    "photo",
+                    photo_file,
+                    caption=caption,
+                    caption_entities=caption_entities,
+                    **_upload_timeouts,
                 )
 
-            try:
-                if update.message:
-                    await asyncio.wait_for(update.message.delete(), timeout=10)
-            except (asyncio.TimeoutError, Exception) as e:
-                error_logger.error(f"Failed to delete original message: {str(e)}")
+            if source_url:
+                self._remember_media(source_url, "photo", sent, title)
+            await self._finish_media_send(update)
 
         except Exception as e:
             error_logger.error(f"Photo sending error: {str(e)}")
             await self.send_error_sticker(update)
 
+    @staticmethod
+    def _media_caption(
+        update: Update, source_url: Optional[str], title: Optional[str] = None
+    ) -> Tuple[str, List[Any]]:
+        """Build the caption of a sent video or photo and its entities."""
+        # Manual entities support expandable_blockquote
+        # (HTML/MarkdownV2 parsers in older python-telegram-bot don't support it)
+        from telegram import MessageEntity
+
+        def utf16_len(s: str) -> int:
+            return len(s.encode("utf-16-le")) // 2
+
+        username = "Unknown"
+        if update.effective_user:
+            username = (
+                update.effective_user.username
+                or update.effective_user.first_name
+                or "Unknown"
+            )
+
+        caption = f"👤 Від: @{username}"
+        caption_entities = []
+        offset = utf16_len(caption)
+
+        if source_url:
+            link_prefix = "\n\n🔗 "
+            link_label = "Посилання"
+            offset += utf16_len(link_prefix)
+            caption_entities.append(
+                MessageEntity(
+                    type=MessageEntity.TEXT_LINK,
+                    offset=offset,
+                    length=utf16_len(link_label),
+                    url=source_url,
+                )
+            )
+            caption += link_prefix + link_label
+            offset += utf16_len(link_label)
+
+        if title:
+            title_prefix = "\n\n"
+            # Truncate only if needed to stay within Telegram's 1024-char caption limit
+            max_title_len = 1024 - len(caption) - len(title_prefix)
+            truncated_title = (
+                title
+                if len(title) <= max_title_len
+                else title[: max_title_len - 3] + "..."
+            )
+            offset += utf16_len(title_prefix)
+            caption_entities.append(
+                MessageEntity(
+                    type="expandable_blockquote",
+                    offset=offset,
+                    length=utf16_len(truncated_title),
+                )
+            )
+            caption += title_prefix + truncated_title
+
+        return caption, caption_entities
+
+    @staticmethod
+    async def _deliver_media(
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        kind: str,
+        media: Any,
+        **kwargs: Any,
+    ) -> Any:
+        """Send a video or photo as a reply to the replied-to message, else to the chat."""
+        if update.message and update.message.reply_to_message:
+            reply = getattr(update.message.reply_to_message, f"reply_{kind}")
+            return await reply(**{kind: media}, **kwargs)
+        if update.effective_chat:
+            send = getattr(context.bot, f"send_{kind}")
+            return await send(chat_id=update.effective_chat.id, **{kind: media}, **kwargs)
+        return None
+
+    async def _finish_media_send(self, update: Update) -> None:
+        """Track the download and delete the original message after a successful send."""
+        if update.effective_chat:
+            from modules.event_tracker import record_bot_event
+
+            _user_id = update.effective_user.id if update.effective_user else None
+            asyncio.ensure_future(
+                record_bot_event(
+                    "video_download", update.effective_chat.id, _user_id
+                )
+            )
+
+        try:
+            if update.message:
+                await asyncio.wait_for(update.message.delete(), timeout=10)
+        except (asyncio.TimeoutError, Exception) as e:
+            error_logger.error(f"Failed to delete original message: {str(e)}")
+
+    def _remember_media(
+        self, source_url: str, kind: str, sent: Any, title: Optional[str]
+    ) -> None:
+        """Store the file_id of a sent video or photo for later shares of the link."""
+        if kind == "photo":
+            sizes = getattr(sent, "photo", None)
+            media = sizes[-1] if isinstance(sizes, (list, tuple)) and sizes else None
+        else:
+            media = getattr(sent, "video", None)
+        file_id = getattr(media, "file_id", None)
+        if not isinstance(file_id, str):
+            return
+
+        def dimension(name: str) -> Optional[int]:
+            value = getattr(media, name, None)
+            return value if isinstance(value, int) else None
+
+        self.media_cache.set(
+            media_cache_key(source_url),
+            kind=kind,
+            file_id=file_id,
+            title=title,
+            width=dimension("width"),
+            height=dimension("height"),
+            duration=dimension("duration"),
+        )
+
+    async def _send_cached_media(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE, url: str
+    ) -> bool:
+        """Resend a link sent before by its file_id; False if it has to be downloaded."""
+        key = media_cache_key(url)
+        entry = self.media_cache.get(key)
+        if entry is None:
+            performance_monitor.record_metric("cache_miss_media", 1)
+            return False
+        performance_monitor.record_cache_hit("media")
+
+        kind = entry.get("kind", "video")
+        caption, caption_entities = self._media_caption(
+            update, url, entry.get("title") if kind == "video" else None
+        )
+        extra: Dict[str, Any] = {}
+        if kind == "video":
+            extra = {
+                name: entry[name]
+                for name in ("width", "height", "duration")
+                if entry.get(name)
+            }
+        try:
+            await self._deliver_media(
+                update,
+                context,
+                kind,
+                entry["file_id"],
+                caption=caption,
+                caption_entities=caption_entities,
+                **extra,
+            )
+        except TelegramError as e:
+            if isinstance(e, BadRequest):
+                # The file_id is no longer accepted; download the link again
+                self.media_cache.evict(key)
+            error_logger.warning(f"Sending cached {kind} for {key} failed: {e}")
+            return False
+
+        general_logger.info(f"Resent cached {kind} for {key}")
+        await self._finish_media_send(update)
+        return True
+
     async def _handle_download_error(self, update: Update, url: str) -> None:
         """Handle download errors with standardized handling."""
         from modules.error_handler import (
@@ -3721,7 +3900,7 @@ class VideoDownloader:
 
         if filename and os.path.exists(filename):
             try:
-                os.remove(filename)
+                self.release_download(filename)
             except Exception as e:
                 user_id = (
                     update.effective_user.id if update.effective_user else "Unknown"
@@ -3756,6 +3935,15 @@ class VideoDownloader:
 
         return "yt-dlp"
 
+    @staticmethod
+    def _yt_dlp_env() -> Dict[str, str]:
+        """Environment for yt-dlp, with deno on PATH for YouTube's JS challenges."""
+        env = os.environ.copy()
+        deno_path = os.path.expanduser("~/.deno/bin")
+        if os.path.exists(deno_path):
+            env["PATH"] = f"{deno_path}:{env.get('PATH', '')}"
+        return env
+
     def _verify_yt_dlp(self) -> None:
         """Verify yt-dlp is installed and accessible."""
         try:
@@ -3924,7 +4112,6 @@ class VideoDownloader:
 
         # Base yt-dlp arguments with bot detection avoidance
         yt_dlp_args = [
-            self.yt_dlp_path,
             url,
             "-o",
             output_template,
@@ -3934,9 +4121,10 @@ class VideoDownloader:
             "--geo-bypass",  # Try to bypass geo-restrictions
         ]
 
-        # Add format if specified
-        if config.format:
-            yt_dlp_args.extend(["-f", config.format])
+        # Add format if specified, led by the probed one that fits the upload limit
+        download_format = self._sized_format(url, config.format)
+        if download_format:
+            yt_dlp_args.extend(["-f", download_format])
 
         # Add extra arguments if specified
         if config.extra_args:
@@ -4024,7 +4212,6 @@ class VideoDownloader:
 
                 # Create base args for this strategy
                 strategy_yt_dlp_args = [
-                    self.yt_dlp_path,
                     url,
                     "-o",
                     output_template,
@@ -4037,7 +4224,7 @@ class VideoDownloader:
                     "--fragment-retries",
                     "3",
                     "-f",
-                    strategy_format,
+                    self._sized_format(url, strategy_format),
                 ]
 
                 # Add strategy-specific args
@@ -4047,22 +4234,17 @@ class VideoDownloader:
                     error_logger.info(
                         f"Executing: {' '.join(strategy_yt_dlp_args[:8])}... (truncated)"
                     )
-                    process = await asyncio.create_subprocess_exec(
-                        *strategy_yt_dlp_args,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE,
-                    )
-                    stdout, stderr = await asyncio.wait_for(
-                        process.communicate(), timeout=120.0
+                    result = await asyncio.wait_for(
+                        self.ytdlp_pool.run(strategy_yt_dlp_args), timeout=120.0
                     )
 
-                    if process.returncode == 0 and os.path.exists(output_template):
+                    if result.returncode == 0 and os.path.exists(output_template):
                         error_logger.info(
                             f"✅ YouTube download successful with strategy: {strategy_name}"
                         )
                         return output_template, await self._get_video_title(url)
                     else:
-                        stderr_text = stderr.decode()
+                        stderr_text = result.stderr.decode()
 
                         # Check for specific errors
                         if (
@@ -4106,12 +4288,6 @@ class VideoDownloader:
 
                 except (asyncio.TimeoutError, Exception) as e:
                     error_logger.warning(f"❌ Strategy '{strategy_name}' error: {e}")
-                    if "process" in locals() and process.returncode is None:
-                        try:
-                            process.kill()
-                            await process.wait()
-                        except Exception:
-                            pass  # cleanup
 
                     # Clean up any partial files
                     if os.path.exists(output_template):
@@ -4137,16 +4313,11 @@ class VideoDownloader:
             error_logger.info(
                 f"Starting yt-dlp download with args: {' '.join(yt_dlp_args)}"
             )  # Log full command
-            process = await asyncio.create_subprocess_exec(
-                *yt_dlp_args,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(), timeout=90.0
+            result = await asyncio.wait_for(
+                self.ytdlp_pool.run(yt_dlp_args), timeout=90.0
             )  # Increased timeout
 
-            if process.returncode == 0:
+            if result.returncode == 0:
                 if os.path.exists(output_template):
                     error_logger.info(f"Download successful: {output_template}")
                     return output_template, await self._get_video_title(url)
@@ -4155,17 +4326,11 @@ class VideoDownloader:
                         f"Download completed but file not found: {output_template}"
                     )
             else:
-                stderr_text = stderr.decode()
+                stderr_text = result.stderr.decode()
                 error_logger.error(f"Download failed for {url}: {stderr_text}")
 
         except (asyncio.TimeoutError, Exception) as e:
             error_logger.error(f"Generic download error for {url}: {e}")
-            if "process" in locals() and process.returncode is None:
-                try:
-                    process.kill()
-                    await process.wait()
-                except Exception:
-                    pass  # cleanup
 
         return None, None
 
@@ -5,7 +5,7 @@ Provides video download handling functionality as a service.
 """
 
 import logging
-from typing import Any
+from typing import Any, Optional
 from telegram.ext import Application
 
 from modules.service_registry import ServiceInterface
@@ -20,6 +20,7 @@ class VideoHandlerService(ServiceInterface):
     
     def __init__(self) -> None:
         self._initialized = False
+        self._video_downloader: Optional[Any] = None
     
     async def initialize(self) -> None:
         """Initialize the video handler service."""
@@ -27,7 +28,13 @@ class VideoHandlerService(ServiceInterface):
         logger.info("Video Handler Service initialized")
     
     async def shutdown(self) -> None:
-        """Shutdown the video handler service."""
+        """Shutdown the video handler service and the downloader's worker processes."""
+        if self._video_downloader is not None:
+            try:
+                await self._video_downloader.close()
+            except Exception as e:
+                logger.error(f"Error closing video downloader: {e}")
+            self._video_downloader = None
         self._initialized = False
         logger.info("Video Handler Service shutdown")
     
@@ -37,4 +44,5 @@ class VideoHandlerService(ServiceInterface):
             await self.initialize()
 
         setup_video_handlers(application, extract_urls_func=extract_urls, config_manager=config_manager)
+        self._video_downloader = application.bot_data.get("video_downloader")
         logger.info("Video handlers setup completed")
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+Size-targeted ffmpeg transcoding for videos over Telegram's upload limit.
+
+``transcode_to_size`` re-encodes a video to H.264/AAC at the bitrate that
+makes it fit a byte budget over its duration. It also lowers the resolution
+to suit that bitrate. It runs in a process of ``VideoTranscoder``'s pool,
+which bounds how many transcodes run at once and keeps the waiting and
+ffmpeg I/O off the event loop. Videos so long that their bitrate would
+drop below ``MIN_VIDEO_BITRATE`` are not worth transcoding;
+``can_transcode_to`` tells callers so before anything is downloaded.
+Transcode times are recorded as ``video_transcode_time``, tagged by outcome.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from modules.performance_monitor import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+TRANSCODE_WORKERS = 1
+TRANSCODE_TIMEOUT = 300
+
+AUDIO_BITRATE = 96_000
+MIN_VIDEO_BITRATE = 200_000
+
+# Share of the budget the encoder aims for; rate control overshoots a little
+SIZE_HEADROOM = 0.92
+
+# Highest resolution worth encoding at a video bitrate (bit/s) of at least the first value
+HEIGHT_STEPS = ((2_500_000, 1080), (1_200_000, 720), (600_000, 480), (0, 360))
+
+
+class TranscodeError(RuntimeError):
+    """ffmpeg could not produce a file within the budget."""
+
+
+def video_bitrate(target_bytes: int, duration: float) -> int:
+    """Video bitrate (bit/s) that fits target_bytes over duration seconds, after audio."""
+    return int(target_bytes * 8 * SIZE_HEADROOM / duration) - AUDIO_BITRATE
+
+
+def can_transcode_to(target_bytes: int, duration: Optional[float]) -> bool:
+    """Whether a video of duration seconds can be transcoded to target_bytes at a watchable bitrate."""
+    return not duration or video_bitrate(target_bytes, duration) >= MIN_VIDEO_BITRATE
+
+
+def max_height(bitrate: int) -> int:
+    return next(height for floor, height in HEIGHT_STEPS if bitrate >= floor)
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """Duration of a media file in seconds according to ffprobe, or None."""
+    try:
+        completed = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", path],
+            capture_output=True, text=True, timeout=30,
+        )
+        return float(completed.stdout.strip())
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+def transcode_to_size(src: str, dst: str, target_bytes: int, duration: Optional[float] = None) -> str:
+    """Transcode src into dst so that it fits target_bytes; return dst or raise TranscodeError."""
+    duration = duration or probe_duration(src)
+    if not duration:
+        raise TranscodeError(f"unknown duration of {src}")
+    bitrate = video_bitrate(target_bytes, duration)
+    if bitrate < MIN_VIDEO_BITRATE:
+        raise TranscodeError(f"{duration:.0f}s is too long to fit {target_bytes} bytes")
+    height = max_height(bitrate)
+    cmd = [
+        "ffmpeg", "-y", "-nostdin", "-loglevel", "error", "-i", src,
+        "-vf", f"scale=-2:'min({height},ih)'",
+        "-c:v", "libx264", "-preset", "veryfast",
+        "-b:v", str(bitrate), "-maxrate", str(bitrate), "-bufsize", str(2 * bitrate),
+        "-c:a", "aac", "-b:a", str(AUDIO_BITRATE),
+        "-movflags", "+faststart",
+        dst,
+    ]
+    try:
+        completed = subprocess.run(cmd, capture_output=True, text=True, timeout=TRANSCODE_TIMEOUT)
+    except (OSError, subprocess.SubprocessError) as e:
+        _remove(dst)
+        raise TranscodeError(f"ffmpeg failed: {e}") from e
+    if completed.returncode != 0 or not os.path.exists(dst):
+        _remove(dst)
+        raise TranscodeError(f"ffmpeg exited with {completed.returncode}: {completed.stderr[-300:].strip()}")
+    size = os.path.getsize(dst)
+    if size > target_bytes:
+        _remove(dst)
+        raise TranscodeError(f"transcoded file is {size} bytes, over {target_bytes}")
+    return dst
+
+
+def _remove(path: str) -> None:
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class VideoTranscoder:
+    """Runs transcode_to_size on a pool of max_workers processes."""
+
+    def __init__(self, max_workers: int = TRANSCODE_WORKERS) -> None:
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def available() -> bool:
+        return shutil.which("ffmpeg") is not None
+
+    async def fit(self, filename: str, target_bytes: int, duration: Optional[float] = None) -> Optional[str]:
+        """Return a transcoded copy of filename that fits target_bytes, or None if it cannot be made."""
+        if not self.available():
+            logger.warning(f"ffmpeg is not installed; cannot shrink {filename}")
+            return None
+        dst = f"{os.path.splitext(filename)[0]}_fit.mp4"
+        started = time.monotonic()
+        future: Optional["Future[str]"] = None
+        outcome = "failed"
+        try:
+            future = self._pool().submit(transcode_to_size, filename, dst, target_bytes, duration)
+            result = await asyncio.wrap_future(future)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            # The transcode keeps running in its process; drop its output when it ends
+            if future is not None:
+                future.add_done_callback(lambda _future: _remove(dst))
+            outcome = "cancelled"
+            raise
+        except BrokenProcessPool as e:
+            logger.warning(f"Transcode process died while shrinking {filename}: {e}")
+            self.shutdown()
+            return None
+        except Exception as e:
+            logger.warning(f"Could not transcode {filename} to {target_bytes} bytes: {e}")
+            return None
+        finally:
+            performance_monitor.record_metric(
+                "video_transcode_time", time.monotonic() - started, "seconds", {"outcome": outcome}
+            )
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned, not forked: the bot's threads and event loop must not be copied
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,171 @@
+"""
+Per-chat word counts backing /count.
+
+``chat_word_counts`` holds one row per (chat, normalized token) with the
+number of occurrences in the chat's history. ``INSERT_MESSAGE_SQL`` in
+``modules.database`` adds the tokens of every newly inserted message in the
+same statement, using the token arrays produced by ``word_count_params``, so
+/count is a single primary-key lookup instead of a regex scan of the history.
+
+Tokens are runs of word characters, with apostrophes allowed inside a word
+(``м'ясо``). ``normalize_token`` folds case, unifies the apostrophe variants,
+drops stress marks and replaces Latin look-alike letters in Cyrillic words,
+so ``Пiсня`` typed with a Latin ``i`` counts as ``пісня``.
+
+Databases that already hold history must be rebuilt once with
+``scripts/rebuild_word_counts.py``; until then ``word_counts_ready`` returns
+False and /count keeps using the regex query.
+"""
+
+import logging
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from modules.rollup_state import mark_backfilled, rollup_ready
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "word_counts"
+
+# Tokens longer than this are noise (hashes, base64, keyboard mashing)
+MAX_TOKEN_LENGTH = 64
+
+# Messages streamed per round trip while rebuilding
+REBUILD_FETCH_SIZE = 5000
+
+_APOSTROPHES = str.maketrans({"\u2019": "'", "\u02bc": "'", "\u2018": "'", "`": "'", "\u00b4": "'"})
+
+# Latin letters that look identical to Cyrillic ones (Ukrainian і included)
+_CYRILLIC_LOOKALIKES = str.maketrans({
+    "a": "а", "c": "с", "e": "е", "i": "і", "o": "о", "p": "р", "x": "х", "y": "у",
+})
+
+_STRESS_MARKS = {"\u0300", "\u0301"}
+
+_TOKEN_RE = re.compile(r"\w+(?:'\w+)*")
+
+# What /count accepts as a word: letters, optionally joined by apostrophes
+_WORD_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+
+_CYRILLIC_RE = re.compile("[\u0400-\u04ff]")
+
+
+def _fold(text: str) -> str:
+    """Case-fold ``text``, unify apostrophes and strip stress marks."""
+    text = unicodedata.normalize("NFD", text.casefold().translate(_APOSTROPHES))
+    return unicodedata.normalize("NFC", "".join(ch for ch in text if ch not in _STRESS_MARKS))
+
+
+def _normalize_folded(token: str) -> str:
+    if _CYRILLIC_RE.search(token):
+        return token.translate(_CYRILLIC_LOOKALIKES)
+    return token
+
+
+def normalize_token(word: str) -> str:
+    """Return the form under which ``word`` is counted."""
+    return _normalize_folded(_fold(word.strip()))
+
+
+def is_countable_word(token: str) -> bool:
+    """Return True if a normalized token is something /count can look up."""
+    return 0 < len(token) <= MAX_TOKEN_LENGTH and _WORD_RE.fullmatch(token) is not None
+
+
+def tokenize(text: Optional[str]) -> Counter[str]:
+    """Count the normalized tokens of a message text."""
+    if not text:
+        return Counter()
+    return Counter(
+        _normalize_folded(token)
+        for token in _TOKEN_RE.findall(_fold(text))
+        if len(token) <= MAX_TOKEN_LENGTH
+    )
+
+
+def word_count_params(text: Optional[str]) -> Tuple[List[str], List[int]]:
+    """Return the (tokens, counts) array parameters for INSERT_MESSAGE_SQL.
+
+    Tokens are sorted so concurrent inserts lock the count rows of a chat in
+    the same order.
+    """
+    counts = tokenize(text)
+    tokens = sorted(counts)
+    return tokens, [counts[token] for token in tokens]
+
+
+async def word_counts_ready(conn: Any) -> bool:
+    """Return True once the word counts cover the whole message history."""
+    return await rollup_ready(conn, ROLLUP_NAME)
+
+
+async def fetch_word_count(conn: Any, chat_id: int, token: str) -> int:
+    """Return how many times ``token`` (already normalized) occurs in the chat."""
+    count = await conn.fetchval(
+        "SELECT count FROM chat_word_counts WHERE chat_id = $1 AND normalized_token = $2",
+        chat_id, token,
+    )
+    return int(count or 0)
+
+
+def _add_message(
+    counts: Counter[str], last_seen: Dict[str, datetime], text: Optional[str], timestamp: datetime
+) -> None:
+    for token, n in tokenize(text).items():
+        counts[token] += n
+        if token not in last_seen or timestamp > last_seen[token]:
+            last_seen[token] = timestamp
+
+
+async def rebuild_word_counts(conn: Any, chat_id: int) -> int:
+    """Re-tokenize the history of one chat; returns the number of distinct tokens.
+
+    The history up to a snapshot id is tokenized without blocking writers.
+    The table is then locked only to add the messages that arrived meanwhile
+    and swap in the recomputed rows, so concurrent increments are neither
+    lost nor counted twice.
+
+    The snapshot id is read under the same lock: it waits for the writers
+    already inserting messages, whose ids may be below the maximum but not
+    yet committed, and whose increments the swap would otherwise delete.
+    """
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE chat_word_counts IN SHARE ROW EXCLUSIVE MODE")
+        snapshot_id = await conn.fetchval("SELECT COALESCE(MAX(internal_message_id), 0) FROM messages")
+    counts: Counter[str] = Counter()
+    last_seen: Dict[str, datetime] = {}
+
+    async with conn.transaction():
+        async for row in conn.cursor("""
+            SELECT text, timestamp FROM messages
+            WHERE chat_id = $1 AND internal_message_id <= $2 AND text IS NOT NULL
+        """, chat_id, snapshot_id, prefetch=REBUILD_FETCH_SIZE):
+            _add_message(counts, last_seen, row["text"], row["timestamp"])
+
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE chat_word_counts IN SHARE ROW EXCLUSIVE MODE")
+        for row in await conn.fetch("""
+            SELECT text, timestamp FROM messages
+            WHERE chat_id = $1 AND internal_message_id > $2 AND text IS NOT NULL
+        """, chat_id, snapshot_id):
+            _add_message(counts, last_seen, row["text"], row["timestamp"])
+        await conn.execute("DELETE FROM chat_word_counts WHERE chat_id = $1", chat_id)
+        await conn.copy_records_to_table(
+            "chat_word_counts",
+            records=[(chat_id, token, n, last_seen[token]) for token, n in counts.items()],
+            columns=["chat_id", "normalized_token", "count", "last_seen"],
+        )
+    return len(counts)
+
+
+async def backfill_word_counts(conn: Any) -> int:
+    """Rebuild the word counts of every chat and mark them ready; returns the number of chats."""
+    chat_ids = [r["chat_id"] for r in await conn.fetch("SELECT chat_id FROM chats ORDER BY chat_id")]
+    for i, chat_id in enumerate(chat_ids, 1):
+        tokens = await rebuild_word_counts(conn, chat_id)
+        logger.info(f"[{i}/{len(chat_ids)}] chat {chat_id}: {tokens} distinct words")
+    await mark_backfilled(conn, ROLLUP_NAME)
+    return len(chat_ids)
@@ -0,0 +1,247 @@
+"""
+Pool of long-lived yt-dlp worker processes.
+
+Spawning the ``yt-dlp`` command costs interpreter startup and extractor
+imports on every call, hundreds of milliseconds before any network work.
+``YtDlpPool`` instead keeps up to ``size`` ``modules.ytdlp_worker`` processes
+that host yt-dlp as a library and reuses them for search, metadata and
+download jobs. A job is the argument list the command would take (without
+the executable) and ``run`` returns its return code, stdout and stderr, so
+callers read the result exactly as they read the command's output.
+
+Workers are started on demand and retired after ``max_jobs`` jobs, which
+also picks up a yt-dlp upgraded while the bot runs. A worker that crashes
+fails only its current job; one whose job is cancelled or times out is
+killed, as yt-dlp cannot be interrupted mid-download. If workers cannot be
+started at all (yt-dlp is installed only as a binary), the pool falls back
+to running ``fallback_executable`` per job.
+
+Job durations are recorded as ``ytdlp_job_time`` tagged by kind, worker
+starts as ``ytdlp_worker_starts`` and crashes as ``ytdlp_worker_crashes``.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from modules.performance_monitor import performance_monitor
+from modules.ytdlp_worker import DEFAULT_EXTRACTOR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 3
+MAX_JOBS_PER_WORKER = 50
+WORKER_START_TIMEOUT = 30.0
+WORKER_STOP_TIMEOUT = 5.0
+
+# Results carry a job's whole stdout (e.g. -j metadata) on one line
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+@dataclass
+class YtDlpResult:
+    """Outcome of one job, shaped like a finished yt-dlp process."""
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+
+
+class YtDlpUnavailable(RuntimeError):
+    """A worker process could not be started, or the pool is closed."""
+
+
+class _Worker:
+    """One worker process and the protocol spoken with it."""
+
+    def __init__(
+        self, process: asyncio.subprocess.Process, stdin: asyncio.StreamWriter, stdout: asyncio.StreamReader
+    ) -> None:
+        self.process = process
+        self.stdin = stdin
+        self.stdout = stdout
+        self.jobs = 0
+
+    @classmethod
+    async def start(cls, extractor: str, env: Mapping[str, str]) -> "_Worker":
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "modules.ytdlp_worker", "--extractor", extractor,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                env=dict(env),
+                limit=MAX_MESSAGE_SIZE,
+            )
+        except OSError as e:
+            raise YtDlpUnavailable(f"could not spawn yt-dlp worker: {e}") from e
+        # Both are pipes, as requested above
+        assert process.stdin is not None and process.stdout is not None
+        worker = cls(process, process.stdin, process.stdout)
+        try:
+            line = await asyncio.wait_for(worker.stdout.readline(), WORKER_START_TIMEOUT)
+            message = json.loads(line) if line else {"event": "error", "message": "exited during startup"}
+        except BaseException:
+            worker.kill()
+            raise
+        if message.get("event") != "ready":
+            worker.kill()
+            raise YtDlpUnavailable(f"yt-dlp worker failed to start: {message.get('message')}")
+        performance_monitor.record_metric("ytdlp_worker_starts", 1, "count")
+        logger.info(f"Started yt-dlp worker {process.pid}")
+        return worker
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def run(self, job_id: int, argv: Sequence[str], on_progress: Optional[ProgressCallback]) -> YtDlpResult:
+        self.jobs += 1
+        try:
+            self.stdin.write((json.dumps({"id": job_id, "argv": list(argv)}) + "\n").encode())
+            await self.stdin.drain()
+            while line := await self.stdout.readline():
+                message = json.loads(line)
+                if message.get("id") != job_id:
+                    continue
+                if message["event"] == "result":
+                    return YtDlpResult(
+                        message["returncode"], message["stdout"].encode(), message["stderr"].encode()
+                    )
+                if message["event"] == "progress" and on_progress is not None:
+                    try:
+                        on_progress(message)
+                    except Exception as e:
+                        logger.warning(f"yt-dlp progress callback failed: {e}")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        return await self._crashed()
+
+    async def _crashed(self) -> YtDlpResult:
+        try:
+            returncode = await asyncio.wait_for(self.process.wait(), WORKER_STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.kill()
+            returncode = -9
+        performance_monitor.record_metric("ytdlp_worker_crashes", 1, "count")
+        logger.warning(f"yt-dlp worker {self.process.pid} exited mid-job with code {returncode}")
+        return YtDlpResult(returncode or -1, b"", f"ERROR: yt-dlp worker exited with code {returncode}\n".encode())
+
+    def kill(self) -> None:
+        if self.alive:
+            self.process.kill()
+
+    async def close(self) -> None:
+        """Let the worker exit by closing its stdin; kill it if it does not."""
+        if not self.alive:
+            return
+        self.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), WORKER_STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.kill()
+
+
+class YtDlpPool:
+    """Runs yt-dlp jobs on reusable worker processes; see the module docstring."""
+
+    def __init__(
+        self,
+        size: int = DEFAULT_WORKERS,
+        max_jobs: int = MAX_JOBS_PER_WORKER,
+        extractor: str = DEFAULT_EXTRACTOR,
+        env: Optional[Mapping[str, str]] = None,
+        fallback_executable: Optional[str] = None,
+    ) -> None:
+        self.size = size
+        self.max_jobs = max_jobs
+        self.extractor = extractor
+        self.fallback_executable = fallback_executable
+        self._env = dict(os.environ if env is None else env)
+        # Workers run "-m modules.ytdlp_worker" from wherever the bot was started
+        self._env["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_ROOT, self._env.get("PYTHONPATH")]))
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[_Worker] = []
+        self._job_ids = itertools.count(1)
+        # Set to fallback_executable once workers turn out not to start
+        self._fallback: Optional[str] = None
+        self._closed = False
+
+    async def run(
+        self, argv: Sequence[str], kind: str = "download", on_progress: Optional[ProgressCallback] = None
+    ) -> YtDlpResult:
+        """
+        Run yt-dlp with argv (no executable) and return its result.
+
+        on_progress receives the download progress events of the job. kind
+        ("search", "metadata", "download") only tags the metrics.
+        """
+        started = time.monotonic()
+        async with self._slots:
+            if self._closed:
+                raise YtDlpUnavailable("yt-dlp pool is closed")
+            if self._fallback is not None:
+                result = await self._run_subprocess(self._fallback, argv)
+            else:
+                result = await self._run_on_worker(argv, on_progress)
+        performance_monitor.record_metric("ytdlp_job_time", time.monotonic() - started, "seconds", {"kind": kind})
+        return result
+
+    async def close(self) -> None:
+        """Stop the idle workers and refuse new jobs; busy ones are stopped when their job ends."""
+        self._closed = True
+        workers, self._idle = self._idle, []
+        await asyncio.gather(*(worker.close() for worker in workers))
+
+    async def _run_on_worker(self, argv: Sequence[str], on_progress: Optional[ProgressCallback]) -> YtDlpResult:
+        try:
+            worker = await self._checkout()
+        except YtDlpUnavailable as e:
+            if self.fallback_executable is None:
+                raise
+            logger.warning(f"{e}; running {self.fallback_executable} per job instead")
+            self._fallback = self.fallback_executable
+            return await self._run_subprocess(self.fallback_executable, argv)
+
+        try:
+            result = await worker.run(next(self._job_ids), argv, on_progress)
+        except BaseException:
+            # Cancelled or timed out mid-job: the worker is still busy with it
+            worker.kill()
+            raise
+        if worker.alive and worker.jobs < self.max_jobs and not self._closed:
+            self._idle.append(worker)
+        else:
+            await worker.close()
+        return result
+
+    async def _checkout(self) -> _Worker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                return worker
+        return await _Worker.start(self.extractor, self._env)
+
+    async def _run_subprocess(self, executable: str, argv: Sequence[str]) -> YtDlpResult:
+        process = await asyncio.create_subprocess_exec(
+            executable, *argv,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=self._env,
+        )
+        try:
+            stdout, stderr = await process.communicate()
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+            raise
+        # Already exited; wait() only reads its return code
+        return YtDlpResult(await process.wait(), stdout, stderr)
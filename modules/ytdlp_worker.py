@@ -0,0 +1,153 @@
+"""
+Long-lived yt-dlp worker process used by ``modules.ytdlp_pool``.
+
+Run as ``python -m modules.ytdlp_worker [--extractor module:Class]``. The
+worker loads its extractor once, so yt-dlp and the extractors it has used
+stay imported between jobs, and then answers jobs read from stdin, one JSON
+line each::
+
+    {"id": 1, "argv": ["https://...", "-f", "best", "-o", "/tmp/x.mp4"]}
+
+``argv`` is what the yt-dlp command line would take, so search
+(``ytsearch5:...`` with ``--print``), metadata (``--get-title``) and download
+jobs all look like the commands they replace. For each job the worker writes
+JSON lines to stdout: ``progress`` events while a download runs, then one
+``result`` with the return code and the captured stdout and stderr. The
+first line written is ``ready`` (or ``error`` if the extractor failed to
+load). The worker exits when stdin is closed.
+"""
+
+import argparse
+import importlib
+import io
+import json
+import optparse
+import os
+import sys
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+
+DEFAULT_EXTRACTOR = "modules.ytdlp_worker:YtDlpExtractor"
+
+# Seconds between progress events of one download; state changes are always sent
+PROGRESS_INTERVAL = 0.5
+
+PROGRESS_FIELDS = ("status", "downloaded_bytes", "total_bytes", "total_bytes_estimate", "speed", "eta", "filename")
+
+ProgressHook = Callable[[Dict[str, Any]], None]
+
+
+class YtDlpExtractor:
+    """Runs yt-dlp command lines in-process through its library API."""
+
+    def __init__(self) -> None:
+        import yt_dlp
+        from yt_dlp.postprocessor.ffmpeg import FFmpegPostProcessor
+
+        self._yt_dlp = yt_dlp
+        self._ffmpeg = FFmpegPostProcessor
+
+    def run(self, argv: List[str], progress: ProgressHook) -> Tuple[int, str, str]:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        # YoutubeDL picks its output streams when created, so it prints into these
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            returncode = self._download(argv, progress)
+        return returncode, stdout.getvalue(), stderr.getvalue()
+
+    def _download(self, argv: List[str], progress: ProgressHook) -> int:
+        yt_dlp = self._yt_dlp
+        try:
+            _, opts, urls, ydl_opts = yt_dlp.parse_options(argv)
+            if opts.ffmpeg_location:
+                self._ffmpeg._ffmpeg_location.set(opts.ffmpeg_location)
+            ydl_opts = {**ydl_opts, "progress_hooks": [*(ydl_opts.get("progress_hooks") or []), progress]}
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                returncode: int = ydl.download(urls)
+                return returncode
+        except optparse.OptParseError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 2
+        except SystemExit as e:
+            # --version and --help exit like the command line would
+            if isinstance(e.code, int):
+                return e.code
+            if e.code:
+                print(e.code, file=sys.stderr)
+            return 1 if e.code else 0
+        except yt_dlp.utils.DownloadError:
+            # Already reported on stderr by YoutubeDL
+            return 1
+        except Exception as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+
+
+def load_extractor(spec: str) -> Any:
+    """Instantiate the extractor class named by "module:Class"."""
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class _Channel:
+    """JSON lines to the pool over the worker's original stdout."""
+
+    def __init__(self, stream: TextIO) -> None:
+        self._stream = stream
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self._stream.write(json.dumps(message, ensure_ascii=False, default=str) + "\n")
+        self._stream.flush()
+
+
+def _progress_hook(channel: _Channel, job_id: int) -> ProgressHook:
+    last: Dict[str, Any] = {"status": None, "sent": 0.0}
+
+    def hook(update: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        status = update.get("status")
+        if status == last["status"] and now - last["sent"] < PROGRESS_INTERVAL:
+            return
+        last["status"], last["sent"] = status, now
+        event = {key: update.get(key) for key in PROGRESS_FIELDS if update.get(key) is not None}
+        channel.send({"id": job_id, "event": "progress", **event})
+
+    return hook
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--extractor", default=DEFAULT_EXTRACTOR, help="module:Class running the jobs")
+    args = parser.parse_args(argv)
+
+    # Keep stdout for the protocol; anything else writing to fd 1 (ffmpeg, stray prints) goes to stderr
+    channel = _Channel(os.fdopen(os.dup(1), "w", encoding="utf-8"))
+    os.dup2(2, 1)
+
+    try:
+        extractor = load_extractor(args.extractor)
+    except Exception as e:
+        channel.send({"event": "error", "message": f"{type(e).__name__}: {e}"})
+        return 1
+    channel.send({"event": "ready", "pid": os.getpid()})
+
+    try:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            try:
+                returncode, stdout, stderr = extractor.run(job["argv"], _progress_hook(channel, job["id"]))
+            except Exception as e:
+                returncode, stdout, stderr = 1, "", f"ERROR: {type(e).__name__}: {e}\n"
+            channel.send(
+                {"id": job["id"], "event": "result", "returncode": returncode, "stdout": stdout, "stderr": stderr}
+            )
+    except BrokenPipeError:
+        # The pool went away mid-job
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
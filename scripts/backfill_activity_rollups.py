@@ -0,0 +1,67 @@
+"""
+Backfill the hourly activity rollups used by /stats and /report.
+
+Rebuilds chat_activity_hourly and chat_command_hourly from the messages
+table one chat at a time, then marks the rollups as ready so the commands
+stop falling back to the raw queries. The bot may keep running meanwhile.
+
+Usage:
+    python scripts/backfill_activity_rollups.py              # backfill every chat, then verify
+    python scripts/backfill_activity_rollups.py --chat-id -100123
+    python scripts/backfill_activity_rollups.py --check      # only compare rollups with raw data
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.database import Database
+from modules.activity_rollups import (
+    backfill_activity_rollups, rebuild_activity_rollups, verify_activity_rollups
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def check(conn, chat_id):
+    """Log rollup buckets that disagree with the raw messages; return True if none do."""
+    mismatches = await verify_activity_rollups(conn, chat_id)
+    if not mismatches:
+        logger.info("Rollups match the raw messages")
+        return True
+    for row in mismatches:
+        logger.warning(f"Rollup mismatch: {row}")
+    return False
+
+
+async def main(chat_id, check_only):
+    await Database.initialize()
+    pool = await Database.get_pool()
+    try:
+        async with pool.acquire() as conn:
+            if not check_only and chat_id is not None:
+                rows = await rebuild_activity_rollups(conn, chat_id)
+                logger.info(f"chat {chat_id}: {rows} hourly rows")
+            elif not check_only:
+                chats = await backfill_activity_rollups(conn)
+                logger.info(f"Activity rollups backfilled for {chats} chats")
+            ok = await check(conn, chat_id)
+    finally:
+        await Database.close()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chat-id", type=int, help="Only rebuild/check this chat")
+    parser.add_argument("--check", action="store_true", help="Only run the consistency check")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.chat_id, args.check)) else 1)
@@ -0,0 +1,46 @@
+"""
+Backfill the reply edges used by the /stats response-time percentiles.
+
+Records an edge for every human reply already in the messages table, one
+chat at a time, then marks the edges as ready so /stats stops computing its
+percentiles from the messages self-join. New replies are recorded on
+insert, so the bot may keep running meanwhile and the script is safe to run
+again.
+
+Usage:
+    python scripts/backfill_reply_edges.py
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.database import Database
+from modules.reply_edges import backfill_reply_edges
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    await Database.initialize()
+    pool = await Database.get_pool()
+    try:
+        async with pool.acquire() as conn:
+            edges = await backfill_reply_edges(conn)
+            logger.info(f"Reply edges backfilled: {edges} added")
+    finally:
+        await Database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    asyncio.run(main())
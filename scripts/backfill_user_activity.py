@@ -0,0 +1,46 @@
+"""
+Backfill the per-user activity profiles used by /mystats and /missing.
+
+Records the current username of every user as an alias, rebuilds the
+activity profile of every user one chat at a time, then marks the profiles
+as ready so both commands stop scanning the messages table. Each chat is
+rebuilt in its own transaction while new messages are held back, so the bot
+may keep running meanwhile and the script is safe to run again.
+
+Usage:
+    python scripts/backfill_user_activity.py
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.database import Database
+from modules.user_activity import backfill_user_activity
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    await Database.initialize()
+    pool = await Database.get_pool()
+    try:
+        async with pool.acquire() as conn:
+            chats = await backfill_user_activity(conn)
+            logger.info(f"User activity backfilled: {chats} chats")
+    finally:
+        await Database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    asyncio.run(main())
@@ -109,7 +109,7 @@ async def migrate_json_history(json_file_path: str, json_chat_id: int, db_chat_i
                             replied_to_message_id
                         )
                         VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                        ON CONFLICT (chat_id, message_id) DO NOTHING
+                        ON CONFLICT DO NOTHING
                     """,
                         msg['id'],
                         db_chat_id,  # Use the database chat ID
@@ -115,7 +115,7 @@ async def migrate_logs() -> None:
                                     is_command, command_name, is_gpt_reply
                                 )
                                 VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                                ON CONFLICT (chat_id, message_id) DO NOTHING
+                                ON CONFLICT DO NOTHING
                             """,
                                 int(timestamp.timestamp() * 1000),  # Use actual message timestamp for message_id
                                 int(chat_id),
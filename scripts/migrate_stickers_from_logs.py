@@ -118,7 +118,7 @@ async def main():
                     message_id, chat_id, user_id, timestamp,
                     text, is_command, is_gpt_reply, raw_telegram_message
                 ) VALUES ($1, $2, $3, $4, NULL, false, false, $5)
-                ON CONFLICT (chat_id, message_id) DO NOTHING
+                ON CONFLICT DO NOTHING
             """, next_id, chat_id, user_id, ts, raw_sticker)
             next_id -= 1
             inserted += 1
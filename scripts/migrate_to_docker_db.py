@@ -208,7 +208,7 @@ async def migrate_data_direct(
                         raw_telegram_message
                     )
                     VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                    ON CONFLICT (chat_id, message_id) DO NOTHING
+                    ON CONFLICT DO NOTHING
                 """,
                     msg['message_id'], msg['chat_id'], msg['user_id'],
                     msg['timestamp'], msg['text'], msg['is_command'],
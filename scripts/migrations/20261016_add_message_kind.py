@@ -0,0 +1,126 @@
+"""
+Migration script to add the denormalized messages.message_kind column.
+
+Classifies existing rows from raw_telegram_message in batches (the same
+precedence as modules.database.classify_message_kind), builds the
+(chat_id, message_kind, timestamp) indexes concurrently so the bot can keep
+writing, and finally rebuilds the activity rollups whose counters are
+derived from message_kind.
+
+Runs before or after scripts/partition_messages.py: on a partitioned table
+each partition is indexed concurrently and attached to the parent index.
+"""
+import asyncio
+import logging
+from pathlib import Path
+import sys
+
+# Set up basic logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from modules.database import MESSAGE_KIND_KEYS, Database
+from modules.activity_rollups import backfill_activity_rollups
+from modules.message_partitions import is_partitioned
+from modules.types import MessageKind
+
+BATCH_SIZE = 50000
+
+# Same precedence as classify_message_kind
+_KIND_CASES = "\n        ".join(
+    f"WHEN raw_telegram_message ? '{key}' THEN {kind:d}" for key, kind in MESSAGE_KIND_KEYS
+)
+
+BACKFILL_SQL = f"""
+    UPDATE messages SET message_kind = CASE
+        {_KIND_CASES}
+        WHEN text IS NOT NULL AND text <> '' THEN {MessageKind.TEXT:d}
+        WHEN raw_telegram_message ->> 'text' <> '' THEN {MessageKind.TEXT:d}
+        ELSE {MessageKind.OTHER:d}
+    END
+    WHERE internal_message_id >= $1 AND internal_message_id < $2
+      AND message_kind IS NULL
+"""
+
+# (name, definition following the table name)
+INDEXES = [
+    ("idx_messages_chat_kind_ts", "(chat_id, message_kind, timestamp)"),
+    (
+        "idx_messages_chat_ts_plain_text",
+        f"(chat_id, timestamp) WHERE message_kind = {MessageKind.TEXT:d} "
+        "AND is_command = false AND is_gpt_reply = false",
+    ),
+]
+
+LIST_PARTITIONS_SQL = """
+    SELECT child.relname AS name,
+           EXISTS (
+               SELECT 1 FROM pg_inherits ii
+               JOIN pg_class idx ON idx.oid = ii.inhrelid
+               JOIN pg_index ix ON ix.indexrelid = idx.oid
+               WHERE ii.inhparent = $1::regclass AND ix.indrelid = child.oid
+           ) AS indexed
+    FROM pg_inherits i
+    JOIN pg_class child ON child.oid = i.inhrelid
+    WHERE i.inhparent = 'messages'::regclass
+    ORDER BY child.relname
+"""
+
+
+async def create_index(conn, name, definition):
+    """Build one index on messages without blocking writes."""
+    logger.info(f"Creating index {name}...")
+    if not await is_partitioned(conn):
+        await conn.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON messages {definition}")
+        return
+    # An invalid parent index is attached to one partition index at a time
+    await conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY messages {definition}")
+    for row in await conn.fetch(LIST_PARTITIONS_SQL, name):
+        if row["indexed"]:
+            continue
+        partition = row["name"]
+        logger.info(f"Indexing {partition}...")
+        await conn.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_{name} ON {partition} {definition}"
+        )
+        await conn.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition}_{name}")
+
+
+async def migrate():
+    """Add, backfill and index messages.message_kind."""
+    try:
+        async with (await Database.get_pool()).acquire() as conn:
+            await conn.execute("ALTER TABLE messages ADD COLUMN IF NOT EXISTS message_kind SMALLINT")
+
+            bounds = await conn.fetchrow(
+                "SELECT MIN(internal_message_id) AS lo, MAX(internal_message_id) AS hi FROM messages"
+            )
+            if bounds["lo"] is not None:
+                total = 0
+                for start in range(bounds["lo"], bounds["hi"] + 1, BATCH_SIZE):
+                    status = await conn.execute(BACKFILL_SQL, start, start + BATCH_SIZE)
+                    total += int(status.split()[-1])
+                    logger.info(f"Classified messages up to id {start + BATCH_SIZE - 1} ({total} rows)")
+
+            for name, definition in INDEXES:
+                await create_index(conn, name, definition)
+            await conn.execute("ANALYZE messages")
+
+            logger.info("Rebuilding activity rollups from message_kind...")
+            chats = await backfill_activity_rollups(conn)
+            logger.info(f"Migration complete, rollups rebuilt for {chats} chats")
+
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        raise
+    finally:
+        await Database.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
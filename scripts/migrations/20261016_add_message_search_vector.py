@@ -0,0 +1,93 @@
+"""
+Migration script to add the full-text messages.search_vector column for /search.
+
+Adds the stored generated column (which rewrites every partition, so stop the
+bot or run it in a quiet hour), indexes it partition by partition with
+CREATE INDEX CONCURRENTLY so writes resume while the GIN indexes are built,
+and drops the unused English-only to_tsvector index.
+
+The chat_search text search configuration is created by Database.initialize;
+messages must already be partitioned (scripts/partition_messages.py).
+"""
+import asyncio
+import logging
+from pathlib import Path
+import sys
+
+# Set up basic logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from modules.database import Database
+from modules.message_partitions import is_partitioned
+from modules.rollup_state import mark_backfilled
+from modules.message_search import SEARCH_VECTOR_STATE
+
+INDEX_NAME = "idx_messages_search_vector"
+
+ADD_COLUMN_SQL = """
+    ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+        to_tsvector('chat_search'::regconfig, COALESCE(text, ''))
+    ) STORED
+"""
+
+LIST_PARTITIONS_SQL = """
+    SELECT child.relname AS name,
+           EXISTS (
+               SELECT 1 FROM pg_inherits ii
+               JOIN pg_class idx ON idx.oid = ii.inhrelid
+               JOIN pg_index ix ON ix.indexrelid = idx.oid
+               WHERE ii.inhparent = $1::regclass AND ix.indrelid = child.oid
+           ) AS indexed
+    FROM pg_inherits i
+    JOIN pg_class child ON child.oid = i.inhrelid
+    WHERE i.inhparent = 'messages'::regclass
+    ORDER BY child.relname
+"""
+
+
+async def migrate():
+    """Add and index messages.search_vector."""
+    try:
+        await Database.initialize()
+        async with (await Database.get_pool()).acquire() as conn:
+            if not await is_partitioned(conn):
+                raise RuntimeError("messages is not partitioned; run scripts/partition_messages.py first")
+
+            logger.info("Adding messages.search_vector (rewrites every partition)...")
+            await conn.execute(ADD_COLUMN_SQL)
+
+            # An invalid parent index is attached to one partition index at a time
+            await conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON ONLY messages USING GIN(search_vector)"
+            )
+            for row in await conn.fetch(LIST_PARTITIONS_SQL, INDEX_NAME):
+                if row["indexed"]:
+                    continue
+                name = row["name"]
+                logger.info(f"Indexing {name}...")
+                await conn.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}_search_vector_idx "
+                    f"ON {name} USING GIN(search_vector)"
+                )
+                await conn.execute(f"ALTER INDEX {INDEX_NAME} ATTACH PARTITION {name}_search_vector_idx")
+
+            await conn.execute("DROP INDEX IF EXISTS idx_messages_text_search")
+            await conn.execute("ANALYZE messages")
+            await mark_backfilled(conn, SEARCH_VECTOR_STATE)
+            logger.info("Migration complete")
+
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        raise
+    finally:
+        await Database.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
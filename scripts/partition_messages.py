@@ -0,0 +1,211 @@
+"""
+Convert the messages table to monthly range partitions without downtime.
+
+The bot keeps running while this script works:
+
+1. ``messages_partitioned`` is created with the same columns, the partitioned
+   keys, one partition per month since the oldest message and all indexes
+   (built while it is still empty);
+2. a trigger mirrors every insert, update and delete on ``messages`` into it;
+3. existing rows are copied in ``internal_message_id`` batches, then rows that
+   changed during the copy are reconciled;
+4. a short transaction locks ``messages``, drops the trigger and swaps the
+   tables, leaving the original as ``messages_legacy``.
+
+Every step is idempotent, so an interrupted run can simply be restarted.
+
+Usage:
+    python scripts/partition_messages.py                  # convert, keep messages_legacy
+    python scripts/partition_messages.py --drop-legacy    # drop messages_legacy afterwards
+    python scripts/partition_messages.py --retention-months 12 --mode archive
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.database import Database, PARTITION_MONTHS_AHEAD
+from modules.message_partitions import (
+    RETENTION_MODES, apply_message_retention, ensure_message_partitions, is_partitioned
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+STAGING_TABLE = "messages_partitioned"
+INDEX_SUFFIX = "_p"
+BATCH_SIZE = 20000
+
+CREATE_STAGING_SQL = f"""
+CREATE TABLE IF NOT EXISTS {STAGING_TABLE} (
+    LIKE messages INCLUDING DEFAULTS,
+    PRIMARY KEY (internal_message_id, timestamp),
+    UNIQUE (chat_id, message_id, timestamp),
+    FOREIGN KEY (chat_id) REFERENCES chats(chat_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+) PARTITION BY RANGE (timestamp)
+"""
+
+# Column order is identical (LIKE), so whole rows can be copied with NEW.*
+MIRROR_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION messages_mirror_to_partitioned() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM {STAGING_TABLE}
+        WHERE internal_message_id = OLD.internal_message_id AND timestamp = OLD.timestamp;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO {STAGING_TABLE} SELECT NEW.* ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS messages_mirror_to_partitioned ON messages;
+CREATE TRIGGER messages_mirror_to_partitioned
+AFTER INSERT OR UPDATE OR DELETE ON messages
+FOR EACH ROW EXECUTE FUNCTION messages_mirror_to_partitioned();
+"""
+
+COPY_BATCH_SQL = f"""
+INSERT INTO {STAGING_TABLE}
+SELECT * FROM messages
+WHERE internal_message_id >= $1 AND internal_message_id < $2
+ON CONFLICT DO NOTHING
+"""
+
+# Drops copies of rows whose timestamp was updated while their batch was copied
+RECONCILE_BATCH_SQL = f"""
+DELETE FROM {STAGING_TABLE} p
+WHERE p.internal_message_id >= $1 AND p.internal_message_id < $2
+  AND NOT EXISTS (
+      SELECT 1 FROM messages m
+      WHERE m.internal_message_id = p.internal_message_id AND m.timestamp = p.timestamp
+  )
+"""
+
+# Secondary indexes of messages that do not back a constraint
+LIST_INDEXES_SQL = """
+SELECT i.relname AS name, pg_get_indexdef(ix.indexrelid) AS definition
+FROM pg_index ix
+JOIN pg_class i ON i.oid = ix.indexrelid
+WHERE ix.indrelid = $1::regclass
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = ix.indexrelid)
+"""
+
+LIST_ALL_INDEXES_SQL = "SELECT indexrelid::regclass::text AS name FROM pg_index WHERE indrelid = $1::regclass"
+
+
+async def create_staging_table(conn, months_ahead):
+    """Create the partitioned copy of messages with its partitions and indexes."""
+    await conn.execute(CREATE_STAGING_SQL)
+    since = await conn.fetchval("SELECT MIN(timestamp) FROM messages")
+    partitions = await ensure_message_partitions(conn, months_ahead, since=since, parent=STAGING_TABLE)
+    logger.info(f"{STAGING_TABLE}: {len(partitions)} monthly partitions")
+
+    for row in await conn.fetch(LIST_INDEXES_SQL, "messages"):
+        definition = row["definition"].replace(
+            f"INDEX {row['name']} ON ", f"INDEX IF NOT EXISTS {row['name']}{INDEX_SUFFIX} ON ", 1
+        ).replace(" ON public.messages ", f" ON public.{STAGING_TABLE} ", 1).replace(
+            " ON messages ", f" ON {STAGING_TABLE} ", 1
+        )
+        logger.info(f"Creating index: {definition}")
+        await conn.execute(definition)
+
+
+async def copy_rows(conn, batch_size):
+    """Copy existing rows in id batches, then drop copies that went stale meanwhile."""
+    bounds = await conn.fetchrow(
+        "SELECT MIN(internal_message_id) AS lo, MAX(internal_message_id) AS hi FROM messages"
+    )
+    if bounds["lo"] is None:
+        return
+    copied = 0
+    for start in range(bounds["lo"], bounds["hi"] + 1, batch_size):
+        status = await conn.execute(COPY_BATCH_SQL, start, start + batch_size)
+        copied += int(status.split()[-1])
+        logger.info(f"Copied messages up to id {start + batch_size - 1} ({copied} rows)")
+    for start in range(bounds["lo"], bounds["hi"] + 1, batch_size):
+        status = await conn.execute(RECONCILE_BATCH_SQL, start, start + batch_size)
+        if status != "DELETE 0":
+            logger.info(f"Reconciled ids {start}..{start + batch_size - 1}: {status}")
+
+
+async def swap_tables(conn):
+    """Atomically replace messages with the partitioned copy."""
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE messages IN ACCESS EXCLUSIVE MODE")
+        legacy_count = await conn.fetchval("SELECT COUNT(*) FROM messages")
+        new_count = await conn.fetchval(f"SELECT COUNT(*) FROM {STAGING_TABLE}")
+        if legacy_count != new_count:
+            raise RuntimeError(f"Row count mismatch: messages={legacy_count}, {STAGING_TABLE}={new_count}")
+
+        await conn.execute("DROP TRIGGER messages_mirror_to_partitioned ON messages")
+        await conn.execute("DROP FUNCTION messages_mirror_to_partitioned()")
+
+        for row in await conn.fetch(LIST_ALL_INDEXES_SQL, "messages"):
+            await conn.execute(f"ALTER INDEX {row['name']} RENAME TO {row['name']}_legacy")
+        await conn.execute("ALTER TABLE messages RENAME TO messages_legacy")
+
+        await conn.execute(f"ALTER TABLE {STAGING_TABLE} RENAME TO messages")
+        for row in await conn.fetch(LIST_ALL_INDEXES_SQL, "messages"):
+            name = row["name"]
+            if name.endswith(INDEX_SUFFIX):
+                target = name[:-len(INDEX_SUFFIX)]
+            else:
+                target = name.replace(STAGING_TABLE, "messages", 1)
+            if target != name:
+                await conn.execute(f"ALTER INDEX {name} RENAME TO {target}")
+
+        await conn.execute(
+            "ALTER SEQUENCE messages_internal_message_id_seq OWNED BY messages.internal_message_id"
+        )
+    logger.info(f"Swapped tables: {new_count} rows now in partitioned messages")
+
+
+async def convert(months_ahead, batch_size, drop_legacy):
+    async with (await Database.get_pool()).acquire() as conn:
+        if await is_partitioned(conn):
+            logger.info("messages is already partitioned")
+        else:
+            await create_staging_table(conn, months_ahead)
+            await conn.execute(MIRROR_TRIGGER_SQL)
+            logger.info("Mirror trigger installed, copying rows...")
+            await copy_rows(conn, batch_size)
+            await swap_tables(conn)
+            await conn.execute("ANALYZE messages")
+
+        if drop_legacy and await conn.fetchval("SELECT to_regclass('messages_legacy') IS NOT NULL"):
+            await conn.execute("DROP TABLE messages_legacy")
+            logger.info("Dropped messages_legacy")
+
+
+async def main(args):
+    try:
+        if args.retention_months is not None:
+            async with (await Database.get_pool()).acquire() as conn:
+                changed = await apply_message_retention(conn, args.retention_months, args.mode)
+            logger.info(f"Retention ({args.mode}) applied to: {', '.join(changed) or 'nothing'}")
+        else:
+            await convert(args.months_ahead, args.batch_size, args.drop_legacy)
+    finally:
+        await Database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD,
+                        help="Future monthly partitions to create")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows copied per batch")
+    parser.add_argument("--drop-legacy", action="store_true", help="Drop messages_legacy after the swap")
+    parser.add_argument("--retention-months", type=int,
+                        help="Apply retention to partitions older than this many months instead of converting")
+    parser.add_argument("--mode", choices=RETENTION_MODES, default="strip_raw", help="Retention mode")
+    asyncio.run(main(parser.parse_args()))
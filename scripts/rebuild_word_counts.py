@@ -0,0 +1,51 @@
+"""
+Rebuild the per-chat word counts used by /count.
+
+Re-tokenizes the message history one chat at a time into chat_word_counts,
+then marks the counts as ready so /count stops falling back to the regex
+query. The bot may keep running meanwhile. Run it again for a chat after
+changing the tokenizer in modules/word_counts.py.
+
+Usage:
+    python scripts/rebuild_word_counts.py                  # every chat
+    python scripts/rebuild_word_counts.py --chat-id -100123
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.database import Database
+from modules.word_counts import backfill_word_counts, rebuild_word_counts
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def main(chat_id):
+    await Database.initialize()
+    pool = await Database.get_pool()
+    try:
+        async with pool.acquire() as conn:
+            if chat_id is not None:
+                tokens = await rebuild_word_counts(conn, chat_id)
+                logger.info(f"chat {chat_id}: {tokens} distinct words")
+            else:
+                chats = await backfill_word_counts(conn)
+                logger.info(f"Word counts rebuilt for {chats} chats")
+    finally:
+        await Database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chat-id", type=int, help="Only rebuild this chat")
+    args = parser.parse_args()
+    asyncio.run(main(args.chat_id))
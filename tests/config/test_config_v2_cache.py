@@ -0,0 +1,83 @@
+"""Tests for the resolved-config cache of config_v2.ConfigManager."""
+
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, patch
+
+from config_v2 import manager as manager_module
+from config_v2.compat import CompatConfigManager
+from config_v2.manager import ConfigManager
+from config_v2.schema import ChatBehaviorConfig
+
+
+@pytest_asyncio.fixture
+async def mgr(tmp_path):
+    instance = await ConfigManager.create(str(tmp_path / "config.db"))
+    yield instance
+    await instance.close()
+    manager_module._instance = None
+
+
+@pytest.mark.asyncio
+async def test_hot_reads_do_not_query_sqlite(mgr):
+    compat = CompatConfigManager()
+    await compat.get_config("-100", "supergroup")  # warm every module of the chat
+    first = await compat.get_config("-100", "supergroup", module_name="chat_behavior")
+
+    with patch.object(mgr.db, "get_all_modules_config", AsyncMock()) as bulk, \
+         patch.object(mgr.db, "get_module_config", AsyncMock()) as single, \
+         patch.object(mgr.db, "upsert_chat", AsyncMock()) as upsert, \
+         patch.object(mgr.db, "get_chat", AsyncMock()) as get_chat:
+        again = await compat.get_config("-100", "supergroup", module_name="chat_behavior")
+        full = await compat.get_config("-100", "supergroup")
+        bulk.assert_not_awaited()
+        single.assert_not_awaited()
+        upsert.assert_not_awaited()
+        get_chat.assert_not_awaited()
+
+    assert again == first
+    assert full["config_modules"]["chat_behavior"] == first
+    assert full["chat_metadata"]["chat_type"] == "supergroup"
+
+
+@pytest.mark.asyncio
+async def test_results_are_private_copies(mgr):
+    compat = CompatConfigManager()
+    config = await compat.get_config("-100", "supergroup", module_name="chat_behavior")
+    config["overrides"]["ban_words"].append("mutated")
+    config["enabled"] = False
+
+    fresh = await compat.get_config("-100", "supergroup", module_name="chat_behavior")
+    assert "mutated" not in fresh["overrides"]["ban_words"]
+    assert fresh["enabled"] is True
+    typed = await mgr.get_typed_config("-100", ChatBehaviorConfig)
+    typed.ban_words.append("mutated")
+    assert "mutated" not in (await mgr.get_resolved_view("-100", "chat_behavior"))["ban_words"]
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_precisely(mgr):
+    await mgr.get_resolved_view("-1", "chat_behavior")
+    await mgr.get_resolved_view("-1", "gpt")
+    await mgr.get_resolved_view("-2", "chat_behavior")
+
+    await mgr.set_value("-1", "chat_behavior", "ban_words", ["spam"])
+    assert ("-1", "chat_behavior") not in mgr._resolved
+    assert ("-1", "gpt") in mgr._resolved
+    assert ("-2", "chat_behavior") in mgr._resolved
+    assert (await mgr.get_resolved_view("-1", "chat_behavior"))["ban_words"] == ["spam"]
+
+    # The global layer is shared: a global write reaches every chat
+    await mgr.set_value("global", "chat_behavior", "ban_symbols", ["$"])
+    assert (await mgr.get_resolved_view("-2", "chat_behavior"))["ban_symbols"] == ["$"]
+    assert ("-1", "gpt") in mgr._resolved
+
+    await mgr.delete_override("-1", "chat_behavior", "ban_words")
+    assert (await mgr.get_resolved_view("-1", "chat_behavior"))["ban_words"] == []
+
+    await mgr.set_module_config("-1", "chat_behavior", {"ban_words": ["a"]})
+    backup_id = await mgr.create_backup("before", "-1")
+    await mgr.delete_chat_overrides("-1")
+    assert (await mgr.get_resolved_view("-1", "chat_behavior"))["ban_words"] == []
+    assert await mgr.restore_backup(backup_id)
+    assert (await mgr.get_resolved_view("-1", "chat_behavior"))["ban_words"] == ["a"]
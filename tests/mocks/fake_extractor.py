@@ -0,0 +1,77 @@
+"""
+Offline stand-in for yt-dlp inside ``modules.ytdlp_worker``, for testing the
+worker pool.
+
+Start a pool with ``extractor="tests.mocks.fake_extractor:FakeExtractor"``.
+Jobs take yt-dlp style arguments; the URL decides what happens:
+
+- ``fake://video/<id>`` writes a small file to the ``-o`` path (``%(id)s``,
+  ``%(title)s`` and ``%(ext)s`` are filled in), reporting progress first;
+  ``--get-title``, ``--skip-download`` and ``--print`` behave as in yt-dlp,
+  with ``after_move:filepath`` printing the written path;
+- ``ytsearchN:<query>`` prints N JSON results;
+- ``fake://pid`` prints the worker's process id;
+- ``fake://fail`` reports an error and returns 1;
+- ``fake://slow`` sleeps for a minute;
+- ``fake://crash`` kills the worker process.
+"""
+
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+FAKE_CONTENT = b"fake video data"
+
+
+class FakeExtractor:
+    def run(self, argv: List[str], progress: Callable[[Dict[str, Any]], None]) -> Tuple[int, str, str]:
+        options, url = self._parse(argv)
+        if url.startswith("ytsearch"):
+            count, _, query = url[len("ytsearch"):].partition(":")
+            lines = [json.dumps({"id": f"search{i}", "title": f"{query} {i}"}) for i in range(int(count or 1))]
+            return 0, "".join(line + "\n" for line in lines), ""
+        if url == "fake://pid":
+            return 0, f"{os.getpid()}\n", ""
+        if url == "fake://fail":
+            return 1, "", "ERROR: fake failure\n"
+        if url == "fake://slow":
+            time.sleep(60)
+            return 0, "", ""
+        if url == "fake://crash":
+            os._exit(3)
+        if not url.startswith("fake://video/"):
+            return 1, "", f"ERROR: Unsupported URL: {url}\n"
+
+        video_id = url[len("fake://video/"):]
+        info = {"id": video_id, "title": f"Fake {video_id}", "ext": "mp4"}
+        if "--get-title" in options:
+            return 0, info["title"] + "\n", ""
+        stdout = ""
+        path = ""
+        if "--skip-download" not in options:
+            path = options.get("-o", "%(title)s.%(ext)s") % info
+            total = len(FAKE_CONTENT)
+            progress({"status": "downloading", "downloaded_bytes": 0, "total_bytes": total, "filename": path})
+            with open(path, "wb") as f:
+                f.write(FAKE_CONTENT)
+            progress({"status": "finished", "downloaded_bytes": total, "total_bytes": total, "filename": path})
+        for template in options.get("--print", []):
+            stdout += (path if template == "after_move:filepath" else json.dumps(info)) + "\n"
+        return 0, stdout, ""
+
+    @staticmethod
+    def _parse(argv: List[str]) -> Tuple[Dict[str, Any], str]:
+        options: Dict[str, Any] = {"--print": []}
+        url = ""
+        args = iter(argv)
+        for arg in args:
+            if arg == "--print":
+                options["--print"].append(next(args))
+            elif arg in ("-o", "-f"):
+                options[arg] = next(args)
+            elif arg.startswith("-"):
+                options[arg] = True
+            else:
+                url = arg
+        return options, url
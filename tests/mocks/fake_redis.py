@@ -0,0 +1,131 @@
+"""
+In-process fake Redis for testing the Redis and hybrid caches.
+
+``FakeRedisServer`` holds the shared state (keys with expiry and pub/sub
+channels); every ``FakeRedis`` client created from it sees the same data, so
+several cache instances can simulate separate bot processes.
+"""
+
+import asyncio
+import fnmatch
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode('utf-8')
+
+
+class FakeRedisServer:
+    """Shared keyspace and pub/sub channels."""
+
+    def __init__(self) -> None:
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.channels: Dict[bytes, Set['FakePubSub']] = {}
+
+    def client(self) -> 'FakeRedis':
+        """Create a client connected to this server."""
+        return FakeRedis(self)
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self.data[key]
+            return None
+        return value
+
+
+class FakeRedis:
+    """Subset of the ``redis.asyncio.Redis`` API used by ``RedisCache``."""
+
+    def __init__(self, server: FakeRedisServer) -> None:
+        self.server = server
+        self.closed = False
+
+    async def ping(self) -> bool:
+        return True
+
+    async def get(self, key: Any) -> Optional[bytes]:
+        return self.server._get(_to_bytes(key))
+
+    async def set(self, key: Any, value: Any) -> bool:
+        self.server.data[_to_bytes(key)] = (_to_bytes(value), None)
+        return True
+
+    async def setex(self, key: Any, ttl: int, value: Any) -> bool:
+        self.server.data[_to_bytes(key)] = (_to_bytes(value), time.monotonic() + ttl)
+        return True
+
+    async def delete(self, *keys: Any) -> int:
+        deleted = 0
+        for key in keys:
+            if self.server._get(_to_bytes(key)) is not None:
+                del self.server.data[_to_bytes(key)]
+                deleted += 1
+        return deleted
+
+    async def exists(self, *keys: Any) -> int:
+        return sum(1 for key in keys if self.server._get(_to_bytes(key)) is not None)
+
+    async def keys(self, pattern: Any = '*') -> List[bytes]:
+        pattern = _to_bytes(pattern).decode('utf-8')
+        return [
+            key for key in list(self.server.data)
+            if self.server._get(key) is not None and fnmatch.fnmatchcase(key.decode('utf-8'), pattern)
+        ]
+
+    async def incr(self, key: Any) -> int:
+        value = int(self.server._get(_to_bytes(key)) or 0) + 1
+        self.server.data[_to_bytes(key)] = (_to_bytes(value), None)
+        return value
+
+    async def publish(self, channel: Any, message: Any) -> int:
+        subscribers = self.server.channels.get(_to_bytes(channel), set())
+        for pubsub in subscribers:
+            pubsub.queue.put_nowait({"type": "message", "channel": _to_bytes(channel), "data": _to_bytes(message)})
+        return len(subscribers)
+
+    def pubsub(self) -> 'FakePubSub':
+        return FakePubSub(self.server)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakePubSub:
+    """Subset of the ``redis.asyncio.client.PubSub`` API."""
+
+    def __init__(self, server: FakeRedisServer) -> None:
+        self.server = server
+        self.queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue()
+        self.subscribed: Set[bytes] = set()
+
+    async def subscribe(self, *channels: Any) -> None:
+        for channel in map(_to_bytes, channels):
+            self.server.channels.setdefault(channel, set()).add(self)
+            self.subscribed.add(channel)
+            self.queue.put_nowait({"type": "subscribe", "channel": channel, "data": len(self.subscribed)})
+
+    async def unsubscribe(self, *channels: Any) -> None:
+        for channel in map(_to_bytes, channels or list(self.subscribed)):
+            self.server.channels.get(channel, set()).discard(self)
+            self.subscribed.discard(channel)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                message = await asyncio.wait_for(self.queue.get(), max(deadline - time.monotonic(), 0.001))
+            except asyncio.TimeoutError:
+                return None
+            if ignore_subscribe_messages and message["type"] != "message":
+                continue
+            return message
+
+    async def close(self) -> None:
+        await self.unsubscribe()
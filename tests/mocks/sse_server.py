@@ -0,0 +1,75 @@
+"""
+In-process HTTP server streaming server-sent events, for testing streamed
+chat completions.
+
+``SSEServer`` answers every request with the configured event lines as a
+``text/event-stream`` response, then closes the connection. It records each
+request body, so tests can check what the client sent.
+"""
+
+import asyncio
+import json
+from typing import Any, List, Optional
+
+
+def completion_events(*deltas: str) -> List[str]:
+    """SSE lines of a streamed chat completion yielding deltas, ending with [DONE]."""
+    lines = []
+    for delta in deltas:
+        chunk = {"choices": [{"index": 0, "delta": {"content": delta}}]}
+        lines += [f"data: {json.dumps(chunk)}", ""]
+    return lines + ["data: [DONE]", ""]
+
+
+class SSEServer:
+    """Serves the same event stream to every request on 127.0.0.1."""
+
+    def __init__(self, events: List[str], delay: float = 0.0) -> None:
+        self.events = events
+        self.delay = delay
+        self.requests: List[Any] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        assert self._server is not None
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def __aenter__(self) -> 'SSEServer':
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        assert self._server is not None
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        length = 0
+        await reader.readline()  # request line
+        while True:
+            header = (await reader.readline()).decode("latin-1").strip()
+            if not header:
+                break
+            name, _, value = header.partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        body = await reader.readexactly(length) if length else b""
+        self.requests.append(json.loads(body) if body else None)
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        try:
+            for line in self.events:
+                writer.write(f"{line}\n".encode("utf-8"))
+                await writer.drain()
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+        except ConnectionError:
+            pass  # the client stopped reading
+        finally:
+            writer.close()
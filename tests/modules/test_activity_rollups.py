@@ -0,0 +1,94 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from typing import Any
+
+from modules import activity_rollups, rollup_state
+from modules.activity_rollups import floor_hour, rollups_ready, verify_activity_rollups
+from modules.stats_command import fetch_stats_data
+
+
+class AsyncContextManagerMock:
+    def __init__(self, value: Any) -> None:
+        self.value = value
+    async def __aenter__(self) -> Any:
+        return self.value
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        return None
+
+
+@pytest.fixture(autouse=True)
+def reset_ready_flag() -> Any:
+    rollup_state._backfilled.clear()
+    yield
+    rollup_state._backfilled.clear()
+
+
+def test_floor_hour() -> None:
+    dt = datetime(2024, 5, 1, 13, 47, 12, 999, tzinfo=timezone.utc)
+    assert floor_hour(dt) == datetime(2024, 5, 1, 13, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_rollups_ready_is_cached_once_backfilled() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=datetime.now(timezone.utc))
+    assert await rollups_ready(conn) is True
+    assert await rollups_ready(conn) is True
+    conn.fetchval.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_rollups_not_ready_without_marker() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=None)
+    assert await rollups_ready(conn) is False
+    assert await rollups_ready(conn) is False
+    assert conn.fetchval.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_verify_reports_both_tables() -> None:
+    conn = MagicMock()
+    conn.fetch = AsyncMock(side_effect=[
+        [{"chat_id": 1, "bucket": None, "user_id": 2, "raw_messages": 3, "rollup_messages": 2}],
+        [],
+    ])
+    mismatches = await verify_activity_rollups(conn, chat_id=1)
+    assert mismatches == [{"chat_id": 1, "bucket": None, "user_id": 2, "raw_messages": 3, "rollup_messages": 2}]
+    assert "chat_activity_hourly" in conn.fetch.await_args_list[0].args[0]
+    assert "chat_command_hourly" in conn.fetch.await_args_list[1].args[0]
+
+
+@pytest.mark.asyncio
+async def test_fetch_stats_data_reads_rollups_when_ready() -> None:
+    rollup_row = {f"{side}_{column}": 0 for side in ("cur", "prev") for column in activity_rollups._COUNT_COLUMNS}
+    rollup_row.update({
+        "cur_message_count": 7, "cur_command_count": 1, "prev_message_count": 3,
+        "cur_media_count": 2, "prev_media_count": 1, "cur_text_count": 4, "prev_text_count": 2,
+    })
+
+    async def fetchrow(query: str, *args: Any) -> Any:
+        if "chat_activity_hourly" in query:
+            return rollup_row
+        return {"current_count": 0, "prev_count": 0}
+
+    conn = MagicMock()
+    conn.fetchrow = AsyncMock(side_effect=fetchrow)
+    conn.fetch = AsyncMock(return_value=[])
+    conn.fetchval = AsyncMock(return_value=0)
+    pool = MagicMock()
+    pool.acquire.return_value = AsyncContextManagerMock(conn)
+    with patch("modules.stats_command.Database.get_pool", new=AsyncMock(return_value=pool)), \
+         patch("modules.stats_command.rollups_ready", new=AsyncMock(return_value=True)), \
+         patch("modules.stats_command._add_message_stats_raw") as mock_raw, \
+         patch("modules.stats_command.reply_edges_ready", new=AsyncMock(return_value=True)), \
+         patch("modules.stats_command.fetch_response_percentiles", new=AsyncMock(return_value=None)):
+        data = await fetch_stats_data(-100, 7)
+
+    mock_raw.assert_not_called()
+    assert all("messages m" not in call.args[0] for call in conn.fetch.await_args_list)
+    assert data["current_total"] == 7
+    assert data["prev_total"] == 3
+    assert data["media_current"] == 2
+    assert data["text_msgs_prev"] == 2
@@ -549,6 +549,55 @@ class TestAsyncBatchProcessor:
         
         await processor.stop()
 
+    
+    @pytest.mark.asyncio
+    async def test_bounded_queue_applies_backpressure(self):
+        """Test that add_item waits when the queue is full."""
+        async def batch_processor(batch: List[Any]):
+            pass
+        
+        processor = AsyncBatchProcessor(
+            batch_processor,
+            batch_size=10,
+            flush_interval=10.0,
+            max_queue_size=2
+        )
+        processor._started = True  # Keep items queued
+        
+        await processor.add_item("item1")
+        await processor.add_item("item2")
+        
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(processor.add_item("item3"), timeout=0.1)
+        
+        assert processor.queue_depth == 2
+    
+    @pytest.mark.asyncio
+    async def test_stop_drains_pending_items(self):
+        """Test that stop processes items collected before shutdown."""
+        processed_items = []
+        
+        async def batch_processor(batch: List[Any]):
+            processed_items.extend(batch)
+        
+        processor = AsyncBatchProcessor(
+            batch_processor,
+            batch_size=2,
+            flush_interval=10.0
+        )
+        
+        await processor.start()
+        for i in range(5):
+            await processor.add_item(i)
+        await asyncio.sleep(0.05)
+        
+        await processor.stop()
+        
+        assert sorted(processed_items) == [0, 1, 2, 3, 4]
+        stats = processor.get_stats()
+        assert stats['items_processed'] == 5
+        assert stats['queue_depth'] == 0
+
 
 class TestAsyncDecorators:
     """Test cases for async decorators."""
@@ -1,12 +1,15 @@
 import pytest
 import asyncio
+import time
 from modules.caching_system import (
-    MemoryCache, CacheConfig, CacheManager, cached, CacheBackend, CachePolicy
+    MemoryCache, CacheConfig, CacheManager, cached, CacheBackend, CachePolicy,
+    CacheSerializer, HybridCache, RedisCache
 )
 from modules.types import CacheEntry
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 from modules.handlers import basic_commands
+from tests.mocks.fake_redis import FakeRedisServer
 
 @pytest.mark.asyncio
 async def test_memory_cache_basic_operations():
@@ -88,6 +91,221 @@ async def test_cached_decorator_basic():
     assert result3 == 3
     assert calls["count"] == 2  # Cache expired 
 
+@pytest.mark.asyncio
+async def test_cached_decorator_coalesces_concurrent_misses():
+    manager = CacheManager()
+    manager.get_or_create_cache("single_flight_test", CacheConfig(max_size=10, default_ttl=60))
+    calls = {"count": 0}
+    release = asyncio.Event()
+    @cached(cache_name="single_flight_test", ttl=60)
+    async def fetch(city):
+        calls["count"] += 1
+        await release.wait()
+        return f"weather:{city}"
+    tasks = [asyncio.create_task(fetch("Kyiv")) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*tasks) == ["weather:Kyiv"] * 10
+    assert calls["count"] == 1
+    assert await fetch("Kyiv") == "weather:Kyiv"
+    stats = manager.get_single_flight("single_flight_test").stats
+    assert (stats.misses, stats.coalesced, stats.hits) == (1, 9, 1)
+
+@pytest.mark.asyncio
+async def test_cached_decorator_serves_stale_while_revalidating():
+    manager = CacheManager()
+    manager.get_or_create_cache("swr_test", CacheConfig(max_size=10, default_ttl=60))
+    calls = {"count": 0}
+    @cached(cache_name="swr_test", ttl=10, stale_ttl=30)
+    async def fetch():
+        calls["count"] += 1
+        await asyncio.sleep(0)
+        return calls["count"]
+    with patch("modules.caching_system.time.time", return_value=1000.0):
+        assert await fetch() == 1
+    with patch("modules.caching_system.time.time", return_value=1015.0):
+        assert await fetch() == 1  # stale, refresh started
+        assert await fetch() == 1  # refresh still running, not started twice
+        await asyncio.sleep(0.01)
+        assert await fetch() == 2
+    assert calls["count"] == 2
+    assert manager.get_single_flight("swr_test").stats.stale_served == 2
+
+@pytest.mark.asyncio
+async def test_cached_decorator_negative_caching():
+    manager = CacheManager()
+    manager.get_or_create_cache("negative_test", CacheConfig(max_size=10, default_ttl=60))
+    calls = {"count": 0}
+    @cached(cache_name="negative_test", ttl=60, negative_ttl=5)
+    async def fetch():
+        calls["count"] += 1
+        raise ConnectionError("upstream down")
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            await fetch()
+    assert calls["count"] == 1
+    assert manager.get_single_flight("negative_test").stats.negative_hits == 2
+    with patch("modules.caching_system.time.monotonic", return_value=time.monotonic() + 10):
+        with pytest.raises(ConnectionError):
+            await fetch()
+    assert calls["count"] == 2
+
+@pytest.mark.asyncio
+async def test_memory_cache_lfu_eviction():
+    config = CacheConfig(backend=CacheBackend.MEMORY, policy=CachePolicy.LFU, max_size=3, default_ttl=10)
+    cache = MemoryCache(config)
+    for key in ("a", "b", "c"):
+        await cache.set(key, key)
+    await cache.get("a")
+    await cache.get("a")
+    await cache.get("c")
+    await cache.set("d", "d")  # 'b' has the lowest frequency
+    assert await cache.keys() == ["a", "c", "d"]
+    await cache.set("e", "e")  # 'd' ties with nothing below it
+    assert not await cache.exists("d")
+    assert cache.get_stats().evictions == 2
+
+@pytest.mark.asyncio
+async def test_memory_cache_ttl_policy_evicts_earliest_deadline():
+    config = CacheConfig(backend=CacheBackend.MEMORY, policy=CachePolicy.TTL, max_size=3, default_ttl=100)
+    cache = MemoryCache(config)
+    await cache.set("long", 1, ttl=300)
+    await cache.set("short", 2, ttl=5)
+    await cache.set("mid", 3, ttl=50)
+    await cache.set("short", 4, ttl=500)  # re-set moves its deadline back
+    await cache.set("new", 5)
+    assert sorted(await cache.keys()) == ["long", "new", "short"]
+
+@pytest.mark.asyncio
+async def test_memory_cache_ttl_uses_monotonic_clock():
+    config = CacheConfig(backend=CacheBackend.MEMORY, policy=CachePolicy.LRU, max_size=10, default_ttl=10)
+    cache = MemoryCache(config)
+    with patch("modules.caching_system.time.monotonic", return_value=1000.0):
+        await cache.set("a", 1)
+        await cache.set("b", 2, ttl=100)
+    with patch("modules.caching_system.time.monotonic", return_value=1010.5):
+        assert await cache.get("a") is None
+        assert await cache.get("b") == 2
+        assert await cache.cleanup_expired() == 0
+    with patch("modules.caching_system.time.monotonic", return_value=1200.0):
+        assert await cache.cleanup_expired() == 1
+    assert cache.get_stats().size == 0
+
+@pytest.mark.asyncio
+async def test_memory_cache_memory_accounting_is_incremental():
+    config = CacheConfig(
+        backend=CacheBackend.MEMORY, policy=CachePolicy.LRU, max_size=100,
+        default_ttl=10, max_memory_bytes=20000
+    )
+    cache = MemoryCache(config)
+    await cache.set("small", "x")
+    small = cache.get_stats().memory_usage_bytes
+    await cache.set("big", "y" * 5000)
+    assert cache.get_stats().memory_usage_bytes > small + 5000
+    await cache.delete("big")
+    assert cache.get_stats().memory_usage_bytes == small
+    for i in range(5):
+        await cache.set(f"big{i}", "z" * 5000)
+    stats = cache.get_stats()
+    assert stats.memory_usage_bytes <= 20000
+    assert not await cache.exists("small")
+    assert stats.evictions >= 2
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy", list(CachePolicy))
+async def test_memory_cache_operations_do_not_scale_with_size(policy):
+    """Micro-benchmark: per-operation cost must stay flat as the cache grows."""
+    async def ops_time(size):
+        cache = MemoryCache(CacheConfig(
+            backend=CacheBackend.MEMORY, policy=policy, max_size=size, default_ttl=3600
+        ))
+        for i in range(size):
+            await cache.set(f"k{i}", i, ttl=3600 + i % 97)
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            for i in range(2000):
+                await cache.get(f"k{(i * 7919) % size}")
+                await cache.set(f"n{i}", i)  # full cache: every set evicts
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    small = await ops_time(500)
+    large = await ops_time(20000)
+    # The list/min() based implementation was ~40x slower at 20000 entries
+    assert large < small * 5
+
+@pytest.mark.parametrize("serialization", ["json", "pickle", "msgpack"])
+def test_cache_serializer_round_trip_and_compression_threshold(serialization):
+    serializer = CacheSerializer(serialization, compression=True, threshold=100)
+    small = {"a": 1}
+    large = {"text": "x" * 1000}
+    assert serializer.loads(serializer.dumps(small)) == small
+    assert serializer.loads(serializer.dumps(large)) == large
+    assert serializer.dumps(small)[0] & 0x80 == 0
+    assert serializer.dumps(large)[0] & 0x80
+    assert len(serializer.dumps(large)) < 200
+    # Values written with another configuration stay readable
+    assert CacheSerializer("json").loads(serializer.dumps(small)) == small
+
+@pytest.mark.asyncio
+async def test_redis_cache_clear_bumps_generation():
+    server = FakeRedisServer()
+    config = CacheConfig(backend=CacheBackend.REDIS, key_prefix="t")
+    cache = RedisCache(config, client=server.client())
+    await cache.set("a", 1)
+    assert await cache.keys() == ["a"]
+    await cache.clear()
+    assert await cache.get("a") is None
+    assert await cache.keys() == []
+    # A new instance starts on the current generation
+    other = RedisCache(config, client=server.client())
+    await cache.set("b", 2)
+    assert await other.get("b") == 2
+
+@pytest.mark.asyncio
+async def test_redis_cache_keeps_generation_when_refresh_fails():
+    server = FakeRedisServer()
+    client = server.client()
+    cache = RedisCache(CacheConfig(backend=CacheBackend.REDIS, key_prefix="t"), client=client)
+    await cache.clear()
+    assert cache.generation == 1
+
+    client.get = AsyncMock(side_effect=ConnectionError("redis down"))
+    cache._generation_checked_at = float('-inf')
+    assert await cache.get("a") is None
+    assert cache.generation == 1
+
+@pytest.mark.asyncio
+async def test_hybrid_cache_invalidates_other_instances():
+    server = FakeRedisServer()
+    config = CacheConfig(backend=CacheBackend.HYBRID, key_prefix="t")
+    first = HybridCache(config, redis_client=server.client())
+    second = HybridCache(config, redis_client=server.client())
+    try:
+        await first.set("k", "v1")
+        assert await second.get("k") == "v1"  # promoted into second's L1
+        assert await second.l1_cache.get("k") == "v1"
+
+        await first.set("k", "v2")
+        await asyncio.sleep(0.05)
+        assert await second.l1_cache.get("k") is None
+        assert await second.get("k") == "v2"
+
+        await first.delete("k")
+        await asyncio.sleep(0.05)
+        assert await second.get("k") is None
+
+        await second.set("other", 1)
+        assert await first.get("other") == 1
+        await second.clear()
+        await asyncio.sleep(0.05)
+        assert await first.l1_cache.get("other") is None
+        assert await first.get("other") is None
+    finally:
+        await first.close()
+        await second.close()
+
 @pytest.mark.asyncio
 async def test_start_command_replies_and_logs():
     update = MagicMock()
@@ -13,6 +13,7 @@ from modules.chat_analysis import (
     get_messages_for_chat_last_n_days,
     get_messages_for_chat_date_period,
     get_messages_for_chat_single_date,
+    get_period_watermark,
     get_user_chat_stats,
     get_user_chat_stats_with_fallback,
     get_last_message_for_user_in_chat
@@ -390,6 +391,48 @@ class TestGetMessagesForChatSingleDate:
             assert result == []
 
 
+class TestGetPeriodWatermark:
+    """Test get_period_watermark function."""
+
+    @staticmethod
+    def _conn(get_pool: Any, row: Dict[str, Any]) -> Any:
+        conn = AsyncMock()
+        conn.fetchrow.return_value = row
+        pool = AsyncMock()
+        pool.acquire = lambda: create_async_context_manager_mock(conn)
+        get_pool.return_value = pool
+        return conn
+
+    @pytest.mark.asyncio
+    async def test_period_key_reads_window_counts(self):
+        with patch('modules.chat_analysis.Database.get_pool') as mock_get_pool:
+            conn = self._conn(mock_get_pool, {'messages': 5, 'first_id': 10, 'last_id': 20})
+
+            watermark = await get_period_watermark(12345, "period_2024-01-01_2024-01-31")
+
+        assert str(watermark) == "5:10:20"
+        query, chat_id, start, end = conn.fetchrow.call_args[0]
+        assert "COUNT(*)" in query and "m.text" not in query
+        assert chat_id == 12345
+        assert start == KYIV_TZ.localize(datetime(2024, 1, 1))
+        assert end == KYIV_TZ.localize(datetime(2024, 2, 1))
+
+    @pytest.mark.asyncio
+    async def test_last_messages_key_reads_newest_ids(self):
+        with patch('modules.chat_analysis.Database.get_pool') as mock_get_pool:
+            conn = self._conn(mock_get_pool, {'messages': 0, 'first_id': None, 'last_id': None})
+
+            watermark = await get_period_watermark(12345, "last_50_messages")
+
+        assert str(watermark) == "0:0:0"
+        assert conn.fetchrow.call_args[0][1:] == (12345, 50)
+
+    @pytest.mark.asyncio
+    async def test_unknown_key_is_rejected(self):
+        with pytest.raises(ValueError):
+            await get_period_watermark(12345, "yesterday")
+
+
 class TestGetUserChatStats:
     """Test get_user_chat_stats function."""
     
@@ -474,6 +517,12 @@ class TestGetUserChatStats:
 
 class TestGetUserChatStatsWithFallback:
     """Test get_user_chat_stats_with_fallback function."""
+
+    @pytest.fixture(autouse=True)
+    def legacy_scans(self):
+        """Exercise the messages scans used before the activity profiles are backfilled."""
+        with patch('modules.chat_analysis.user_activity_ready', new=AsyncMock(return_value=False)):
+            yield
     
     @pytest.mark.asyncio
     async def test_get_user_chat_stats_with_fallback_success(self):
@@ -558,6 +607,12 @@ class TestGetUserChatStatsWithFallback:
 
 class TestGetLastMessageForUserInChat:
     """Test get_last_message_for_user_in_chat function."""
+
+    @pytest.fixture(autouse=True)
+    def legacy_scans(self):
+        """Exercise the messages scans used before the activity profiles are backfilled."""
+        with patch('modules.chat_analysis.user_activity_ready', new=AsyncMock(return_value=False)):
+            yield
     
     @pytest.mark.asyncio
     async def test_get_last_message_for_user_in_chat_by_user_id(self):
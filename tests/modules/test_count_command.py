@@ -177,4 +177,23 @@ async def test_missing_command_valid_last_message() -> None:
         with patch("modules.chat_analysis.get_last_message_for_user_in_chat", new=AsyncMock(return_value=last_message)):
             await missing_command(update, context)
             update.message.reply_text.assert_awaited()
-            assert "востаннє писав" in update.message.reply_text.await_args[0][0] 
\ No newline at end of file
+            assert "востаннє писав" in update.message.reply_text.await_args[0][0]
+
+
+@pytest.mark.asyncio
+async def test_count_command_uses_word_counts_when_ready() -> None:
+    update = MagicMock()
+    update.effective_chat.id = 1
+    update.message.reply_text = AsyncMock()
+    context = MagicMock()
+    context.args = ["Пiсня"]
+    pool = MagicMock()
+    conn = AsyncMock()
+    pool.acquire = lambda: AsyncContextManagerMock(conn)
+    with patch("modules.database.Database.get_pool", new=AsyncMock(return_value=pool)), \
+         patch("modules.count_command.word_counts_ready", new=AsyncMock(return_value=True)), \
+         patch("modules.count_command.fetch_word_count", new=AsyncMock(return_value=3)) as mock_fetch:
+        await count_command(update, context)
+    mock_fetch.assert_awaited_once_with(conn, 1, "пісня")
+    conn.fetchval.assert_not_awaited()
+    assert "зустрілося 3 разів" in update.message.reply_text.await_args[0][0]
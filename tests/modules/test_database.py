@@ -3,7 +3,11 @@ import asyncio
 from unittest.mock import patch, AsyncMock, MagicMock
 from telegram import Chat, User, Message
 from typing import Any
-from modules.database import Database, DatabaseConnectionManager
+from modules.database import (
+    Database, DatabaseConnectionManager, INSERT_MESSAGE_SQL, MessageIngestionPipeline, PendingMessage,
+    classify_message_kind
+)
+from modules.types import MessageKind
 
 @pytest.fixture
 def mock_chat() -> Chat:
@@ -95,4 +99,85 @@ async def test_error_handling_on_db_failure(monkeypatch: Any, mock_chat: Chat) -
     manager._cache_manager.delete(f"chat:{mock_chat.id}")
     with patch.object(manager, 'get_connection', side_effect=Exception("DB fail")):
         with pytest.raises(Exception, match="DB fail"):
-            await Database.save_chat_info(mock_chat)
\ No newline at end of file
+            await Database.save_chat_info(mock_chat)
+
+
+@pytest.mark.asyncio
+async def test_ingestion_pipeline_batches_messages(mock_message: MagicMock) -> None:
+    manager = Database.get_connection_manager()
+    manager._cache_manager.delete(f"chat:{mock_message.chat.id}")
+    manager._cache_manager.delete(f"user:{mock_message.from_user.id}")
+    conn = AsyncMock()
+    conn.transaction = MagicMock()
+    with patch.object(manager, 'get_connection') as mock_conn:
+        mock_conn.return_value.__aenter__.return_value = conn
+        pipeline = MessageIngestionPipeline(manager, batch_size=10, flush_interval=10.0)
+        await pipeline.start()
+        for i in range(3):
+            await pipeline.enqueue(PendingMessage.from_message(mock_message))
+        assert pipeline.queue_depth == 3
+        await pipeline.drain()
+
+    # One connection for the whole batch, chats and users de-duplicated
+    assert mock_conn.call_count == 1
+    sql_calls = [call.args for call in conn.executemany.await_args_list]
+    assert len(sql_calls) == 3
+    assert len(sql_calls[0][1]) == 1  # chats
+    assert len(sql_calls[1][1]) == 1  # users
+    assert len(sql_calls[2][1]) == 3  # messages
+    assert pipeline.get_stats()['items_processed'] == 3
+    assert pipeline.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_save_message_enqueues_when_ingestion_enabled(mock_message: MagicMock) -> None:
+    pipeline = MagicMock()
+    pipeline.enqueue = AsyncMock()
+    with patch.object(Database, '_ingestion_pipeline', pipeline), \
+         patch.object(Database, 'save_chat_info', new=AsyncMock()) as mock_save_chat:
+        await Database.save_message(mock_message)
+    pipeline.enqueue.assert_awaited_once()
+    mock_save_chat.assert_not_awaited()
+
+
+@pytest.mark.parametrize("raw,text,expected", [
+    ({"text": "hello"}, None, MessageKind.TEXT),
+    ({"photo": [{}], "caption": "x"}, None, MessageKind.PHOTO),
+    ({"video": {}}, None, MessageKind.VIDEO),
+    ({"video_note": {}}, None, MessageKind.VIDEO_NOTE),
+    ({"sticker": {}}, None, MessageKind.STICKER),
+    ({"animation": {}, "document": {}}, None, MessageKind.ANIMATION),
+    ({"voice": {}}, None, MessageKind.VOICE),
+    ({"poll": {}}, None, MessageKind.OTHER),
+    (None, "fallback text", MessageKind.TEXT),
+    (None, None, MessageKind.OTHER),
+])
+def test_classify_message_kind(raw: Any, text: Any, expected: MessageKind) -> None:
+    assert classify_message_kind(raw, text) == expected
+
+
+def test_pending_message_params_include_kind(mock_message: MagicMock) -> None:
+    record = PendingMessage.from_message(mock_message)
+    assert record.message_kind == MessageKind.TEXT
+    assert record.to_params()[11] == int(MessageKind.TEXT)
+    assert record.to_params()[12:] == (["start"], [1])
+
+
+@pytest.mark.asyncio
+async def test_image_analysis_is_saved_as_a_bot_reply(mock_message: MagicMock) -> None:
+    bot_user = User(id=42, first_name="Bot", is_bot=True)
+    mock_message.get_bot.return_value.get_me = AsyncMock(return_value=bot_user)
+    conn = AsyncMock()
+    with patch.object(Database, 'save_chat_info', new=AsyncMock()), \
+         patch.object(Database, 'save_user_info', new=AsyncMock()), \
+         patch.object(Database.get_connection_manager(), 'get_connection') as mock_conn:
+        mock_conn.return_value.__aenter__.return_value = conn
+        await Database.save_image_analysis_as_message(mock_message, "a cat")
+
+    # A new row through INSERT_MESSAGE_SQL; the user's photo message is left alone
+    sql, *params = conn.execute.await_args.args
+    assert sql == INSERT_MESSAGE_SQL
+    assert params[:3] == [-mock_message.message_id, mock_message.chat.id, bot_user.id]
+    assert params[4] == "[IMAGE ANALYSIS]: a cat"
+    assert params[7:9] == [True, mock_message.message_id]
+    assert conn.execute.await_count == 1
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import pytest
+
+from modules.download_coordinator import DownloadCoordinator
+
+
+def _downloader(path: str, gate: asyncio.Event, calls: list) -> object:
+    async def download() -> tuple:
+        calls.append(path)
+        await gate.wait()
+        with open(path, "wb") as f:
+            f.write(b"video")
+        return path, "Title"
+    return download
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_file_until_last_release(tmp_path) -> None:
+    coordinator = DownloadCoordinator()
+    gate = asyncio.Event()
+    calls: list = []
+    download = _downloader(str(tmp_path / "video.mp4"), gate, calls)
+
+    waiters = [asyncio.create_task(coordinator.fetch("video:tiktok:1", download)) for _ in range(3)]
+    await asyncio.sleep(0)
+    gate.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == [str(tmp_path / "video.mp4")]
+    assert {filename for filename, _ in results} == {str(tmp_path / "video.mp4")}
+    coordinator.release(results[0][0])
+    coordinator.release(results[1][0])
+    assert os.path.exists(results[0][0])
+    coordinator.release(results[2][0])
+    assert not os.path.exists(results[0][0])
+
+
+@pytest.mark.asyncio
+async def test_timed_out_waiter_does_not_cancel_the_others(tmp_path) -> None:
+    coordinator = DownloadCoordinator()
+    gate = asyncio.Event()
+    download = _downloader(str(tmp_path / "video.mp4"), gate, [])
+
+    patient = asyncio.create_task(coordinator.fetch("key", download))
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(coordinator.fetch("key", download), timeout=0.01)
+    gate.set()
+    filename, _ = await patient
+
+    assert os.path.exists(filename)
+    coordinator.release(filename)
+    assert not os.path.exists(filename)
+
+
+@pytest.mark.asyncio
+async def test_download_is_cancelled_when_every_waiter_gives_up() -> None:
+    coordinator = DownloadCoordinator()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def download() -> tuple:
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return None, None
+
+    waiters = [asyncio.create_task(coordinator.fetch("key", download)) for _ in range(2)]
+    await started.wait()
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_failed_download_is_retried_by_the_next_request(tmp_path) -> None:
+    coordinator = DownloadCoordinator()
+    attempts = 0
+
+    async def download() -> tuple:
+        nonlocal attempts
+        attempts += 1
+        return None, None
+
+    assert await coordinator.fetch("key", download) == (None, None)
+    assert await coordinator.fetch("key", download) == (None, None)
+    assert attempts == 2
+
+    stray = tmp_path / "other.mp4"
+    stray.write_bytes(b"x")
+    coordinator.release(str(stray))
+    assert not stray.exists()
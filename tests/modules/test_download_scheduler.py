@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+from typing import Any, List, Optional
+from unittest.mock import AsyncMock, patch
+
+from telegram.error import RetryAfter
+
+from modules.download_scheduler import DownloadScheduler, QueuePositionMessage, download_platform, queue_position_text
+
+
+async def _hold(scheduler: DownloadScheduler, order: List[str], name: str, platform: str, chat: str,
+                user: str = "u", gate: Optional[asyncio.Event] = None, positions: Optional[List[int]] = None) -> None:
+    async with scheduler.slot(platform, chat, user, positions.append if positions is not None else None):
+        order.append(name)
+        if gate is not None:
+            await gate.wait()
+
+
+async def _queue(scheduler: DownloadScheduler, *jobs: Any) -> List[asyncio.Task]:
+    tasks = []
+    for job in jobs:
+        tasks.append(asyncio.create_task(_hold(scheduler, *job)))
+        await asyncio.sleep(0)
+    return tasks
+
+
+@pytest.mark.parametrize("url,platform", [
+    ("https://vm.tiktok.com/ZMabc/", "tiktok"),
+    ("https://www.youtube.com/shorts/abc", "youtube_shorts"),
+    ("https://youtu.be/abc", "youtube"),
+    ("https://www.instagram.com/reel/abc/", "instagram_reels"),
+    ("https://x.com/user/status/1", "twitter"),
+    ("https://vimeo.com/1", "other"),
+])
+def test_download_platform(url: str, platform: str) -> None:
+    assert download_platform(url) == platform
+
+
+@pytest.mark.asyncio
+async def test_chats_take_turns() -> None:
+    scheduler = DownloadScheduler(max_concurrency=1)
+    order: List[str] = []
+    gate = asyncio.Event()
+    tasks = await _queue(
+        scheduler,
+        (order, "running", "youtube", "c", "u", gate),
+        (order, "a1", "youtube", "a", "alice"),
+        (order, "a2", "youtube", "a", "alice"),
+        (order, "a3", "youtube", "a", "bob"),
+        (order, "b1", "youtube", "b", "carol"),
+    )
+    gate.set()
+    await asyncio.gather(*tasks)
+
+    # b1 runs right after a1 although queued last; alice's second link waits for bob's first
+    assert order == ["running", "a1", "b1", "a3", "a2"]
+
+
+@pytest.mark.asyncio
+async def test_short_form_links_go_first_and_positions_are_reported() -> None:
+    scheduler = DownloadScheduler(max_concurrency=1)
+    order: List[str] = []
+    positions: List[int] = []
+    gate = asyncio.Event()
+
+    with patch("modules.download_scheduler.performance_monitor") as monitor:
+        tasks = await _queue(
+            scheduler,
+            (order, "running", "youtube", "a", "u", gate),
+            (order, "long", "youtube", "b", "u", None, positions),
+            (order, "short", "tiktok", "c"),
+        )
+        assert positions == [1, 2]
+        gate.set()
+        await asyncio.gather(*tasks)
+
+    assert order == ["running", "short", "long"]
+    assert positions == [1, 2, 1, 0]
+    waits = [c.args[3]["platform"] for c in monitor.record_metric.call_args_list if c.args[0] == "download_queue_wait"]
+    assert sorted(waits) == ["tiktok", "youtube", "youtube"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue() -> None:
+    scheduler = DownloadScheduler(max_concurrency=1)
+    order: List[str] = []
+    gate = asyncio.Event()
+    running, cancelled, waiting = await _queue(
+        scheduler,
+        (order, "running", "youtube", "a", "u", gate),
+        (order, "cancelled", "youtube", "b"),
+        (order, "waiting", "youtube", "c"),
+    )
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == 1
+
+    gate.set()
+    await asyncio.gather(running, waiting)
+    assert order == ["running", "waiting"]
+
+
+@pytest.mark.asyncio
+async def test_queue_position_message_shows_only_the_latest_position() -> None:
+    message = AsyncMock()
+    display = QueuePositionMessage(message, interval=0.05)
+
+    display.update(3)
+    display.update(2)
+    display.update(1)
+    await asyncio.sleep(0)
+    display.update(0)
+    await asyncio.sleep(0.1)
+
+    assert [c.args[0] for c in message.edit_text.await_args_list] == [
+        queue_position_text(1), queue_position_text(0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_queue_position_message_waits_out_retry_after() -> None:
+    message = AsyncMock()
+    message.edit_text.side_effect = [RetryAfter(0), None]
+    display = QueuePositionMessage(message, interval=0.05)
+
+    display.update(2)
+    await asyncio.sleep(0.01)
+    assert message.edit_text.await_count == 1
+    await asyncio.sleep(0.1)
+
+    assert message.edit_text.await_count == 2
+    assert message.edit_text.await_args.args[0] == queue_position_text(2)
+
+
+@pytest.mark.asyncio
+async def test_queue_position_message_close_cancels_pending_edit() -> None:
+    message = AsyncMock()
+    display = QueuePositionMessage(message, interval=1.0)
+
+    display.update(2)
+    await asyncio.sleep(0)
+    display.update(1)
+    await display.close()
+    await asyncio.sleep(0)
+
+    assert message.edit_text.await_count == 1
@@ -7,7 +7,7 @@ import pytest
 import asyncio
 import json
 import base64
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from typing import Dict, Any, List, Optional
 
@@ -2310,4 +2310,101 @@ class TestErrorContextAndLogging:
             call_args = mock_error_handler.handle_error.call_args
             assert call_args[1]["error"] == test_error  # Error should be passed as keyword argument
             assert call_args[1]["update"] == mock_update
-            assert call_args[1]["propagate"] == True
\ No newline at end of file
+            assert call_args[1]["propagate"] == True
+
+class TestAnalyzeCache:
+    """Test the watermark-keyed /analyze cache."""
+
+    @staticmethod
+    def _update() -> Mock:
+        update = Mock()
+        update.effective_chat.id = 12345
+        update.effective_user.id = 1
+        update.effective_user.username = "alice"
+        update.message.reply_text = AsyncMock()
+        return update
+
+    @staticmethod
+    def _patches(watermark: Any) -> Any:
+        config = Mock()
+        config.get_analysis_cache_config.return_value = {"enabled": True, "ttl": 3600}
+        return (
+            patch('modules.gpt.Database.health_check', new=AsyncMock(return_value=True)),
+            patch('modules.gpt.get_shared_config_manager', return_value=config),
+            patch('modules.gpt.get_period_watermark', new=AsyncMock(return_value=watermark)),
+        )
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_skips_message_retrieval(self):
+        from modules.chat_analysis import WindowWatermark
+        update = self._update()
+        context = Mock()
+        context.args = ["last", "7", "days"]
+        health, config, watermark = self._patches(WindowWatermark(3, 10, 12))
+
+        with health, config, watermark, \
+             patch('modules.gpt.Database.get_analysis_cache', new=AsyncMock(return_value="cached")) as get_cache, \
+             patch('modules.gpt.get_messages_for_chat_last_n_days', new=AsyncMock()) as load:
+            await gpt.analyze_command(update, context)
+
+        get_cache.assert_awaited_once_with(12345, "last_7_days", "3:10:12", 3600)
+        load.assert_not_awaited()
+        assert "cached" in update.message.reply_text.await_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_cache_miss_stores_result_under_watermark(self):
+        from modules.chat_analysis import WindowWatermark
+        update = self._update()
+        context = Mock()
+        context.args = []
+        health, config, watermark = self._patches(WindowWatermark(1, 42, 42))
+        messages = [(datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc), "alice", "hi")]
+
+        with health, config, watermark, \
+             patch('modules.gpt.Database.get_analysis_cache', new=AsyncMock(return_value=None)), \
+             patch('modules.gpt.Database.set_analysis_cache', new=AsyncMock()) as set_cache, \
+             patch('modules.gpt.get_messages_for_chat_today', new=AsyncMock(return_value=messages)), \
+             patch('modules.gpt.gpt_response', new=AsyncMock(return_value="summary")):
+            await gpt.analyze_command(update, context)
+
+        set_cache.assert_awaited_once_with(12345, "today", "1:42:42", "summary")
+
+    @pytest.mark.asyncio
+    async def test_empty_watermark_skips_retrieval(self):
+        from modules.chat_analysis import WindowWatermark
+        update = self._update()
+        context = Mock()
+        context.args = []
+        health, config, watermark = self._patches(WindowWatermark(0, None, None))
+
+        with health, config, watermark, \
+             patch('modules.gpt.Database.get_analysis_cache', new=AsyncMock()) as get_cache, \
+             patch('modules.gpt.get_messages_for_chat_today', new=AsyncMock()) as load:
+            await gpt.analyze_command(update, context)
+
+        get_cache.assert_not_awaited()
+        load.assert_not_awaited()
+        assert "Немає повідомлень" in update.message.reply_text.await_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_multi_day_period_is_summarized_day_by_day(self):
+        from modules.chat_analysis import WindowWatermark
+        from modules.period_summary import PeriodPlan
+        update = self._update()
+        context = Mock()
+        context.args = ["period", "2024-05-01", "2024-05-03"]
+        health, config, watermark = self._patches(WindowWatermark(4, 1, 4))
+        plan = PeriodPlan(12345, {date(2024, 5, 1): WindowWatermark(4, 1, 4)})
+
+        with health, config, watermark, \
+             patch('modules.gpt.Database.get_analysis_cache', new=AsyncMock(return_value=None)), \
+             patch('modules.gpt.Database.set_analysis_cache', new=AsyncMock()) as set_cache, \
+             patch('modules.gpt.plan_period', new=AsyncMock(return_value=plan)) as plan_period, \
+             patch('modules.gpt.summarize_period', new=AsyncMock(return_value="merged")) as summarize, \
+             patch('modules.gpt.get_messages_for_chat_date_period', new=AsyncMock()) as load:
+            await gpt.analyze_command(update, context)
+
+        plan_period.assert_awaited_once_with(12345, date(2024, 5, 1), date(2024, 5, 3))
+        assert summarize.await_args.args[0] is plan
+        load.assert_not_awaited()
+        set_cache.assert_awaited_once_with(12345, "period_2024-05-01_2024-05-03", "4:1:4", "merged")
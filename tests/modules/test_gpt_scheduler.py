@@ -0,0 +1,122 @@
+import asyncio
+import pytest
+import time
+from typing import Any, List
+from unittest.mock import patch
+
+import httpx
+
+from modules.gpt_scheduler import GPTOverloaded, GPTScheduler, Priority, retry_after_seconds
+
+
+def _rate_limited(retry_after: str = "") -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://api.example/chat/completions")
+    headers = {"Retry-After": retry_after} if retry_after else {}
+    response = httpx.Response(429, headers=headers, request=request)
+    return httpx.HTTPStatusError("429", request=request, response=response)
+
+
+@pytest.mark.asyncio
+async def test_waiting_requests_start_in_priority_order() -> None:
+    scheduler = GPTScheduler(max_concurrency=1, shed_queue_depth={})
+    gate = asyncio.Event()
+    order: List[str] = []
+
+    async def call(name: str) -> str:
+        order.append(name)
+        if name == "first":
+            await gate.wait()
+        return name
+
+    first = asyncio.create_task(scheduler.run(Priority.DIRECT, None, lambda: call("first")))
+    await asyncio.sleep(0)
+    waiting = [
+        asyncio.create_task(scheduler.run(priority, None, lambda name=name: call(name)))
+        for name, priority in [("random", Priority.BACKGROUND), ("analyze", Priority.ANALYZE), ("ask", Priority.DIRECT)]
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == 3
+
+    with patch("modules.gpt_scheduler.performance_monitor") as monitor:
+        gate.set()
+        await asyncio.gather(first, *waiting)
+
+    assert order == ["first", "ask", "analyze", "random"]
+    waits = {call.args[3]["priority"] for call in monitor.record_metric.call_args_list if call.args[0] == "gpt_queue_wait"}
+    assert waits == {"direct", "analyze", "background"}
+
+
+@pytest.mark.asyncio
+async def test_background_work_is_shed_when_queue_is_deep() -> None:
+    scheduler = GPTScheduler(max_concurrency=1, shed_queue_depth={Priority.BACKGROUND: 1})
+    gate = asyncio.Event()
+
+    async def blocked() -> None:
+        await gate.wait()
+
+    tasks = [asyncio.create_task(scheduler.run(Priority.DIRECT, None, blocked)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(GPTOverloaded):
+        await scheduler.run(Priority.BACKGROUND, None, blocked)
+    gate.set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_chat_bucket_delays_direct_and_sheds_background() -> None:
+    scheduler = GPTScheduler(chat_requests_per_minute=600, chat_burst=1)
+
+    async def call() -> str:
+        return "ok"
+
+    await scheduler.run(Priority.DIRECT, 42, call)
+    with pytest.raises(GPTOverloaded):
+        await scheduler.run(Priority.BACKGROUND, 42, call)
+    start = time.monotonic()
+    assert await scheduler.run(Priority.DIRECT, 42, call) == "ok"
+    assert time.monotonic() - start >= 0.05
+    # Other chats have buckets of their own
+    assert await scheduler.run(Priority.BACKGROUND, 43, call) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_request_is_retried_after_retry_after() -> None:
+    scheduler = GPTScheduler()
+    attempts = 0
+
+    async def call() -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise _rate_limited("0.1")
+        return "ok"
+
+    start = time.monotonic()
+    assert await scheduler.run(Priority.MENTION, None, call) == "ok"
+    assert attempts == 2
+    assert time.monotonic() - start >= 0.1
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_rate_limit_before_first_delta_only() -> None:
+    scheduler = GPTScheduler()
+    opened = 0
+
+    async def deltas() -> Any:
+        nonlocal opened
+        opened += 1
+        if opened == 1:
+            raise _rate_limited("0")
+        yield "a"
+        yield "b"
+
+    assert [d async for d in scheduler.stream(Priority.DIRECT, None, deltas)] == ["a", "b"]
+    assert opened == 2
+    assert scheduler._active == 0
+
+
+def test_retry_after_falls_back_to_exponential_backoff() -> None:
+    assert retry_after_seconds(_rate_limited("3"), 0) == 3.0
+    assert retry_after_seconds(_rate_limited(), 2) == 8.0
+    assert retry_after_seconds(_rate_limited("Wed, 21 Oct 2015 07:28:00 GMT"), 0) == 0.0
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from telegram.error import BadRequest
+
+from modules.gpt import OpenAIAsyncClient
+from modules.gpt_streaming import CURSOR, PLACEHOLDER_TEXT, StreamError, iter_sse_deltas, stream_reply
+from tests.mocks.sse_server import SSEServer, completion_events
+
+
+async def _deltas(*parts: str, delay: float = 0.0) -> Any:
+    for part in parts:
+        if delay:
+            await asyncio.sleep(delay)
+        yield part
+
+
+def _message() -> Any:
+    reply = MagicMock()
+    reply.edit_text = AsyncMock()
+    reply.delete = AsyncMock()
+    message = MagicMock()
+    message.reply_text = AsyncMock(return_value=reply)
+    return message
+
+
+@pytest.mark.asyncio
+async def test_client_streams_deltas_from_event_stream() -> None:
+    async with SSEServer(completion_events("Hel", "lo", " world")) as server:
+        client = OpenAIAsyncClient(api_key="key", base_url=server.base_url)
+        try:
+            deltas = [d async for d in client.chat.completions.stream(
+                model="m", messages=[{"role": "user", "content": "hi"}], max_tokens=10, temperature=0.5
+            )]
+        finally:
+            await client._client.aclose()
+
+    assert deltas == ["Hel", "lo", " world"]
+    assert server.requests[0]["stream"] is True
+
+
+@pytest.mark.asyncio
+async def test_error_event_raises() -> None:
+    async def lines() -> Any:
+        yield 'data: {"error": {"message": "overloaded"}}'
+
+    with pytest.raises(StreamError, match="overloaded"):
+        [d async for d in iter_sse_deltas(lines())]
+
+
+@pytest.mark.asyncio
+async def test_edits_are_throttled_and_final_edit_uses_markdown() -> None:
+    message = _message()
+    reply = message.reply_text.return_value
+
+    with patch("modules.gpt_streaming.GPTConstants.STREAM_EDIT_INTERVAL_PRIVATE", 0.05):
+        text = await stream_reply(message, _deltas(*["word "] * 20, delay=0.01), private=True)
+
+    assert text == ("word " * 20).strip()
+    message.reply_text.assert_awaited_once_with(PLACEHOLDER_TEXT)
+    edits = reply.edit_text.await_args_list
+    # 0.2s of deltas at one edit per 0.05s, not one edit per delta
+    assert 1 <= len(edits) - 1 <= 5
+    assert all(call.args[0].endswith(CURSOR) and call.kwargs["parse_mode"] is None for call in edits[:-1])
+    assert edits[-1].args == (text,) and edits[-1].kwargs == {"parse_mode": "Markdown"}
+
+
+@pytest.mark.asyncio
+async def test_invalid_markdown_falls_back_to_plain_text() -> None:
+    message = _message()
+    reply = message.reply_text.return_value
+    reply.edit_text.side_effect = [BadRequest("Can't parse entities"), None]
+
+    assert await stream_reply(message, _deltas("*unclosed")) == "*unclosed"
+
+    assert reply.edit_text.await_args_list[-1].args == ("*unclosed",)
+    assert "parse_mode" not in reply.edit_text.await_args_list[-1].kwargs
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_removes_placeholder() -> None:
+    async def failing() -> Any:
+        yield "partial"
+        raise StreamError("boom")
+
+    message = _message()
+    with pytest.raises(StreamError):
+        await stream_reply(message, failing())
+
+    message.reply_text.return_value.delete.assert_awaited_once()
@@ -3,7 +3,7 @@ Tests for the handler registry module.
 """
 
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from telegram.ext import Application
 
 from modules.handler_registry import HandlerRegistry
@@ -38,6 +38,20 @@ class TestHandlerRegistry:
         assert handler_registry.command_processor is not None
         assert handler_registry.command_processor == mock_command_processor
 
+    @pytest.mark.asyncio
+    async def test_shutdown_closes_video_downloader(self, handler_registry):
+        """Test that shutdown stops the video downloader's worker processes."""
+        video_downloader = Mock()
+        video_downloader.close = AsyncMock()
+        application = MagicMock(spec=Application)
+        application.bot_data = {"video_downloader": video_downloader}
+
+        with patch('modules.video_downloader.setup_video_handlers'):
+            await handler_registry._register_video_handlers(application)
+        await handler_registry.shutdown()
+
+        video_downloader.close.assert_awaited_once()
+
 
 class TestHandlerRegistryIntegration:
     """Test handler registry integration scenarios."""
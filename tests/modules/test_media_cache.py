@@ -0,0 +1,31 @@
+import pytest
+
+from modules.media_cache import MediaCache, media_cache_key
+
+
+@pytest.mark.parametrize("url,key", [
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&si=abc", "youtube:dQw4w9WgXcQ"),
+    ("https://youtu.be/dQw4w9WgXcQ?si=abc", "youtube:dQw4w9WgXcQ"),
+    ("https://m.youtube.com/shorts/dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://www.tiktok.com/@user/video/7301234567890?is_from_webapp=1&_r=1", "tiktok:7301234567890"),
+    ("https://www.instagram.com/reel/C1a2B3c4D5/?igsh=xyz", "instagram:C1a2B3c4D5"),
+    ("https://www.instagram.com/someone/p/C1a2B3c4D5/", "instagram:C1a2B3c4D5"),
+    ("https://x.com/user/status/1790000000000000000?s=20", "twitter:1790000000000000000"),
+    ("https://vm.tiktok.com/ZMabc123/?utm_source=copy", "https://vm.tiktok.com/ZMabc123"),
+])
+def test_media_cache_key(url: str, key: str) -> None:
+    assert media_cache_key(url) == key
+
+
+def test_entries_persist_and_can_be_evicted(tmp_path) -> None:
+    path = str(tmp_path / "media_cache.json")
+    cache = MediaCache(path)
+    cache.set("tiktok:1", kind="video", file_id="FILE", title="Clip", width=720, height=1280, duration=15)
+
+    reloaded = MediaCache(path)
+    assert reloaded.get("tiktok:1")["file_id"] == "FILE"
+    assert reloaded.get("tiktok:2") is None
+    assert reloaded.hit_rate == 0.5
+
+    reloaded.evict("tiktok:1")
+    assert MediaCache(path).get("tiktok:1") is None
@@ -0,0 +1,85 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from modules.media_probe import ProbeCache, ProbeResult, choose_format, estimate_size, probe_media
+from modules.ytdlp_pool import YtDlpPool, YtDlpResult
+
+MB = 1024 * 1024
+
+
+def _youtube_info(duration: float = 600) -> dict:
+    return {
+        "title": "Talk",
+        "tags": ["conf"],
+        "duration": duration,
+        "formats": [
+            {"format_id": "sb0", "vcodec": "none", "acodec": "none", "ext": "mhtml"},
+            {"format_id": "140", "vcodec": "none", "acodec": "mp4a.40.2", "filesize": 9 * MB},
+            {"format_id": "18", "vcodec": "avc1.42001E", "acodec": "mp4a.40.2", "height": 360, "filesize": 30 * MB},
+            {"format_id": "136", "vcodec": "avc1.4d401f", "acodec": "none", "height": 720, "filesize": 38 * MB},
+            {"format_id": "137", "vcodec": "avc1.640028", "acodec": "none", "height": 1080, "filesize": 90 * MB},
+            {"format_id": "248", "vcodec": "vp9", "acodec": "none", "height": 1080, "filesize": 30 * MB},
+        ],
+    }
+
+
+def test_best_h264_pair_that_fits_is_chosen() -> None:
+    result = choose_format(_youtube_info())
+
+    assert result is not None
+    assert (result.format_id, result.size, result.fits) == ("136+140", 47 * MB, True)
+    assert (result.title, result.tags, result.duration) == ("Talk", ["conf"], 600)
+
+
+def test_estimated_sizes_must_fit_with_margin() -> None:
+    info = {
+        "duration": 100,
+        "formats": [
+            # 4000 kbit/s for 100 s = 50 MB, over the margin
+            {"format_id": "hls-4000", "tbr": 4000, "height": 1080},
+            {"format_id": "hls-2000", "tbr": 2000, "height": 720},
+        ],
+    }
+
+    assert estimate_size(info["formats"][1], 100) == (25_000_000, False)
+    assert choose_format(info).format_id == "hls-2000"
+
+
+def test_smallest_format_is_chosen_when_nothing_fits() -> None:
+    result = choose_format(_youtube_info(duration=7200), limit=20 * MB)
+
+    assert result is not None
+    assert (result.format_id, result.fits) == ("18", False)
+
+
+def test_formats_without_sizes_give_no_choice() -> None:
+    assert choose_format({"formats": [{"format_id": "0", "vcodec": "h264"}]}) is None
+    assert choose_format({"entries": []}) is None
+
+
+@pytest.mark.asyncio
+async def test_probe_reads_formats_through_the_pool() -> None:
+    pool = YtDlpPool(size=1)
+    info = json.dumps(_youtube_info()).encode()
+    with patch.object(pool, "run", AsyncMock(side_effect=[YtDlpResult(0, info, b""), YtDlpResult(1, b"", b"ERROR")])) as run:
+        probed = await probe_media(pool, "https://youtu.be/x", ["--impersonate", "chrome"])
+        failed = await probe_media(pool, "https://youtu.be/y")
+
+    assert probed is not None and probed.format_id == "136+140"
+    assert failed is None
+    argv = run.await_args_list[0].args[0]
+    assert argv[:2] == ["https://youtu.be/x", "-J"] and argv[-2:] == ["--impersonate", "chrome"]
+
+
+def test_probe_cache_expires_and_evicts_oldest() -> None:
+    result = ProbeResult(format_id="18", size=1, fits=True)
+    cache = ProbeCache(ttl=60, capacity=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, result)
+
+    assert cache.get("a") is None
+    assert cache.get("c") is result
+    with patch("modules.media_probe.time.monotonic", return_value=10 ** 9):
+        assert cache.get("c") is None
@@ -0,0 +1,72 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from modules.message_partitions import (
+    apply_message_retention, ensure_message_partitions, month_start, partition_name
+)
+
+
+def test_month_start_handles_year_boundaries() -> None:
+    dt = datetime(2024, 12, 31, 23, 59, tzinfo=timezone.utc)
+    assert month_start(dt) == datetime(2024, 12, 1, tzinfo=timezone.utc)
+    assert month_start(dt, 1) == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert month_start(dt, -12) == datetime(2023, 12, 1, tzinfo=timezone.utc)
+    assert partition_name(month_start(dt, 1)) == "messages_2025_01"
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_is_noop_on_legacy_table() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=False)
+    conn.execute = AsyncMock()
+    assert await ensure_message_partitions(conn, 3) == []
+    conn.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_default_and_upcoming_months() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=True)
+    conn.execute = AsyncMock()
+    names = await ensure_message_partitions(conn, 2)
+
+    statements = [call.args[0] for call in conn.execute.await_args_list]
+    assert "messages_default PARTITION OF messages DEFAULT" in statements[0]
+    assert len(names) == 3
+    assert names[0] == partition_name(month_start(datetime.now(timezone.utc)))
+    assert all("FOR VALUES FROM" in sql for sql in statements[1:])
+
+
+@pytest.mark.asyncio
+async def test_retention_disabled_or_invalid_mode() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=True)
+    assert await apply_message_retention(conn, 0, "archive") == []
+    conn.fetchval.assert_not_awaited()
+    with pytest.raises(ValueError):
+        await apply_message_retention(conn, 6, "delete")
+
+
+@pytest.mark.asyncio
+async def test_strip_raw_only_touches_old_unmarked_partitions() -> None:
+    now = datetime.now(timezone.utc)
+    old = month_start(now, -8)
+    older = month_start(now, -9)
+    conn = MagicMock()
+    # is_partitioned, then the stripped marker of each old partition
+    conn.fetchval = AsyncMock(side_effect=[True, "raw_telegram_message stripped by retention", None])
+    conn.fetch = AsyncMock(return_value=[
+        {"name": partition_name(month_start(now))},
+        {"name": partition_name(old)},
+        {"name": partition_name(older)},
+        {"name": "messages_default"},
+    ])
+    conn.execute = AsyncMock(return_value="UPDATE 3")
+
+    changed = await apply_message_retention(conn, 6, "strip_raw")
+
+    assert changed == [partition_name(old)]
+    statements = [call.args[0] for call in conn.execute.await_args_list]
+    assert statements[0].startswith(f"UPDATE {partition_name(old)} SET raw_telegram_message = NULL")
+    assert partition_name(month_start(now)) not in " ".join(statements)
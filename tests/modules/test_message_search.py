@@ -0,0 +1,52 @@
+import pytest
+from datetime import datetime, timezone
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+from modules import rollup_state
+from modules.message_search import search_messages
+
+
+@pytest.fixture(autouse=True)
+def reset_ready_flag() -> Any:
+    rollup_state._backfilled.clear()
+    yield
+    rollup_state._backfilled.clear()
+
+
+def _hit(internal_id: int, rank: float) -> dict:
+    return {
+        "internal_message_id": internal_id, "message_id": internal_id + 1000,
+        "timestamp": datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc), "rank": rank,
+        "username": "alice", "first_name": "Alice", "snippet": "a ⟦борщ⟧ <b>",
+    }
+
+
+@pytest.mark.asyncio
+async def test_search_pages_with_a_keyset() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=True)
+    conn.fetch = AsyncMock(return_value=[_hit(3, 0.5), _hit(2, 0.25), _hit(1, 0.25)])
+
+    hits, cursor = await search_messages(conn, -100, "борщ", limit=2)
+
+    assert [h["internal_message_id"] for h in hits] == [3, 2]
+    assert cursor == (0.25, 2)
+    query, *args = conn.fetch.await_args.args
+    assert "m.search_vector @@ websearch_to_tsquery('chat_search', $2)" in query
+    assert args == [-100, "борщ", None, None, 3]
+
+    conn.fetch = AsyncMock(return_value=[_hit(1, 0.25)])
+    hits, cursor = await search_messages(conn, -100, "борщ", after=(0.25, 2), limit=2)
+    assert cursor is None
+    assert conn.fetch.await_args.args[3:] == (0.25, 2, 3)
+
+
+@pytest.mark.asyncio
+async def test_search_computes_vectors_before_migration() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=None)
+    conn.fetch = AsyncMock(return_value=[])
+
+    assert await search_messages(conn, -100, "борщ") == ([], None)
+    assert "to_tsvector('chat_search'::regconfig" in conn.fetch.await_args.args[0]
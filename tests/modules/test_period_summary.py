@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from datetime import date, datetime, timezone
+from typing import Any, List
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from modules.chat_analysis import WindowWatermark
+from modules.period_summary import PeriodPlan, plan_period, summarize_period
+
+
+class AsyncContextManagerMock:
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    async def __aenter__(self) -> Any:
+        return self.value
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+
+def _pool(conn: Any) -> Any:
+    pool = MagicMock()
+    pool.acquire = lambda: AsyncContextManagerMock(conn)
+    return pool
+
+
+def _messages(day: date, count: int) -> List[Any]:
+    stamp = datetime(day.year, day.month, day.day, 12, 0, tzinfo=timezone.utc)
+    return [(stamp, "alice", f"message {i} of {day}") for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_plan_reuses_days_whose_watermark_is_unchanged() -> None:
+    conn = MagicMock()
+    conn.fetch = AsyncMock(side_effect=[
+        [
+            {"day": date(2024, 5, 1), "messages": 3, "first_id": 1, "last_id": 3},
+            {"day": date(2024, 5, 2), "messages": 2, "first_id": 4, "last_id": 5},
+        ],
+        [
+            {"day": date(2024, 5, 1), "watermark": "3:1:3", "summary": "first day"},
+            {"day": date(2024, 5, 2), "watermark": "1:4:4", "summary": "stale"},
+        ],
+    ])
+
+    with patch("modules.period_summary.Database.get_pool", new=AsyncMock(return_value=_pool(conn))):
+        plan = await plan_period(-100, date(2024, 5, 1), date(2024, 5, 3))
+
+    assert plan.messages == 5
+    assert plan.summaries == {date(2024, 5, 1): "first day"}
+    assert plan.missing_days == [date(2024, 5, 2)]
+    assert "GROUP BY 1" in conn.fetch.await_args_list[0].args[0]
+
+
+@pytest.mark.asyncio
+async def test_only_missing_days_are_summarized_then_merged_once() -> None:
+    days = [date(2024, 5, d) for d in range(1, 6)]
+    plan = PeriodPlan(-100, {day: WindowWatermark(2, d, d + 1) for d, day in enumerate(days)})
+    plan.summaries[days[0]] = "stored"
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+    running = 0
+    peak = 0
+
+    async def summarize_chunk(day: date, text: str) -> str:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return f"summary of {day}"
+
+    merge = AsyncMock(return_value="merged")
+
+    async def load(chat_id: int, start: datetime, end: datetime) -> List[Any]:
+        return _messages(start.date(), 2)
+
+    with patch("modules.period_summary.Database.get_pool", new=AsyncMock(return_value=_pool(conn))), \
+         patch("modules.period_summary.get_messages_for_chat_window", new=load):
+        result = await summarize_period(plan, summarize_chunk, merge, concurrency=2)
+
+    assert result == "merged"
+    assert peak == 2
+    stored = {call.args[2]: call.args[3] for call in conn.execute.await_args_list}
+    assert sorted(stored) == days[1:]
+    assert stored[days[1]] == str(WindowWatermark(2, 1, 2))
+    merge_input = merge.await_args.args[0]
+    assert merge_input.startswith("01.05.2024:\nstored")
+    assert "05.05.2024:\nsummary of 2024-05-05" in merge_input
+
+
+@pytest.mark.asyncio
+async def test_fully_summarized_period_costs_one_merge() -> None:
+    day = date(2024, 5, 1)
+    plan = PeriodPlan(-100, {day: WindowWatermark(1, 1, 1)}, {day: "stored"})
+    summarize_chunk = AsyncMock()
+    merge = AsyncMock(return_value="merged")
+
+    with patch("modules.period_summary.get_messages_for_chat_window", new=AsyncMock()) as load:
+        assert await summarize_period(plan, summarize_chunk, merge) == "merged"
+
+    load.assert_not_awaited()
+    summarize_chunk.assert_not_awaited()
+    merge.assert_awaited_once_with("01.05.2024:\nstored")
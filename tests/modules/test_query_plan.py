@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import pytest
+from typing import Any, List
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from modules import query_plan
+from modules.query_plan import QueryPlan, spare_connections
+
+
+class FakeConnection:
+    def __init__(self, tracker: "FakePool") -> None:
+        self.tracker = tracker
+
+    async def fetchval(self, query: str, *args: Any) -> Any:
+        self.tracker.in_flight += 1
+        self.tracker.peak = max(self.tracker.peak, self.tracker.in_flight)
+        try:
+            await asyncio.sleep(args[0] if args else 0)
+            if query == "fail":
+                raise RuntimeError("boom")
+            return query
+        finally:
+            self.tracker.in_flight -= 1
+
+
+class FakeAcquire:
+    def __init__(self, pool: "FakePool") -> None:
+        self.pool = pool
+
+    async def __aenter__(self) -> FakeConnection:
+        self.pool.acquired += 1
+        self.pool.connections.append(FakeConnection(self.pool))
+        return self.pool.connections[-1]
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+
+class FakePool:
+    """Pool with ``idle`` free connections and room for ``unopened`` more."""
+
+    def __init__(self, idle: int, unopened: int = 0) -> None:
+        self.idle = idle
+        self.unopened = unopened
+        self.acquired = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.connections: List[FakeConnection] = []
+
+    def get_idle_size(self) -> int:
+        return self.idle
+
+    def get_size(self) -> int:
+        return 10 - self.unopened
+
+    def get_max_size(self) -> int:
+        return 10
+
+    def acquire(self) -> FakeAcquire:
+        return FakeAcquire(self)
+
+
+def _plan(steps: int, max_concurrency: int = 3, delay: float = 0.01) -> QueryPlan:
+    plan = QueryPlan("test", max_concurrency=max_concurrency)
+    for i in range(steps):
+        plan.fetchval(f"q{i}", f"q{i}", delay)
+    return plan
+
+
+def test_spare_connections() -> None:
+    assert spare_connections(FakePool(idle=2, unopened=3)) == 5
+    assert spare_connections(object()) == 0
+
+
+@pytest.mark.asyncio
+async def test_runs_steps_concurrently_up_to_the_cap() -> None:
+    pool = FakePool(idle=10)
+    plan = _plan(8, max_concurrency=3)
+
+    results = await plan.run(pool)
+
+    assert list(results) == [f"q{i}" for i in range(8)]
+    assert results["q5"] == "q5"
+    assert plan.workers == 3
+    assert pool.acquired == 3
+    assert pool.peak == 3
+    assert set(plan.timings) == set(results)
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_one_connection_when_pool_is_busy() -> None:
+    pool = FakePool(idle=query_plan.QUERY_PLAN_RESERVED_CONNECTIONS + 1)
+    plan = _plan(5)
+
+    results = await plan.run(pool)
+
+    assert len(results) == 5
+    assert plan.workers == 1
+    assert pool.acquired == 1
+    assert pool.peak == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_pool_runs_sequentially() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=1)
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+    plan = _plan(3)
+
+    assert await plan.run(pool) == {"q0": 1, "q1": 1, "q2": 1}
+    assert plan.workers == 1
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_remaining_steps() -> None:
+    pool = FakePool(idle=10)
+    plan = QueryPlan("test", max_concurrency=2)
+    plan.fetchval("bad", "fail", 0)
+    plan.fetchval("slow", "slow", 10)
+
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(plan.run(pool), timeout=1)
+    assert pool.in_flight == 0
+
+
+def test_duplicate_step_is_rejected() -> None:
+    plan = _plan(1)
+    with pytest.raises(ValueError):
+        plan.fetchval("q0", "again")
+
+
+@pytest.mark.asyncio
+async def test_slow_steps_are_logged(caplog: pytest.LogCaptureFixture) -> None:
+    plan = _plan(2, delay=0.02)
+    with patch.object(query_plan.PerformanceConstants, "SLOW_QUERY_THRESHOLD", 0.01), \
+         patch.object(query_plan.performance_monitor, "record_metric") as record_metric, \
+         caplog.at_level(logging.WARNING, logger="modules.query_plan"):
+        await plan.run(FakePool(idle=10))
+
+    assert "Slow query test.q0" in caplog.text
+    assert record_metric.call_args.args[0] == "query_plan_duration"
+    assert record_metric.call_args.args[3] == {"plan": "test", "mode": "concurrent"}
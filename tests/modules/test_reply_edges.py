@@ -0,0 +1,75 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+from modules import rollup_state
+from modules.reply_edges import backfill_reply_edges, fetch_response_percentiles, reply_edges_ready
+from modules.stats_command import _empty_stats_data, format_stats
+
+
+@pytest.fixture(autouse=True)
+def reset_ready_flag() -> Any:
+    rollup_state._backfilled.clear()
+    yield
+    rollup_state._backfilled.clear()
+
+
+@pytest.mark.asyncio
+async def test_reply_edges_ready_is_cached_once_backfilled() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=datetime.now(timezone.utc))
+    assert await reply_edges_ready(conn) is True
+    assert await reply_edges_ready(conn) is True
+    conn.fetchval.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_percentiles_are_computed_in_the_database() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=[12.0, 90.5, 3600.0])
+    now = datetime.now(timezone.utc)
+
+    result = await fetch_response_percentiles(conn, -100, now - timedelta(days=7), now)
+
+    assert result == {"p50": 12.0, "p90": 90.5, "p99": 3600.0}
+    query = conn.fetchval.await_args.args[0]
+    assert "percentile_cont(ARRAY[0.5, 0.9, 0.99])" in query
+    assert "FROM message_reply_edges" in query
+
+
+@pytest.mark.asyncio
+async def test_percentiles_fall_back_to_self_join_and_handle_no_replies() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=None)
+    now = datetime.now(timezone.utc)
+
+    assert await fetch_response_percentiles(conn, -100, now - timedelta(days=7), now, use_edges=False) is None
+    query = conn.fetchval.await_args.args[0]
+    assert "percentile_cont" in query
+    assert "JOIN messages original" in query
+
+
+@pytest.mark.asyncio
+async def test_backfill_marks_edges_ready() -> None:
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[{"chat_id": -1}, {"chat_id": -2}])
+    conn.execute = AsyncMock(side_effect=["INSERT 0 3", "INSERT 0 0", "INSERT 0 1"])
+
+    assert await backfill_reply_edges(conn) == 3
+    statements = [call.args for call in conn.execute.await_args_list]
+    assert statements[0][1] == -1 and statements[1][1] == -2
+    assert "rollup_state" in statements[2][0]
+    assert statements[2][1] == "reply_edges"
+
+
+def test_format_stats_shows_tail_percentiles() -> None:
+    now = datetime.now(timezone.utc)
+    data = _empty_stats_data(now, now - timedelta(days=7), is_all_time=False)
+    data["avg_response_seconds"] = 45.0
+    data["response_percentiles"] = {"p50": 45.0, "p90": 600.0, "p99": 7260.0}
+
+    text = format_stats(data)
+
+    assert "Median response time:</b> 45s" in text
+    assert "p90 10m 0s · p99 2h 1m" in text
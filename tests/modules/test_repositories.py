@@ -12,6 +12,7 @@ from datetime import datetime
 from typing import Dict, Any, List, Optional
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from modules.database import INSERT_MESSAGE_SQL, RETRACT_MESSAGE_SQL
 from modules.repositories import (
     Repository, ChatEntity, UserEntity, MessageEntity, AnalysisCacheEntity,
     ChatRepository, UserRepository, MessageRepository, AnalysisCacheRepository,
@@ -444,7 +445,12 @@ class TestMessageRepository:
         async def acquire():
             yield mock_conn
             
+        @asynccontextmanager
+        async def transaction():
+            yield
+            
         mock_pool.acquire = acquire
+        mock_conn.transaction = transaction
         
         return mock_pool, mock_conn
     
@@ -514,8 +520,8 @@ class TestMessageRepository:
         mock_pool, mock_conn = mock_database_pool
         mock_conn.execute.return_value = None
         
-        # Mock the get_by_id call that happens after save
-        mock_conn.fetchrow.return_value = {
+        # Not stored yet, then the get_by_id call that happens after save
+        mock_conn.fetchrow.side_effect = lambda *args: None if "FOR UPDATE" in args[0] else {
             'internal_message_id': 1,
             'message_id': sample_message_entity.message_id,
             'chat_id': sample_message_entity.chat_id,
@@ -538,9 +544,39 @@ class TestMessageRepository:
         mock_conn.execute.assert_called_once()
         # Verify the SQL structure
         call_args = mock_conn.execute.call_args
-        assert "INSERT INTO messages" in call_args[0][0]
+        assert call_args[0][0] == INSERT_MESSAGE_SQL
         assert "ON CONFLICT" in call_args[0][0]
     
+    @pytest.mark.asyncio
+    async def test_save_existing_message_retracts_it_first(self, message_repository, sample_message_entity, mock_database_pool):
+        """Test that rewriting a stored message takes the old version out of the rollups."""
+        mock_pool, mock_conn = mock_database_pool
+        stored_at = datetime(2026, 1, 1, 12, 0)
+        mock_conn.fetchrow.return_value = {
+            'timestamp': stored_at,
+            'text': 'old text',
+            'internal_message_id': 2,
+            'message_id': sample_message_entity.message_id,
+            'chat_id': sample_message_entity.chat_id,
+            'user_id': sample_message_entity.user_id,
+            'is_command': False,
+            'command_name': None,
+            'is_gpt_reply': False,
+            'replied_to_message_id': None,
+            'gpt_context_message_ids': None,
+            'raw_telegram_message': None
+        }
+        
+        with patch('modules.repositories.Database.get_pool', return_value=mock_pool):
+            await message_repository.save(sample_message_entity)
+        
+        retract, insert = mock_conn.execute.call_args_list
+        assert retract[0][0] == RETRACT_MESSAGE_SQL
+        assert retract[0][1:] == (
+            sample_message_entity.chat_id, sample_message_entity.message_id, stored_at, ['old', 'text'], [1, 1]
+        )
+        assert insert[0][0] == INSERT_MESSAGE_SQL
+    
     @pytest.mark.asyncio
     async def test_find_by_criteria_chat_id(self, message_repository, mock_database_pool):
         """Test finding messages by chat ID criteria."""
@@ -1120,6 +1156,7 @@ class TestRepositoryTransactionHandling:
             yield mock_conn
             
         mock_pool.acquire = acquire
+        mock_conn.transaction = MagicMock()
         
         with patch('modules.repositories.Database.get_pool', return_value=mock_pool):
             message_repo = MessageRepository()
@@ -1246,6 +1283,7 @@ class TestRepositoryTransactionHandling:
             yield mock_conn
             
         mock_pool.acquire = acquire
+        mock_conn.transaction = MagicMock()
         
         with patch('modules.repositories.Database.get_pool', return_value=mock_pool):
             message_repo = MessageRepository()
@@ -0,0 +1,150 @@
+import re
+import pytest
+from datetime import datetime, timezone
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from telegram import Message
+
+from modules import search_command
+from modules.search_command import (
+    CALLBACK_PATTERN,
+    decode_cursor,
+    encode_cursor,
+    format_results,
+    handle_search_page_callback,
+    search_command as search_handler,
+)
+
+
+class AsyncContextManagerMock:
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    async def __aenter__(self) -> Any:
+        return self.value
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+
+@pytest.fixture(autouse=True)
+def reset_state() -> Any:
+    search_command._queries.clear()
+    yield
+    search_command._queries.clear()
+
+
+def _hit(internal_id: int, rank: float) -> dict:
+    return {
+        "internal_message_id": internal_id, "message_id": internal_id + 1000,
+        "timestamp": datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc), "rank": rank,
+        "username": "alice", "first_name": "Alice", "snippet": "a ⟦борщ⟧ <b>",
+    }
+
+
+def test_cursor_round_trips_through_callback_data() -> None:
+    rank = 0.0607927106320858  # a float4 as asyncpg returns it
+    data = encode_cursor("0123456789", 12, (rank, 9223372036854775807))
+
+    assert len(data.encode()) <= 64
+    assert re.match(CALLBACK_PATTERN, data)
+    assert decode_cursor(data) == ("0123456789", 12, (rank, 9223372036854775807))
+
+
+def test_format_results_escapes_text_and_highlights_matches() -> None:
+    text = format_results(-1001234, "<борщ>", [_hit(1, 0.5)], 2)
+
+    assert "<b>&lt;борщ&gt;</b> — сторінка 2" in text
+    assert 'href="https://t.me/c/1234/1001"' in text
+    assert "a <b>борщ</b> &lt;b&gt;" in text
+    assert "@alice" in text
+    assert "t.me" not in format_results(42, "борщ", [_hit(1, 0.5)], 1)
+    # Image analyses are stored under negative message ids
+    assert "t.me" not in format_results(-1001234, "борщ", [{**_hit(1, 0.5), "message_id": -7}], 1)
+
+
+@pytest.mark.asyncio
+async def test_search_command_replies_with_next_page_button() -> None:
+    update = MagicMock()
+    update.effective_chat.id = -100
+    update.message.reply_text = AsyncMock()
+    context = MagicMock()
+    context.args = ["нова", "пошта"]
+    pool = MagicMock()
+    pool.acquire = lambda: AsyncContextManagerMock(MagicMock())
+
+    with patch("modules.search_command.Database.get_pool", new=AsyncMock(return_value=pool)), \
+         patch("modules.search_command.search_messages",
+               new=AsyncMock(return_value=([_hit(2, 0.5)], (0.5, 2)))) as search:
+        await search_handler(update, context)
+
+    assert search.await_args.args[1:] == (-100, "нова пошта")
+    markup = update.message.reply_text.await_args.kwargs["reply_markup"]
+    data = markup.inline_keyboard[0][0].callback_data
+    token, page, cursor = decode_cursor(data)
+    assert search_command._queries[token] == (-100, "нова пошта")
+    assert (page, cursor) == (2, (0.5, 2))
+
+
+@pytest.mark.asyncio
+async def test_search_command_without_query_shows_usage() -> None:
+    update = MagicMock()
+    update.message.reply_text = AsyncMock()
+    context = MagicMock()
+    context.args = []
+
+    await search_handler(update, context)
+
+    assert "/search <запит>" in update.message.reply_text.await_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_forgotten_query_asks_for_a_new_search() -> None:
+    update = MagicMock()
+    update.callback_query.data = encode_cursor("0123456789", 2, (0.5, 2))
+    update.callback_query.message = MagicMock(spec=Message)
+    update.callback_query.message.chat.id = -100
+    update.callback_query.message.reply_text = AsyncMock()
+    update.callback_query.edit_message_reply_markup = AsyncMock()
+
+    with patch("modules.search_command.Database.get_pool", new=AsyncMock()) as get_pool:
+        await handle_search_page_callback(update, MagicMock())
+
+    get_pool.assert_not_awaited()
+    update.callback_query.edit_message_reply_markup.assert_awaited_once_with(reply_markup=None)
+    assert "/search" in update.callback_query.message.reply_text.await_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_page_callback_reports_database_errors() -> None:
+    search_command._queries["0123456789"] = (-100, "борщ")
+    update = MagicMock()
+    update.callback_query.data = encode_cursor("0123456789", 2, (0.5, 2))
+    update.callback_query.message = MagicMock(spec=Message)
+    update.callback_query.message.chat.id = -100
+    update.callback_query.message.reply_text = AsyncMock()
+    update.callback_query.edit_message_text = AsyncMock()
+
+    with patch("modules.search_command.Database.get_pool", new=AsyncMock(side_effect=OSError("db down"))):
+        await handle_search_page_callback(update, MagicMock())
+
+    update.callback_query.edit_message_text.assert_not_awaited()
+    assert "Помилка" in update.callback_query.message.reply_text.await_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_page_callback_on_inaccessible_message() -> None:
+    update = MagicMock()
+    update.callback_query.data = encode_cursor("0123456789", 2, (0.5, 2))
+    update.callback_query.answer = AsyncMock()
+    update.callback_query.message.chat.id = -100
+    context = MagicMock()
+    context.bot.send_message = AsyncMock()
+
+    await handle_search_page_callback(update, context)
+
+    # CallbackHandlerService has already answered the query
+    update.callback_query.answer.assert_not_awaited()
+    chat_id, text = context.bot.send_message.await_args.args
+    assert chat_id == -100 and "/search" in text
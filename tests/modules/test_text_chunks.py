@@ -0,0 +1,35 @@
+from modules.text_chunks import estimate_tokens, pack_lines, split_text
+
+
+def test_estimate_tokens_counts_utf8_bytes() -> None:
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("привіт") == 3  # 12 UTF-8 bytes
+
+
+def test_pack_lines_respects_the_token_budget() -> None:
+    lines = ["a" * 40, "b" * 40, "c" * 40, "d" * 400]
+
+    chunks = pack_lines(lines, 25)
+
+    assert chunks == [["a" * 40, "b" * 40], ["c" * 40], ["d" * 400]]
+
+
+def test_split_text_keeps_paragraphs_together() -> None:
+    text = "First paragraph.\n\nSecond paragraph.\n\n\n" + "Third one is here."
+
+    assert split_text(text, 100) == [text.replace("\n\n\n", "\n\n")]
+    assert split_text(text, 10) == ["First paragraph.\n\nSecond paragraph.", "Third one is here."]
+
+
+def test_split_text_falls_back_to_sentences_then_words() -> None:
+    sentence = "Word " * 9 + "end."
+    text = f"{sentence} {sentence} {sentence}"
+
+    chunks = split_text(text, 30)
+
+    assert chunks == [f"{sentence} {sentence}", sentence]
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+    assert "".join(split_text("a" * 100, 10)) == "a" * 100
+    assert all(estimate_tokens(chunk) <= 10 for chunk in split_text("a" * 100, 10))
+    assert all(estimate_tokens(chunk) <= 5 for chunk in split_text("tiny words " * 20, 5))
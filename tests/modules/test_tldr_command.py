@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from typing import Any, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from modules.handlers import tldr_command
+from modules.handlers.tldr_command import _summarize_chunked, tldr_command as tldr_handler
+
+
+@pytest.fixture(autouse=True)
+def reset_cache() -> Any:
+    tldr_command._summaries.clear()
+    yield
+    tldr_command._summaries.clear()
+
+
+def _update(text: str) -> Any:
+    update = MagicMock()
+    update.effective_chat = None
+    update.message.reply_to_message.text = text
+    update.message.reply_to_message.caption = None
+    status = MagicMock()
+    status.edit_text = AsyncMock()
+    update.message.reply_text = AsyncMock(return_value=status)
+    return update
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_summarized_concurrently_then_merged() -> None:
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 2000 for i in range(4))
+    running = 0
+    peak = 0
+
+    async def gpt_call(system_prompt: str, user_content: str) -> Optional[str]:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "merged" if "---" in user_content else user_content.split("\n\n")[1][:11]
+
+    with patch.object(tldr_command, "CHUNK_CONCURRENCY", 2), \
+         patch("modules.handlers.tldr_command._gpt_call", new=gpt_call), \
+         patch("modules.handlers.tldr_command.performance_monitor") as monitor:
+        assert await _summarize_chunked(text, "english") == "merged"
+
+    assert peak == 2
+    metrics = [call.args[0] for call in monitor.record_metric.call_args_list]
+    assert metrics.count("tldr_chunk_duration") == 4
+    assert metrics.count("tldr_merge_duration") == 1
+
+
+@pytest.mark.asyncio
+async def test_reposted_url_is_answered_from_cache() -> None:
+    article = "A long enough article body. " * 10
+
+    with patch("modules.handlers.tldr_command._fetch_url_text", new=AsyncMock(return_value=article)) as fetch, \
+         patch("modules.handlers.tldr_command._gpt_call", new=AsyncMock(return_value="summary")) as gpt:
+        await tldr_handler(_update("look https://example.com/post?utm_source=a"), MagicMock(args=[]))
+        update = _update("again https://example.com/post?utm_source=b")
+        await tldr_handler(update, MagicMock(args=[]))
+
+    fetch.assert_awaited_once()
+    gpt.assert_awaited_once()
+    update.message.reply_text.assert_awaited_once_with("summary")
+
+
+@pytest.mark.asyncio
+async def test_failed_summary_is_not_cached() -> None:
+    with patch("modules.handlers.tldr_command._gpt_call", new=AsyncMock(return_value=None)):
+        update = _update("Some text worth summarizing.")
+        await tldr_handler(update, MagicMock(args=[]))
+
+    status = update.message.reply_text.return_value
+    status.edit_text.assert_awaited_once_with(tldr_command.SUMMARY_FAILED)
+    assert not tldr_command._summaries
@@ -11,7 +11,7 @@ from unittest.mock import patch, MagicMock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from modules.url_processor import (
-    sanitize_url, shorten_url, _url_shortener_cache, _shortener_calls,
+    sanitize_url, shorten_url, strip_tracking_params, _url_shortener_cache, _shortener_calls,
     _SHORTENER_MAX_CALLS_PER_MINUTE
 )
 
@@ -52,6 +52,9 @@ def test_sanitize_url_valid(url, expected):
 def test_sanitize_url_invalid(url):
     assert sanitize_url(url) == ""
 
+def test_strip_tracking_params():
+    assert strip_tracking_params("https://Example.com/a?utm_source=tg&id=5&fbclid=x#top") == "https://example.com/a?id=5"
+
 @pytest.mark.asyncio
 async def test_shorten_url_short():
     url = "http://a.co/short"
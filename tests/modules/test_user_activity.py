@@ -0,0 +1,112 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+from modules import rollup_state
+from modules.user_activity import (
+    backfill_user_activity,
+    fetch_last_message,
+    fetch_user_profile,
+    merge_profiles,
+    user_activity_ready,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_ready_flag() -> Any:
+    rollup_state._backfilled.clear()
+    yield
+    rollup_state._backfilled.clear()
+
+
+def _hours(**counts: int) -> list:
+    hourly = [0] * 24
+    for hour, count in counts.items():
+        hourly[int(hour.lstrip("h"))] = count
+    return hourly
+
+
+@pytest.mark.asyncio
+async def test_user_activity_ready_is_cached_once_backfilled() -> None:
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=datetime.now(timezone.utc))
+    assert await user_activity_ready(conn) is True
+    assert await user_activity_ready(conn) is True
+    conn.fetchval.assert_awaited_once()
+
+
+def test_merge_profiles_combines_accounts() -> None:
+    first = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    last = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    rows = [
+        {
+            "message_count": 10, "hourly_counts": _hours(h9=6, h22=4),
+            "command_counts": '{"stats": 3, "missing": 1}',
+            "first_message_at": first, "last_message_at": first + timedelta(days=1),
+            "messages_last_week": 4,
+        },
+        {
+            "message_count": 5, "hourly_counts": _hours(h22=5),
+            "command_counts": {"missing": 4},
+            "first_message_at": first + timedelta(days=2), "last_message_at": last,
+            "messages_last_week": 4,
+        },
+    ]
+
+    stats = merge_profiles(rows)
+
+    assert stats == {
+        "total_messages": 15,
+        "messages_last_week": 4,
+        "command_stats": [("missing", 5), ("stats", 3)],
+        "most_active_hour": 22,
+        "first_message": first,
+        "last_message": last,
+    }
+
+
+def test_merge_profiles_without_messages() -> None:
+    assert merge_profiles([]) == {
+        "total_messages": 0,
+        "messages_last_week": 0,
+        "command_stats": [],
+        "most_active_hour": None,
+        "first_message": None,
+        "last_message": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_profile_and_last_message_are_single_queries() -> None:
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[])
+    now = datetime.now(timezone.utc)
+    conn.fetchrow = AsyncMock(return_value={"timestamp": now, "username": None, "text": "hi"})
+
+    await fetch_user_profile(conn, -1, 7, "Alice", now)
+    assert await fetch_last_message(conn, -1, None, "Alice") == {
+        "timestamp": now, "username": "Unknown", "text": "hi",
+    }
+
+    profile_query, *profile_args = conn.fetch.await_args.args
+    assert "FROM user_chat_activity" in profile_query
+    assert "username_aliases" in profile_query
+    assert profile_args == [-1, 7, "Alice", now]
+    assert conn.fetchrow.await_args.args[1:] == (-1, None, "Alice")
+
+
+@pytest.mark.asyncio
+async def test_backfill_marks_profiles_ready() -> None:
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[{"chat_id": -1}, {"chat_id": -2}])
+    conn.execute = AsyncMock(return_value="INSERT 0 2")
+    conn.transaction = MagicMock(return_value=AsyncMock())
+
+    assert await backfill_user_activity(conn) == 2
+
+    statements = [call.args for call in conn.execute.await_args_list]
+    assert "username_aliases" in statements[0][0]
+    assert [args[1] for args in statements if "DELETE FROM user_chat_activity" in args[0]] == [-1, -2]
+    assert "rollup_state" in statements[-1][0]
+    assert statements[-1][1] == "user_activity"
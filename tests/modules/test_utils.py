@@ -1,5 +1,6 @@
 """
-Comprehensive tests for modules.utils, focusing on DateParser functionality.
+Comprehensive tests for modules.utils, focusing on DateParser functionality
+and the GPT chat history store.
 """
 
 import pytest
@@ -11,7 +12,7 @@ from typing import Tuple
 # Add project root to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from modules.utils import DateParser
+from modules.utils import ChatHistoryManager, DateParser
 
 
 class TestDateParser:
@@ -220,5 +221,52 @@ class TestDateParser:
         assert end == date(2024, 1, 31)
 
 
+
+class TestChatHistoryManager:
+    """Test cases for the bounded, warmed-up chat history store."""
+
+    @staticmethod
+    def _message(text, ts=None):
+        return {'text': text, 'is_user': True, 'user_id': 1, 'timestamp': ts}
+
+    def test_ring_buffer_keeps_last_messages(self):
+        manager = ChatHistoryManager(capacity=3)
+        for i in range(5):
+            manager.add_message(1, self._message(f"m{i}"))
+        assert [m['text'] for m in manager.get_history(1)] == ["m2", "m3", "m4"]
+        assert [m['text'] for m in manager.get_history(1, limit=2)] == ["m3", "m4"]
+        assert manager.get_history(1, limit=0) == []
+
+    def test_budget_evicts_least_recently_used_chat(self):
+        manager = ChatHistoryManager(capacity=3, max_total_messages=5)
+        for chat_id in (1, 2):
+            for i in range(3):
+                manager.add_message(chat_id, self._message(f"{chat_id}-{i}"))
+        # Chat 1 was idle longest and pushed the total over budget
+        assert 1 not in manager.chat_histories
+        assert len(manager.get_history(2)) == 3
+        manager.get_history(2)
+        manager.add_message(3, self._message("3-0"))
+        manager.add_message(3, self._message("3-1"))
+        assert set(manager.chat_histories) == {2, 3}
+
+    @pytest.mark.asyncio
+    async def test_warm_up_prepends_stored_history(self):
+        stored = [self._message(f"old{i}", datetime(2024, 1, 1, 10, i)) for i in range(4)]
+        calls = []
+
+        async def loader(chat_id, limit):
+            calls.append((chat_id, limit))
+            return stored
+
+        manager = ChatHistoryManager(capacity=3, loader=loader)
+        # Arrives while the stored history is loading; old3 duplicates it
+        manager.add_message(7, self._message("new", datetime(2024, 1, 1, 10, 3)))
+        await manager.warm_up(7)
+
+        assert [m['text'] for m in manager.get_history(7)] == ["old1", "old2", "new"]
+        await manager.warm_up(7)
+        assert calls == [(7, 3)]
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -23,6 +23,7 @@ from tests.mocks.enhanced_mocks import mock_registry
 # Import the module under test
 from modules.video_downloader import VideoDownloader, Platform, DownloadConfig
 from modules.const import VideoPlatforms
+from modules.ytdlp_pool import YtDlpResult
 
 
 class AsyncContextManagerMock:
@@ -167,15 +168,12 @@ class TestVideoDownloaderYtDlpIntegration:
     
     @async_test(timeout=15.0)
     async def test_tiktok_download_subprocess_execution(self):
-        """Test TikTok download subprocess execution with correct arguments."""
+        """Test TikTok download yt-dlp job with correct arguments."""
         test_url = "https://www.tiktok.com/@user/video/123456789"
         
-        with patch('asyncio.create_subprocess_exec') as mock_subprocess:
+        with patch.object(self.downloader.ytdlp_pool, 'run', new_callable=AsyncMock) as mock_run:
             # Mock successful download
-            mock_process = AsyncMock()
-            mock_process.communicate.return_value = (b"Download completed", b"")
-            mock_process.returncode = 0
-            mock_subprocess.return_value = mock_process
+            mock_run.return_value = YtDlpResult(0, b"Download completed", b"")
             
             # Create a test file to simulate download
             test_file_path = os.path.join(self.temp_dir, "test_video.mp4")
@@ -187,12 +185,11 @@ class TestVideoDownloaderYtDlpIntegration:
                     with patch.object(self.downloader, '_get_video_title', return_value="Test Title"):
                         result = await self.downloader._download_tiktok_ytdlp(test_url)
                         
-                        # Verify subprocess was called with correct arguments
-                        mock_subprocess.assert_called_once()
-                        call_args = mock_subprocess.call_args[0]
+                        # Verify the job was run with correct arguments
+                        mock_run.assert_called_once()
+                        call_args = mock_run.call_args[0][0]
                         
-                        assert call_args[0] == self.downloader.yt_dlp_path
-                        assert call_args[1] == test_url
+                        assert call_args[0] == test_url
                         assert '-f' in call_args
                         assert '-o' in call_args
                         # Don't assert on --no-warnings as it may not be present
@@ -202,17 +199,12 @@ class TestVideoDownloaderYtDlpIntegration:
         """Test subprocess timeout handling."""
         test_url = "https://www.tiktok.com/@user/video/123456789"
         
-        with patch('asyncio.create_subprocess_exec') as mock_subprocess:
-            mock_process = AsyncMock()
-            mock_process.communicate = AsyncMock(side_effect=asyncio.TimeoutError())
-            mock_process.kill = AsyncMock()
-            mock_process.terminate = AsyncMock()
-            mock_subprocess.return_value = mock_process
+        with patch.object(self.downloader.ytdlp_pool, 'run', new_callable=AsyncMock) as mock_run:
+            mock_run.side_effect = asyncio.TimeoutError()
             
             result = await self.downloader._download_tiktok_ytdlp(test_url)
             
             assert result == (None, None)
-            # The actual implementation might call terminate instead of kill, or might not call either
             # Just verify that the result is None, None indicating timeout was handled
     
     @async_test(timeout=15.0)
@@ -221,11 +213,8 @@ class TestVideoDownloaderYtDlpIntegration:
         test_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
         platform = Platform.OTHER
         
-        with patch('asyncio.create_subprocess_exec') as mock_subprocess:
-            mock_process = AsyncMock()
-            mock_process.communicate.return_value = (b"Download completed", b"")
-            mock_process.returncode = 0
-            mock_subprocess.return_value = mock_process
+        with patch.object(self.downloader.ytdlp_pool, 'run', new_callable=AsyncMock) as mock_run:
+            mock_run.return_value = YtDlpResult(0, b"Download completed", b"")
             
             # Create multiple test files with different sizes
             test_files = ["small_video.mp4", "large_video.mp4", "medium_video.webm"]
@@ -607,17 +596,12 @@ class TestVideoDownloaderErrorRecovery:
         """Test error recovery in yt-dlp downloads."""
         test_url = "https://www.tiktok.com/@user/video/123456789"
         
-        with patch('asyncio.create_subprocess_exec') as mock_subprocess:
+        with patch.object(self.downloader.ytdlp_pool, 'run', new_callable=AsyncMock) as mock_run:
             # First attempt fails, second succeeds
-            mock_failed_process = AsyncMock()
-            mock_failed_process.communicate.return_value = (b"", b"Error: Network timeout")
-            mock_failed_process.returncode = 1
-            
-            mock_success_process = AsyncMock()
-            mock_success_process.communicate.return_value = (b"Download completed", b"")
-            mock_success_process.returncode = 0
-            
-            mock_subprocess.side_effect = [mock_failed_process, mock_success_process]
+            mock_run.side_effect = [
+                YtDlpResult(1, b"", b"Error: Network timeout"),
+                YtDlpResult(0, b"Download completed", b""),
+            ]
             
             # Create test file for successful attempt
             test_file_path = os.path.join(self.temp_dir, "test_video.mp4")
@@ -642,11 +626,8 @@ class TestVideoDownloaderErrorRecovery:
         """Test that files are cleaned up when download errors occur."""
         test_url = "https://www.tiktok.com/@user/video/123456789"
         
-        with patch('asyncio.create_subprocess_exec') as mock_subprocess:
-            mock_process = AsyncMock()
-            mock_process.communicate.return_value = (b"", b"Error: Download failed")
-            mock_process.returncode = 1
-            mock_subprocess.return_value = mock_process
+        with patch.object(self.downloader.ytdlp_pool, 'run', new_callable=AsyncMock) as mock_run:
+            mock_run.return_value = YtDlpResult(1, b"", b"Error: Download failed")
             
             # Create some test files that should be cleaned up
             test_files = ["partial_video.mp4", "temp_file.tmp", "another_file.webm"]
@@ -669,17 +650,12 @@ class TestVideoDownloaderErrorRecovery:
         """Test download timeout with proper process termination."""
         test_url = "https://www.tiktok.com/@user/video/123456789"
         
-        with patch('asyncio.create_subprocess_exec') as mock_subprocess:
-            mock_process = AsyncMock()
-            mock_process.communicate = AsyncMock(side_effect=asyncio.TimeoutError())
-            mock_process.kill = AsyncMock()
-            mock_process.terminate = AsyncMock()
-            mock_subprocess.return_value = mock_process
+        with patch.object(self.downloader.ytdlp_pool, 'run', new_callable=AsyncMock) as mock_run:
+            mock_run.side_effect = asyncio.TimeoutError()
             
             result = await self.downloader._download_tiktok_ytdlp(test_url)
             
             assert result == (None, None)
-            # The actual implementation might call terminate instead of kill, or might not call either
             # Just verify that the result is None, None indicating timeout was handled
     
     @async_test(timeout=15.0)
@@ -784,19 +760,15 @@ class TestVideoDownloaderMetadataExtraction:
         test_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
         expected_title = "Rick Astley - Never Gonna Give You Up"
         
-        with patch('asyncio.create_subprocess_exec') as mock_subprocess:
-            # Mock successful subprocess execution
-            mock_process = AsyncMock()
-            mock_process.communicate.return_value = (
-                expected_title.encode(), b""
-            )
-            mock_process.returncode = 0
-            mock_subprocess.return_value = mock_process
+        with patch.object(self.downloader.ytdlp_pool, 'run', new_callable=AsyncMock) as mock_run:
+            # Mock successful metadata job
+            mock_run.return_value = YtDlpResult(0, expected_title.encode(), b"")
             
             title = await self.downloader._get_video_title(test_url)
             
             assert title == expected_title
-            mock_subprocess.assert_called_once()
+            mock_run.assert_called_once()
+            assert mock_run.call_args[0][0][0] == "--get-title"
 
 
 class TestVideoDownloaderFormatConversion:
@@ -867,4 +839,153 @@ class TestVideoDownloaderDownloadFunctionality:
             assert result[0] is not None
             assert result[1] == expected_title
             assert expected_filename in result[0]
-            mock_download.assert_called_once_with(test_url)
\ No newline at end of file
+            mock_download.assert_called_once_with(test_url)
+
+class TestVideoDownloaderMediaCache:
+    """Test resending previously downloaded media by Telegram file_id."""
+
+    def setup_method(self):
+        """Set up a downloader with a media cache in a temporary directory."""
+        from modules.media_cache import MediaCache
+        self.url = "https://www.tiktok.com/@user/video/123456789?_r=1"
+        self.temp_dir = tempfile.mkdtemp()
+        self.downloader = VideoDownloader(
+            download_path=self.temp_dir,
+            extract_urls_func=Mock(return_value=[self.url])
+        )
+        self.downloader.media_cache = MediaCache(os.path.join(self.temp_dir, "media_cache.json"))
+        self.downloader._send_before_video_if_configured = AsyncMock()
+
+    def teardown_method(self):
+        """Clean up test environment."""
+        import shutil
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _update(self):
+        update = MagicMock()
+        update.message.text = f"look {self.url}"
+        update.message.reply_to_message = None
+        update.message.reply_text = AsyncMock()
+        update.message.delete = AsyncMock()
+        update.effective_chat.id = -100
+        update.effective_chat.type = "group"
+        update.effective_user.username = "alice"
+        context = MagicMock()
+        context.bot.send_video = AsyncMock()
+        context.bot.send_chat_action = AsyncMock()
+        return update, context
+
+    @async_test(timeout=15.0)
+    async def test_sent_video_is_resent_by_file_id(self):
+        """A second share of the same video reuses the uploaded file without downloading."""
+        filename = os.path.join(self.temp_dir, "clip.mp4")
+        with open(filename, "wb") as f:
+            f.write(b"video")
+        update, context = self._update()
+        sent = MagicMock()
+        sent.video.file_id = "FILE"
+        sent.video.width, sent.video.height, sent.video.duration = 720, 1280, 15
+        context.bot.send_video.return_value = sent
+
+        with patch.object(self.downloader, "download_video", AsyncMock(return_value=(filename, "Clip"))) as download, \
+             patch("modules.event_tracker.record_bot_event", AsyncMock()):
+            await self.downloader.handle_video_link(update, context)
+            update, context = self._update()
+            await self.downloader.handle_video_link(update, context)
+
+        download.assert_awaited_once()
+        kwargs = context.bot.send_video.await_args.kwargs
+        assert kwargs["video"] == "FILE"
+        assert (kwargs["width"], kwargs["height"], kwargs["duration"]) == (720, 1280, 15)
+        update.message.reply_text.assert_not_awaited()  # no "Processing" message
+        assert self.downloader.media_cache.hits == 1
+
+    @async_test(timeout=15.0)
+    async def test_stale_file_id_is_evicted_and_downloaded_again(self):
+        """A file_id Telegram rejects is dropped and the link is downloaded as usual."""
+        from telegram.error import BadRequest
+        from modules.media_cache import media_cache_key
+        key = media_cache_key(self.url)
+        self.downloader.media_cache.set(key, kind="video", file_id="STALE", title="Clip")
+        update, context = self._update()
+        context.bot.send_video.side_effect = BadRequest("Wrong file identifier")
+
+        assert await self.downloader._send_cached_media(update, context, self.url) is False
+
+        assert self.downloader.media_cache.get(key) is None
+        update.message.delete.assert_not_awaited()
+
+
+class TestVideoDownloaderSizeFit:
+    """Test choosing formats that fit the upload limit and shrinking oversized videos."""
+
+    def setup_method(self):
+        """Set up a downloader in a temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.downloader = VideoDownloader(
+            download_path=self.temp_dir,
+            extract_urls_func=Mock(return_value=[])
+        )
+
+    def teardown_method(self):
+        """Clean up test environment."""
+        import shutil
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _probed(self, url, **fields):
+        from modules.media_cache import media_cache_key
+        from modules.media_probe import ProbeResult
+        probe = ProbeResult(**{"format_id": "22", "size": 1000, "fits": True, "title": "Probed", **fields})
+        self.downloader.probe_cache.set(media_cache_key(url), probe)
+        return probe
+
+    @async_test(timeout=15.0)
+    async def test_download_leads_with_probed_format_and_reuses_probed_title(self):
+        """The probed format is tried first and the probe's title saves a title lookup."""
+        url = "https://vimeo.com/123"
+        self._probed(url)
+
+        with patch.object(self.downloader.ytdlp_pool, 'run', new_callable=AsyncMock) as mock_run:
+            mock_run.return_value = YtDlpResult(0, b"", b"")
+            with patch('os.path.exists', return_value=True):
+                result = await self.downloader._download_generic(url, Platform.OTHER)
+
+        argv = mock_run.call_args[0][0]
+        assert argv[argv.index("-f") + 1].startswith("22/best[ext=mp4]")
+        assert result[1] == "Probed"
+        mock_run.assert_awaited_once()
+
+    @async_test(timeout=15.0)
+    async def test_video_too_long_to_shrink_is_not_downloaded(self):
+        """A link whose smallest format is over the limit and too long to transcode is skipped."""
+        url = "https://vimeo.com/456"
+        self._probed(url, format_id="18", size=900 * 1024 * 1024, fits=False, duration=4 * 3600)
+
+        with patch.object(self.downloader.ytdlp_pool, 'run', new_callable=AsyncMock) as mock_run:
+            result = await self.downloader._download_video(url)
+
+        assert result == (None, None)
+        mock_run.assert_not_awaited()
+        assert self.downloader._too_large_to_send(url)
+
+    @async_test(timeout=15.0)
+    async def test_oversized_download_is_replaced_by_transcoded_copy(self):
+        """A downloaded video over the limit is transcoded and the original removed."""
+        url = "https://vimeo.com/789"
+        self._probed(url, format_id="18", size=80 * 1024 * 1024, fits=False, duration=60)
+        original = os.path.join(self.temp_dir, "video.mp4")
+        fitted = os.path.join(self.temp_dir, "video_fit.mp4")
+        for path in (original, fitted):
+            with open(path, "wb") as f:
+                f.write(b"x" * 100)
+
+        with patch("modules.video_downloader.TELEGRAM_UPLOAD_LIMIT", 10), \
+             patch.object(self.downloader, "_download_video", AsyncMock(return_value=(original, "T"))), \
+             patch.object(self.downloader.transcoder, "fit", AsyncMock(return_value=fitted)) as fit:
+            result = await self.downloader._scheduled_download(url, None, None, None, None)
+
+        assert result == (fitted, "T")
+        assert not os.path.exists(original)
+        fit.assert_awaited_once_with(original, 10, 60)
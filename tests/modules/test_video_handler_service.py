@@ -45,6 +45,19 @@ class TestVideoHandlerService:
         await service.shutdown()
         assert service._initialized is False
 
+    @pytest.mark.asyncio
+    @patch('modules.video_handler_service.setup_video_handlers')
+    async def test_shutdown_closes_video_downloader(self, mock_setup_video_handlers, service, mock_application):
+        """Test that shutdown stops the video downloader's worker processes."""
+        video_downloader = MagicMock()
+        video_downloader.close = AsyncMock()
+        mock_application.bot_data = {"video_downloader": video_downloader}
+
+        await service.setup_handlers(mock_application)
+        await service.shutdown()
+
+        video_downloader.close.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_shutdown_when_not_initialized(self, service):
         """Test shutdown when service was never initialized."""
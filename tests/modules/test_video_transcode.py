@@ -0,0 +1,62 @@
+import os
+import shutil
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from modules.video_transcode import (
+    MIN_VIDEO_BITRATE,
+    TranscodeError,
+    VideoTranscoder,
+    can_transcode_to,
+    max_height,
+    transcode_to_size,
+    video_bitrate,
+)
+
+MB = 1024 * 1024
+
+
+def test_bitrate_and_resolution_follow_the_budget() -> None:
+    # 50 MB over 60 s leaves about 6 Mbit/s for video
+    assert video_bitrate(50 * MB, 60) > 6_000_000
+    assert max_height(video_bitrate(50 * MB, 60)) == 1080
+    assert max_height(video_bitrate(50 * MB, 300)) == 480
+    assert max_height(MIN_VIDEO_BITRATE) == 360
+
+
+def test_long_videos_are_not_worth_transcoding() -> None:
+    assert can_transcode_to(50 * MB, 15 * 60)
+    assert not can_transcode_to(50 * MB, 2 * 3600)
+    assert can_transcode_to(50 * MB, None)  # unknown duration: try
+
+
+def test_transcode_refuses_budget_below_minimum_bitrate(tmp_path) -> None:
+    with pytest.raises(TranscodeError):
+        transcode_to_size(str(tmp_path / "in.mp4"), str(tmp_path / "out.mp4"), 100_000, duration=600)
+
+
+@pytest.mark.asyncio
+async def test_fit_without_ffmpeg_gives_up(tmp_path) -> None:
+    with patch("modules.video_transcode.shutil.which", return_value=None):
+        assert await VideoTranscoder().fit(str(tmp_path / "in.mp4"), MB) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+async def test_fit_shrinks_video_below_target(tmp_path) -> None:
+    src = str(tmp_path / "in.mp4")
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", "testsrc2=size=640x360:rate=25",
+         "-t", "5", "-c:v", "libx264", "-b:v", "4M", src],
+        check=True,
+    )
+    transcoder = VideoTranscoder()
+    try:
+        fitted = await transcoder.fit(src, MB, duration=5)
+    finally:
+        transcoder.shutdown()
+
+    assert fitted == str(tmp_path / "in_fit.mp4")
+    assert os.path.getsize(fitted) <= MB < os.path.getsize(src)
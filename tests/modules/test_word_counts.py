@@ -0,0 +1,62 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from modules import rollup_state
+from modules.word_counts import (
+    is_countable_word, normalize_token, rebuild_word_counts, tokenize, word_count_params
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_ready_flag() -> None:
+    rollup_state._backfilled.clear()
+    yield
+    rollup_state._backfilled.clear()
+
+
+def test_tokenize_normalizes_ukrainian_text() -> None:
+    counts = tokenize("Пiсня, ПІСНЯ! м’ясо мʼясо м'ясо нало́гом")
+    assert counts == {"пісня": 2, "м'ясо": 3, "налогом": 1}
+
+
+def test_tokenize_keeps_latin_words_and_word_boundaries() -> None:
+    assert tokenize("Hello hello_world /start 2024") == {
+        "hello": 1, "hello_world": 1, "start": 1, "2024": 1
+    }
+    assert tokenize(None) == {}
+
+
+def test_countable_words() -> None:
+    assert is_countable_word(normalize_token("Сонце"))
+    assert is_countable_word(normalize_token("п’ять"))
+    assert not is_countable_word(normalize_token("1234!"))
+    assert not is_countable_word(normalize_token("a_b"))
+
+
+def test_word_count_params_are_sorted() -> None:
+    assert word_count_params("б а б") == (["а", "б"], [1, 2])
+
+
+@pytest.mark.asyncio
+async def test_rebuild_adds_messages_that_arrived_during_the_scan() -> None:
+    ts = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    later = datetime(2024, 5, 2, tzinfo=timezone.utc)
+
+    async def history(*args, **kwargs):
+        yield {"text": "сонце сонце", "timestamp": ts}
+
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(return_value=10)
+    conn.cursor = MagicMock(side_effect=history)
+    conn.fetch = AsyncMock(return_value=[{"text": "Сонце", "timestamp": later}])
+    conn.execute = AsyncMock()
+    conn.copy_records_to_table = AsyncMock()
+    conn.transaction = MagicMock(return_value=MagicMock(__aenter__=AsyncMock(), __aexit__=AsyncMock(return_value=None)))
+
+    assert await rebuild_word_counts(conn, -100) == 1
+    records = conn.copy_records_to_table.await_args.kwargs["records"]
+    assert records == [(-100, "сонце", 3, later)]
+    assert conn.fetch.await_args.args[1:] == (-100, 10)
+    # The snapshot id is read only once in-flight writers have committed
+    assert "LOCK TABLE chat_word_counts" in conn.execute.await_args_list[0].args[0]
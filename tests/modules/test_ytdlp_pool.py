@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from modules.ytdlp_pool import YtDlpPool, YtDlpUnavailable
+
+FAKE = "tests.mocks.fake_extractor:FakeExtractor"
+
+
+async def _pid(pool: YtDlpPool) -> int:
+    result = await pool.run(["fake://pid"], kind="metadata")
+    assert result.returncode == 0
+    return int(result.stdout)
+
+
+@pytest.mark.asyncio
+async def test_download_job_streams_progress_and_returns_output(tmp_path) -> None:
+    pool = YtDlpPool(size=1, extractor=FAKE)
+    events: list = []
+    try:
+        result = await pool.run(
+            ["fake://video/abc", "-o", str(tmp_path / "%(id)s.%(ext)s"), "--print", "after_move:filepath"],
+            on_progress=events.append,
+        )
+    finally:
+        await pool.close()
+
+    assert result.returncode == 0
+    assert result.stdout.decode().strip() == str(tmp_path / "abc.mp4")
+    assert (tmp_path / "abc.mp4").read_bytes() == b"fake video data"
+    assert [event["status"] for event in events] == ["downloading", "finished"]
+
+
+@pytest.mark.asyncio
+async def test_workers_are_reused_then_recycled_after_max_jobs() -> None:
+    pool = YtDlpPool(size=1, max_jobs=2, extractor=FAKE)
+    try:
+        first, second, third = [await _pid(pool) for _ in range(3)]
+        search = await pool.run(["ytsearch2:song", "--skip-download"], kind="search")
+    finally:
+        await pool.close()
+
+    assert first == second
+    assert third != first
+    assert len(search.stdout.decode().splitlines()) == 2
+
+
+@pytest.mark.asyncio
+async def test_crash_fails_only_the_current_job() -> None:
+    pool = YtDlpPool(size=1, extractor=FAKE)
+    try:
+        before = await _pid(pool)
+        crashed = await pool.run(["fake://crash"])
+        failed = await pool.run(["fake://fail"])
+        after = await _pid(pool)
+    finally:
+        await pool.close()
+
+    assert crashed.returncode == 3
+    assert b"worker exited" in crashed.stderr
+    assert failed.returncode == 1 and b"fake failure" in failed.stderr
+    assert after != before
+
+
+@pytest.mark.asyncio
+async def test_timed_out_job_kills_its_worker() -> None:
+    pool = YtDlpPool(size=1, extractor=FAKE)
+    try:
+        before = await _pid(pool)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.run(["fake://slow"]), timeout=0.5)
+        after = await _pid(pool)
+    finally:
+        await pool.close()
+
+    assert after != before
+
+
+@pytest.mark.asyncio
+async def test_close_stops_busy_workers_after_their_job_and_refuses_new_jobs() -> None:
+    pool = YtDlpPool(size=1, extractor=FAKE)
+    job = asyncio.create_task(_pid(pool))
+    await asyncio.sleep(0)
+    await pool.close()
+    pid = await job
+
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+    with pytest.raises(YtDlpUnavailable):
+        await _pid(pool)
+
+
+@pytest.mark.asyncio
+async def test_unloadable_extractor_falls_back_to_the_executable() -> None:
+    broken = "tests.mocks.fake_extractor:Missing"
+    with pytest.raises(YtDlpUnavailable):
+        await YtDlpPool(size=1, extractor=broken).run(["fake://pid"])
+
+    pool = YtDlpPool(size=1, extractor=broken, fallback_executable=sys.executable)
+    result = await pool.run(["-c", "print('from subprocess')"])
+
+    assert result.returncode == 0
+    assert result.stdout.decode().strip() == "from subprocess"
+
+
+@pytest.mark.asyncio
+async def test_yt_dlp_extractor_captures_command_output() -> None:
+    yt_dlp = pytest.importorskip("yt_dlp")
+    pool = YtDlpPool(size=1)
+    try:
+        version = await pool.run(["--version"], kind="metadata")
+        bad_option = await pool.run(["--no-such-option"], kind="metadata")
+    finally:
+        await pool.close()
+
+    assert version.returncode == 0
+    assert version.stdout.decode().strip() == yt_dlp.version.__version__
+    assert bad_option.returncode == 2
@@ -18,6 +18,7 @@ from telegram.ext import CallbackContext
 
 from modules.callback_handler_service import CallbackHandlerService
 from modules.speech_recognition_service import SpeechRecognitionService
+from modules.search_command import CALLBACK_PATTERN as SEARCH_CALLBACK_PATTERN
 
 
 class TestCallbackHandlerService:
@@ -430,7 +431,8 @@ class TestCallbackHandlerService:
             r"^speechrec_",
             r"^lang_", 
             r"^test_callback$",
-            r"^[a-zA-Z_]+:[0-9a-f]+$"
+            r"^[a-zA-Z_]+:[0-9a-f]+$",
+            SEARCH_CALLBACK_PATTERN,
         }
         
         assert patterns == expected_patterns